@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+透明度合成基准测试
+对比旧的“白色背景 + 转RGBA + split取alpha + paste”路径与 flatten_alpha 的耗时和峰值内存。
+每种方法在独立子进程中运行，峰值内存取自 ru_maxrss（仅Linux/macOS）。
+注意：旧路径对 LA 图片不使用 alpha 作为蒙版（结果不正确），其耗时仅供参考。
+
+用法: python benchmarks/bench_flatten.py [百万像素，默认40]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import multiprocessing
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from PIL import Image
+from utils.image_utils import flatten_alpha
+
+
+def legacy_flatten(img):
+    """旧版 ImageConverter 的合成路径"""
+    background = Image.new('RGB', img.size, (255, 255, 255))
+    if img.mode == 'P':
+        img = img.convert('RGBA')
+    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+    return background
+
+
+def make_image(mode, megapixels):
+    """生成带渐变透明度的测试图片"""
+    width = 8000
+    height = int(megapixels * 1_000_000 / width)
+    alpha = Image.linear_gradient('L').resize((width, height))
+    rgb = Image.radial_gradient('L').resize((width, height)).convert('RGB')
+    rgba = rgb.copy()
+    rgba.putalpha(alpha)
+    if mode == 'RGBA':
+        return rgba
+    if mode == 'LA':
+        return rgba.convert('LA')
+    # 带tRNS的调色板图片
+    palette_img = rgba.convert('RGB').quantize(255)
+    palette_img.info['transparency'] = 0
+    return palette_img
+
+
+def run(method_name, source_path, queue):
+    """在子进程中运行单个方法（从PNG解码，避免生成测试图片的临时内存干扰峰值统计）"""
+    import resource
+    img = Image.open(source_path)
+    img.load()
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    method = legacy_flatten if method_name == 'legacy' else flatten_alpha
+    start = time.perf_counter()
+    method(img)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((elapsed, (peak - baseline) / 1024))
+
+
+def main():
+    megapixels = float(sys.argv[1]) if len(sys.argv) > 1 else 40
+    print(f"透明度合成基准测试（{megapixels:g} MP）")
+    print(f"{'模式':<6}{'方法':<10}{'耗时(s)':>10}{'新增峰值内存(MB)':>20}")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for mode in ('RGBA', 'LA', 'P'):
+            source_path = os.path.join(temp_dir, f"{mode}.png")
+            make_image(mode, megapixels).save(source_path, compress_level=1)
+            for method_name in ('legacy', 'flatten'):
+                queue = multiprocessing.Queue()
+                process = multiprocessing.Process(target=run, args=(method_name, source_path, queue))
+                process.start()
+                elapsed, peak_mb = queue.get()
+                process.join()
+                print(f"{mode:<6}{method_name:<10}{elapsed:>10.3f}{peak_mb:>20.1f}")
+
+
+if __name__ == '__main__':
+    main()
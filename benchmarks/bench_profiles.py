@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+编码配置基准测试
+对每种图片格式的 fast / balanced / smallest 配置，统计编码CPU时间、实际耗时和输出大小，
+并与 Pillow 默认参数对比（AVIF 编码器是多线程的，实际耗时小于CPU时间）。
+当前 Pillow 不支持的格式会被跳过。测试图片为带噪声的渐变（接近照片的压缩难度），
+也可以指定一张图片。
+
+用法: python benchmarks/bench_profiles.py [图片路径] [重复次数，默认3]
+"""
+
+import io
+import os
+import sys
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from PIL import Image
+from utils.encoder_profiles import IMAGE_PROFILES, PROFILES, image_save_params
+from utils.image_codecs import is_codec_available
+
+
+def make_image(size=(2400, 1600)):
+    """生成带噪声的渐变测试图片"""
+    gradient = Image.radial_gradient('L').resize(size)
+    noise = Image.effect_noise(size, 24)
+    red = Image.blend(gradient, noise, 0.3)
+    green = Image.linear_gradient('L').resize(size)
+    blue = Image.blend(green.transpose(Image.FLIP_LEFT_RIGHT), noise, 0.15)
+    return Image.merge('RGB', (red, green, blue))
+
+
+def measure(img, save_format, params, repeat):
+    """返回 (平均CPU时间, 平均实际耗时, 输出字节数)"""
+    size = 0
+    start = time.process_time()
+    wall_start = time.perf_counter()
+    for _ in range(repeat):
+        buffer = io.BytesIO()
+        img.save(buffer, format=save_format, **params)
+        size = buffer.tell()
+    return (time.process_time() - start) / repeat, (time.perf_counter() - wall_start) / repeat, size
+
+
+def main():
+    img = Image.open(sys.argv[1]).convert('RGB') if len(sys.argv) > 1 else make_image()
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    img.load()
+
+    print(f"编码配置基准测试（{img.size[0]}x{img.size[1]}，重复 {repeat} 次）")
+    print(f"{'格式':<6}{'配置':<10}{'CPU时间(s)':>12}{'耗时(s)':>10}{'大小(KB)':>12}{'相对默认':>10}")
+    for save_format in IMAGE_PROFILES:
+        if not is_codec_available(save_format):
+            print(f"{save_format:<6}（不可用，跳过）")
+            continue
+        source = img.quantize(256) if save_format == 'GIF' else img
+        default_time, default_wall, default_size = measure(source, save_format, {}, repeat)
+        print(f"{save_format:<6}{'default':<10}{default_time:>12.3f}{default_wall:>10.3f}"
+              f"{default_size / 1024:>12.1f}{'100%':>10}")
+        for profile in PROFILES:
+            params = image_save_params(save_format, {'profile': profile})
+            elapsed, wall, size = measure(source, save_format, params, repeat)
+            ratio = f"{size * 100 / default_size:.0f}%"
+            print(f"{save_format:<6}{profile:<10}{elapsed:>12.3f}{wall:>10.3f}{size / 1024:>12.1f}{ratio:>10}")
+
+
+if __name__ == '__main__':
+    main()
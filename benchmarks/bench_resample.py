@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+重采样基准测试
+对比本项目的多相重采样（NumPy）、ffmpeg 自带的 swresample 和 scipy.signal.resample_poly
+（安装了 SciPy 时）的速度与质量：
+    速度: 立体声噪声的处理倍速（音频时长 / 耗时），ffmpeg 包含进程启动和读写 WAV 的时间
+    短片段: 每个 3 秒片段的平均耗时（语音数据集的典型情况，进程启动开销占主要部分）
+    SNR: 1kHz 正弦波转换后与理想正弦波的信噪比（含 16 位量化）
+    混叠: 高于目标奈奎斯特频率的正弦波残留的能量（相对输入，越低越好）
+
+用法: python benchmarks/bench_resample.py [源采样率，默认44100] [目标采样率，默认16000] [时长秒数，默认60]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import wave
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+from utils.audio_stream import PcmDecoder
+from utils.ffmpeg_utils import find_ffmpeg
+from utils.native_audio import BLOCK_FRAMES, float_to_pcm, pcm_to_float
+from utils.resample import StreamingResampler
+
+try:
+    from scipy.signal import resample_poly
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+# 短片段测试的片段时长（秒）和重复次数
+CLIP_SECONDS = 3
+CLIP_REPEAT = 20
+
+
+def tone(frequency, seconds, sample_rate, channels=2):
+    """生成正弦波（幅度 0.5）"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return np.repeat((0.5 * np.sin(2 * np.pi * frequency * t))[:, None], channels, axis=1)
+
+
+def quantize(block):
+    """按 16 位 PCM 量化（与 ffmpeg 输出的位深一致）"""
+    return pcm_to_float(float_to_pcm(block, 2), 2, block.shape[1])
+
+
+def run_polyphase(data, source_rate, target_rate):
+    """本项目的多相重采样，按块输入"""
+    resampler = StreamingResampler(source_rate, target_rate, data.shape[1])
+    parts = [resampler.process(data[i:i + BLOCK_FRAMES]) for i in range(0, len(data), BLOCK_FRAMES)]
+    parts.append(resampler.flush())
+    return quantize(np.concatenate(parts))
+
+
+def run_scipy(data, source_rate, target_rate):
+    """scipy.signal.resample_poly（整段一次处理）"""
+    resampler = StreamingResampler(source_rate, target_rate, data.shape[1])
+    return quantize(resample_poly(data, resampler.up, resampler.down, axis=0))
+
+
+def make_ffmpeg_runner(temp_dir):
+    """ffmpeg swresample：写出 WAV 后用 ffmpeg 解码并重采样"""
+    def run_ffmpeg(data, source_rate, target_rate):
+        path = os.path.join(temp_dir, 'input.wav')
+        with wave.open(path, 'wb') as wav:
+            wav.setnchannels(data.shape[1])
+            wav.setsampwidth(2)
+            wav.setframerate(source_rate)
+            wav.writeframes(float_to_pcm(data, 2))
+        with PcmDecoder(path, sample_rate=target_rate) as decoder:
+            pcm = b''.join(decoder.chunks(BLOCK_FRAMES))
+            decoder.finish()
+        return pcm_to_float(pcm, 2, data.shape[1])
+    return run_ffmpeg
+
+
+def snr_db(output, frequency, sample_rate):
+    """用最小二乘拟合正弦波（与延迟无关），返回信号与残差的能量比"""
+    signal = output[len(output) // 10: -len(output) // 10, 0]
+    t = np.arange(len(signal)) / sample_rate
+    basis = np.stack([np.sin(2 * np.pi * frequency * t), np.cos(2 * np.pi * frequency * t), np.ones_like(t)], axis=1)
+    coefficients, _, _, _ = np.linalg.lstsq(basis, signal, rcond=None)
+    residual = signal - basis @ coefficients
+    return 10 * np.log10(np.sum((basis @ coefficients) ** 2) / np.sum(residual ** 2))
+
+
+def alias_db(output, source):
+    """输出能量相对输入的分贝数"""
+    signal = output[len(output) // 10: -len(output) // 10, 0]
+    return 10 * np.log10(max(np.mean(signal ** 2), 1e-20) / np.mean(source[:, 0] ** 2))
+
+
+def main():
+    source_rate = int(sys.argv[1]) if len(sys.argv) > 1 else 44100
+    target_rate = int(sys.argv[2]) if len(sys.argv) > 2 else 16000
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 60.0
+
+    noise = np.clip(np.random.default_rng(0).normal(0, 0.2, (int(seconds * source_rate), 2)), -1, 1)
+    sine = tone(1000, 5, source_rate)
+    # 高于目标奈奎斯特频率（且低于源奈奎斯特频率）的正弦波
+    alias_frequency = (min(source_rate, target_rate) / 2 + source_rate / 2) / 2
+    alias = tone(alias_frequency, 5, source_rate)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        runners = [('polyphase', run_polyphase)]
+        if find_ffmpeg():
+            runners.append(('ffmpeg', make_ffmpeg_runner(temp_dir)))
+        if HAS_SCIPY:
+            runners.append(('scipy', run_scipy))
+
+        print(f"重采样基准测试（{source_rate} -> {target_rate} Hz，立体声 {seconds:g} 秒，"
+              f"混叠测试频率 {alias_frequency:g} Hz）")
+        print(f"{'实现':<12}{'耗时(s)':>10}{'倍速':>10}{'短片段(ms)':>12}{'SNR(dB)':>10}{'混叠(dB)':>10}")
+        clip = noise[:CLIP_SECONDS * source_rate]
+        for name, runner in runners:
+            start = time.perf_counter()
+            runner(noise, source_rate, target_rate)
+            elapsed = time.perf_counter() - start
+            start = time.perf_counter()
+            for _ in range(CLIP_REPEAT):
+                runner(clip, source_rate, target_rate)
+            clip_ms = (time.perf_counter() - start) / CLIP_REPEAT * 1000
+            snr = snr_db(runner(sine, source_rate, target_rate), 1000, target_rate)
+            rejection = alias_db(runner(alias, source_rate, target_rate), alias)
+            print(f"{name:<12}{elapsed:>10.3f}{seconds / elapsed:>10.0f}{clip_ms:>12.1f}{snr:>10.1f}{rejection:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+视频转换基准测试
+对比 ffmpeg 直接转码与 MoviePy（每帧解码为 NumPy 数组再送回 ffmpeg 编码）的耗时。
+测试视频由 ffmpeg 生成（testsrc2 图案 + 正弦波音频，H.264 + AAC），两种方式使用相同的编码器，
+并关闭直接复制流（mp4 -> mkv 等只需改变封装的转换不会重新编码）。
+最后对比第一个目标格式整段编码与分段并行编码（每个CPU核心约两段）的耗时。
+
+用法: python benchmarks/bench_video.py [时长秒数，默认20] [分辨率，默认1280x720] [目标格式，默认 mp4,avi,mkv]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from converters.video_converter import HAS_MOVIEPY, VideoConverter
+from utils.config import DEFAULT_CONFIG
+from utils.ffmpeg_utils import find_ffmpeg, run_ffmpeg
+from utils.video_transcode import select_codecs
+
+FRAME_RATE = 25
+
+
+def make_source(path, seconds, size):
+    """生成测试视频"""
+    run_ffmpeg([
+        '-f', 'lavfi', '-i', f'testsrc2=size={size}:rate={FRAME_RATE}:duration={seconds}',
+        '-f', 'lavfi', '-i', f'sine=frequency=440:duration={seconds}',
+        '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-g', str(2 * FRAME_RATE), '-c:a', 'aac', '-shortest', path
+    ])
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 20.0
+    size = sys.argv[2] if len(sys.argv) > 2 else '1280x720'
+    targets = sys.argv[3].split(',') if len(sys.argv) > 3 else ['mp4', 'avi', 'mkv']
+
+    if not find_ffmpeg():
+        print("未找到ffmpeg")
+        return
+    engines = ['ffmpeg'] + (['moviepy'] if HAS_MOVIEPY else [])
+    converter = VideoConverter(DEFAULT_CONFIG['converters']['video'])
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = os.path.join(temp_dir, 'source.mp4')
+        make_source(source, seconds, size)
+        frames = seconds * FRAME_RATE
+
+        print(f"视频转换基准测试（{size}，{seconds:g} 秒，{FRAME_RATE} fps）")
+        print(f"{'目标':<8}{'编码器':<22}" + ''.join(f"{name + '(s)':>12}{'fps':>8}" for name in engines)
+              + (f"{'加速比':>8}" if len(engines) > 1 else ''))
+        for target in targets:
+            elapsed = []
+            for engine in engines:
+                output = os.path.join(temp_dir, f'{engine}.{target}')
+                start = time.perf_counter()
+                options = {'engine': engine, 'stream_copy': False}
+                if not converter.convert(source, output, 'mp4', target, options=options):
+                    raise RuntimeError(f"{engine} 转换为 {target} 失败")
+                elapsed.append(time.perf_counter() - start)
+            codecs = '+'.join(select_codecs(target))
+            row = f"{target:<8}{codecs:<22}" + ''.join(f"{t:>12.2f}{frames / t:>8.0f}" for t in elapsed)
+            if len(elapsed) > 1:
+                row += f"{elapsed[1] / elapsed[0]:>8.1f}"
+            print(row)
+            if target == targets[0]:
+                whole = elapsed[0]
+
+        # 分段并行编码（整段编码的耗时取上面 ffmpeg 的结果）
+        cpus = os.cpu_count() or 1
+        segment_seconds = max(2.0, seconds / (2 * cpus))
+        start = time.perf_counter()
+        converter.convert(source, os.path.join(temp_dir, f'segmented.{targets[0]}'), 'mp4', targets[0],
+                          options={'segmented': True, 'segment_seconds': segment_seconds, 'stream_copy': False})
+        segmented = time.perf_counter() - start
+        print(f"分段并行 {targets[0]}（{cpus} 进程，每段 {segment_seconds:g} 秒）: {segmented:.2f}s，"
+              f"加速比 {whole / segmented:.1f}")
+
+        # 只改变封装时直接复制流
+        start = time.perf_counter()
+        converter.convert(source, os.path.join(temp_dir, 'remux.mkv'), 'mp4', 'mkv')
+        print(f"直接复制流 mp4 -> mkv: {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
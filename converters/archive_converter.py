@@ -9,6 +9,7 @@
 import os
 import zipfile
 import tarfile
+from typing import Any, Dict, Optional
 from core.base_converter import BaseConverter
 from utils.logger import get_logger
 
@@ -37,7 +38,8 @@ class ArchiveConverter(BaseConverter):
         self.has_rar = HAS_RARFILE
         self.has_7z = HAS_PY7ZR
     
-    def convert(self, input_path: str, output_path: str, source_format: str, target_format: str) -> bool:
+    def convert(self, input_path: str, output_path: str, source_format: str, target_format: str,
+                options: Optional[Dict[str, Any]] = None) -> bool:
         """
         执行压缩文件转换
         
@@ -46,6 +48,7 @@ class ArchiveConverter(BaseConverter):
             output_path: 输出文件路径
             source_format: 源文件格式
             target_format: 目标文件格式
+            options: 转换选项
             
         Returns:
             转换是否成功
@@ -54,7 +57,7 @@ class ArchiveConverter(BaseConverter):
             # 确保输出目录存在
             output_dir = os.path.dirname(output_path)
             if output_dir and not os.path.exists(output_dir):
-                os.makedirs(output_dir)
+                os.makedirs(output_dir, exist_ok=True)
             
             # 根据源格式和目标格式选择转换方法
             if source_format == 'zip' and target_format == 'tar':
@@ -7,8 +7,16 @@
 """
 
 import os
+import subprocess
+from typing import Any, Dict, Optional
 from core.base_converter import BaseConverter
+from utils.audio_segments import SEGMENTABLE_FORMATS, segment_audio
+from utils.audio_stream import AUDIO_MUXERS, DEFAULT_CHUNK_FRAMES, can_copy_audio, remux_audio, stream_audio
+from utils.ffmpeg_utils import FFmpegError, find_ffmpeg
 from utils.logger import get_logger
+from utils.media_probe import probe_media
+from utils.native_audio import NativeAudioError, can_convert_natively, convert_native, native_formats
+from utils.progress import get_progress_callback
 
 logger = get_logger(__name__)
 
@@ -25,9 +33,14 @@ class AudioConverter(BaseConverter):
     
     def __init__(self, config):
         super().__init__(config)
-        self.supported = HAS_PYDUB
+        self.has_ffmpeg = find_ffmpeg() is not None
+        self.supported = HAS_PYDUB or self.has_ffmpeg or bool(native_formats())
+        if HAS_PYDUB and self.has_ffmpeg:
+            # PyDub 只在 PATH 中查找 ffmpeg，这里使用找到的路径
+            AudioSegment.converter = find_ffmpeg()
     
-    def convert(self, input_path: str, output_path: str, source_format: str, target_format: str) -> bool:
+    def convert(self, input_path: str, output_path: str, source_format: str, target_format: str,
+                options: Optional[Dict[str, Any]] = None) -> bool:
         """
         执行音频转换
         
@@ -36,29 +49,112 @@ class AudioConverter(BaseConverter):
             output_path: 输出文件路径
             source_format: 源文件格式
             target_format: 目标文件格式
+            options: 转换选项
+                native: WAV/FLAC 之间的转换在进程内完成，不启动ffmpeg（默认 True）
+                sample_width: 输出位深（字节数，默认保持源位深）
+                gain_db: 增益（dB）
+                normalize: 按 EBU R128 测量响度并归一化（默认 False，解码时同时测量，不需要再解码一遍）
+                target_lufs / peak_db: 归一化的目标响度（默认 -23，ReplayGain 风格用 -18）/ 最大采样峰值（默认 -1 dBFS）
+                stream_copy: 音频编码可以放入目标格式时直接复制，不重新编码（默认 True）
+                segmented: 长音频分段后由多个 ffmpeg 进程并行编码再无缝拼接（默认 False，只支持 wav/flac/mp3，
+                    指定时优先于进程内转换和直接复制）
+                segment_seconds / split / segment_workers: 分段时长、切分方式（silence 或 fixed）、并行段数
+                streaming: 使用 ffmpeg 流式转码（默认 True，内存占用与时长无关）
+                chunk_frames: 流式转码每块的采样帧数
+                bitrate: 输出码率（例如 '192k'）
+                sample_rate / channels: 输出采样率 / 声道数（例如语音识别常用的 16000 / 1）
+                resampler: 重采样实现，polyphase（默认，NumPy 多相滤波，按块处理）或 ffmpeg
+                progress_callback: 进度回调（流式转码每块报告一次，直接复制时按 ffmpeg 的进度报告，单位为秒）
             
         Returns:
             转换是否成功
         """
         if not self.supported:
-            logger.error("缺少必要的音频处理库(PyDub)")
+            logger.error("缺少必要的音频处理库(PyDub)或ffmpeg")
             return False
         
+        options = self.get_options(options)
+        
         try:
             # 确保输出目录存在
             output_dir = os.path.dirname(output_path)
             if output_dir and not os.path.exists(output_dir):
-                os.makedirs(output_dir)
+                os.makedirs(output_dir, exist_ok=True)
+            
+            # 显式要求分段编码时优先于进程内转换和直接复制
+            segmented = options.get('segmented')
+            if segmented and not (self.has_ffmpeg and target_format in SEGMENTABLE_FORMATS):
+                logger.warning(f"分段编码需要ffmpeg且只支持 {', '.join(sorted(SEGMENTABLE_FORMATS))}，"
+                               f"改为整段转换为 {target_format}")
+                segmented = False
+            if segmented:
+                seconds = segment_audio(input_path, output_path, target_format, options,
+                                        progress_callback=get_progress_callback(options))
+                logger.info(f"音频转换成功（分段并行编码）: {input_path} -> {output_path} ({seconds:.1f}秒)")
+                return True
+            
+            if options.get('native', True) and can_convert_natively(source_format, target_format, options):
+                try:
+                    seconds = convert_native(input_path, output_path, source_format, target_format, options,
+                                             progress_callback=get_progress_callback(options))
+                    logger.info(f"音频转换成功: {input_path} -> {output_path} ({seconds:.1f}秒)")
+                    return True
+                except NativeAudioError as e:
+                    logger.info(f"无法在进程内转换，改用ffmpeg: {str(e)}")
+            
+            if self.has_ffmpeg and options.get('stream_copy', True) and self._try_remux(
+                    input_path, output_path, target_format, options):
+                return True
+            
+            if self.has_ffmpeg and options.get('streaming', True) and target_format in AUDIO_MUXERS:
+                seconds = stream_audio(
+                    input_path, output_path, target_format, options,
+                    chunk_frames=options.get('chunk_frames', DEFAULT_CHUNK_FRAMES),
+                    progress_callback=get_progress_callback(options)
+                )
+                logger.info(f"音频转换成功: {input_path} -> {output_path} ({seconds:.1f}秒)")
+                return True
+            
+            if not HAS_PYDUB:
+                logger.error(f"缺少必要的音频处理库(PyDub)，无法转换为 {target_format}")
+                return False
             
-            # 加载音频文件
+            # 加载音频文件（整段解码到内存）
             audio = AudioSegment.from_file(input_path, format=source_format)
             
             # 导出为目标格式
-            audio.export(output_path, format=target_format)
+            audio.export(output_path, format=target_format, bitrate=options.get('bitrate'))
             
             logger.info(f"音频转换成功: {input_path} -> {output_path}")
             return True
             
         except Exception as e:
             logger.error(f"音频转换失败: {str(e)}")
-            return False
\ No newline at end of file
+            return False
+    
+    def _try_remux(self, input_path: str, output_path: str, target_format: str,
+                   options: Dict[str, Any]) -> bool:
+        """
+        探测输入的音频编码，目标格式可以容纳时直接复制音频流
+        
+        Args:
+            input_path: 输入文件路径
+            output_path: 输出文件路径
+            target_format: 目标格式
+            options: 转换选项
+            
+        Returns:
+            是否已完成复制（返回False时需要重新编码）
+        """
+        try:
+            info = probe_media(input_path)
+        except (FFmpegError, OSError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"媒体探测失败，改为重新编码: {str(e)}")
+            return False
+        
+        if not can_copy_audio(info, target_format, options):
+            return False
+        
+        remux_audio(input_path, output_path, target_format, progress_callback=get_progress_callback(options))
+        logger.info(f"音频转换成功（直接复制 {info.audio.codec_name} 音频流）: {input_path} -> {output_path}")
+        return True
@@ -7,6 +7,7 @@
 """
 
 import os
+from typing import Any, Dict, Optional
 from core.base_converter import BaseConverter
 from utils.logger import get_logger
 
@@ -31,7 +32,8 @@ class DocumentConverter(BaseConverter):
         super().__init__(config)
         self.supported = HAS_DOCUMENT_LIBS
     
-    def convert(self, input_path: str, output_path: str, source_format: str, target_format: str) -> bool:
+    def convert(self, input_path: str, output_path: str, source_format: str, target_format: str,
+                options: Optional[Dict[str, Any]] = None) -> bool:
         """
         执行文档转换
         
@@ -40,6 +42,7 @@ class DocumentConverter(BaseConverter):
             output_path: 输出文件路径
             source_format: 源文件格式
             target_format: 目标文件格式
+            options: 转换选项
             
         Returns:
             转换是否成功
@@ -52,7 +55,7 @@ class DocumentConverter(BaseConverter):
             # 确保输出目录存在
             output_dir = os.path.dirname(output_path)
             if output_dir and not os.path.exists(output_dir):
-                os.makedirs(output_dir)
+                os.makedirs(output_dir, exist_ok=True)
             
             # 根据源格式和目标格式选择转换方法
             if source_format == 'pdf' and target_format == 'txt':
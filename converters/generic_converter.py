@@ -8,6 +8,7 @@
 
 import os
 import shutil
+from typing import Any, Dict, Optional
 from core.base_converter import BaseConverter
 from utils.logger import get_logger
 
@@ -20,7 +21,8 @@ class GenericConverter(BaseConverter):
     def __init__(self, config):
         super().__init__(config)
     
-    def convert(self, input_path: str, output_path: str, source_format: str, target_format: str) -> bool:
+    def convert(self, input_path: str, output_path: str, source_format: str, target_format: str,
+                options: Optional[Dict[str, Any]] = None) -> bool:
         """
         执行通用文件转换（复制/重命名）
         
@@ -29,6 +31,7 @@ class GenericConverter(BaseConverter):
             output_path: 输出文件路径
             source_format: 源文件格式
             target_format: 目标文件格式
+            options: 转换选项
             
         Returns:
             转换是否成功
@@ -37,7 +40,7 @@ class GenericConverter(BaseConverter):
             # 确保输出目录存在
             output_dir = os.path.dirname(output_path)
             if output_dir and not os.path.exists(output_dir):
-                os.makedirs(output_dir)
+                os.makedirs(output_dir, exist_ok=True)
             
             # 如果源格式和目标格式相同，直接复制文件
             if source_format.lower() == target_format.lower():
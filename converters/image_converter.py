@@ -7,8 +7,24 @@
 """
 
 import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
 from core.base_converter import BaseConverter
 from utils.logger import get_logger
+from utils.formats import PILLOW_FORMATS, pillow_format
+from utils.encoder_profiles import image_save_params, resolve_profile
+from utils.image_codecs import is_codec_available
+from utils.png_optimizer import DEFAULT_TIME_BUDGET, optimize_png
+from utils.image_utils import (
+    DEFAULT_BACKGROUND, DEFAULT_REDUCING_GAP, draft_for_size, flatten_alpha, fit_size, open_scaled, resize_to, shallow_copy,
+    target_size_from_options
+)
+from utils.animation import ANIMATED_FORMATS, is_animated, save_frames
+from utils.progress import get_progress_callback
+from utils.quantize import quantize_image
+from utils.shared_frames import SharedFrame, SharedFramePool
+from utils.tiled_image import DEFAULT_MEMORY_LIMIT_MB, TiledProcessingError, convert_tiled, read_header
 
 logger = get_logger(__name__)
 
@@ -19,6 +35,15 @@ except ImportError:
     HAS_PILLOW = False
     logger.warning("Pillow库未安装，图片转换功能将受限")
 
+# tiled='auto' 时，超过该像素数（百万像素）的 PNG/TIFF 使用分块处理
+DEFAULT_TILED_THRESHOLD_MP = 100
+
+# 调色板量化相关的转换选项
+QUANTIZE_OPTIONS = ('colors', 'quantize', 'dither', 'reuse_palette')
+
+# 支持分块处理的格式
+TILED_FORMATS = ('PNG', 'TIFF')
+
 
 class ImageConverter(BaseConverter):
     """图片转换器"""
@@ -26,18 +51,11 @@ class ImageConverter(BaseConverter):
     def __init__(self, config):
         super().__init__(config)
         self.supported = HAS_PILLOW
-        # Pillow支持的格式映射
-        self.format_map = {
-            'jpg': 'JPEG',
-            'jpeg': 'JPEG',
-            'png': 'PNG',
-            'gif': 'GIF',
-            'bmp': 'BMP',
-            'tiff': 'TIFF',
-            'webp': 'WEBP'
-        }
+        # Pillow支持的格式映射（来自格式注册表）
+        self.format_map = PILLOW_FORMATS
     
-    def convert(self, input_path: str, output_path: str, source_format: str, target_format: str) -> bool:
+    def convert(self, input_path: str, output_path: str, source_format: str, target_format: str,
+                options: Optional[Dict[str, Any]] = None) -> bool:
         """
         执行图片转换
         
@@ -46,6 +64,30 @@ class ImageConverter(BaseConverter):
             output_path: 输出文件路径
             source_format: 源文件格式
             target_format: 目标文件格式
+            options: 转换选项
+                max_width / max_height / max_dimension: 等比缩小到不超过指定尺寸
+                reducing_gap: 缩小时 reduce 阶段的 reducing_gap
+                background: 输出 JPEG 时透明区域的背景色（默认白色）
+                tiled: 分块处理超大 PNG/TIFF（'auto'、True、False，默认 'auto'）
+                tiled_threshold_mp: tiled='auto' 时启用分块处理的像素数阈值（百万像素）
+                memory_limit_mb: 分块处理的内存上限（MB）
+                tile_size: 输出分块 TIFF 的 tile 边长
+                tiff_compression: 输出分块 TIFF 的压缩方式（'deflate' 或 'none'）
+                animated: 多帧图片是否逐帧转换为动画 GIF/WebP 或多页 TIFF（默认 True）
+                progress_callback: 进度回调（多帧图片每写完一帧报告一次）
+                profile: 编码配置（fast、balanced、smallest，默认 balanced）
+                quality / optimize / progressive / subsampling / compress_level / method / lossless:
+                    单项编码参数，覆盖编码配置中的同名参数
+                speed: 编码速度 0~10，越大越快（AVIF 的 speed，WebP 映射为 method）
+                threads: AVIF 编码器的线程数（默认使用全部CPU）
+                colors: 输出 GIF / PNG8 的最大颜色数（默认256）
+                quantize: 量化算法（auto、mediancut、fastoctree、libimagequant，默认 auto）
+                dither: 抖动方式（none、floyd-steinberg、ordered，默认 none）
+                reuse_palette: 动画 GIF 的各帧是否复用调色板（默认 True）
+                png8: 输出 PNG 时量化为调色板图片（适合图标、精灵图）
+                optimize_png: 写出 PNG 后做无损优化（smallest 配置下默认开启）
+                optimize_budget: 每张 PNG 的优化时间预算（秒）
+                strip_metadata: 优化时去除文本、时间、EXIF等非必要块（默认 True）
             
         Returns:
             转换是否成功
@@ -54,30 +96,315 @@ class ImageConverter(BaseConverter):
             logger.error("缺少必要的图片处理库(Pillow)")
             return False
         
+        options = self.get_options(options)
+        if not is_codec_available(pillow_format(target_format)):
+            logger.error(f"当前环境不支持 {target_format} 编码（Pillow未启用对应的库，AVIF可安装 pillow-avif-plugin）")
+            return False
+        
         try:
             # 确保输出目录存在
             output_dir = os.path.dirname(output_path)
             if output_dir and not os.path.exists(output_dir):
-                os.makedirs(output_dir)
+                os.makedirs(output_dir, exist_ok=True)
+            
+            if self._should_tile(input_path, target_format, options):
+                return self._convert_tiled(input_path, output_path, target_format, options)
             
             # 打开图片
             with Image.open(input_path) as img:
-                # 处理RGBA到RGB的转换（某些格式不支持透明度）
-                if target_format in ['jpg', 'jpeg'] and img.mode in ('RGBA', 'LA', 'P'):
-                    # 创建白色背景
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    if img.mode == 'P':
-                        img = img.convert('RGBA')
-                    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = background
+                if is_animated(img) and options.get('animated', True):
+                    if pillow_format(target_format) in ANIMATED_FORMATS:
+                        return self._convert_frames(img, input_path, output_path, target_format, options)
+                    logger.info(f"{target_format} 不支持多帧，只输出第一帧: {input_path}")
+                
+                # 需要缩小时，在解码前请求降采样解码，避免完整解码大图
+                target_size = target_size_from_options(img.size, options)
+                if target_size != img.size:
+                    img = open_scaled(img, target_size, options.get('reducing_gap', DEFAULT_REDUCING_GAP))
                 
-                # 保存图片
-                save_format = self.format_map.get(target_format, target_format.upper())
-                img.save(output_path, format=save_format)
+                self._save(self._prepare_for_target(img, target_format, options), output_path, target_format, options)
             
             logger.info(f"图片转换成功: {input_path} -> {output_path}")
             return True
             
         except Exception as e:
             logger.error(f"图片转换失败: {str(e)}")
-            return False
\ No newline at end of file
+            return False
+    
+    def convert_many(self, input_path: str, output_base: str, target_formats: List[str],
+                     widths: Optional[List[int]] = None,
+                     options: Optional[Dict[str, Any]] = None,
+                     max_workers: Optional[int] = None,
+                     use_processes: bool = False) -> Dict[str, bool]:
+        """
+        一次解码，输出多种格式和多种宽度（例如响应式图片的 srcset）
+        
+        Args:
+            input_path: 输入文件路径
+            output_base: 输出路径前缀（不含扩展名），输出为 前缀.格式 或 前缀-宽度w.格式
+            target_formats: 目标格式列表
+            widths: 宽度阶梯（例如 [320, 640, 1280, 2560]），为空时保持原尺寸
+            options: 转换选项（同 convert）
+            max_workers: 并行编码线程数（Pillow编码时会释放GIL），默认每个输出一个线程
+            use_processes: 在工作进程中编码（位图通过共享内存传递，不复制），
+                适合 PNG 优化等持有GIL的编码步骤较重的场景；max_workers 默认为CPU核数
+            
+        Returns:
+            {输出路径: 是否成功}
+        """
+        if not self.supported:
+            logger.error("缺少必要的图片处理库(Pillow)")
+            return {}
+        
+        options = self.get_options(options)
+        results = {}
+        
+        try:
+            output_dir = os.path.dirname(output_base)
+            if output_dir and not os.path.exists(output_dir):
+                os.makedirs(output_dir, exist_ok=True)
+            
+            with Image.open(input_path) as img:
+                base_size = target_size_from_options(img.size, options)
+                sizes = [fit_size(base_size, width) for width in widths] if widths else [base_size]
+                sizes = sorted(set(sizes), reverse=True)
+                
+                # 只需按最大的输出尺寸解码一次
+                draft_for_size(img, sizes[0])
+                img.load()
+                
+                jobs = []
+                for size in sizes:
+                    resized = resize_to(img, size, options.get('reducing_gap', DEFAULT_REDUCING_GAP))
+                    # 同一尺寸下，各目标格式共享预处理结果（例如多个需要去透明的格式只处理一次）
+                    prepared = {}
+                    for target_format in target_formats:
+                        suffix = f"-{size[0]}w" if widths else ""
+                        output_path = f"{output_base}{suffix}.{target_format}"
+                        save_format = pillow_format(target_format)
+                        if save_format not in prepared:
+                            prepared[save_format] = self._prepare_for_target(resized, target_format, options)
+                        jobs.append((prepared[save_format], output_path, target_format))
+                
+                if use_processes:
+                    results = self._save_in_processes(jobs, options, max_workers)
+                else:
+                    with ThreadPoolExecutor(max_workers=max_workers or len(jobs)) as executor:
+                        # 每个编码任务使用独立的图片对象，像素数据共享
+                        futures = {
+                            executor.submit(self._save_safely, shallow_copy(frame), output_path, target_format,
+                                            options): output_path
+                            for frame, output_path, target_format in jobs
+                        }
+                        for future, output_path in futures.items():
+                            results[output_path] = future.result()
+            
+            logger.info(f"图片批量输出完成: {input_path} -> {len(results)} 个文件")
+            
+        except Exception as e:
+            logger.error(f"图片批量输出失败: {str(e)}")
+        
+        return results
+    
+    def _save_in_processes(self, jobs: List[tuple], options: Dict[str, Any],
+                           max_workers: Optional[int] = None) -> Dict[str, bool]:
+        """
+        在工作进程中保存图片，位图通过共享内存传递
+        
+        Args:
+            jobs: (图片, 输出路径, 目标格式) 列表，同一图片对象只放入共享内存一次
+            options: 转换选项（回调等无法传给其他进程的选项会被忽略）
+            max_workers: 工作进程数
+            
+        Returns:
+            {输出路径: 是否成功}
+        """
+        worker_options = {key: value for key, value in options.items() if not callable(value)}
+        users = Counter(id(frame) for frame, _, _ in jobs)
+        results = {}
+        
+        with SharedFramePool() as pool, ProcessPoolExecutor(max_workers=max_workers) as executor:
+            handles = {}
+            futures = {}
+            for frame, output_path, target_format in jobs:
+                if id(frame) not in handles:
+                    handles[id(frame)] = pool.put(frame, refs=users[id(frame)])
+                handle = handles[id(frame)]
+                future = executor.submit(_save_shared_frame, self.config, handle, output_path, target_format,
+                                         worker_options)
+                # 任务结束（包括工作进程崩溃）即释放引用，最后一个使用方结束后回收共享内存
+                pool.release_when_done(handle, future)
+                futures[future] = output_path
+            
+            for future, output_path in futures.items():
+                try:
+                    results[output_path] = future.result()
+                except Exception as e:
+                    logger.error(f"图片保存失败 {output_path}: {str(e)}")
+                    results[output_path] = False
+        
+        return results
+    
+    def _convert_frames(self, img, input_path: str, output_path: str, target_format: str,
+                        options: Dict[str, Any]) -> bool:
+        """
+        逐帧转换多帧图片（动画 GIF/WebP、多页 TIFF）
+        
+        Args:
+            img: 已打开的多帧图片
+            input_path: 输入文件路径
+            output_path: 输出文件路径
+            target_format: 目标格式
+            options: 转换选项
+            
+        Returns:
+            转换是否成功
+        """
+        target_size = target_size_from_options(img.size, options)
+        reducing_gap = options.get('reducing_gap', DEFAULT_REDUCING_GAP)
+        transform = None
+        if target_size != img.size:
+            transform = lambda frame: resize_to(frame, target_size, reducing_gap)
+        
+        save_format = pillow_format(target_format)
+        params = image_save_params(save_format, options)
+        if 'loop' in options:
+            params['loop'] = options['loop']
+        params.update({key: options[key] for key in QUANTIZE_OPTIONS if key in options})
+        
+        count = save_frames(
+            img, output_path, save_format, transform=transform, params=params,
+            progress_callback=get_progress_callback(options)
+        )
+        logger.info(f"图片逐帧转换成功: {input_path} -> {output_path} ({count} 帧)")
+        return True
+    
+    def _should_tile(self, input_path: str, target_format: str, options: Dict[str, Any]) -> bool:
+        """
+        判断是否使用分块处理
+        
+        Args:
+            input_path: 输入文件路径
+            target_format: 目标格式
+            options: 转换选项
+            
+        Returns:
+            是否使用分块处理
+        """
+        tiled = options.get('tiled', 'auto')
+        if tiled is False or tiled == 'false':
+            return False
+        
+        # 只读取文件头，不触发解压炸弹检查
+        header = read_header(input_path)
+        if header is None:
+            if tiled is True:
+                logger.warning("分块处理只支持PNG和TIFF输入，使用普通模式")
+            return False
+        
+        if tiled is not True:
+            threshold = options.get('tiled_threshold_mp', DEFAULT_TILED_THRESHOLD_MP)
+            if header.width * header.height < threshold * 1000000:
+                return False
+        
+        if pillow_format(target_format) not in TILED_FORMATS:
+            logger.warning(f"分块处理不支持输出格式 {target_format}，使用普通模式")
+            return False
+        if target_size_from_options((header.width, header.height), options) != (header.width, header.height):
+            logger.warning("分块处理不支持缩放，使用普通模式")
+            return False
+        return True
+    
+    def _convert_tiled(self, input_path: str, output_path: str, target_format: str,
+                       options: Dict[str, Any]) -> bool:
+        """
+        以固定内存上限转换超大 PNG/TIFF
+        
+        Args:
+            input_path: 输入文件路径
+            output_path: 输出文件路径
+            target_format: 目标格式
+            options: 转换选项
+            
+        Returns:
+            转换是否成功
+        """
+        try:
+            header = convert_tiled(
+                input_path, output_path, pillow_format(target_format),
+                memory_limit_mb=options.get('memory_limit_mb', DEFAULT_MEMORY_LIMIT_MB),
+                tile_size=options.get('tile_size', 256),
+                compress_level=image_save_params('PNG', options)['compress_level'],
+                tiff_compression=options.get('tiff_compression', 'deflate')
+            )
+        except TiledProcessingError as e:
+            logger.error(f"图片分块转换失败: {str(e)}")
+            return False
+        
+        logger.info(f"图片分块转换成功: {input_path} -> {output_path} ({header.width}x{header.height})")
+        return True
+    
+    def _prepare_for_target(self, img, target_format: str, options: Optional[Dict[str, Any]] = None):
+        """
+        根据目标格式预处理图片
+        
+        Args:
+            img: Pillow 图片
+            target_format: 目标格式
+            options: 转换选项（background: JPEG 去透明时使用的背景色；colors、quantize、dither、png8: 调色板量化）
+            
+        Returns:
+            可直接保存的图片
+        """
+        options = options or {}
+        save_format = pillow_format(target_format)
+        
+        # 处理透明度（JPEG 不支持透明度，合成到背景色上）
+        if save_format == 'JPEG' and img.mode in ('RGBA', 'LA', 'P', 'PA'):
+            img = flatten_alpha(img, options.get('background', DEFAULT_BACKGROUND))
+        
+        # GIF 只支持调色板（单一透明色），PNG8 的调色板可以带 alpha
+        elif save_format == 'GIF' or (save_format == 'PNG' and options.get('png8')):
+            img = quantize_image(
+                img, options.get('colors', 256), options.get('quantize', 'auto'), options.get('dither', 'none'),
+                alpha='binary' if save_format == 'GIF' else 'full'
+            )
+        return img
+    
+    def _save(self, img, output_path: str, target_format: str, options: Optional[Dict[str, Any]] = None):
+        """
+        按目标格式和编码配置保存图片
+        
+        Args:
+            img: Pillow 图片
+            output_path: 输出文件路径
+            target_format: 目标格式
+            options: 转换选项（profile 以及 quality 等单项编码参数）
+        """
+        save_format = pillow_format(target_format)
+        img.save(output_path, format=save_format, **image_save_params(save_format, options))
+        
+        options = options or {}
+        if save_format == 'PNG' and options.get('optimize_png', resolve_profile(options) == 'smallest'):
+            optimize_png(
+                output_path,
+                time_budget=options.get('optimize_budget', DEFAULT_TIME_BUDGET),
+                strip=options.get('strip_metadata', True)
+            )
+    
+    def _save_safely(self, img, output_path: str, target_format: str,
+                     options: Optional[Dict[str, Any]] = None) -> bool:
+        """保存图片并记录错误，用于并行编码"""
+        try:
+            self._save(img, output_path, target_format, options)
+            return True
+        except Exception as e:
+            logger.error(f"图片保存失败 {output_path}: {str(e)}")
+            return False
+
+
+def _save_shared_frame(config: Dict[str, Any], handle, output_path: str, target_format: str,
+                       options: Dict[str, Any]) -> bool:
+    """在工作进程中保存共享内存中的图片（ProcessPoolExecutor 的任务函数）"""
+    with SharedFrame(handle) as img:
+        return ImageConverter(config)._save_safely(img, output_path, target_format, options)
@@ -7,27 +7,55 @@
 """
 
 import os
+import subprocess
+from typing import Any, Dict, Optional
 from core.base_converter import BaseConverter
+from utils.ffmpeg_utils import FFmpegError, FFmpegProgress, find_ffmpeg
 from utils.logger import get_logger
+from utils.media_probe import MediaInfo, probe_media
+from utils.progress import get_progress_callback
+from utils.video_segments import DEFAULT_SEGMENT_SECONDS, segment_video
+from utils.video_transcode import VIDEO_CODECS, can_copy_video, remux_video, select_codecs, transcode_video
 
 logger = get_logger(__name__)
 
 try:
-    from moviepy.editor import VideoFileClip
+    # MoviePy 2.x 移除了 moviepy.editor
+    try:
+        from moviepy import VideoFileClip
+    except ImportError:
+        from moviepy.editor import VideoFileClip
     HAS_MOVIEPY = True
 except ImportError:
     HAS_MOVIEPY = False
     logger.warning("MoviePy库未安装，视频转换功能将受限")
 
+# 转换方式：ffmpeg 直接转码，moviepy 逐帧读入 Python 后再编码（只在没有 ffmpeg 或显式指定时使用）
+VIDEO_ENGINES = ('ffmpeg', 'moviepy')
+
+
+def _encode_summary(progress: Optional[FFmpegProgress]) -> str:
+    """编码统计（总帧数、平均编码 fps 和速度），用于日志"""
+    if progress is None or not progress.frame:
+        return ''
+    parts = [f"{progress.frame} 帧"]
+    if progress.fps:
+        parts.append(f"平均 {progress.fps:.1f} fps")
+    if progress.speed:
+        parts.append(f"{progress.speed:.2f} 倍速")
+    return f" ({'，'.join(parts)})"
+
 
 class VideoConverter(BaseConverter):
     """视频转换器"""
     
     def __init__(self, config):
         super().__init__(config)
-        self.supported = HAS_MOVIEPY
+        self.has_ffmpeg = find_ffmpeg() is not None
+        self.supported = self.has_ffmpeg or HAS_MOVIEPY
     
-    def convert(self, input_path: str, output_path: str, source_format: str, target_format: str) -> bool:
+    def convert(self, input_path: str, output_path: str, source_format: str, target_format: str,
+                options: Optional[Dict[str, Any]] = None) -> bool:
         """
         执行视频转换
         
@@ -36,28 +64,109 @@ class VideoConverter(BaseConverter):
             output_path: 输出文件路径
             source_format: 源文件格式
             target_format: 目标文件格式
-            
+            options: 转换选项
+                stream_copy: 各个流的编码都可以放入目标格式时直接复制，不重新编码（默认 True）
+                engine: 转换方式，ffmpeg（默认，帧数据不经过 Python）或 moviepy
+                segmented: 在关键帧处切分后由多个 ffmpeg 进程并行编码再拼接（默认 False，只用于 ffmpeg）
+                segment_seconds / segment_workers / resume: 段长（默认60秒）、并行段数、是否复用上次未完成的段
+                video_codec / audio_codec: 编码器（默认按目标格式选择，例如 avi 为 mpeg4 + libmp3lame）
+                video_bitrate / audio_bitrate: 视频 / 音频码率（例如 '2M' / '128k'）
+                progress_callback: 进度回调（按 ffmpeg 的进度约每0.5秒报告一次，单位为秒，带编码 fps；
+                    MoviePy 不报告进度）
+        
         Returns:
             转换是否成功
         """
         if not self.supported:
-            logger.error("缺少必要的视频处理库(MoviePy)")
+            logger.error("缺少必要的视频处理库(MoviePy)或ffmpeg")
+            return False
+        
+        options = self.get_options(options)
+        if target_format not in VIDEO_CODECS:
+            logger.error(f"不支持的视频格式: {target_format}")
             return False
         
         try:
             # 确保输出目录存在
             output_dir = os.path.dirname(output_path)
             if output_dir and not os.path.exists(output_dir):
-                os.makedirs(output_dir)
+                os.makedirs(output_dir, exist_ok=True)
+            
+            engine = options.get('engine', 'ffmpeg')
+            if engine not in VIDEO_ENGINES:
+                logger.error(f"未知的视频转换方式: {engine}")
+                return False
+            
+            info = self._probe(input_path) if self.has_ffmpeg else None
+            if info is not None and options.get('stream_copy', True) and can_copy_video(info, target_format, options):
+                remux_video(input_path, output_path, target_format, info,
+                            progress_callback=get_progress_callback(options))
+                codecs = ' + '.join(s.codec_name for s in (info.video, info.audio) if s is not None)
+                logger.info(f"视频转换成功（直接复制 {codecs} 流）: {input_path} -> {output_path}")
+                return True
             
-            # 加载视频文件
+            if info is not None and engine == 'ffmpeg' and self._wants_segments(info, options):
+                seconds = segment_video(input_path, output_path, target_format, info, options,
+                                        progress_callback=get_progress_callback(options))
+                logger.info(f"视频转换成功（分段并行编码）: {input_path} -> {output_path} ({seconds:.1f}秒)")
+                return True
+            
+            if self.has_ffmpeg and engine == 'ffmpeg':
+                progress = transcode_video(input_path, output_path, target_format, options,
+                                           duration=info.duration if info is not None else None,
+                                           progress_callback=get_progress_callback(options))
+                logger.info(f"视频转换成功: {input_path} -> {output_path}{_encode_summary(progress)}")
+                return True
+            
+            if not HAS_MOVIEPY:
+                logger.error("缺少必要的视频处理库(MoviePy)")
+                return False
+            
+            # MoviePy 也按目标格式选择编码器
+            video_codec, audio_codec = select_codecs(target_format, options)
             with VideoFileClip(input_path) as video:
-                # 导出为目标格式
-                video.write_videofile(output_path, codec='libx264', audio_codec='aac')
+                video.write_videofile(output_path, codec=video_codec, audio_codec=audio_codec,
+                                      bitrate=options.get('video_bitrate'), audio_bitrate=options.get('audio_bitrate'),
+                                      logger=None)
             
             logger.info(f"视频转换成功: {input_path} -> {output_path}")
             return True
-            
+        
         except Exception as e:
             logger.error(f"视频转换失败: {str(e)}")
-            return False
\ No newline at end of file
+            return False
+    
+    def _probe(self, input_path: str) -> Optional[MediaInfo]:
+        """
+        探测输入的各个流
+        
+        Args:
+            input_path: 输入文件路径
+            
+        Returns:
+            媒体信息，探测失败时返回None（直接重新编码）
+        """
+        try:
+            return probe_media(input_path)
+        except (FFmpegError, OSError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"媒体探测失败，改为重新编码: {str(e)}")
+            return None
+    
+    def _wants_segments(self, info: MediaInfo, options: Dict[str, Any]) -> bool:
+        """
+        判断是否分段并行编码（视频不足1.5段时整段编码）
+        
+        Args:
+            info: 输入的媒体信息
+            options: 转换选项
+            
+        Returns:
+            是否分段
+        """
+        if not options.get('segmented') or info.video is None:
+            return False
+        segment_seconds = float(options.get('segment_seconds', DEFAULT_SEGMENT_SECONDS))
+        if info.duration is not None and info.duration < segment_seconds * 1.5:
+            logger.info(f"视频时长 {info.duration:.1f} 秒，不分段编码")
+            return False
+        return True
@@ -7,8 +7,9 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Any, Dict, List, Optional
 from utils.logger import get_logger
+from utils.formats import expand_format_set, normalize_ext
 
 logger = get_logger(__name__)
 
@@ -27,9 +28,13 @@ class BaseConverter(ABC):
         self.name = config.get('name', self.__class__.__name__)
         self.input_formats = config.get('input_formats', [])
         self.output_formats = config.get('output_formats', [])
+        # 预先构建格式集合（含别名），用于常数时间查询
+        self.input_format_set = expand_format_set(self.input_formats)
+        self.output_format_set = expand_format_set(self.output_formats)
     
     @abstractmethod
-    def convert(self, input_path: str, output_path: str, source_format: str, target_format: str) -> bool:
+    def convert(self, input_path: str, output_path: str, source_format: str, target_format: str,
+                options: Optional[Dict[str, Any]] = None) -> bool:
         """
         执行转换操作（抽象方法，子类必须实现）
         
@@ -38,12 +43,28 @@ class BaseConverter(ABC):
             output_path: 输出文件路径
             source_format: 源文件格式
             target_format: 目标文件格式
+            options: 本次转换的选项（覆盖配置中的 options）
             
         Returns:
             转换是否成功
         """
         pass
     
+    def get_options(self, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        合并配置中的默认选项和本次转换的选项
+        
+        Args:
+            options: 本次转换的选项
+            
+        Returns:
+            合并后的选项字典
+        """
+        merged = dict(self.config.get('options') or {})
+        if options:
+            merged.update(options)
+        return merged
+    
     def can_convert(self, source_format: str, target_format: str) -> bool:
         """
         检查是否可以执行指定的转换
@@ -55,22 +76,12 @@ class BaseConverter(ABC):
         Returns:
             是否可以转换
         """
-        source_format = source_format.lower()
-        target_format = target_format.lower()
-        
-        # 检查源格式是否支持
-        source_supported = False
-        for fmt in self.input_formats:
-            if fmt.lower() == source_format or fmt.lower() == '*':
-                source_supported = True
-                break
+        source_format = normalize_ext(source_format)
+        target_format = normalize_ext(target_format)
         
-        # 检查目标格式是否支持
-        target_supported = False
-        for fmt in self.output_formats:
-            if fmt.lower() == target_format or fmt.lower() == '*':
-                target_supported = True
-                break
+        # 检查源格式和目标格式是否支持
+        source_supported = source_format in self.input_format_set or '*' in self.input_format_set
+        target_supported = target_format in self.output_format_set or '*' in self.output_format_set
         
         return source_supported and target_supported
     
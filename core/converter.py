@@ -8,8 +8,15 @@
 
 import os
 import importlib
-from typing import Dict, Any
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Dict, Any, FrozenSet, Iterable, Iterator, Optional, Tuple
 from utils.logger import get_logger
+from utils.detect_cache import configure_detection_cache, get_detection_cache
+from utils.encoder_profiles import threads_per_job
+from utils.formats import ext_of, get_category, normalize_ext
+from utils.media_probe import probe_many
+from utils.scanner import ScanEntry, scan_directory
 
 # 尝试使用完整的文件工具模块，如果失败则使用简化版
 try:
@@ -21,6 +28,9 @@ except ImportError:
 
 logger = get_logger(__name__)
 
+# 批量转换时每批并行探测的文件数
+PROBE_BATCH_SIZE = 64
+
 if USE_SIMPLE_FILE_UTILS:
     logger.info("使用简化版文件工具模块")
 else:
@@ -39,6 +49,8 @@ class FileConverter:
         """
         self.config = config
         self.converters = {}
+        self._format_index = {'input': frozenset(), 'output': frozenset()}
+        configure_detection_cache(config.get('cache', {}))
         self._load_converters()
     
     def _load_converters(self):
@@ -62,8 +74,15 @@ class FileConverter:
                 logger.info(f"成功加载转换器: {converter_name}")
             except Exception as e:
                 logger.error(f"加载转换器 {converter_name} 失败: {str(e)}")
+        
+        # 汇总所有转换器支持的格式，供 is_format_supported 常数时间查询
+        self._format_index = {
+            'input': frozenset().union(*(c.input_format_set for c in self.converters.values())),
+            'output': frozenset().union(*(c.output_format_set for c in self.converters.values()))
+        }
     
-    def convert(self, input_path: str, output_path: str, target_format: str) -> bool:
+    def convert(self, input_path: str, output_path: str, target_format: str,
+                options: Optional[Dict[str, Any]] = None) -> bool:
         """
         执行文件转换
         
@@ -71,18 +90,21 @@ class FileConverter:
             input_path: 输入文件路径
             output_path: 输出文件路径
             target_format: 目标格式
+            options: 转换选项（传递给具体转换器）
             
         Returns:
             转换是否成功
         """
         try:
-            # 检查输入文件
-            if not os.path.exists(input_path):
+            # 检查输入文件（stat结果同时用于类型检测缓存）
+            try:
+                st = os.stat(input_path)
+            except OSError:
                 logger.error(f"输入文件不存在: {input_path}")
                 return False
             
             # 获取源文件类型
-            source_format = get_file_type(input_path)
+            source_format = get_file_type(input_path, st)
             if not source_format:
                 logger.error(f"无法识别文件类型: {input_path}")
                 return False
@@ -97,13 +119,118 @@ class FileConverter:
                 return False
             
             # 执行转换
-            success = converter.convert(input_path, output_path, source_format, target_format)
+            success = converter.convert(input_path, output_path, source_format, target_format, options=options)
             return success
             
         except Exception as e:
             logger.error(f"转换过程中发生错误: {str(e)}")
             return False
     
+    def convert_directory(self, input_dir: str, output_dir: str, target_format: str,
+                          include: Optional[Iterable[str]] = None,
+                          exclude: Optional[Iterable[str]] = None,
+                          jobs: int = 1,
+                          options: Optional[Dict[str, Any]] = None) -> Tuple[int, int]:
+        """
+        批量转换目录中所有受支持的文件
+        
+        Args:
+            input_dir: 输入目录
+            output_dir: 输出目录（保持相对目录结构）
+            target_format: 目标格式
+            include: 包含的通配符列表
+            exclude: 排除的通配符列表
+            jobs: 并行转换的任务数
+            options: 转换选项（传递给具体转换器；未指定 threads 时按任务数平分CPU）
+            
+        Returns:
+            (成功数量, 失败数量)
+            
+        Note:
+            不同源文件的输出路径相同时（如 a.jpg 和 a.png 转为 webp），后扫描到的文件
+            在文件名后追加源扩展名（a_png.webp），并记录警告
+        """
+        target_format = normalize_ext(target_format)
+        jobs = max(1, jobs)
+        options = dict(options or {})
+        if jobs > 1 and not options.get('threads'):
+            # 多线程编码器（x264、AVIF 等）默认使用全部CPU，并行任务之间限制每个任务的线程数
+            options['threads'] = threads_per_job(jobs)
+        input_formats = self.get_format_set('input')
+        entries = scan_directory(
+            input_dir,
+            # 有转换器接受任意格式时不按扩展名过滤
+            extensions=None if '*' in input_formats else input_formats,
+            include=include,
+            exclude=exclude
+        )
+        
+        if get_detection_cache() is not None:
+            entries = self._plan_media(entries)
+        
+        claimed = set()
+        created_dirs = set()
+        
+        def output_path_for(entry):
+            stem, ext = os.path.splitext(entry.rel_path)
+            name, attempt = stem, 0
+            while os.path.normcase(name) in claimed:
+                attempt += 1
+                name = f"{stem}_{ext.lstrip('.')}" + (f"_{attempt}" if attempt > 1 else '')
+            claimed.add(os.path.normcase(name))
+            output_path = os.path.join(output_dir, name + '.' + target_format)
+            if name != stem:
+                logger.warning(f"输出文件名冲突，{entry.path} 改为输出到 {output_path}")
+            # 在提交任务前创建输出目录，避免并行任务同时创建同一目录
+            entry_dir = os.path.dirname(output_path)
+            if entry_dir not in created_dirs:
+                os.makedirs(entry_dir, exist_ok=True)
+                created_dirs.add(entry_dir)
+            return output_path
+        
+        def convert_entry(entry, output_path):
+            return self.convert(entry.path, output_path, target_format, options=options)
+        
+        succeeded = total = 0
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            pending = set()
+            for entry in entries:
+                pending.add(executor.submit(convert_entry, entry, output_path_for(entry)))
+                # 限制排队任务数量，扫描结果按需消费
+                if len(pending) >= jobs * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    total += len(done)
+                    succeeded += sum(1 for f in done if f.result())
+            total += len(pending)
+            succeeded += sum(1 for f in pending if f.result())
+        
+        failed = total - succeeded
+        logger.info(f"批量转换完成: 成功 {succeeded} 个，失败 {failed} 个")
+        return succeeded, failed
+    
+    def _plan_media(self, entries: Iterable[ScanEntry]) -> Iterator[ScanEntry]:
+        """
+        按批并行探测音视频文件（结果写入检测缓存，转换器不再逐个探测），每批内时长长的先转换，
+        并行任务的结束时间更接近
+        
+        Args:
+            entries: 扫描得到的文件条目
+            
+        Returns:
+            调整顺序后的文件条目
+        """
+        entries = iter(entries)
+        while True:
+            batch = list(islice(entries, PROBE_BATCH_SIZE))
+            if not batch:
+                return
+            media = [e for e in batch if get_category(ext_of(e.path)) in ('audio', 'video')]
+            if media:
+                infos = probe_many([e.path for e in media], [e.stat for e in media])
+                durations = {e.path: info.duration or 0.0 for e, info in zip(media, infos) if info is not None}
+                batch.sort(key=lambda e: durations.get(e.path, 0.0), reverse=True)
+            yield from batch
+    
     def _find_converter(self, source_format: str, target_format: str):
         """
         查找合适的转换器
@@ -142,6 +269,18 @@ class FileConverter:
             }
         return formats
     
+    def get_format_set(self, format_type: str) -> FrozenSet[str]:
+        """
+        获取所有转换器支持的格式集合
+        
+        Args:
+            format_type: 格式类型 ('input' 或 'output')
+            
+        Returns:
+            格式集合（含别名）
+        """
+        return self._format_index.get(format_type, frozenset())
+    
     def is_format_supported(self, format_name: str, format_type: str) -> bool:
         """
         检查指定格式是否被支持
@@ -153,12 +292,4 @@ class FileConverter:
         Returns:
             是否支持该格式
         """
-        supported_formats = self.get_supported_formats()
-        
-        # 遍历所有转换器的支持格式
-        for converter_formats in supported_formats.values():
-            if format_type in converter_formats:
-                if format_name.lower() in [fmt.lower() for fmt in converter_formats[format_type]]:
-                    return True
-        
-        return False
\ No newline at end of file
+        return normalize_ext(format_name) in self.get_format_set(format_type)
\ No newline at end of file
@@ -9,17 +9,24 @@ AlwaysConverter - 一个支持超过80种文件类型的Python文件转换器
 import os
 import sys
 import click
+import yaml
 from core.converter import FileConverter
 from utils.logger import get_logger
 from utils.config import load_config
+from utils.progress import ConsoleProgress
 
 # 检查是否有图形界面支持
 def has_gui():
     """检查是否存在ui.py文件"""
     return os.path.exists(os.path.join(os.path.dirname(__file__), 'ui', 'main.py'))
 
-def launch_gui():
-    """启动图形界面"""
+def launch_gui(config_path='config/config.yaml'):
+    """
+    启动图形界面
+    
+    Args:
+        config_path: 配置文件路径（命令行 --config）
+    """
     try:
         # 添加当前目录到Python路径
         sys.path.insert(0, os.path.dirname(__file__))
@@ -29,7 +36,7 @@ def launch_gui():
         
         # 直接调用UI的main函数
         from ui.main import main as ui_main
-        ui_main()
+        ui_main(load_config(config_path))
         return True
     except ImportError as e:
         print(f"无法启动图形界面: {e}")
@@ -41,6 +48,25 @@ def launch_gui():
 logger = get_logger(__name__)
 
 
+def parse_options(pairs):
+    """
+    解析命令行中的 key=value 转换选项
+    
+    Args:
+        pairs: key=value 字符串序列，值按YAML解析（数字、布尔值、列表等）
+        
+    Returns:
+        选项字典
+    """
+    options = {}
+    for pair in pairs:
+        key, sep, value = pair.partition('=')
+        if not sep:
+            raise click.BadParameter(f"选项格式应为 key=value: {pair}")
+        options[key.strip()] = yaml.safe_load(value)
+    return options
+
+
 def show_supported_formats(config_path='config/config.yaml'):
     """显示支持的格式"""
     try:
@@ -139,18 +165,24 @@ def interactive_mode(config_path='config/config.yaml'):
 
 @click.command()
 @click.option('--input', '-i', help='输入文件路径')
+@click.option('--input-dir', '-d', help='输入目录（批量转换，此时 --output 为输出目录）')
+@click.option('--include', multiple=True, help='批量转换时包含的文件通配符（可多次指定）')
+@click.option('--exclude', multiple=True, help='批量转换时排除的文件或目录通配符（可多次指定）')
+@click.option('--jobs', '-j', default=1, type=int, help='批量转换的并行任务数')
 @click.option('--output', '-o', help='输出文件路径')
 @click.option('--format', '-f', help='目标文件格式')
+@click.option('--option', '-O', 'option', multiple=True, help='转换选项 key=value（可多次指定，例如 -O max_width=1280）')
+@click.option('--progress/--no-progress', default=None, help='显示单个文件的转换进度（默认在终端中显示）')
 @click.option('--config', '-c', default='config/config.yaml', help='配置文件路径')
 @click.option('--list', '-l', is_flag=True, help='显示支持的格式')
 @click.option('--interactive', '-I', is_flag=True, help='进入交互式模式')
 @click.option('--gui', '-g', is_flag=True, help='启动图形界面')
-def main(input, output, format, config, list, interactive, gui):
+def main(input, input_dir, include, exclude, jobs, output, format, option, progress, config, list, interactive, gui):
     """主程序入口"""
     # 如果指定了--gui参数，则启动图形界面
     if gui:
         if has_gui():
-            if launch_gui():
+            if launch_gui(config):
                 return
             else:
                 print("启动图形界面失败")
@@ -169,8 +201,35 @@ def main(input, output, format, config, list, interactive, gui):
         interactive_mode(config)
         return
     
+    options = parse_options(option)
+    
+    # 如果指定了输入目录，则执行批量转换
+    if input_dir and output and format:
+        try:
+            if not os.path.isdir(input_dir):
+                logger.error(f"输入目录不存在: {input_dir}")
+                sys.exit(1)
+            
+            # 加载配置
+            config_data = load_config(config)
+            
+            # 创建转换器实例
+            converter = FileConverter(config_data)
+            
+            # 执行批量转换
+            succeeded, failed = converter.convert_directory(
+                input_dir, output, format, include=include, exclude=exclude, jobs=jobs, options=options
+            )
+            print(f"批量转换完成: 成功 {succeeded} 个，失败 {failed} 个")
+            if failed:
+                sys.exit(1)
+                
+        except Exception as e:
+            logger.error(f"批量转换过程中发生错误: {str(e)}")
+            sys.exit(1)
+    
     # 如果指定了输入和输出文件，则执行转换
-    if input and output and format:
+    elif input and output and format:
         try:
             # 检查输入文件是否存在
             if not os.path.exists(input):
@@ -183,8 +242,16 @@ def main(input, output, format, config, list, interactive, gui):
             # 创建转换器实例
             converter = FileConverter(config_data)
             
-            # 执行转换
-            success = converter.convert(input, output, format)
+            # 执行转换（在 stderr 的同一行刷新进度）
+            show_progress = sys.stderr.isatty() if progress is None else progress
+            console = ConsoleProgress() if show_progress else None
+            if console is not None:
+                options['progress_callback'] = console
+            try:
+                success = converter.convert(input, output, format, options=options)
+            finally:
+                if console is not None:
+                    console.close()
             
             if success:
                 logger.info(f"文件转换成功: {input} -> {output}")
@@ -199,7 +266,7 @@ def main(input, output, format, config, list, interactive, gui):
     else:
         # 如果没有提供任何参数，检查是否有图形界面并启动
         if has_gui():
-            if launch_gui():
+            if launch_gui(config):
                 return
             else:
                 print("启动图形界面失败")
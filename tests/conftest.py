@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+pytest 配置
+测试期间检测缓存写到临时目录，不写入仓库或用户缓存目录
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.detect_cache import CACHE_DIR_ENV, get_detection_cache
+
+_cache_dir = tempfile.mkdtemp(prefix='detect_cache_')
+os.environ[CACHE_DIR_ENV] = _cache_dir
+
+
+def pytest_unconfigure(config):
+    """提交缓存并删除临时目录"""
+    cache = get_detection_cache()
+    if cache is not None:
+        cache.flush()
+    shutil.rmtree(_cache_dir, ignore_errors=True)
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+音频转换器测试
+"""
+
+import math
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import unittest
+import wave
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from converters.audio_converter import AudioConverter
+from utils.audio_segments import segment_audio
+from utils.audio_stream import PcmDecoder
+from utils.config import DEFAULT_CONFIG
+from utils.ffmpeg_utils import find_ffmpeg, run_ffmpeg
+from utils.loudness import LoudnessMeter
+from utils.media_probe import probe_media, probe_tags
+from utils.native_audio import HAS_NUMPY, HAS_SOUNDFILE, NativeAudioError, float_to_pcm, pcm_to_float, remix_channels
+
+
+def write_sine(path, seconds=2.0, sample_rate=22050, channels=2, frequency=440.0):
+    """生成正弦波 WAV 文件"""
+    frames = int(seconds * sample_rate)
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        samples = (int(12000 * math.sin(2 * math.pi * frequency * i / sample_rate)) for i in range(frames))
+        wav.writeframes(b''.join(struct.pack('<h', s) * channels for s in samples))
+    return path
+
+
+@unittest.skipUnless(find_ffmpeg(), '需要ffmpeg')
+class TestAudioConverter(unittest.TestCase):
+    """音频转换器测试类"""
+    
+    def setUp(self):
+        """测试初始化"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.converter = AudioConverter(DEFAULT_CONFIG['converters']['audio'])
+        self.source = write_sine(self.path('tone.wav'))
+    
+    def tearDown(self):
+        """清理临时目录"""
+        self.temp_dir.cleanup()
+    
+    def path(self, name):
+        """临时文件路径"""
+        return os.path.join(self.temp_dir.name, name)
+    
+    def decoded_seconds(self, path):
+        """解码输出文件，返回时长（秒）"""
+        with PcmDecoder(path) as decoder:
+            size = sum(len(chunk) for chunk in decoder.chunks())
+            decoder.finish()
+            return size / decoder.format.byte_rate
+    
+    def test_streaming_conversion_with_progress(self):
+        """测试流式转码按块报告进度"""
+        events = []
+        output = self.path('tone.flac')
+        self.assertTrue(self.converter.convert(self.source, output, 'wav', 'flac', options={
+            'native': False, 'chunk_frames': 4096, 'progress_callback': events.append
+        }))
+        
+        self.assertAlmostEqual(self.decoded_seconds(output), 2.0, places=2)
+        self.assertGreaterEqual(len(events), 10)
+        self.assertEqual(events[-1].unit, 's')
+        self.assertAlmostEqual(events[-1].current, 2.0, places=2)
+        self.assertEqual([e.current for e in events], sorted(e.current for e in events))
+    
+    def test_streaming_lossy_output(self):
+        """测试流式转码为有损格式，并改变采样率和声道数"""
+        output = self.path('tone.mp3')
+        self.assertTrue(self.converter.convert(
+            self.source, output, 'wav', 'mp3', options={'bitrate': '64k', 'sample_rate': 16000, 'channels': 1}
+        ))
+        with PcmDecoder(output) as decoder:
+            self.assertEqual((decoder.format.sample_rate, decoder.format.channels), (16000, 1))
+    
+    def test_streaming_keeps_bit_depth_and_tags(self):
+        """测试流式转码保持24位源的位深，并复制标签"""
+        source = self.path('tone24.wav')
+        run_ffmpeg(['-i', self.source, '-c:a', 'pcm_s24le', '-metadata', 'title=Tone', source])
+        flac, wav = self.path('out24.flac'), self.path('out24.wav')
+        # wav -> flac -> wav 都不能直接复制音频流
+        for input_path, output, source_format, target in ((source, flac, 'wav', 'flac'), (flac, wav, 'flac', 'wav')):
+            with patch('converters.audio_converter.remux_audio', side_effect=AssertionError('不应复制音频流')):
+                self.assertTrue(self.converter.convert(input_path, output, source_format, target,
+                                                       options={'native': False}))
+            self.assertEqual(probe_media(output, use_cache=False).audio.bits_per_sample, 24)
+            with PcmDecoder(output) as decoder, PcmDecoder(source) as original:
+                self.assertEqual(decoder.format.sample_width, 3)
+                self.assertEqual(b''.join(decoder.chunks()), b''.join(original.chunks()))
+            tags = subprocess.run([find_ffmpeg(), '-i', output, '-f', 'ffmetadata', '-'],
+                                  capture_output=True, text=True).stdout
+            self.assertIn('title=Tone', tags)
+    
+    def test_remux_without_reencoding(self):
+        """测试目标格式可以容纳原编码时直接复制音频流"""
+        source = self.path('tone.aac')
+        run_ffmpeg(['-i', self.source, '-c:a', 'aac', '-b:a', '96k', source])
+        output = self.path('tone.m4a')
+        
+        with patch('converters.audio_converter.stream_audio') as stream_audio:
+            self.assertTrue(self.converter.convert(source, output, 'aac', 'm4a'))
+            stream_audio.assert_not_called()
+        info = probe_media(output)
+        self.assertEqual((info.audio.codec_name, info.audio.sample_rate), ('aac', 22050))
+        
+        # 指定码率时需要重新编码
+        with patch('converters.audio_converter.stream_audio', return_value=2.0) as stream_audio:
+            self.assertTrue(self.converter.convert(source, output, 'aac', 'm4a', options={'bitrate': '64k'}))
+            stream_audio.assert_called_once()
+        
+        # 探测超时时改为重新编码
+        with patch('converters.audio_converter.probe_media', side_effect=subprocess.TimeoutExpired('ffprobe', 30)), \
+                patch('converters.audio_converter.stream_audio', return_value=2.0) as stream_audio:
+            self.assertTrue(self.converter.convert(source, output, 'aac', 'm4a'))
+            stream_audio.assert_called_once()
+    
+    def test_segmented_encoding(self):
+        """测试分段并行编码：flac 拼接后与原始数据完全一致，mp3 与整段编码的时长相同，都保留源文件的标签"""
+        source = self.path('tagged.wav')
+        run_ffmpeg(['-i', write_sine(self.path('long.wav'), seconds=6.0), '-c:a', 'copy',
+                    '-metadata', 'title=Long Tone', '-metadata', 'artist=Tester', source])
+        tags = {'title': 'Long Tone', 'artist': 'Tester'}
+        events = []
+        flac = self.path('long.flac')
+        # 显式要求分段时优先于进程内转换
+        with patch('converters.audio_converter.segment_audio', wraps=segment_audio) as segmented_path, \
+                patch('converters.audio_converter.convert_native', side_effect=AssertionError('不应在进程内转换')):
+            self.assertTrue(self.converter.convert(source, flac, 'wav', 'flac', options={
+                'segmented': True, 'segment_seconds': 1, 'progress_callback': events.append
+            }))
+            segmented_path.assert_called_once()
+        self.assertGreater(len([e for e in events if e.stage == 'audio']), 3)
+        with PcmDecoder(flac) as decoder:
+            decoded = b''.join(decoder.chunks())
+            decoder.finish()
+        with wave.open(source, 'rb') as wav:
+            self.assertEqual(decoded, wav.readframes(wav.getnframes()))
+        self.assertEqual(probe_tags(flac), tags)
+        
+        segmented, whole = self.path('segmented.mp3'), self.path('whole.mp3')
+        self.assertTrue(self.converter.convert(source, segmented, 'wav', 'mp3', options={
+            'segmented': True, 'segment_seconds': 1, 'split': 'fixed'
+        }))
+        run_ffmpeg(['-i', source, '-c:a', 'libmp3lame', '-write_xing', '0', whole])
+        self.assertAlmostEqual(self.decoded_seconds(segmented), self.decoded_seconds(whole), places=3)
+        self.assertEqual(probe_tags(segmented), tags)
+        
+        wav = self.path('segmented.wav')
+        self.assertTrue(self.converter.convert(source, wav, 'wav', 'wav', options={
+            'segmented': True, 'segment_seconds': 1
+        }))
+        self.assertEqual(probe_tags(wav), tags)
+        self.assertAlmostEqual(self.decoded_seconds(wav), 6.0, places=3)
+    
+    @unittest.skipUnless(HAS_NUMPY, '需要NumPy')
+    def test_native_wav_conversion(self):
+        """测试 WAV 位深、声道和增益转换在进程内完成"""
+        output = self.path('mono24.wav')
+        with patch('subprocess.Popen', side_effect=AssertionError('不应启动子进程')):
+            self.assertTrue(self.converter.convert(
+                self.source, output, 'wav', 'wav', options={'sample_width': 3, 'channels': 1, 'gain_db': -6.0206}
+            ))
+        
+        with wave.open(self.source, 'rb') as src, wave.open(output, 'rb') as out:
+            self.assertEqual((out.getnchannels(), out.getsampwidth(), out.getnframes()), (1, 3, src.getnframes()))
+            original = pcm_to_float(src.readframes(100), 2, 2)[:, 0]
+            converted = pcm_to_float(out.readframes(100), 3, 1)[:, 0]
+        self.assertTrue(all(abs(a / 2 - b) < 1e-4 for a, b in zip(original, converted)))
+    
+    @unittest.skipUnless(HAS_NUMPY, '需要NumPy')
+    def test_native_resample_for_speech(self):
+        """测试在进程内转换为 16kHz 单声道"""
+        output = self.path('speech.wav')
+        with patch('subprocess.Popen', side_effect=AssertionError('不应启动子进程')):
+            self.assertTrue(self.converter.convert(
+                self.source, output, 'wav', 'wav', options={'sample_rate': 16000, 'channels': 1}
+            ))
+        
+        with wave.open(output, 'rb') as out:
+            self.assertEqual((out.getframerate(), out.getnchannels()), (16000, 1))
+            self.assertEqual(out.getnframes(), 32000)
+            samples = pcm_to_float(out.readframes(out.getnframes()), 2, 1)[:, 0]
+        # 滤波器延迟已补偿，中间部分应与 16kHz 下的同频正弦波一致
+        expected = [12000 / 32768 * math.sin(2 * math.pi * 440 * i / 16000) for i in range(1000, 31000)]
+        self.assertLess(max(abs(a - b) for a, b in zip(samples[1000:31000], expected)), 2e-3)
+    
+    @unittest.skipUnless(HAS_NUMPY, '需要NumPy')
+    def test_native_loudness_normalization(self):
+        """测试在进程内响度归一化到目标响度"""
+        output = self.path('normalized.wav')
+        with patch('subprocess.Popen', side_effect=AssertionError('不应启动子进程')):
+            self.assertTrue(self.converter.convert(
+                self.source, output, 'wav', 'wav', options={'normalize': True, 'target_lufs': -30}
+            ))
+    
+        with wave.open(output, 'rb') as out:
+            meter = LoudnessMeter(out.getframerate(), out.getnchannels())
+            meter.process(pcm_to_float(out.readframes(out.getnframes()), 2, out.getnchannels()))
+        self.assertAlmostEqual(meter.integrated, -30.0, delta=0.1)
+    
+    @unittest.skipUnless(HAS_NUMPY, '需要NumPy')
+    def test_pcm_round_trip(self):
+        """测试各位深的整数 PCM 与浮点互转无损"""
+        for width in (1, 2, 3, 4):
+            data = bytes(range(256)) * width * 2
+            self.assertEqual(float_to_pcm(pcm_to_float(data, width, 2), width), data)
+    
+    @unittest.skipUnless(HAS_NUMPY, '需要NumPy')
+    def test_multichannel_downmix(self):
+        """测试 5.1 混缩为立体声：中置分到两侧，丢弃 LFE，左右环绕不串到另一侧"""
+        import numpy as np
+        stereo = remix_channels(np.eye(6), 2)
+        self.assertAlmostEqual(stereo[2, 0], stereo[2, 1])
+        self.assertEqual(stereo[3].tolist(), [0.0, 0.0])
+        self.assertEqual((stereo[4, 1], stereo[5, 0]), (0.0, 0.0))
+        # 每侧系数之和为1，满幅输入不削波
+        self.assertEqual(stereo.sum(axis=0).round(6).tolist(), [1.0, 1.0])
+        with self.assertRaises(NativeAudioError):
+            remix_channels(np.zeros((1, 9)), 2)
+    
+    @unittest.skipUnless(HAS_SOUNDFILE, '需要soundfile')
+    def test_native_flac_round_trip(self):
+        """测试 WAV 与 FLAC 在进程内互转无损"""
+        flac = self.path('tone.flac')
+        back = self.path('back.wav')
+        with patch('subprocess.Popen', side_effect=AssertionError('不应启动子进程')):
+            self.assertTrue(self.converter.convert(self.source, flac, 'wav', 'flac'))
+            self.assertTrue(self.converter.convert(flac, back, 'flac', 'wav'))
+        with wave.open(self.source, 'rb') as src, wave.open(back, 'rb') as out:
+            self.assertEqual(out.readframes(out.getnframes()), src.readframes(src.getnframes()))
+    
+    def test_invalid_input_leaves_no_output(self):
+        """测试解码失败时返回False且不留下输出文件"""
+        broken = self.path('broken.wav')
+        with open(broken, 'wb') as f:
+            f.write(b'RIFF\x00\x00\x00\x00WAVEjunk')
+        self.assertFalse(self.converter.convert(broken, self.path('out.mp3'), 'wav', 'mp3'))
+        self.assertFalse(os.path.exists(self.path('out.mp3')))
+
+
+if __name__ == '__main__':
+    unittest.main()
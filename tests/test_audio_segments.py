@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+分段编码和音频帧拼接测试
+"""
+
+import os
+import sys
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.audio_frames import _crc8, _crc16, _encode_number, _parse_flac_header, renumber_flac_frame
+from utils.audio_segments import find_split_points
+from utils.native_audio import HAS_NUMPY
+
+
+def make_flac_frame(number, payload=b'\x12\xff\xf8\x00' * 50):
+    """构造一个帧头和校验值有效的 FLAC 帧（块大小 4608，44.1kHz，立体声，16位）"""
+    header = b'\xff\xf8\x59\x18' + _encode_number(number)
+    header += bytes((_crc8(header),))
+    body = header + payload
+    return body + _crc16(body).to_bytes(2, 'big')
+
+
+class TestAudioSegments(unittest.TestCase):
+    """分段编码测试类"""
+    
+    def test_fixed_split_points(self):
+        """测试按固定长度切分，最后一段不短于半段"""
+        self.assertEqual(find_split_points(100, 30), [30, 60])
+        self.assertEqual(find_split_points(110, 30), [30, 60, 90])
+        self.assertEqual(find_split_points(20, 30), [])
+    
+    @unittest.skipUnless(HAS_NUMPY, '需要NumPy')
+    def test_silence_split_points(self):
+        """测试在预定切分点附近的静音处切分"""
+        energy = [1.0] * 100
+        energy[27] = 0.0
+        energy[61] = 0.0
+        self.assertEqual(find_split_points(100, 30, 5, energy), [27, 61])
+    
+    def test_renumber_flac_frame(self):
+        """测试改写帧号（包括帧号编码长度变化）后帧头和整帧的校验值仍然有效"""
+        frame = make_flac_frame(3)
+        payload = frame[_parse_flac_header(frame, 0).length:-2]
+        for number in (3, 100, 5000, 300000):
+            renumbered = renumber_flac_frame(frame, number)
+            header = _parse_flac_header(renumbered, 0)
+            self.assertIsNotNone(header)
+            self.assertEqual(header.number, number)
+            self.assertEqual(_crc16(renumbered[:-2]), int.from_bytes(renumbered[-2:], 'big'))
+            self.assertEqual(renumbered[header.length:-2], payload)
+
+
+if __name__ == '__main__':
+    unittest.main()
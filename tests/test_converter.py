@@ -7,12 +7,14 @@ AlwaysConverter 测试文件
 
 import os
 import sys
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
 
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+from converters.image_converter import HAS_PILLOW
 from core.converter import FileConverter
 from utils.config import load_config
 
@@ -89,6 +91,41 @@ class TestFileConverter(unittest.TestCase):
         mock_convert.return_value = True
         result = self.converter.convert('test.zip', 'test.tar', 'zip', 'tar')
         self.assertTrue(result)
+    
+    def test_convert_directory(self):
+        """测试批量转换：接受任意格式的转换器不过滤扩展名，同名输出不互相覆盖"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = os.path.join(temp_dir, 'in')
+            for rel_path in ['a.jpg', 'a.png', 'sub/a.jpg', 'notes.xyz']:
+                path = os.path.join(input_dir, rel_path)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                open(path, 'wb').close()
+            
+            outputs = []
+            with patch.object(self.converter, 'get_format_set', return_value=frozenset({'*'})), \
+                    patch.object(self.converter, 'convert', side_effect=lambda i, o, *a, **k: outputs.append(o) or True):
+                result = self.converter.convert_directory(input_dir, os.path.join(temp_dir, 'out'), 'webp')
+            
+            self.assertEqual(result, (4, 0))
+            names = sorted(os.path.relpath(o, os.path.join(temp_dir, 'out')).replace(os.sep, '/') for o in outputs)
+            self.assertEqual(len(names), 4)
+            self.assertIn(names[:2], (['a.webp', 'a_jpg.webp'], ['a.webp', 'a_png.webp']))
+            self.assertEqual(names[2:], ['notes.webp', 'sub/a.webp'])
+    
+    @unittest.skipUnless(HAS_PILLOW, '需要Pillow')
+    def test_convert_directory_parallel(self):
+        """测试并行批量转换时各任务共用新建的输出子目录"""
+        from PIL import Image
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = os.path.join(temp_dir, 'in')
+            for sub in ('a', 'b'):
+                os.makedirs(os.path.join(input_dir, sub))
+                for index in range(4):
+                    Image.new('RGB', (8, 8), (index * 60, 0, 0)).save(os.path.join(input_dir, sub, f'{index}.png'))
+            
+            output_dir = os.path.join(temp_dir, 'out')
+            self.assertEqual(self.converter.convert_directory(input_dir, output_dir, 'bmp', jobs=4), (8, 0))
+            self.assertEqual(sorted(os.listdir(os.path.join(output_dir, 'a'))), [f'{i}.bmp' for i in range(4)])
 
 
 if __name__ == '__main__':
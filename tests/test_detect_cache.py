@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+检测缓存测试
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.config import load_config
+from utils.detect_cache import CACHE_DIR_ENV, DetectionCache, resolve_cache_path
+from utils import file_utils
+
+
+class TestDetectionCache(unittest.TestCase):
+    """检测缓存测试类"""
+    
+    def setUp(self):
+        """测试初始化"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'cache.db')
+        self.file_path = os.path.join(self.temp_dir.name, 'sample')
+        with open(self.file_path, 'wb') as f:
+            f.write(b'%PDF-1.4 sample')
+    
+    def tearDown(self):
+        """清理临时目录"""
+        self.temp_dir.cleanup()
+    
+    def test_hit_after_put(self):
+        """测试写入后命中，并能跨实例共享"""
+        cache = DetectionCache(self.db_path)
+        st = os.stat(self.file_path)
+        self.assertEqual(cache.get(st), (False, None))
+        
+        cache.put(st, 'pdf')
+        cache.flush()
+        self.assertEqual(cache.get(st), (True, 'pdf'))
+        
+        # 新实例（模拟其他进程）读取同一数据库
+        other = DetectionCache(self.db_path)
+        self.assertEqual(other.get(st), (True, 'pdf'))
+    
+    def test_invalidated_on_change(self):
+        """测试文件变化后缓存失效"""
+        cache = DetectionCache(self.db_path)
+        cache.put(os.stat(self.file_path), 'pdf')
+        cache.flush()
+        
+        with open(self.file_path, 'ab') as f:
+            f.write(b' changed')
+        
+        other = DetectionCache(self.db_path)
+        self.assertEqual(other.get(os.stat(self.file_path)), (False, None))
+    
+    def test_get_file_type_does_not_reopen_cached_file(self):
+        """测试缓存命中时不再读取文件内容"""
+        cache = DetectionCache(self.db_path)
+        with patch.object(file_utils, 'get_detection_cache', return_value=cache), \
+                patch.object(file_utils, '_detect_file_type_by_content', return_value='pdf') as detect:
+            self.assertEqual(file_utils.get_file_type(self.file_path), 'pdf')
+            self.assertEqual(file_utils.get_file_type(self.file_path), 'pdf')
+            self.assertEqual(detect.call_count, 1)
+    
+    def test_default_path(self):
+        """测试默认路径和相对路径基于缓存目录，与当前工作目录无关"""
+        cwd = os.getcwd()
+        elsewhere = os.path.join(self.temp_dir.name, 'elsewhere')
+        os.mkdir(elsewhere)
+        with patch.dict(os.environ, {CACHE_DIR_ENV: self.temp_dir.name}):
+            try:
+                os.chdir(elsewhere)
+                self.assertEqual(DetectionCache().db_path, os.path.join(self.temp_dir.name, 'detect_cache.db'))
+                self.assertEqual(resolve_cache_path('sub/c.db'), os.path.join(self.temp_dir.name, 'sub', 'c.db'))
+            finally:
+                os.chdir(cwd)
+        self.assertEqual(resolve_cache_path(self.db_path), self.db_path)
+    
+    def test_config_relative_path(self):
+        """测试配置文件中的相对缓存路径相对于配置文件所在目录"""
+        config_path = os.path.join(self.temp_dir.name, 'config.yaml')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            f.write('cache:\n  path: data/cache.db\n')
+        config = load_config(config_path)
+        self.assertEqual(config['cache'], {'enabled': True, 'path': os.path.join(self.temp_dir.name, 'data/cache.db')})
+        self.assertIsNone(load_config()['cache']['path'])
+
+
+if __name__ == '__main__':
+    unittest.main()
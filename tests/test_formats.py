@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+格式注册表测试
+"""
+
+import os
+import sys
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils import formats
+
+
+class TestFormatRegistry(unittest.TestCase):
+    """格式注册表测试类"""
+    
+    def test_lookup_with_aliases(self):
+        """测试扩展名和别名查询"""
+        self.assertEqual(formats.canonical_ext('.JPEG'), 'jpg')
+        self.assertEqual(formats.canonical_ext('tif'), 'tiff')
+        self.assertEqual(formats.get_category('mkv'), 'video')
+        self.assertEqual(formats.get_category('xyz'), 'unknown')
+        self.assertEqual(formats.pillow_format('jpeg'), 'JPEG')
+    
+    def test_mime_index(self):
+        """测试MIME类型双向查询"""
+        self.assertEqual(formats.get_mime('png'), 'image/png')
+        self.assertEqual(formats.ext_from_mime('audio/x-wav'), 'wav')
+        self.assertEqual(formats.ext_from_mime('application/x-rar'), 'rar')
+        self.assertIsNone(formats.ext_from_mime('application/x-unknown'))
+    
+    def test_signature_detection(self):
+        """测试文件签名识别，更具体的签名优先"""
+        self.assertEqual(formats.detect_by_signature(b'\x89PNG\r\n\x1a\n....'), 'png')
+        self.assertEqual(formats.detect_by_signature(b'RIFF\x00\x00\x00\x00WEBPVP8 '), 'webp')
+        self.assertEqual(formats.detect_by_signature(b'\x00\x00\x00\x20ftypM4A '), 'm4a')
+        self.assertEqual(formats.detect_by_signature(b'\x00\x00\x00\x20ftypisom'), 'mp4')
+        self.assertEqual(formats.detect_by_signature(b'\x00\x00\x00\x1cftypavif'), 'avif')
+        self.assertIsNone(formats.detect_by_signature(b'plain text'))
+    
+    def test_format_sets(self):
+        """测试格式集合包含别名"""
+        format_set = formats.expand_format_set(['JPG', 'png'])
+        self.assertIn('jpeg', format_set)
+        self.assertIn('png', format_set)
+        self.assertNotIn('gif', format_set)
+        self.assertIn('svg', formats.formats_for('image', 'input'))
+        self.assertNotIn('svg', formats.formats_for('image', 'output'))
+
+
+if __name__ == '__main__':
+    unittest.main()
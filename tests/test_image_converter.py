@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+图片转换器测试
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from converters.image_converter import ImageConverter, HAS_PILLOW
+from utils.config import DEFAULT_CONFIG
+from utils.encoder_profiles import image_save_params
+from utils.image_codecs import available_formats, is_codec_available
+from utils.image_utils import flatten_alpha
+
+if HAS_PILLOW:
+    from PIL import Image, JpegImagePlugin
+
+
+@unittest.skipUnless(HAS_PILLOW, '需要Pillow')
+class TestImageConverter(unittest.TestCase):
+    """图片转换器测试类"""
+    
+    def setUp(self):
+        """测试初始化"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.converter = ImageConverter(DEFAULT_CONFIG['converters']['image'])
+    
+    def tearDown(self):
+        """清理临时目录"""
+        self.temp_dir.cleanup()
+    
+    def path(self, name):
+        """临时文件路径"""
+        return os.path.join(self.temp_dir.name, name)
+    
+    def make_image(self, name, mode='RGB', size=(64, 48), color=(200, 30, 30)):
+        """生成测试图片"""
+        path = self.path(name)
+        Image.new(mode, size, color).save(path)
+        return path
+    
+    def test_basic_conversion(self):
+        """测试基本格式转换"""
+        source = self.make_image('a.png')
+        self.assertTrue(self.converter.convert(source, self.path('a.jpg'), 'png', 'jpg'))
+        with Image.open(self.path('a.jpg')) as img:
+            self.assertEqual(img.format, 'JPEG')
+            self.assertEqual(img.size, (64, 48))
+    
+    def test_jpeg_draft_downscale(self):
+        """测试JPEG缩小时使用草稿解码"""
+        source = self.make_image('big.jpg', size=(1600, 1200))
+        original_draft = JpegImagePlugin.JpegImageFile.draft
+        with patch.object(JpegImagePlugin.JpegImageFile, 'draft', autospec=True, side_effect=original_draft) as draft:
+            self.assertTrue(self.converter.convert(
+                source, self.path('small.webp'), 'jpg', 'webp', options={'max_width': 200}
+            ))
+            self.assertTrue(draft.called)
+        with Image.open(self.path('small.webp')) as img:
+            self.assertEqual(img.size, (200, 150))
+    
+    def test_max_dimension_does_not_upscale(self):
+        """测试最大尺寸选项只缩小不放大"""
+        source = self.make_image('tall.png', size=(300, 600))
+        self.assertTrue(self.converter.convert(source, self.path('t1.png'), 'png', 'png', options={'max_dimension': 100}))
+        self.assertTrue(self.converter.convert(source, self.path('t2.png'), 'png', 'png', options={'max_dimension': 1000}))
+        with Image.open(self.path('t1.png')) as img:
+            self.assertEqual(img.size, (50, 100))
+        with Image.open(self.path('t2.png')) as img:
+            self.assertEqual(img.size, (300, 600))
+    
+    def test_convert_many_decodes_once(self):
+        """测试一次解码输出多种格式和宽度"""
+        source = self.make_image('photo.png', mode='RGBA', size=(800, 600), color=(10, 20, 30, 128))
+        with patch.object(Image, 'open', wraps=Image.open) as image_open:
+            results = self.converter.convert_many(
+                source, self.path('out/photo'), ['jpg', 'webp', 'png'], widths=[320, 640, 1280]
+            )
+            self.assertEqual(image_open.call_count, 1)
+        
+        # 超过原图宽度的阶梯会被收敛到原尺寸
+        self.assertEqual(len(results), 9)
+        self.assertTrue(all(results.values()))
+        with Image.open(self.path('out/photo-320w.jpg')) as img:
+            self.assertEqual((img.mode, img.size), ('RGB', (320, 240)))
+        with Image.open(self.path('out/photo-800w.png')) as img:
+            self.assertEqual((img.mode, img.size), ('RGBA', (800, 600)))
+    
+    def test_convert_many_in_processes(self):
+        """测试在工作进程中编码（位图通过共享内存传递）"""
+        source = self.make_image('photo.png', mode='RGBA', size=(400, 300), color=(10, 20, 30, 128))
+        results = self.converter.convert_many(
+            source, self.path('out/photo'), ['jpg', 'png', 'gif'], widths=[200], use_processes=True
+        )
+        self.converter.convert_many(source, self.path('threads/photo'), ['png'], widths=[200])
+        
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(results.values()))
+        with Image.open(self.path('out/photo-200w.png')) as img, \
+                Image.open(self.path('threads/photo-200w.png')) as expected:
+            self.assertEqual((img.mode, img.size), ('RGBA', (200, 150)))
+            self.assertEqual(img.tobytes(), expected.tobytes())
+        with Image.open(self.path('out/photo-200w.gif')) as img:
+            self.assertEqual((img.mode, img.size), ('P', (200, 150)))
+    
+    def test_flatten_alpha_modes(self):
+        """测试各种透明模式合成到背景色"""
+        rgba = Image.new('RGBA', (2, 2), (0, 0, 0, 128))
+        self.assertEqual(flatten_alpha(rgba).getpixel((0, 0)), (127, 127, 127))
+        
+        la = Image.new('LA', (2, 2), (0, 0))
+        self.assertEqual(flatten_alpha(la, '#102030').getpixel((0, 0)), (16, 32, 48))
+        
+        palette_img = Image.new('P', (2, 1))
+        palette_img.putpalette([255, 0, 0, 0, 0, 255])
+        palette_img.putpixel((1, 0), 1)
+        palette_img.info['transparency'] = 0
+        flattened = flatten_alpha(palette_img, (0, 255, 0))
+        self.assertEqual(flattened.mode, 'RGB')
+        self.assertEqual(list(flattened.getdata()), [(0, 255, 0), (0, 0, 255)])
+        # 原图不受影响
+        self.assertEqual(palette_img.info['transparency'], 0)
+    
+    def make_animation(self, name, frames=12, loop=0):
+        """生成带透明帧的动画 GIF（loop 为 None 时不写循环设置）"""
+        images = []
+        for index in range(frames):
+            img = Image.new('RGBA', (60, 40), (0, 0, 0, 0) if index % 3 == 0 else (255, 255, 255, 255))
+            img.paste((255, 0, 0, 255), (index * 4, 10, index * 4 + 12, 30))
+            images.append(img)
+        path = self.path(name)
+        extra = {} if loop is None else {'loop': loop}
+        images[0].save(path, save_all=True, append_images=images[1:], duration=[50 + 10 * i for i in range(frames)],
+                       disposal=2, **extra)
+        return path
+    
+    def frame_durations(self, path):
+        """读取每一帧的时长"""
+        durations = []
+        with Image.open(path) as img:
+            for index in range(img.n_frames):
+                img.seek(index)
+                img.load()
+                durations.append(img.info.get('duration'))
+        return durations
+    
+    def test_animated_conversion(self):
+        """测试动画逐帧转换，保留帧数和时长并报告进度"""
+        source = self.make_animation('anim.gif')
+        events = []
+        self.assertTrue(self.converter.convert(
+            source, self.path('anim.webp'), 'gif', 'webp', options={'progress_callback': events.append}
+        ))
+        self.assertEqual(self.frame_durations(self.path('anim.webp')), self.frame_durations(source))
+        self.assertEqual([(e.current, e.total) for e in events], [(i, 12) for i in range(1, 13)])
+        
+        self.assertTrue(self.converter.convert(source, self.path('pages.tiff'), 'gif', 'tiff'))
+        with Image.open(self.path('pages.tiff')) as img:
+            self.assertEqual(img.n_frames, 12)
+        
+        # 不支持多帧的格式只输出第一帧
+        self.assertTrue(self.converter.convert(source, self.path('first.png'), 'gif', 'png'))
+    
+    def test_animated_gif_frames_preserved(self):
+        """测试逐帧写出的 GIF 与原动画逐帧一致"""
+        source = self.make_animation('anim.gif')
+        self.assertTrue(self.converter.convert(source, self.path('copy.gif'), 'gif', 'gif'))
+        with Image.open(source) as expected, Image.open(self.path('copy.gif')) as actual:
+            self.assertEqual(actual.n_frames, expected.n_frames)
+            for index in range(expected.n_frames):
+                expected.seek(index)
+                actual.seek(index)
+                self.assertEqual(actual.convert('RGBA').tobytes(), expected.convert('RGBA').tobytes())
+    
+    def test_animation_loop(self):
+        """测试没有循环设置的动画只播放一次，循环设置原样保留"""
+        once = self.make_animation('once.gif', frames=3, loop=None)
+        self.assertTrue(self.converter.convert(once, self.path('once_copy.gif'), 'gif', 'gif'))
+        with Image.open(self.path('once_copy.gif')) as img:
+            self.assertNotIn('loop', img.info)
+        
+        for source, loop in ((once, 1), (self.make_animation('forever.gif', frames=3), 0)):
+            self.assertTrue(self.converter.convert(source, self.path('anim.webp'), 'gif', 'webp'))
+            with Image.open(self.path('anim.webp')) as img:
+                self.assertEqual(img.info['loop'], loop)
+        
+        # 逐帧编码接口不可用时改用 save_all
+        with patch('utils.animation.HAS_WEBP_FRAME_ENCODER', False):
+            self.assertTrue(self.converter.convert(once, self.path('fallback.webp'), 'gif', 'webp'))
+        self.assertEqual(self.frame_durations(self.path('fallback.webp')), self.frame_durations(once))
+        with Image.open(self.path('fallback.webp')) as img:
+            self.assertEqual(img.info['loop'], 1)
+        
+        # 私有接口的参数不兼容时也改用 save_all
+        for encoder in (MagicMock(side_effect=TypeError('signature')), MagicMock(return_value=object())):
+            with patch('utils.animation._webp', SimpleNamespace(WebPAnimEncoder=encoder)):
+                self.assertTrue(self.converter.convert(once, self.path('fallback.webp'), 'gif', 'webp'))
+            encoder.assert_called_once()
+            self.assertEqual(self.frame_durations(self.path('fallback.webp')), self.frame_durations(once))
+    
+    def test_encoder_profiles(self):
+        """测试编码配置及单项参数覆盖"""
+        self.assertEqual(image_save_params('PNG', {'profile': 'fast'}), {'compress_level': 1})
+        self.assertEqual(image_save_params('JPEG', {'profile': 'smallest', 'quality': 90})['quality'], 90)
+        self.assertEqual(image_save_params('TIFF', {'tiff_compression': 'lzw'})['compression'], 'tiff_lzw')
+        # 未知配置使用默认配置，其他格式的参数不会混入
+        self.assertEqual(image_save_params('PNG', {'profile': 'unknown', 'quality': 50}), {'compress_level': 6})
+        
+        source = self.path('gradient.png')
+        Image.radial_gradient('L').resize((512, 512)).convert('RGB').save(source)
+        sizes = {}
+        for profile in ('fast', 'smallest'):
+            output = self.path(f'{profile}.jpg')
+            self.assertTrue(self.converter.convert(source, output, 'png', 'jpg', options={'profile': profile}))
+            sizes[profile] = os.path.getsize(output)
+        self.assertLess(sizes['smallest'], sizes['fast'])
+    
+    def test_speed_and_threads_options(self):
+        """测试 speed / threads 选项映射到 WebP、AVIF 编码参数"""
+        self.assertEqual(image_save_params('WEBP', {'speed': 10})['method'], 0)
+        self.assertEqual(image_save_params('WEBP', {'speed': 0})['method'], 6)
+        self.assertEqual(image_save_params('WEBP', {'speed': 10, 'method': 5})['method'], 5)
+        avif = image_save_params('AVIF', {'profile': 'fast', 'speed': 20, 'threads': 1})
+        self.assertEqual((avif['speed'], avif['max_threads']), (10, 1))
+        self.assertNotIn('speed', image_save_params('PNG', {'speed': 5}))
+    
+    @unittest.skipUnless(HAS_PILLOW and is_codec_available('AVIF'), '需要Pillow AVIF支持')
+    def test_avif_output(self):
+        """测试 AVIF 输出"""
+        source = self.make_image('photo.png', mode='RGBA', size=(64, 48), color=(200, 100, 50, 255))
+        output = self.path('photo.avif')
+        self.assertTrue(self.converter.convert(source, output, 'png', 'avif', options={'speed': 9, 'threads': 2}))
+        with Image.open(output) as img:
+            self.assertEqual((img.format, img.size), ('AVIF', (64, 48)))
+        self.assertIn('avif', DEFAULT_CONFIG['converters']['image']['output_formats'])
+    
+    def test_missing_codec_fallback(self):
+        """测试编解码器不可用时格式被去掉，转换直接失败"""
+        source = self.make_image('photo.png')
+        with patch('utils.image_codecs.probe_image_codecs', return_value={'WEBP': 'pillow', 'AVIF': None}):
+            self.assertEqual(available_formats(['png', 'avif', 'webp']), ['png', 'webp'])
+            self.assertFalse(self.converter.convert(source, self.path('photo.avif'), 'png', 'avif'))
+        self.assertFalse(os.path.exists(self.path('photo.avif')))
+    
+    def test_quantized_gif_and_png8(self):
+        """测试调色板量化（GIF 单一透明色、PNG8 带 alpha 的调色板）"""
+        source = self.path('icon.png')
+        img = Image.linear_gradient('L').resize((64, 64)).convert('RGBA')
+        img.putalpha(Image.radial_gradient('L').resize((64, 64)))
+        img.save(source)
+        
+        for dither in ('none', 'floyd-steinberg', 'ordered'):
+            self.assertTrue(self.converter.convert(
+                source, self.path('icon.gif'), 'png', 'gif', options={'colors': 16, 'dither': dither}
+            ))
+            with Image.open(self.path('icon.gif')) as gif:
+                self.assertEqual(gif.mode, 'P')
+                self.assertLessEqual(len(set(gif.getdata())), 16)
+                # 中心透明，角落不透明
+                self.assertEqual(gif.getpixel((32, 32)), gif.info['transparency'])
+                self.assertNotEqual(gif.getpixel((0, 0)), gif.info['transparency'])
+        
+        self.assertTrue(self.converter.convert(
+            source, self.path('icon8.png'), 'png', 'png', options={'png8': True, 'colors': 32}
+        ))
+        with Image.open(self.path('icon8.png')) as png8:
+            self.assertEqual(png8.mode, 'P')
+            self.assertIn('transparency', png8.info)
+            self.assertLess(os.path.getsize(self.path('icon8.png')), os.path.getsize(source))
+    
+    def test_animation_palette_reuse(self):
+        """测试动画各帧复用调色板"""
+        frames = [Image.linear_gradient('L').resize((80, 60)).rotate(index * 18).convert('RGB') for index in range(20)]
+        source = self.path('anim.gif')
+        frames[0].save(source, save_all=True, append_images=frames[1:], duration=40, loop=0)
+        self.assertTrue(self.converter.convert(source, self.path('shared.gif'), 'gif', 'gif'))
+        self.assertTrue(self.converter.convert(
+            source, self.path('local.gif'), 'gif', 'gif', options={'reuse_palette': False}
+        ))
+        # 复用调色板时后续帧不写局部调色板
+        self.assertLess(os.path.getsize(self.path('shared.gif')), os.path.getsize(self.path('local.gif')))
+        with Image.open(self.path('shared.gif')) as img:
+            self.assertEqual(img.n_frames, 20)
+    
+    def test_jpeg_background_option(self):
+        """测试输出JPEG时的背景色选项"""
+        source = self.make_image('clear.png', mode='RGBA', color=(0, 0, 0, 0))
+        self.assertTrue(self.converter.convert(source, self.path('clear.jpg'), 'png', 'jpg', options={'background': 'black'}))
+        with Image.open(self.path('clear.jpg')) as img:
+            self.assertLess(sum(img.getpixel((10, 10))), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+响度测量测试
+"""
+
+import os
+import sys
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.loudness import HAS_NUMPY, BlockFilter, LoudnessMeter, k_weighting, normalization_gain
+
+if HAS_NUMPY:
+    import numpy as np
+
+
+def sine(level_db, seconds, sample_rate=48000, frequency=1000.0):
+    """生成峰值为 level_db（dBFS）的立体声正弦波"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    wave = 10 ** (level_db / 20) * np.sin(2 * np.pi * frequency * t)
+    return np.stack([wave, wave], axis=1)
+
+
+def measure(data, sample_rate=48000, block=10000):
+    """分块输入并返回测量结果"""
+    meter = LoudnessMeter(sample_rate, data.shape[1])
+    for start in range(0, len(data), block):
+        meter.process(data[start:start + block])
+    return meter
+
+
+@unittest.skipUnless(HAS_NUMPY, '需要NumPy')
+class TestLoudness(unittest.TestCase):
+    """响度测量测试类"""
+    
+    def test_block_filter_matches_recursion(self):
+        """测试分块滤波与逐采样递推的结果一致"""
+        signal = np.random.default_rng(0).standard_normal((3000, 2))
+        for b, a in k_weighting(44100):
+            expected = np.zeros_like(signal)
+            z1 = z2 = np.zeros(2)
+            for t, x in enumerate(signal):
+                expected[t] = b[0] * x + z1
+                z1, z2 = b[1] * x - a[1] * expected[t] + z2, b[2] * x - a[2] * expected[t]
+            block_filter = BlockFilter(b, a, 2)
+            output = np.concatenate([block_filter.process(signal[i:i + 333]) for i in range(0, 3000, 333)])
+            np.testing.assert_allclose(output, expected[:len(output)], atol=1e-9)
+    
+    def test_reference_tone(self):
+        """测试 EBU Tech 3341 的参考信号：-23 dBFS 的 1kHz 立体声正弦波为 -23 LUFS"""
+        meter = measure(sine(-23, 20))
+        self.assertAlmostEqual(meter.integrated, -23.0, delta=0.1)
+        self.assertAlmostEqual(meter.peak_db, -23.0, delta=0.01)
+    
+    def test_gating_and_gain(self):
+        """测试静音被门限排除，归一化增益受峰值限制"""
+        tone = sine(-20, 10)
+        with_silence = np.concatenate([tone, np.zeros_like(tone)])
+        self.assertAlmostEqual(measure(with_silence).integrated, measure(tone).integrated, delta=0.1)
+        self.assertIsNone(measure(np.zeros((48000 * 2, 2))).integrated)
+        
+        meter = measure(tone)
+        self.assertAlmostEqual(normalization_gain(meter, -30.0), -30.0 - meter.integrated, places=6)
+        # 提升到 0 LUFS 需要约 +20 dB，但峰值为 -20 dBFS，只能提升到 -1 dBFS
+        self.assertAlmostEqual(normalization_gain(meter, 0.0, peak_db=-1.0), 19.0, delta=0.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
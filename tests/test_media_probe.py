@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+媒体探测测试
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.detect_cache import DetectionCache
+from utils.ffmpeg_utils import FFmpegError
+from utils.media_probe import parse_ffmetadata, parse_ffmpeg_info, probe_many, probe_media
+
+FFMPEG_OUTPUT = """Input #0, mov,mp4,m4a,3gp,3g2,mj2, from 'clip.mp4':
+  Metadata:
+    major_brand     : isom
+  Duration: 00:01:02.50, start: 0.000000, bitrate: 1130 kb/s
+  Stream #0:0[0x1](und): Video: h264 (High) (avc1 / 0x31637661), yuv420p(tv, bt709, progressive), 1920x1080 [SAR 1:1 DAR 16:9], 1000 kb/s, 29.97 fps, 29.97 tbr, 30k tbn (default)
+  Stream #0:1[0x2](eng): Audio: aac (LC) (mp4a / 0x6134706D), 48000 Hz, 5.1, fltp, 128 kb/s (default)
+  Stream #0:2: Video: mjpeg (Baseline), yuvj420p(pc, bt470bg/unknown/unknown), 600x600, 90k tbr, 90k tbn (attached pic)
+At least one output file must be specified
+"""
+
+
+class TestMediaProbe(unittest.TestCase):
+    """媒体探测测试类"""
+    
+    def test_parse_ffmpeg_info(self):
+        """测试解析 ffmpeg -i 输出的流信息"""
+        info = parse_ffmpeg_info(FFMPEG_OUTPUT)
+        self.assertEqual(info.format_name, 'mov,mp4,m4a,3gp,3g2,mj2')
+        self.assertAlmostEqual(info.duration, 62.5)
+        self.assertEqual(info.bit_rate, 1130000)
+        self.assertEqual(len(info.streams), 3)
+        
+        video = info.video
+        self.assertEqual((video.codec_name, video.width, video.height), ('h264', 1920, 1080))
+        self.assertEqual((video.pix_fmt, video.frame_rate), ('yuv420p', 29.97))
+        audio = info.audio
+        self.assertEqual((audio.codec_name, audio.sample_rate, audio.channels), ('aac', 48000, 6))
+        self.assertEqual((audio.sample_fmt, audio.bits_per_sample), ('fltp', None))
+        # 封面图片不算视频流
+        self.assertTrue(info.streams[2].attached_pic)
+        self.assertEqual(len(info.streams_of('video')), 1)
+    
+    def test_parse_ffmetadata(self):
+        """测试解析 ffmetadata 的转义字符，忽略章节"""
+        text = ';FFMETADATA1\nTitle=a\\=b\\;c\nartist=x\\\ny\nkey=v\\\\\n\n[CHAPTER]\ntitle=chapter\n'
+        self.assertEqual(parse_ffmetadata(text), {'title': 'a=b;c', 'artist': 'x\ny', 'key': 'v\\'})
+    
+    def test_cached_probe(self):
+        """测试探测结果按文件身份缓存，文件变化后重新探测；批量探测保持顺序，失败的文件为None"""
+        info = parse_ffmpeg_info(FFMPEG_OUTPUT)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            paths = [os.path.join(temp_dir, name) for name in ('a.mp4', 'b.mp4', 'broken.mp4')]
+            for path in paths:
+                with open(path, 'wb') as f:
+                    f.write(b'media')
+            cache = DetectionCache(os.path.join(temp_dir, 'cache.db'))
+            
+            def fake_probe(path):
+                if path.endswith('broken.mp4'):
+                    raise FFmpegError('无法识别')
+                return info
+            
+            with patch('utils.media_probe.get_detection_cache', return_value=cache), \
+                    patch('utils.media_probe._run_probe', side_effect=fake_probe) as run_probe:
+                self.assertEqual(probe_media(paths[0]), info)
+                self.assertEqual(probe_media(paths[0]), info)
+                self.assertEqual(run_probe.call_count, 1)
+                
+                # 缓存写入数据库后其他实例也能读到
+                cache.flush()
+                with patch('utils.media_probe.get_detection_cache',
+                           return_value=DetectionCache(cache.db_path)):
+                    self.assertEqual(probe_media(paths[0]), info)
+                self.assertEqual(run_probe.call_count, 1)
+                
+                with open(paths[0], 'ab') as f:
+                    f.write(b' changed')
+                self.assertEqual(probe_many(paths), [info, info, None])
+                self.assertEqual(run_probe.call_count, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
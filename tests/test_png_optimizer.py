@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+PNG无损优化测试
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.png_optimizer import HAS_PILLOW, optimize_png
+
+if HAS_PILLOW:
+    from PIL import Image, PngImagePlugin
+
+
+@unittest.skipUnless(HAS_PILLOW, '需要Pillow')
+class TestPngOptimizer(unittest.TestCase):
+    """PNG无损优化测试类"""
+    
+    def setUp(self):
+        """测试初始化"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'image.png')
+        gradient = Image.linear_gradient('L').resize((200, 150))
+        self.image = Image.merge('RGB', (gradient, gradient.rotate(90), Image.radial_gradient('L').resize((200, 150))))
+    
+    def tearDown(self):
+        """清理临时目录"""
+        self.temp_dir.cleanup()
+    
+    def assertLossless(self, expected):
+        """优化后的像素与原图一致"""
+        with Image.open(self.path) as img:
+            img.load()
+            self.assertEqual(img.mode, expected.mode)
+            self.assertEqual(img.tobytes(), expected.tobytes())
+            self.assertEqual(img.info.get('transparency'), expected.info.get('transparency'))
+    
+    def test_lossless_and_smaller(self):
+        """测试各种模式优化后无损且更小"""
+        rgba = self.image.convert('RGBA')
+        rgba.putalpha(Image.radial_gradient('L').resize((200, 150)))
+        palette = self.image.quantize(32)
+        palette.info['transparency'] = 3
+        for img in (self.image, rgba, palette, self.image.convert('1')):
+            img.save(self.path, compress_level=1)
+            with Image.open(self.path) as expected:
+                expected.load()
+                result = optimize_png(self.path)
+                self.assertLess(result.optimized_size, result.original_size)
+                self.assertEqual(os.path.getsize(self.path), result.optimized_size)
+                self.assertLossless(expected)
+    
+    def test_strip_metadata(self):
+        """测试去除文本块，保留ICC配置"""
+        info = PngImagePlugin.PngInfo()
+        info.add_text('Comment', 'x' * 1000)
+        self.image.save(self.path, pnginfo=info, icc_profile=b'fake-icc-profile')
+        optimize_png(self.path)
+        with Image.open(self.path) as img:
+            self.assertNotIn('Comment', img.info)
+            self.assertEqual(img.info.get('icc_profile'), b'fake-icc-profile')
+        
+        self.image.save(self.path, pnginfo=info)
+        optimize_png(self.path, strip=False)
+        with Image.open(self.path) as img:
+            self.assertEqual(img.info.get('Comment'), 'x' * 1000)
+    
+    def test_time_budget_and_animation(self):
+        """测试时间预算用尽时保留原文件，动画PNG不处理"""
+        self.image.save(self.path)
+        original = os.path.getsize(self.path)
+        result = optimize_png(self.path, time_budget=0)
+        self.assertEqual(result.trial, 'original')
+        self.assertEqual(os.path.getsize(self.path), original)
+        
+        frames = [self.image, self.image.rotate(180)]
+        frames[0].save(self.path, save_all=True, append_images=frames[1:])
+        self.assertIsNone(optimize_png(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
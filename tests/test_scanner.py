@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+目录扫描器测试
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.scanner import scan_directory
+
+
+class TestScanner(unittest.TestCase):
+    """目录扫描器测试类"""
+    
+    def setUp(self):
+        """创建测试目录树"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        for rel_path in ['a.jpg', 'b.txt', 'sub/c.PNG', 'sub/deep/d.mp3', 'skip/e.jpg']:
+            path = os.path.join(self.root, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(b'x' * 10)
+    
+    def tearDown(self):
+        """清理临时目录"""
+        self.temp_dir.cleanup()
+    
+    def scan(self, **kwargs):
+        """返回扫描结果的相对路径集合"""
+        return {entry.rel_path for entry in scan_directory(self.root, max_workers=4, **kwargs)}
+    
+    def test_scan_all(self):
+        """测试扫描全部文件并携带stat结果"""
+        entries = list(scan_directory(self.root))
+        self.assertEqual(len(entries), 5)
+        self.assertTrue(all(entry.size == 10 for entry in entries))
+    
+    def test_extension_filter(self):
+        """测试扩展名过滤（大小写不敏感，含别名）"""
+        self.assertEqual(self.scan(extensions=['jpeg', 'png']), {'a.jpg', 'sub/c.PNG', 'skip/e.jpg'})
+    
+    def test_include_exclude(self):
+        """测试通配符过滤和目录剪枝"""
+        self.assertEqual(self.scan(include=['*.jpg'], exclude=['skip']), {'a.jpg'})
+        self.assertEqual(self.scan(exclude=['sub/deep']), {'a.jpg', 'b.txt', 'sub/c.PNG', 'skip/e.jpg'})
+    
+    def test_zero_inode_dir_entries(self):
+        """测试 DirEntry.stat() 不提供 inode 时（Windows）仍扫描全部子目录，并返回有效的文件身份"""
+        real_scandir = os.scandir
+        
+        class ZeroInodeEntry:
+            """st_ino、st_dev 为0的目录项"""
+            def __init__(self, entry):
+                self._entry = entry
+                self.name, self.path = entry.name, entry.path
+            
+            def is_dir(self, **kwargs):
+                return self._entry.is_dir(**kwargs)
+            
+            def is_file(self, **kwargs):
+                return self._entry.is_file(**kwargs)
+            
+            def stat(self, **kwargs):
+                st = self._entry.stat(**kwargs)
+                return os.stat_result((st.st_mode, 0, 0) + tuple(st)[3:])
+        
+        class ZeroInodeScandir:
+            def __init__(self, path):
+                self._it = real_scandir(path)
+            
+            def __enter__(self):
+                return (ZeroInodeEntry(entry) for entry in self._it)
+            
+            def __exit__(self, *args):
+                self._it.close()
+        
+        with patch('utils.scanner.os.scandir', ZeroInodeScandir):
+            entries = list(scan_directory(self.root, max_workers=4))
+        self.assertEqual(len(entries), 5)
+        self.assertTrue(all(entry.stat.st_ino != 0 for entry in entries))
+        self.assertEqual(len({(entry.stat.st_dev, entry.stat.st_ino) for entry in entries}), 5)
+    
+    @unittest.skipUnless(hasattr(os, 'symlink'), '需要符号链接支持')
+    def test_symlink_loop(self):
+        """测试跟随符号链接时不会陷入循环"""
+        os.symlink(self.root, os.path.join(self.root, 'sub', 'loop'))
+        self.assertEqual(len(self.scan(follow_symlinks=True)), 5)
+        self.assertEqual(len(self.scan()), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+共享内存帧传递测试
+"""
+
+import os
+import sys
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.shared_frames import HAS_PILLOW, SharedFrame, SharedFramePool
+
+if HAS_PILLOW:
+    from PIL import Image
+
+
+def frame_digest(handle):
+    """在工作进程中读取共享帧"""
+    with SharedFrame(handle) as img:
+        return img.mode, img.size, img.tobytes()
+
+
+def crash(handle):
+    """模拟工作进程崩溃"""
+    os._exit(1)
+
+
+def segment_exists(name):
+    """共享内存块是否仍然存在"""
+    try:
+        shared_memory.SharedMemory(name=name).close()
+        return True
+    except FileNotFoundError:
+        return False
+
+
+@unittest.skipUnless(HAS_PILLOW, '需要Pillow')
+class TestSharedFrames(unittest.TestCase):
+    """共享内存帧传递测试类"""
+    
+    def setUp(self):
+        """测试初始化"""
+        self.gradient = Image.radial_gradient('L').resize((123, 77))
+    
+    def test_round_trip_modes(self):
+        """测试各模式的像素、调色板和透明色原样传递"""
+        palette_img = self.gradient.convert('RGB').quantize(16)
+        palette_img.info['transparency'] = 3
+        images = [self.gradient.convert(mode) for mode in ('1', 'L', 'LA', 'RGB', 'RGBA', 'CMYK', 'I', 'F', 'I;16')]
+        images.append(palette_img)
+        
+        with SharedFramePool() as pool:
+            for image in images:
+                handle = pool.put(image)
+                with SharedFrame(handle) as img:
+                    self.assertEqual((img.mode, img.size), (image.mode, image.size))
+                    self.assertEqual(img.tobytes(), image.tobytes())
+                    if image.mode == 'P':
+                        self.assertEqual(img.getpalette(), image.getpalette())
+                        self.assertEqual(img.info['transparency'], 3)
+                pool.release(handle)
+            self.assertEqual(len(pool), 0)
+    
+    def test_reference_counting_across_processes(self):
+        """测试工作进程读取共享帧，最后一个使用方结束后回收内存"""
+        image = self.gradient.convert('RGB')
+        with SharedFramePool() as pool, ProcessPoolExecutor(max_workers=2) as executor:
+            handle = pool.put(image, refs=3)
+            futures = [executor.submit(frame_digest, handle) for _ in range(3)]
+            for future in futures:
+                pool.release_when_done(handle, future)
+            for future in futures:
+                self.assertEqual(future.result(), ('RGB', image.size, image.tobytes()))
+        self.assertEqual(len(pool), 0)
+        self.assertFalse(segment_exists(handle.name))
+    
+    def test_worker_crash_frees_memory(self):
+        """测试工作进程崩溃时共享内存仍被回收"""
+        with SharedFramePool() as pool:
+            handle = pool.put(self.gradient)
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                future = executor.submit(crash, handle)
+                pool.release_when_done(handle, future)
+                with self.assertRaises(Exception):
+                    future.result()
+            self.assertEqual(len(pool), 0)
+            self.assertFalse(segment_exists(handle.name))
+
+
+if __name__ == '__main__':
+    unittest.main()
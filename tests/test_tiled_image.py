@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+分块图片处理测试
+"""
+
+import os
+import sys
+import tempfile
+import tracemalloc
+import unittest
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.tiled_image import (
+    HAS_NUMPY, HAS_PILLOW, HAS_TIFFFILE, StreamingPngWriter, convert_tiled, iter_png_bands, read_header
+)
+from converters.image_converter import ImageConverter
+from utils.config import DEFAULT_CONFIG
+
+if HAS_PILLOW:
+    from PIL import Image, ImageDraw
+
+
+@unittest.skipUnless(HAS_PILLOW, '需要Pillow')
+class TestTiledImage(unittest.TestCase):
+    """分块图片处理测试类"""
+    
+    def setUp(self):
+        """测试初始化"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+    
+    def tearDown(self):
+        """清理临时目录"""
+        self.temp_dir.cleanup()
+    
+    def path(self, name):
+        """临时文件路径"""
+        return os.path.join(self.temp_dir.name, name)
+    
+    def make_image(self, mode='RGBA', size=(301, 257)):
+        """生成带渐变和图形的测试图片（行间差异较大，能覆盖各种滤波类型）"""
+        img = Image.linear_gradient('L').resize(size).convert(mode)
+        draw = ImageDraw.Draw(img)
+        draw.ellipse((20, 30, 200, 220), fill='red' if mode != 'L' else 90)
+        draw.line((0, 0, size[0], size[1]), fill='blue' if mode != 'L' else 200, width=7)
+        return img
+    
+    def assertSameImage(self, path, expected):
+        """输出文件与原图像素一致"""
+        with Image.open(path) as img:
+            self.assertEqual(img.size, expected.size)
+            self.assertEqual(img.mode, expected.mode)
+            self.assertEqual(img.tobytes(), expected.tobytes())
+    
+    def test_png_bands(self):
+        """测试PNG按条带读取"""
+        img = self.make_image('RGB')
+        img.save(self.path('a.png'))
+        header, bands, _, _ = iter_png_bands(self.path('a.png'), band_height=10)
+        self.assertEqual((header.width, header.height, header.mode), (301, 257, 'RGB'))
+        
+        rebuilt = Image.new('RGB', img.size)
+        count = 0
+        for y, band in bands:
+            rebuilt.paste(band, (0, y))
+            count += 1
+        self.assertEqual(count, 26)
+        self.assertEqual(rebuilt.tobytes(), img.tobytes())
+    
+    def test_png_round_trip(self):
+        """测试分块转换PNG的各种模式"""
+        for mode in ('RGBA', 'L', 'LA'):
+            img = self.make_image(mode)
+            img.save(self.path('in.png'))
+            convert_tiled(self.path('in.png'), self.path('out.png'), 'PNG', memory_limit_mb=0.05)
+            self.assertSameImage(self.path('out.png'), img)
+        
+        palette_img = self.make_image('RGB').quantize(16)
+        palette_img.save(self.path('in.png'), bits=4)
+        convert_tiled(self.path('in.png'), self.path('out.png'), 'PNG', memory_limit_mb=0.05)
+        self.assertSameImage(self.path('out.png'), palette_img)
+    
+    @unittest.skipUnless(HAS_NUMPY, '需要NumPy')
+    def test_tiled_tiff_output(self):
+        """测试输出分块BigTIFF，并能再次分块读取"""
+        img = self.make_image('RGBA')
+        img.save(self.path('in.png'))
+        convert_tiled(self.path('in.png'), self.path('out.tif'), 'TIFF', memory_limit_mb=0.05, tile_size=64)
+        if HAS_TIFFFILE:
+            convert_tiled(self.path('out.tif'), self.path('back.png'), 'PNG', memory_limit_mb=0.05)
+            self.assertSameImage(self.path('back.png'), img)
+            
+            # 调色板 TIFF 按 RGB 读出（TIFF 调色板为16位）
+            palette_img = self.make_image('RGB').quantize(16)
+            palette_img.save(self.path('palette.tif'))
+            convert_tiled(self.path('palette.tif'), self.path('back.png'), 'PNG', memory_limit_mb=0.05)
+            self.assertSameImage(self.path('back.png'), palette_img.convert('RGB'))
+    
+    @unittest.skipUnless(HAS_NUMPY, '需要NumPy')
+    def test_memory_limit(self):
+        """测试分块转换PNG的Python内存峰值不超过内存上限（包括滤波的临时数组）"""
+        img = self.make_image('RGB', size=(2000, 1500))
+        img.save(self.path('in.png'), compress_level=1)
+        tracemalloc.start()
+        try:
+            convert_tiled(self.path('in.png'), self.path('out.png'), 'PNG', memory_limit_mb=2)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, 2 * 1024 * 1024)
+        self.assertSameImage(self.path('out.png'), img)
+    
+    def test_header_bypasses_bomb_check(self):
+        """测试读取文件头不受解压炸弹限制"""
+        self.make_image('L').save(self.path('a.png'))
+        original = Image.MAX_IMAGE_PIXELS
+        Image.MAX_IMAGE_PIXELS = 100
+        try:
+            header = read_header(self.path('a.png'))
+        finally:
+            Image.MAX_IMAGE_PIXELS = original
+        self.assertEqual((header.format, header.width, header.height), ('PNG', 301, 257))
+    
+    def test_converter_tiled_option(self):
+        """测试图片转换器的分块选项"""
+        converter = ImageConverter(DEFAULT_CONFIG['converters']['image'])
+        img = self.make_image('RGB')
+        img.save(self.path('in.png'))
+        self.assertTrue(converter.convert(
+            self.path('in.png'), self.path('out.png'), 'png', 'png',
+            options={'tiled': True, 'memory_limit_mb': 0.05}
+        ))
+        self.assertSameImage(self.path('out.png'), img)
+        
+        # 不支持分块输出的格式回退到普通模式
+        self.assertTrue(converter.convert(
+            self.path('in.png'), self.path('out.jpg'), 'png', 'jpg', options={'tiled': True}
+        ))
+        
+        # 写入中途失败时不留下截断的 PNG
+        write_band = StreamingPngWriter.write_band
+        
+        def fail_after_first_band(writer, band):
+            if writer.rows_written:
+                raise OSError("磁盘已满")
+            write_band(writer, band)
+        
+        with patch.object(StreamingPngWriter, 'write_band', autospec=True, side_effect=fail_after_first_band):
+            self.assertFalse(converter.convert(
+                self.path('in.png'), self.path('partial.png'), 'png', 'png',
+                options={'tiled': True, 'memory_limit_mb': 0.05}
+            ))
+        self.assertFalse(os.path.exists(self.path('partial.png')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+视频转换器测试
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from converters.video_converter import VideoConverter
+from utils.config import DEFAULT_CONFIG
+from utils.encoder_profiles import threads_per_job, video_encoder_args
+from utils.ffmpeg_utils import FFmpegError, find_ffmpeg, parse_progress, run_ffmpeg
+from utils.media_probe import probe_media
+from utils.progress import ProgressEvent, format_progress
+from utils import video_segments
+from utils.video_transcode import build_video_args, can_copy_video, select_codecs
+
+
+def write_test_video(path, seconds=1, size='160x120'):
+    """生成带音频的测试视频（每秒一个关键帧）"""
+    run_ffmpeg([
+        '-f', 'lavfi', '-i', f'testsrc2=size={size}:rate=25:duration={seconds}',
+        '-f', 'lavfi', '-i', f'sine=frequency=440:duration={seconds}',
+        '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-g', '25', '-c:a', 'aac', '-shortest', path
+    ])
+    return path
+
+
+@unittest.skipUnless(find_ffmpeg(), '需要ffmpeg')
+class TestVideoConverter(unittest.TestCase):
+    """视频转换器测试类"""
+    
+    def setUp(self):
+        """测试初始化"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.converter = VideoConverter(DEFAULT_CONFIG['converters']['video'])
+        self.source = write_test_video(self.path('source.mp4'))
+    
+    def tearDown(self):
+        """清理临时目录"""
+        self.temp_dir.cleanup()
+    
+    def path(self, name):
+        """临时文件路径"""
+        return os.path.join(self.temp_dir.name, name)
+    
+    def test_codec_selection(self):
+        """测试按目标格式选择编码器，指定码率时去掉固定质量参数"""
+        self.assertEqual(select_codecs('avi'), ('mpeg4', 'libmp3lame'))
+        self.assertEqual(select_codecs('mkv', {'audio_codec': 'flac'}), ('libx264', 'flac'))
+        with self.assertRaises(FFmpegError):
+            select_codecs('gif')
+        
+        args = build_video_args('in.mp4', 'out.avi', 'avi', {'video_bitrate': '2M'})
+        self.assertNotIn('-q:v', args)
+        self.assertEqual(args[args.index('-b:v') + 1], '2M')
+        self.assertEqual(args[-3:], ['-f', 'avi', 'out.avi'])
+    
+    def test_encoder_profiles(self):
+        """测试视频编码配置、单项参数覆盖和线程数"""
+        self.assertEqual(video_encoder_args('libx264', {'profile': 'fast'}), ['-preset', 'veryfast', '-crf', '23'])
+        self.assertEqual(video_encoder_args('libx264', {'profile': 'archive', 'crf': 20, 'tune': 'film'}),
+                         ['-preset', 'slow', '-tune', 'film', '-crf', '20'])
+        # x265 不支持 film，不传给编码器
+        self.assertEqual(video_encoder_args('libx265', {'profile': 'balanced', 'tune': 'film'}),
+                         ['-preset', 'medium', '-crf', '28'])
+        self.assertIn('-tune', video_encoder_args('libx265', {'tune': 'grain'}))
+        vp9 = video_encoder_args('libvpx-vp9', {'video_bitrate': '1M', 'threads': 1})
+        self.assertNotIn('-crf', vp9)
+        self.assertEqual(vp9[-4:], ['-b:v', '1M', '-threads', '1'])
+        self.assertEqual(video_encoder_args('mpeg4', {'profile': 'fast'}), [])
+        self.assertEqual(threads_per_job(10 ** 6), 1)
+        
+        # 编码参数需要重新编码，编码配置本身不影响直接复制
+        info = probe_media(self.source)
+        self.assertFalse(can_copy_video(info, 'mkv', {'crf': 20}))
+        self.assertTrue(can_copy_video(info, 'mkv', {'profile': 'fast', 'threads': 2}))
+    
+    def test_direct_ffmpeg_conversion(self):
+        """测试 ffmpeg 直接转码，输出编码与目标封装格式匹配，不经过 MoviePy"""
+        with patch('converters.video_converter.VideoFileClip', create=True,
+                   side_effect=AssertionError('不应使用MoviePy')):
+            for target, codecs in (('avi', ('mpeg4', 'mp3')), ('mkv', ('h264', 'aac'))):
+                output = self.path(f'output.{target}')
+                self.assertTrue(self.converter.convert(self.source, output, 'mp4', target))
+                info = probe_media(output)
+                self.assertEqual((info.video.codec_name, info.audio.codec_name), codecs)
+                self.assertAlmostEqual(info.duration, 1.0, delta=0.1)
+    
+    def test_ffmpeg_progress(self):
+        """测试解析 ffmpeg -progress 输出，转码时报告的进度带编码 fps 并以100%结束"""
+        progress = parse_progress({'frame': '250', 'fps': '87.5', 'out_time_us': '10000000',
+                                   'speed': '3.5x', 'progress': 'continue'}, 20.0)
+        self.assertEqual((progress.out_time, progress.frame, progress.fps, progress.speed), (10.0, 250, 87.5, 3.5))
+        self.assertFalse(progress.finished)
+        progress = parse_progress({'out_time_us': 'N/A', 'fps': '0.00', 'speed': 'N/A', 'progress': 'end'})
+        self.assertEqual((progress.out_time, progress.fps, progress.speed), (None, None, None))
+        self.assertTrue(progress.finished)
+        self.assertEqual(format_progress(ProgressEvent('video', 12.3, 27.3, 's', 2.3, 6.3, 87.2)),
+                         'video 45.1% 0:12/0:27 87 fps 2.30x 剩余 0:06')
+        
+        events = []
+        output = self.path('progress.avi')
+        self.assertTrue(self.converter.convert(self.source, output, 'mp4', 'avi',
+                                               options={'progress_callback': events.append}))
+        self.assertTrue(events)
+        self.assertEqual({event.stage for event in events}, {'video'})
+        self.assertEqual(events[-1].fraction, 1.0)
+        # 不足0.5秒的编码 ffmpeg 不给出 fps，只检查速度
+        self.assertIsNotNone(events[-1].speed)
+    
+    def test_remux_without_reencoding(self):
+        """测试只改变封装时直接复制流，目标格式不能容纳或关闭 stream_copy 时重新编码"""
+        output = self.path('remuxed.mkv')
+        with patch('converters.video_converter.transcode_video') as transcode:
+            self.assertTrue(self.converter.convert(self.source, output, 'mp4', 'mkv'))
+            transcode.assert_not_called()
+        info = probe_media(output)
+        self.assertEqual((info.video.codec_name, info.audio.codec_name), ('h264', 'aac'))
+        
+        # avi 不直接容纳 H.264，指定码率时也需要重新编码
+        self.assertFalse(can_copy_video(info, 'avi'))
+        self.assertFalse(can_copy_video(info, 'mp4', {'video_bitrate': '1M'}))
+        with patch('converters.video_converter.transcode_video', return_value=None) as transcode:
+            self.assertTrue(self.converter.convert(self.source, output, 'mp4', 'mkv', options={'stream_copy': False}))
+            transcode.assert_called_once()
+        
+        # 探测超时时改为重新编码
+        with patch('converters.video_converter.probe_media', side_effect=subprocess.TimeoutExpired('ffprobe', 30)), \
+                patch('converters.video_converter.transcode_video', return_value=None) as transcode:
+            self.assertTrue(self.converter.convert(self.source, output, 'mp4', 'mkv'))
+            transcode.assert_called_once()
+    
+    def test_failed_transcode_removes_output(self):
+        """测试转码失败时删除不完整的输出文件"""
+        output = self.path('partial.mp4')
+        
+        def fail_midway(args, on_progress=None):
+            with open(output, 'wb') as f:
+                f.write(b'partial')
+            raise FFmpegError("ffmpeg 返回 1")
+        
+        with patch('utils.video_transcode.run_ffmpeg', side_effect=fail_midway):
+            self.assertFalse(self.converter.convert(self.source, output, 'mp4', 'mp4',
+                                                    options={'stream_copy': False}))
+        self.assertFalse(os.path.exists(output))
+    
+    def test_segmented_transcoding_with_resume(self):
+        """测试分段并行转码：中断后再次转换只编码未完成的段，拼接结果时间戳连续"""
+        source = write_test_video(self.path('long.mp4'), seconds=6)
+        output = self.path('segmented.mp4')
+        options = {'segmented': True, 'segment_seconds': 2, 'segment_workers': 1, 'stream_copy': False}
+        run_to = video_segments._run_to
+        
+        def fail_on_last(args, path, on_progress=None):
+            if path.endswith('encoded_00002.mp4'):
+                raise FFmpegError('模拟中断')
+            run_to(args, path, on_progress)
+        
+        with patch('utils.video_segments._run_to', side_effect=fail_on_last):
+            self.assertFalse(self.converter.convert(source, output, 'mp4', 'mp4', options=options))
+        self.assertTrue(os.path.exists(os.path.join(video_segments.work_dir_for(output), 'manifest.json')))
+        
+        with patch('utils.video_segments._run_to', side_effect=run_to) as resumed:
+            self.assertTrue(self.converter.convert(source, output, 'mp4', 'mp4', options=options))
+        # 音频和前两段已完成，只需编码最后一段
+        self.assertEqual([os.path.basename(call.args[1]) for call in resumed.call_args_list], ['encoded_00002.mp4'])
+        self.assertFalse(os.path.exists(video_segments.work_dir_for(output)))
+        info = probe_media(output)
+        self.assertEqual((info.video.codec_name, info.audio.codec_name), ('h264', 'aac'))
+        self.assertAlmostEqual(info.duration, 6.0, delta=0.1)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
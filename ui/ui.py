@@ -25,9 +25,22 @@ from PyQt5.QtWidgets import (
     QCheckBox, QTabWidget, QListWidget, QSpinBox, QDoubleSpinBox,
     QSlider, QRadioButton, QButtonGroup, QFrame, QScrollArea
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QIcon, QFont, QPixmap, QPainter, QColor
 
+# 添加项目根目录到Python路径，以便使用转换核心
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+try:
+    from utils.encoder_profiles import DEFAULT_PROFILE, PROFILES, VIDEO_PRESETS, VIDEO_TUNES, profile_quality
+    from utils.image_codecs import available_formats
+    HAS_CONVERTER = True
+except ImportError:
+    HAS_CONVERTER = False
+    DEFAULT_PROFILE, PROFILES = 'balanced', ('fast', 'balanced', 'smallest')
+    VIDEO_PRESETS = ('ultrafast', 'superfast', 'veryfast', 'faster', 'fast', 'medium', 'slow', 'slower', 'veryslow')
+    VIDEO_TUNES = ('film', 'animation', 'grain', 'stillimage', 'fastdecode', 'zerolatency')
+
 # 检查文件名，确保已重命名为ui.py或通过环境变量绕过检查
 if os.path.basename(__file__) != "ui.py" and not os.environ.get('ALWAYS_CONVERTER_UI'):
     print("请将此文件重命名为 ui.py 才能使用图形界面功能")
@@ -37,44 +50,7 @@ if os.path.basename(__file__) != "ui.py" and not os.environ.get('ALWAYS_CONVERTE
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class ConversionWorker(QThread):
-    """转换工作线程"""
-    progress_updated = pyqtSignal(int)
-    log_updated = pyqtSignal(str)
-    conversion_finished = pyqtSignal(bool, str)
-    
-    def __init__(self, input_file, output_file, target_format, options):
-        super().__init__()
-        self.input_file = input_file
-        self.output_file = output_file
-        self.target_format = target_format
-        self.options = options
-        
-    def run(self):
-        try:
-            # 模拟转换过程
-            self.log_updated.emit(f"开始转换: {self.input_file}")
-            self.log_updated.emit(f"目标格式: {self.target_format}")
-            
-            # 显示转换选项
-            if self.options:
-                self.log_updated.emit("转换选项:")
-                for key, value in self.options.items():
-                    self.log_updated.emit(f"  {key}: {value}")
-            
-            for i in range(101):
-                # 模拟转换进度
-                self.progress_updated.emit(i)
-                if i % 20 == 0:
-                    self.log_updated.emit(f"转换进度: {i}%")
-                self.msleep(50)  # 模拟处理时间
-                
-            self.log_updated.emit(f"转换完成: {self.output_file}")
-            self.conversion_finished.emit(True, "文件转换成功!")
-            
-        except Exception as e:
-            self.log_updated.emit(f"转换失败: {str(e)}")
-            self.conversion_finished.emit(False, f"转换失败: {str(e)}")
+from ui.worker import ConversionWorker
 
 class RoundedButton(QPushButton):
     """圆角按钮类"""
@@ -139,8 +115,13 @@ class IconButton(QPushButton):
 class AlwaysConverterUI(QMainWindow):
     """主界面类"""
     
-    def __init__(self):
+    def __init__(self, config=None):
+        """
+        Args:
+            config: 已加载的配置（命令行 --config 指定的文件），未指定时加载默认配置
+        """
         super().__init__()
+        self.config = config
         self.conversion_thread = None
         self.initUI()
         
@@ -344,6 +325,17 @@ class AlwaysConverterUI(QMainWindow):
         advanced_group = QGroupBox("高级设置")
         advanced_layout = QVBoxLayout(advanced_group)
         
+        # 编码配置（切换配置时，质量滑块同步为该配置的质量）
+        profile_layout = QHBoxLayout()
+        profile_label = QLabel("编码配置:")
+        self.profile_combo = QComboBox()
+        self.profile_combo.addItems(PROFILES)
+        self.profile_combo.setCurrentText(DEFAULT_PROFILE)
+        self.profile_combo.currentTextChanged.connect(self.on_profile_changed)
+        profile_layout.addWidget(profile_label)
+        profile_layout.addWidget(self.profile_combo)
+        advanced_layout.addLayout(profile_layout)
+        
         quality_layout = QHBoxLayout()
         quality_label = QLabel("图像质量:")
         self.quality_slider = QSlider(Qt.Horizontal)
@@ -357,6 +349,7 @@ class AlwaysConverterUI(QMainWindow):
         quality_layout.addWidget(self.quality_slider)
         quality_layout.addWidget(self.quality_value)
         advanced_layout.addLayout(quality_layout)
+        self.on_profile_changed(DEFAULT_PROFILE)
         
         # 线程数设置
         thread_layout = QHBoxLayout()
@@ -370,6 +363,36 @@ class AlwaysConverterUI(QMainWindow):
         
         layout.addWidget(advanced_group)
         
+        # 视频编码设置（"自动" 表示使用编码配置中的值）
+        video_group = QGroupBox("视频编码")
+        video_layout = QGridLayout(video_group)
+        
+        self.video_preset_combo = QComboBox()
+        self.video_preset_combo.addItems(["自动"] + list(VIDEO_PRESETS))
+        video_layout.addWidget(QLabel("编码预设:"), 0, 0)
+        video_layout.addWidget(self.video_preset_combo, 0, 1)
+        
+        self.video_crf_spin = QSpinBox()
+        # CRF 0 是无损编码，"自动" 用 -1 表示
+        self.video_crf_spin.setRange(-1, 51)
+        self.video_crf_spin.setValue(-1)
+        self.video_crf_spin.setSpecialValueText("自动")
+        video_layout.addWidget(QLabel("质量 (CRF，越小越清晰):"), 1, 0)
+        video_layout.addWidget(self.video_crf_spin, 1, 1)
+        
+        self.video_tune_combo = QComboBox()
+        self.video_tune_combo.addItems(["自动"] + list(VIDEO_TUNES))
+        video_layout.addWidget(QLabel("内容类型 (tune):"), 2, 0)
+        video_layout.addWidget(self.video_tune_combo, 2, 1)
+        
+        self.encoder_threads_spin = QSpinBox()
+        self.encoder_threads_spin.setRange(0, os.cpu_count() or 1)
+        self.encoder_threads_spin.setSpecialValueText("自动")
+        video_layout.addWidget(QLabel("编码线程数:"), 3, 0)
+        video_layout.addWidget(self.encoder_threads_spin, 3, 1)
+        
+        layout.addWidget(video_group)
+        
         # 日志设置
         log_group = QGroupBox("日志设置")
         log_layout = QVBoxLayout(log_group)
@@ -475,9 +498,14 @@ class AlwaysConverterUI(QMainWindow):
         
     def populate_format_combo(self):
         """填充格式选择下拉框"""
+        image_formats = ["jpg", "png", "gif", "bmp", "tiff", "webp", "avif"]
+        if HAS_CONVERTER:
+            # 去掉当前 Pillow 无法编码的格式（如未安装 AVIF 支持）
+            image_formats = available_formats(image_formats)
+        
         formats = [
             "pdf", "docx", "txt", "rtf", "odt",
-            "jpg", "png", "gif", "bmp", "tiff", "webp",
+            *image_formats,
             "mp3", "wav", "flac", "aac", "ogg",
             "mp4", "avi", "mkv", "mov",
             "zip", "rar", "7z"
@@ -523,11 +551,39 @@ class AlwaysConverterUI(QMainWindow):
             self.output_line.setText(file_path)
             self.statusBar().showMessage(f'已选择输出文件: {file_path}')
             
+    def on_profile_changed(self, profile):
+        """编码配置变化时更新质量滑块，并记下配置对应的值"""
+        quality = profile_quality(profile) if HAS_CONVERTER else None
+        if quality:
+            self.quality_slider.setValue(quality)
+        self.profile_quality_value = self.quality_slider.value()
+            
+    def get_converter_options(self):
+        """获取传给转换核心的选项"""
+        options = {"profile": self.profile_combo.currentText()}
+        # 质量滑块被调离配置的值时才覆盖配置中各格式自己的质量
+        if self.quality_slider.value() != self.profile_quality_value:
+            options["quality"] = self.quality_slider.value()
+        # 视频编码参数只在不是"自动"时传递
+        if self.video_preset_combo.currentIndex() > 0:
+            options["preset"] = self.video_preset_combo.currentText()
+        if self.video_crf_spin.value() >= 0:
+            options["crf"] = self.video_crf_spin.value()
+        if self.video_tune_combo.currentIndex() > 0:
+            options["tune"] = self.video_tune_combo.currentText()
+        if self.encoder_threads_spin.value() > 0:
+            options["threads"] = self.encoder_threads_spin.value()
+        return options
+        
     def get_conversion_options(self):
         """获取转换选项"""
         options = {
+            "编码配置": self.profile_combo.currentText(),
             "图像质量": self.quality_slider.value(),
             "线程数": self.thread_spin.value(),
+            "视频编码预设": self.video_preset_combo.currentText(),
+            "视频质量": self.video_crf_spin.text(),
+            "编码线程数": self.encoder_threads_spin.text(),
             "保持文件夹结构": self.preserve_folder_check.isChecked(),
             "日志级别": self.log_level_combo.currentText()
         }
@@ -563,9 +619,11 @@ class AlwaysConverterUI(QMainWindow):
         
         # 启动转换线程
         self.conversion_thread = ConversionWorker(
-            input_file, output_file, target_format, options
+            input_file, output_file, target_format, options, self.get_converter_options(),
+            config=self.config
         )
         self.conversion_thread.progress_updated.connect(self.update_progress)
+        self.conversion_thread.status_updated.connect(self.statusBar().showMessage)
         self.conversion_thread.log_updated.connect(self.update_log)
         self.conversion_thread.conversion_finished.connect(self.conversion_finished)
         self.conversion_thread.start()
@@ -642,8 +700,13 @@ class AlwaysConverterUI(QMainWindow):
             "设置功能已在设置标签页中提供。"
         )
 
-def main():
-    """主函数"""
+def main(config=None):
+    """
+    主函数
+    
+    Args:
+        config: 已加载的配置（由 main.py 按 --config 加载后传入）
+    """
     app = QApplication(sys.argv)
     
     # 设置应用程序信息
@@ -651,7 +714,7 @@ def main():
     app.setApplicationVersion("1.0.0")
     
     # 创建并显示主窗口
-    window = AlwaysConverterUI()
+    window = AlwaysConverterUI(config)
     window.show()
     
     # 运行应用程序
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+AlwaysConverter 图形界面的转换工作线程
+ui/ui.py 和 ui/enhanced.py 共用，在后台线程中调用转换核心并通过信号报告进度和日志
+"""
+
+import os
+import sys
+from PyQt5.QtCore import QThread, pyqtSignal
+
+# 添加项目根目录到Python路径，以便使用转换核心
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+try:
+    from core.converter import FileConverter
+    from utils.config import load_config
+    from utils.progress import format_progress
+    HAS_CONVERTER = True
+except ImportError:
+    HAS_CONVERTER = False
+
+
+class ConversionWorker(QThread):
+    """转换工作线程"""
+    progress_updated = pyqtSignal(int)
+    status_updated = pyqtSignal(str)
+    log_updated = pyqtSignal(str)
+    conversion_finished = pyqtSignal(bool, str)
+    
+    def __init__(self, input_file, output_file, target_format, options, converter_options=None, config=None):
+        """
+        Args:
+            input_file: 输入文件路径
+            output_file: 输出文件路径
+            target_format: 目标格式
+            options: 界面上的转换选项（模拟转换时显示）
+            converter_options: 传给转换核心的选项
+            config: 已加载的配置（命令行 --config 指定的文件），未指定时加载默认配置
+        """
+        super().__init__()
+        self.input_file = input_file
+        self.output_file = output_file
+        self.target_format = target_format
+        self.options = options
+        self.converter_options = converter_options or {}
+        self.config = config
+        
+    def run(self):
+        if HAS_CONVERTER:
+            self.run_conversion()
+        else:
+            self.run_simulation()
+    
+    def run_conversion(self):
+        """使用转换核心执行转换"""
+        try:
+            self.log_updated.emit(f"开始转换: {self.input_file}")
+            self.log_updated.emit(f"目标格式: {self.target_format}")
+            for key, value in self.converter_options.items():
+                self.log_updated.emit(f"  {key}: {value}")
+            
+            options = dict(self.converter_options)
+            options['progress_callback'] = self.on_progress
+            config = self.config if self.config is not None else load_config()
+            converter = FileConverter(config)
+            success = converter.convert(self.input_file, self.output_file, self.target_format, options=options)
+            
+            if success:
+                self.progress_updated.emit(100)
+                self.log_updated.emit(f"转换完成: {self.output_file}")
+                self.conversion_finished.emit(True, "文件转换成功!")
+            else:
+                self.log_updated.emit("转换失败，详细信息请查看日志")
+                self.conversion_finished.emit(False, "转换失败")
+                
+        except Exception as e:
+            self.log_updated.emit(f"转换失败: {str(e)}")
+            self.conversion_finished.emit(False, f"转换失败: {str(e)}")
+    
+    def on_progress(self, event):
+        """转换核心的进度回调（进度条显示比例，状态栏显示编码速度和剩余时间）"""
+        if event.fraction is not None:
+            self.progress_updated.emit(int(event.fraction * 100))
+        self.status_updated.emit(format_progress(event))
+        
+    def run_simulation(self):
+        """转换核心不可用时模拟转换过程"""
+        try:
+            # 模拟转换过程
+            self.log_updated.emit(f"开始转换: {self.input_file}")
+            self.log_updated.emit(f"目标格式: {self.target_format}")
+            
+            # 显示转换选项
+            if self.options:
+                self.log_updated.emit("转换选项:")
+                for key, value in self.options.items():
+                    self.log_updated.emit(f"  {key}: {value}")
+            
+            for i in range(101):
+                # 模拟转换进度
+                self.progress_updated.emit(i)
+                if i % 20 == 0:
+                    self.log_updated.emit(f"转换进度: {i}%")
+                self.msleep(50)  # 模拟处理时间
+                
+            self.log_updated.emit(f"转换完成: {self.output_file}")
+            self.conversion_finished.emit(True, "文件转换成功!")
+            
+        except Exception as e:
+            self.log_updated.emit(f"转换失败: {str(e)}")
+            self.conversion_finished.emit(False, f"转换失败: {str(e)}")
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+多帧图片模块
+逐帧读取动画 GIF/WebP 和多页 TIFF，并逐帧编码为动画 GIF/WebP 或多页 TIFF。
+
+任一时刻只保留当前帧（GIF 输出额外保留上一帧用于差异裁剪），长动画的内存占用不随帧数增长。
+Pillow 自带的 GIF save_all 会先缓存全部帧，WebP save_all 会先把 append_images 转成列表，
+因此这里直接使用各格式的逐帧写入接口（WebP 的逐帧编码器是 Pillow 的私有接口，
+版本不符或调用失败时改用 save_all）。
+"""
+
+from itertools import chain
+from typing import Any, Callable, Dict, Iterator, NamedTuple, Optional
+from utils.logger import get_logger
+from utils.progress import ProgressCallback, report_progress
+from utils.quantize import make_palette_image, palette_error, quantize_image
+
+logger = get_logger(__name__)
+
+try:
+    from PIL import GifImagePlugin, ImageChops, ImageSequence, TiffImagePlugin
+    HAS_PILLOW = True
+except ImportError:
+    HAS_PILLOW = False
+
+try:
+    from PIL import __version__ as PILLOW_VERSION, _webp
+    HAS_WEBP_ANIM = hasattr(_webp, 'WebPAnimEncoder')
+    # 逐帧编码按 Pillow 11 起的私有接口调用（WebPAnimEncoder(size, ...)、add(getim(), ...)）
+    HAS_WEBP_FRAME_ENCODER = HAS_WEBP_ANIM and int(PILLOW_VERSION.split('.')[0]) >= 11
+except ImportError:
+    HAS_WEBP_ANIM = HAS_WEBP_FRAME_ENCODER = False
+
+# 支持逐帧写出的格式
+ANIMATED_FORMATS = ('GIF', 'WEBP', 'TIFF')
+
+# 复用调色板时，帧的平均误差超过该值（每通道）即重新计算调色板
+PALETTE_ERROR_LIMIT = 8.0
+
+# 动画帧的默认时长（毫秒）
+DEFAULT_FRAME_DURATION = 100
+
+
+class Frame(NamedTuple):
+    """动画帧"""
+    index: int
+    image: Any
+    duration: int
+    disposal: int
+
+
+def frame_count(img) -> int:
+    """
+    获取图片帧数
+
+    Args:
+        img: Pillow 图片
+
+    Returns:
+        帧数（单帧图片为1）
+    """
+    return getattr(img, 'n_frames', 1)
+
+
+def is_animated(img) -> bool:
+    """
+    判断图片是否有多帧
+
+    Args:
+        img: Pillow 图片
+
+    Returns:
+        是否为多帧图片
+    """
+    return getattr(img, 'is_animated', False) or frame_count(img) > 1
+
+
+def iter_frames(img, transform: Optional[Callable] = None) -> Iterator[Frame]:
+    """
+    逐帧读取（每一帧都是合成后的完整画面）
+
+    Args:
+        img: 多帧 Pillow 图片
+        transform: 对每帧做的处理（例如缩放），参数和返回值都是 Pillow 图片
+
+    Returns:
+        帧迭代器，每帧都是独立的图片对象
+    """
+    default_duration = img.info.get('duration') or DEFAULT_FRAME_DURATION
+    for index, frame in enumerate(ImageSequence.Iterator(img)):
+        # 部分格式（例如 WebP）在加载帧时才写入时长
+        frame.load()
+        duration = frame.info.get('duration') or default_duration
+        disposal = getattr(frame, 'disposal_method', 0)
+        # seek 会改写同一个图片对象，这里得到独立的帧
+        image = frame.convert('RGBA') if frame.mode in ('P', 'PA', 'LA', 'RGBa') else frame.copy()
+        if transform is not None:
+            image = transform(image)
+        yield Frame(index, image, int(duration), disposal)
+
+
+def save_frames(img, output_path: str, save_format: str,
+                transform: Optional[Callable] = None,
+                params: Optional[Dict[str, Any]] = None,
+                progress_callback: Optional[ProgressCallback] = None) -> int:
+    """
+    逐帧转换多帧图片
+
+    Args:
+        img: 多帧 Pillow 图片
+        output_path: 输出路径
+        save_format: Pillow 格式名（GIF、WEBP、TIFF）
+        transform: 对每帧做的处理
+        params: 编码参数（例如 WebP 的 quality、lossless、method，TIFF 的 compression）
+        progress_callback: 进度回调，每写完一帧报告一次
+
+    Returns:
+        写出的帧数
+    """
+    writers = {
+        'GIF': _write_gif,
+        'WEBP': _write_webp,
+        'TIFF': _write_tiff,
+    }
+    if save_format not in writers:
+        raise ValueError(f"不支持逐帧写出的格式: {save_format}")
+
+    params = dict(params or {})
+    # 源图片没有循环设置（例如没有 NETSCAPE 扩展的 GIF）时输出也只播放一次
+    if 'loop' in img.info:
+        params.setdefault('loop', img.info['loop'])
+    total = frame_count(img)
+
+    def frames():
+        for frame in iter_frames(img, transform):
+            yield frame
+            report_progress(progress_callback, 'frames', frame.index + 1, total, 'frame')
+
+    return writers[save_format](frames(), output_path, params)
+
+
+def _write_gif(frames: Iterator[Frame], output_path: str, params: Dict[str, Any]) -> int:
+    """
+    逐帧写出动画 GIF，只写出与上一帧不同的区域
+
+    默认复用第一帧的调色板（写为全局调色板，后续帧不再需要局部调色板），
+    画面变化较大、原调色板误差过高时才重新计算；reuse_palette 为 False 时每帧单独量化。
+    """
+    colors = params.get('colors', 256)
+    method = params.get('quantize', 'auto')
+    dither = params.get('dither', 'none')
+    reuse_palette = params.get('reuse_palette', True)
+
+    count = 0
+    previous = None
+    previous_disposal = 2
+    shared_palette = None
+    global_palette = None
+
+    with open(output_path, 'wb') as fp:
+        for frame in frames:
+            image = frame.image
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'A' in image.mode else 'RGB')
+            opaque = image.mode == 'RGB' or image.getchannel('A').getextrema()[0] == 255
+
+            # 上一帧保留在画布上，且当前帧不透明时，只需写出变化区域
+            box = (0, 0) + image.size
+            if previous is not None and previous_disposal in (0, 1) and opaque:
+                bbox = ImageChops.difference(image.convert('RGB'), previous).getbbox()
+                if bbox is None:
+                    # 与上一帧完全相同，仍写出1个像素以保留时长
+                    bbox = (0, 0, 1, 1)
+                box = bbox
+
+            region = image.crop(box) if box != (0, 0) + image.size else image
+            if reuse_palette and (shared_palette is None or
+                                  palette_error(region, shared_palette) > PALETTE_ERROR_LIMIT):
+                # 从完整帧计算调色板（第一帧或画面变化较大时），预留一个索引给可能出现的透明色
+                shared_palette = make_palette_image(quantize_image(image, min(colors, 255), method))
+            paletted = quantize_image(region, colors, method, dither, palette=shared_palette)
+            transparency = paletted.info.get('transparency')
+            disposal = frame.disposal if frame.disposal in (0, 1, 2, 3) else 0
+            if not opaque and disposal in (0, 1):
+                # 合成后的完整帧带有透明区域，需要清除上一帧
+                disposal = 2
+
+            if count == 0:
+                info = {'duration': frame.duration}
+                if params.get('loop') is not None:
+                    info['loop'] = params['loop']
+                header, _ = GifImagePlugin.getheader(paletted, info=info)
+                for block in header:
+                    fp.write(block)
+                global_palette = paletted.getpalette()
+
+            # 调色板与全局调色板一致（允许全局调色板更长）时不写局部调色板
+            frame_palette = paletted.getpalette()
+            include_color_table = count > 0 and global_palette[:len(frame_palette)] != frame_palette
+            frame_params = {'duration': frame.duration, 'disposal': disposal, 'include_color_table': include_color_table}
+            if transparency is not None:
+                frame_params['transparency'] = transparency
+            for block in GifImagePlugin.getdata(paletted, offset=box[:2], **frame_params):
+                fp.write(block)
+
+            previous = image.convert('RGB')
+            previous_disposal = disposal
+            count += 1
+
+        fp.write(b';')
+    return count
+
+
+def _write_webp(frames: Iterator[Frame], output_path: str, params: Dict[str, Any]) -> int:
+    """逐帧写出动画 WebP（帧编码后立即释放，编码器只保留压缩数据）"""
+    if not HAS_WEBP_ANIM:
+        raise RuntimeError("当前Pillow不支持动画WebP编码")
+
+    lossless = bool(params.get('lossless', False))
+    quality = float(params.get('quality', 80))
+    alpha_quality = int(params.get('alpha_quality', 100))
+    method = int(params.get('method', 4))
+    minimize_size = bool(params.get('minimize_size', False))
+    kmin = params.get('kmin', 9 if lossless else 3)
+    kmax = params.get('kmax', 17 if lossless else 5)
+    # WebP 的循环次数0表示无限循环，没有循环设置时只播放一次
+    loop = 1 if params.get('loop') is None else int(params['loop'])
+    save_params = dict(loop=loop, lossless=lossless, quality=quality, alpha_quality=alpha_quality,
+                       method=method, minimize_size=minimize_size, kmin=kmin, kmax=kmax)
+
+    if not HAS_WEBP_FRAME_ENCODER:
+        return _save_webp_all(frames, output_path, **save_params)
+
+    def prepared(frame):
+        image = frame.image
+        if image.mode not in ('RGB', 'RGBA', 'RGBX'):
+            image = image.convert('RGBA' if image.has_transparency_data else 'RGB')
+        return image
+
+    frames = iter(frames)
+    first = next(frames, None)
+    if first is None:
+        raise ValueError("图片没有可写出的帧")
+    image = prepared(first)
+    try:
+        # 背景色为透明黑，循环次数、关键帧间隔与 Pillow 的默认值一致
+        encoder = _webp.WebPAnimEncoder(image.size, 0, loop, minimize_size, kmin, kmax, False, False)
+        _webp_add(encoder, image, 0, lossless, quality, alpha_quality, method)
+    except (TypeError, AttributeError) as e:
+        # 私有接口的参数随 Pillow 版本变化时改用公开接口
+        logger.warning(f"Pillow 的 WebP 逐帧编码接口不兼容，改用 save_all: {str(e)}")
+        return _save_webp_all(chain([first], frames), output_path, **save_params)
+    timestamp = first.duration
+    count = 1
+
+    for frame in frames:
+        _webp_add(encoder, prepared(frame), timestamp, lossless, quality, alpha_quality, method)
+        timestamp += frame.duration
+        count += 1
+
+    _webp_add(encoder, None, timestamp, lossless, quality, alpha_quality, 0)
+    # 参数依次为 ICC 配置、EXIF、XMP
+    data = encoder.assemble('', '', '')
+    if data is None:
+        raise OSError("WebP编码器没有返回数据")
+
+    with open(output_path, 'wb') as fp:
+        fp.write(data)
+    return count
+
+
+def _webp_add(encoder, image, timestamp: int, lossless: bool, quality: float,
+              alpha_quality: int, method: int):
+    """向 WebP 动画编码器添加一帧（image 为 None 时结束编码）"""
+    pointer = None if image is None else image.getim()
+    encoder.add(pointer, round(timestamp), lossless, quality, alpha_quality, method)
+
+
+def _save_webp_all(frames: Iterator[Frame], output_path: str, **save_params) -> int:
+    """用 Pillow 公开的 save_all 写出动画 WebP（需要先读入全部帧）"""
+    frames = list(frames)
+    if not frames:
+        raise ValueError("图片没有可写出的帧")
+    images = [frame.image for frame in frames]
+    images[0].save(output_path, format='WEBP', save_all=True, append_images=images[1:],
+                   duration=[frame.duration for frame in frames], **save_params)
+    return len(frames)
+
+
+def _write_tiff(frames: Iterator[Frame], output_path: str, params: Dict[str, Any]) -> int:
+    """逐帧写出多页 TIFF"""
+    save_params = {key: value for key, value in params.items() if key in ('compression', 'quality')}
+    count = 0
+    with TiffImagePlugin.AppendingTiffWriter(output_path, True) as tf:
+        for frame in frames:
+            frame.image.save(tf, format='TIFF', **save_params)
+            tf.newFrame()
+            count += 1
+    return count
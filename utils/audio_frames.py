@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+音频帧拼接模块
+按帧切分 MP3 / FLAC 数据，用于把分段编码的结果无缝拼接为一个文件：
+    MP3: 关闭比特池（bit reservoir）后每帧独立，可以按帧截取后直接拼接
+    FLAC: 各段的帧号都从0开始，拼接时重写帧号和校验值，并重新生成 STREAMINFO
+拼接后的文件按源文件的标签写入 FLAC 的 VORBIS_COMMENT、MP3 的 ID3v2 或 WAV 的 LIST/INFO。
+"""
+
+import os
+import struct
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# MPEG 音频 Layer III 的码率表（kbps），分别用于 MPEG-1 和 MPEG-2 / 2.5
+_MP3_BITRATES = {
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_SAMPLE_RATES = (44100, 48000, 32000)
+# 帧头中的版本号 -> (码率表, 采样率除数)
+_MP3_VERSIONS = {3: (1, 1), 2: (2, 2), 0: (2, 4)}
+
+# FLAC 帧同步码（固定块大小）和 STREAMINFO 块类型
+_FLAC_SYNC = b'\xff\xf8'
+_FLAC_STREAMINFO = 0
+_FLAC_VORBIS_COMMENT = 4
+_FLAC_CRC16_POLY = 0x18005
+
+# 写入 FLAC VORBIS_COMMENT 的编码器名称
+VORBIS_VENDOR = 'AlwaysConverter'
+
+# 标签名 -> ID3v2.4 文本帧（其他标签写为 TXXX，comment 写为 COMM）
+_ID3_FRAMES = {
+    'title': 'TIT2', 'artist': 'TPE1', 'album': 'TALB', 'album_artist': 'TPE2', 'composer': 'TCOM',
+    'genre': 'TCON', 'date': 'TDRC', 'track': 'TRCK', 'disc': 'TPOS', 'copyright': 'TCOP',
+    'publisher': 'TPUB', 'language': 'TLAN', 'encoded_by': 'TENC',
+}
+
+# 标签名 -> WAV LIST/INFO 子块（与 ffmpeg 的映射一致，其他标签 WAV 无法保存）
+_RIFF_INFO = {
+    'artist': 'IART', 'comment': 'ICMT', 'copyright': 'ICOP', 'date': 'ICRD', 'genre': 'IGNR',
+    'language': 'ILNG', 'title': 'INAM', 'album': 'IPRD', 'track': 'IPRT', 'encoded_by': 'ITCH',
+}
+
+
+class AudioFrameError(Exception):
+    """音频帧数据无法解析"""
+
+
+def mp3_samples_per_frame(sample_rate: int) -> int:
+    """
+    获取 Layer III 每帧的采样数
+
+    Args:
+        sample_rate: 采样率
+
+    Returns:
+        MPEG-1（32kHz 及以上）为 1152，MPEG-2 / 2.5 为 576
+    """
+    return 1152 if sample_rate >= 32000 else 576
+
+
+def mp3_frames(data: bytes) -> List[bytes]:
+    """
+    把 MP3 数据切分为帧（数据开头不能有 ID3 标签）
+
+    Args:
+        data: MP3 数据
+
+    Returns:
+        帧列表
+    """
+    frames = []
+    pos = 0
+    while pos + 4 <= len(data):
+        header = int.from_bytes(data[pos:pos + 4], 'big')
+        version = (header >> 19) & 3
+        if header >> 21 != 0x7ff or version not in _MP3_VERSIONS or (header >> 17) & 3 != 1:
+            raise AudioFrameError(f"偏移 {pos} 处不是 Layer III 帧头")
+        table, divisor = _MP3_VERSIONS[version]
+        bitrate_index, rate_index = (header >> 12) & 15, (header >> 10) & 3
+        if bitrate_index in (0, 15) or rate_index == 3:
+            raise AudioFrameError(f"偏移 {pos} 处的帧头无效（不支持自由码率）")
+        sample_rate = _MP3_SAMPLE_RATES[rate_index] // divisor
+        coefficient = 144 if table == 1 else 72
+        length = coefficient * _MP3_BITRATES[table][bitrate_index] * 1000 // sample_rate + ((header >> 9) & 1)
+        frames.append(data[pos:pos + length])
+        pos += length
+    return frames
+
+
+def _crc8(data: bytes) -> int:
+    """FLAC 帧头校验（多项式 0x07，初值 0）"""
+    crc = 0
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xff if crc & 0x80 else (crc << 1) & 0xff
+    return crc
+
+
+def _crc16(data: bytes) -> int:
+    """FLAC 帧校验（多项式 0x8005，初值 0）"""
+    crc = 0
+    for byte in data:
+        crc ^= byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x8005) & 0xffff if crc & 0x8000 else (crc << 1) & 0xffff
+    return crc
+
+
+def _poly_mulmod(a: int, b: int) -> int:
+    """GF(2) 多项式乘法后对 CRC-16 多项式取模"""
+    result = 0
+    while b:
+        if b & 1:
+            result ^= a
+        b >>= 1
+        a <<= 1
+        if a & 0x10000:
+            a ^= _FLAC_CRC16_POLY
+    return result
+
+
+def _crc16_shift(crc: int, length: int) -> int:
+    """CRC 寄存器值 crc 之后再处理 length 个零字节的结果（即 crc * x^(8*length) mod P）"""
+    result, power, exponent = crc, 2, 8 * length
+    while exponent:
+        if exponent & 1:
+            result = _poly_mulmod(result, power)
+        power = _poly_mulmod(power, power)
+        exponent >>= 1
+    return result
+
+
+def _decode_number(data: bytes, pos: int) -> Tuple[int, int]:
+    """解析帧头中 UTF-8 方式编码的帧号，返回 (帧号, 字节数)"""
+    first = data[pos]
+    if first < 0x80:
+        return first, 1
+    length = 0
+    while length < 7 and first & (0x80 >> length):
+        length += 1
+    if length < 2 or pos + length > len(data):
+        raise AudioFrameError("帧号编码无效")
+    value = first & (0xff >> (length + 1))
+    for byte in data[pos + 1:pos + length]:
+        if byte & 0xc0 != 0x80:
+            raise AudioFrameError("帧号编码无效")
+        value = (value << 6) | (byte & 0x3f)
+    return value, length
+
+
+def _encode_number(value: int) -> bytes:
+    """按 UTF-8 方式编码帧号"""
+    if value < 0x80:
+        return bytes((value,))
+    length = 2
+    while value >= 1 << (5 * length + 1):
+        length += 1
+    tail = [0x80 | ((value >> (6 * i)) & 0x3f) for i in range(length - 2, -1, -1)]
+    return bytes([((0xff00 >> length) & 0xff) | (value >> (6 * (length - 1)))] + tail)
+
+
+class _FlacHeader(NamedTuple):
+    """FLAC 帧头"""
+    number: int
+    number_offset: int
+    number_length: int
+    length: int
+
+
+def _parse_flac_header(data: bytes, pos: int):
+    """解析 pos 处的帧头，不是有效帧头时返回None"""
+    if data[pos:pos + 2] != _FLAC_SYNC or pos + 5 > len(data):
+        return None
+    try:
+        number, number_length = _decode_number(data, pos + 4)
+    except AudioFrameError:
+        return None
+    block_code, rate_code = data[pos + 2] >> 4, data[pos + 2] & 15
+    length = 4 + number_length
+    length += {6: 1, 7: 2}.get(block_code, 0)
+    length += {12: 1, 13: 2, 14: 2}.get(rate_code, 0)
+    if block_code == 0 or rate_code == 15 or pos + length + 1 > len(data):
+        return None
+    if _crc8(data[pos:pos + length]) != data[pos + length]:
+        return None
+    return _FlacHeader(number, pos + 4, number_length, length + 1)
+
+
+class FlacStream(NamedTuple):
+    """FLAC 文件的 STREAMINFO 和帧数据"""
+    streaminfo: bytes
+    frames: List[bytes]
+
+
+def read_flac(data: bytes) -> FlacStream:
+    """
+    读取 FLAC 文件（只支持固定块大小，帧号从0开始连续）
+
+    Args:
+        data: FLAC 文件数据
+
+    Returns:
+        STREAMINFO（34字节）和帧列表
+    """
+    if data[:4] != b'fLaC':
+        raise AudioFrameError("不是FLAC数据")
+    pos, streaminfo = 4, None
+    while True:
+        if pos + 4 > len(data):
+            raise AudioFrameError("FLAC元数据不完整")
+        block_type, size = data[pos] & 0x7f, int.from_bytes(data[pos + 1:pos + 4], 'big')
+        if block_type == _FLAC_STREAMINFO:
+            streaminfo = data[pos + 4:pos + 4 + size]
+        last = data[pos] & 0x80
+        pos += 4 + size
+        if last:
+            break
+    if streaminfo is None or len(streaminfo) != 34:
+        raise AudioFrameError("缺少STREAMINFO")
+
+    frames = []
+    while pos < len(data):
+        header = _parse_flac_header(data, pos)
+        if header is None or header.number != len(frames):
+            raise AudioFrameError(f"偏移 {pos} 处不是第 {len(frames)} 帧的帧头")
+        # 下一帧从帧号正确、帧头校验通过的同步码开始（帧数据中偶尔也会出现同步码）
+        end = pos + header.length
+        while True:
+            end = data.find(_FLAC_SYNC, end)
+            if end < 0:
+                end = len(data)
+                break
+            following = _parse_flac_header(data, end)
+            if following is not None and following.number == len(frames) + 1:
+                break
+            end += 1
+        frames.append(data[pos:end])
+        pos = end
+    return FlacStream(streaminfo, frames)
+
+
+def renumber_flac_frame(frame: bytes, number: int) -> bytes:
+    """
+    修改帧号并更新帧头和帧的校验值（不重新计算整帧的 CRC-16）
+
+    Args:
+        frame: 完整的帧数据
+        number: 新帧号
+
+    Returns:
+        新的帧数据
+    """
+    header = _parse_flac_header(frame, 0)
+    if header is None:
+        raise AudioFrameError("帧头无效")
+    if header.number == number:
+        return frame
+    prefix = frame[:header.number_offset]
+    suffix = frame[header.number_offset + header.number_length:header.length - 1]
+    new_header = prefix + _encode_number(number) + suffix
+    new_header += bytes((_crc8(new_header),))
+
+    # CRC 是线性的：只有帧头变化时，新校验值 = 原校验值 xor (两个帧头的 CRC 之差 * x^(8*其余长度))
+    rest = frame[header.length:-2]
+    old_crc = int.from_bytes(frame[-2:], 'big')
+    delta = _crc16(frame[:header.length]) ^ _crc16(new_header)
+    crc = old_crc ^ _crc16_shift(delta, len(rest))
+    return new_header + rest + crc.to_bytes(2, 'big')
+
+
+def flac_vorbis_comment(tags: Dict[str, str]) -> bytes:
+    """
+    构造 FLAC 的 VORBIS_COMMENT 元数据块内容（不含块头）
+
+    Args:
+        tags: 标签字典
+
+    Returns:
+        块内容
+    """
+    def string(value: str) -> bytes:
+        data = value.encode('utf-8')
+        return struct.pack('<I', len(data)) + data
+
+    comments = [string(f"{key.upper()}={value}") for key, value in tags.items()]
+    return string(VORBIS_VENDOR) + struct.pack('<I', len(comments)) + b''.join(comments)
+
+
+def id3v2_tag(tags: Dict[str, str]) -> bytes:
+    """
+    构造 ID3v2.4 标签（文本均为 UTF-8）
+
+    Args:
+        tags: 标签字典
+
+    Returns:
+        标签数据，没有标签时为空
+    """
+    def syncsafe(value: int) -> bytes:
+        return bytes(((value >> 21) & 0x7f, (value >> 14) & 0x7f, (value >> 7) & 0x7f, value & 0x7f))
+
+    frames = []
+    for key, value in tags.items():
+        text = value.encode('utf-8')
+        if key == 'comment':
+            frame_id, body = 'COMM', b'\x03eng\x00' + text
+        elif key in _ID3_FRAMES:
+            frame_id, body = _ID3_FRAMES[key], b'\x03' + text
+        else:
+            frame_id, body = 'TXXX', b'\x03' + key.encode('utf-8') + b'\x00' + text
+        frames.append(frame_id.encode('ascii') + syncsafe(len(body)) + b'\x00\x00' + body)
+    if not frames:
+        return b''
+    data = b''.join(frames)
+    return b'ID3\x04\x00\x00' + syncsafe(len(data)) + data
+
+
+def append_wav_info(path: str, tags: Dict[str, str]):
+    """
+    在 WAV 文件末尾追加 LIST/INFO 块并更新 RIFF 长度
+
+    Args:
+        path: WAV 文件路径
+        tags: 标签字典（只写入 WAV 能保存的标签）
+    """
+    info = b''
+    for key, value in tags.items():
+        if key in _RIFF_INFO:
+            data = value.encode('utf-8') + b'\x00'
+            info += _RIFF_INFO[key].encode('ascii') + struct.pack('<I', len(data)) + data + b'\x00' * (len(data) & 1)
+    if not info:
+        return
+    with open(path, 'r+b') as f:
+        f.seek(0, os.SEEK_END)
+        # 块长度为奇数时需要补齐
+        if f.tell() & 1:
+            f.write(b'\x00')
+        f.write(b'LIST' + struct.pack('<I', len(info) + 4) + b'INFO' + info)
+        size = f.tell()
+        f.seek(4)
+        f.write(struct.pack('<I', size - 8))
+
+
+def write_flac(path: str, streams: List[FlacStream], total_samples: int, md5: bytes = bytes(16),
+               tags: Optional[Dict[str, str]] = None):
+    """
+    把多段 FLAC 的帧依次写为一个文件（重写帧号，合并 STREAMINFO）
+
+    Args:
+        path: 输出文件路径
+        streams: 各段的 FLAC 数据（采样率、声道数、位深和块大小需相同）
+        total_samples: 总采样帧数
+        md5: 全部 PCM 数据的 MD5（未知时为16个零字节）
+        tags: 写入 VORBIS_COMMENT 的标签（为空时只写 STREAMINFO）
+    """
+    frame_sizes = [len(frame) for stream in streams for frame in stream.frames]
+    info = bytearray(streams[0].streaminfo)
+    info[4:10] = min(frame_sizes).to_bytes(3, 'big') + max(frame_sizes).to_bytes(3, 'big')
+    # 采样数的高4位与位深共用一个字节
+    info[13] = (info[13] & 0xf0) | ((total_samples >> 32) & 0x0f)
+    info[14:18] = (total_samples & 0xffffffff).to_bytes(4, 'big')
+    info[18:34] = md5
+
+    blocks = [(_FLAC_STREAMINFO, bytes(info))]
+    if tags:
+        blocks.append((_FLAC_VORBIS_COMMENT, flac_vorbis_comment(tags)))
+
+    with open(path, 'wb') as f:
+        f.write(b'fLaC')
+        for index, (block_type, data) in enumerate(blocks):
+            # 最后一个元数据块的类型字节最高位为1
+            last = 0x80 if index == len(blocks) - 1 else 0
+            f.write(bytes((last | block_type,)) + len(data).to_bytes(3, 'big') + data)
+        number = 0
+        for stream in streams:
+            for frame in stream.frames:
+                f.write(renumber_flac_frame(frame, number))
+                number += 1
+
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+分段并行音频编码模块
+长音频先解码为临时 WAV（同时统计每一小段的能量），在静音处（或按固定长度）切分，
+各段由多个 ffmpeg 进程同时编码，最后按帧无缝拼接：
+    wav: 直接拼接 PCM 数据
+    flac: 段长取块大小的整数倍，拼接时重写帧号（utils.audio_frames）
+    mp3: 段的边界对齐到帧，每段前后多编码几帧作为重叠（保证边界帧的编码上下文与整段编码一致），
+         关闭比特池后按帧截取拼接
+各段不写标签，源文件的标签在拼接时写入（见 utils.audio_frames）。
+临时 WAV 放在输出目录中，大小约为未压缩的音频。
+"""
+
+import hashlib
+import os
+import struct
+import subprocess
+import tempfile
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from utils.audio_frames import append_wav_info, id3v2_tag, mp3_frames, mp3_samples_per_frame, read_flac, write_flac
+from utils.audio_stream import PcmDecoder, PcmEncoder, PcmFormat, audio_codec_args
+from utils.ffmpeg_utils import FFmpegError
+from utils.logger import get_logger
+from utils.loudness import LoudnessMeter, normalized_options, wants_normalization
+from utils.media_probe import probe_tags
+from utils.native_audio import HAS_NUMPY, pcm_to_float
+from utils.progress import ProgressCallback, report_progress
+from utils.resample import DEFAULT_RESAMPLER
+
+logger = get_logger(__name__)
+
+if HAS_NUMPY:
+    import numpy as np
+
+# 可以无缝拼接的目标格式
+SEGMENTABLE_FORMATS = ('wav', 'flac', 'mp3')
+
+# 默认段长（秒）和在预定切分点前后查找静音的范围（秒）
+DEFAULT_SEGMENT_SECONDS = 300
+SILENCE_SEARCH_SECONDS = 10
+
+# MP3 每段前后重叠编码的帧数
+MP3_OVERLAP_FRAMES = 4
+
+# FLAC 编码的块大小（采样帧数），也是 wav 切分点的对齐单位
+FLAC_BLOCK_SIZE = 4608
+
+# 统计能量的单位（采样帧数，各格式对齐单位的公约数）
+_ENERGY_UNIT = 576
+
+# 临时 WAV 的读写块大小（采样帧数）
+_COPY_FRAMES = 65536
+
+# 各格式的编码参数（mp3 关闭比特池、Xing 头和 ID3 标签，使每帧独立且数据只包含音频帧）
+_FORMAT_ARGS = {
+    'wav': [],
+    'flac': ['-c:a', 'flac', '-frame_size', str(FLAC_BLOCK_SIZE)],
+    'mp3': ['-c:a', 'libmp3lame', '-reservoir', '0', '-write_xing', '0', '-id3v2_version', '0'],
+}
+
+
+def segment_unit(target_format: str, sample_rate: int) -> int:
+    """
+    获取切分点的对齐单位（采样帧数）
+
+    Args:
+        target_format: 目标格式
+        sample_rate: 输出采样率
+
+    Returns:
+        mp3 为每帧采样数，其他格式为 FLAC 块大小
+    """
+    if target_format == 'mp3':
+        return mp3_samples_per_frame(sample_rate)
+    return FLAC_BLOCK_SIZE
+
+
+def find_split_points(unit_count: int, segment_units: int, search_units: int = 0,
+                      energy: Optional[Sequence[float]] = None) -> List[int]:
+    """
+    选择切分点
+
+    Args:
+        unit_count: 总单位数
+        segment_units: 每段的单位数
+        search_units: 在预定切分点前后查找静音的单位数
+        energy: 每个单位的能量（为空时按固定长度切分）
+
+    Returns:
+        切分点（单位序号，递增，不含0和结尾）
+    """
+    points = []
+    previous = 0
+    nominal = segment_units
+    # 最后一段不短于半段
+    while nominal < unit_count - segment_units // 2:
+        point = nominal
+        if energy is not None and search_units > 0:
+            low = max(previous + 1, nominal - search_units)
+            high = min(unit_count - 1, nominal + search_units)
+            point = low + int(np.argmin(energy[low:high + 1]))
+        points.append(point)
+        previous = point
+        nominal = point + segment_units
+    return points
+
+
+def _decode_to_wav(input_path: str, wav_path: str, options: Dict,
+                   progress_callback: Optional[ProgressCallback]) -> Tuple[PcmFormat, int, Optional[list], bytes, Dict]:
+    """
+    解码到临时 WAV，同时统计每 _ENERGY_UNIT 帧的能量、PCM 数据的 MD5，需要时测量响度
+
+    Returns:
+        (PCM 格式, 采样帧数, 能量（没有numpy时为None）, MD5, 合并了归一化增益的转换选项)
+    """
+    md5 = hashlib.md5()
+    energy = [] if HAS_NUMPY else None
+    meter = None
+    pending = None
+    written = 0
+    start_time = time.monotonic()
+    with PcmDecoder(input_path, options.get('sample_rate'), options.get('channels'),
+                    options.get('resampler', DEFAULT_RESAMPLER), options.get('sample_width')) as decoder:
+        pcm_format = decoder.format
+        if wants_normalization(options):
+            meter = LoudnessMeter(pcm_format.sample_rate, pcm_format.channels)
+        with wave.open(wav_path, 'wb') as wav:
+            wav.setnchannels(pcm_format.channels)
+            wav.setsampwidth(pcm_format.sample_width)
+            wav.setframerate(pcm_format.sample_rate)
+            for chunk in decoder.chunks():
+                wav.writeframes(chunk)
+                md5.update(chunk)
+                written += len(chunk) // pcm_format.frame_size
+                if energy is not None:
+                    block = pcm_to_float(chunk, pcm_format.sample_width, pcm_format.channels)
+                    if meter is not None:
+                        meter.process(block)
+                    if pending is not None:
+                        block = np.concatenate([pending, block])
+                    usable = len(block) // _ENERGY_UNIT * _ENERGY_UNIT
+                    squares = np.square(block[:usable]).reshape(-1, _ENERGY_UNIT * pcm_format.channels)
+                    energy.append(squares.mean(axis=1))
+                    pending = block[usable:]
+                seconds = written / pcm_format.sample_rate
+                elapsed = time.monotonic() - start_time
+                speed = seconds / elapsed if elapsed > 0 else None
+                report_progress(progress_callback, 'decode', seconds, decoder.duration, 's', speed=speed)
+        decoder.finish()
+    if energy is not None:
+        energy = np.concatenate(energy) if energy else np.zeros(0)
+    if meter is not None:
+        options = normalized_options(options, meter)
+    return pcm_format, written, energy, md5.digest(), options
+
+
+def _encode_segment(wav_path: str, pcm_format: PcmFormat, start: int, end: int,
+                    segment_path: str, target_format: str, codec_args: List[str]):
+    """把临时 WAV 中 [start, end) 范围的采样编码为一段"""
+    with wave.open(wav_path, 'rb') as wav:
+        wav.setpos(start)
+        with PcmEncoder(segment_path, target_format, pcm_format, codec_args) as encoder:
+            remaining = end - start
+            while remaining > 0:
+                chunk = wav.readframes(min(_COPY_FRAMES, remaining))
+                if not chunk:
+                    break
+                encoder.write(chunk)
+                remaining -= len(chunk) // pcm_format.frame_size
+            encoder.finish()
+
+
+def _join_segments(output_path: str, target_format: str, segments: List[Tuple[str, int, int]],
+                   pcm_format: PcmFormat, total_frames: int, md5: bytes, tags: Dict[str, str]):
+    """
+    拼接各段
+
+    Args:
+        segments: [(段文件路径, 开头要去掉的帧数, 保留的帧数（None为全部）)]，帧数只用于 mp3
+        tags: 写入输出文件的标签
+    """
+    if target_format == 'mp3':
+        with open(output_path, 'wb') as out:
+            out.write(id3v2_tag(tags))
+            for path, skip, keep in segments:
+                with open(path, 'rb') as f:
+                    frames = mp3_frames(f.read())
+                out.write(b''.join(frames[skip:None if keep is None else skip + keep]))
+    elif target_format == 'flac':
+        streams = []
+        for path, _, _ in segments:
+            with open(path, 'rb') as f:
+                streams.append(read_flac(f.read()))
+        write_flac(output_path, streams, total_frames, md5, tags)
+    else:
+        with wave.open(output_path, 'wb') as out:
+            out.setnchannels(pcm_format.channels)
+            out.setsampwidth(pcm_format.sample_width)
+            out.setframerate(pcm_format.sample_rate)
+            for path, _, _ in segments:
+                for chunk in _read_wav_data(path, _COPY_FRAMES * pcm_format.frame_size):
+                    out.writeframes(chunk)
+        append_wav_info(output_path, tags)
+
+
+def _read_wav_data(path: str, block_size: int) -> Iterator[bytes]:
+    """
+    逐块读取 WAV 文件 data 块中的 PCM 数据（ffmpeg 写出的高位深 WAV 是 WAVE_FORMAT_EXTENSIBLE 格式，
+    wave 模块不一定能读取）
+
+    Args:
+        path: WAV 文件路径
+        block_size: 每块的字节数
+
+    Returns:
+        PCM 数据块迭代器
+    """
+    with open(path, 'rb') as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+            raise FFmpegError(f"无法读取分段 {path}: 不是WAV文件")
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise FFmpegError(f"无法读取分段 {path}: 缺少data块")
+            chunk_id, size = struct.unpack('<4sI', header)
+            if chunk_id == b'data':
+                break
+            f.seek(size + (size & 1), os.SEEK_CUR)
+        while size > 0:
+            chunk = f.read(min(block_size, size))
+            if not chunk:
+                break
+            size -= len(chunk)
+            yield chunk
+
+
+def _source_tags(input_path: str) -> Dict[str, str]:
+    """读取源文件的标签，失败时只记录警告（输出不带标签）"""
+    try:
+        return probe_tags(input_path)
+    except (FFmpegError, OSError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"读取标签失败，输出不含标签: {input_path}: {str(e)}")
+        return {}
+
+
+def segment_audio(input_path: str, output_path: str, target_format: str,
+                  options: Optional[Dict] = None,
+                  progress_callback: Optional[ProgressCallback] = None) -> float:
+    """
+    分段并行编码音频
+
+    Args:
+        input_path: 输入文件路径
+        output_path: 输出文件路径
+        target_format: 目标格式（SEGMENTABLE_FORMATS 之一）
+        options: 转换选项
+            segment_seconds: 每段时长（秒，默认300）
+            split: 切分方式，silence（默认，在预定切分点前后10秒（不超过段长的1/4）内能量最低处切分，
+                需要numpy）或 fixed
+            segment_workers: 同时编码的段数（默认为CPU核心数）
+            bitrate / gain_db / sample_rate / channels / resampler / normalize: 同流式转码（响度在解码时测量）
+        progress_callback: 进度回调（解码阶段为 'decode'，之后每编码完一段报告一次 'audio'，单位为秒）
+
+    Returns:
+        处理的音频时长（秒）
+    """
+    if target_format not in SEGMENTABLE_FORMATS:
+        raise FFmpegError(f"不支持分段编码的格式: {target_format}")
+    options = options or {}
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    try:
+        with tempfile.TemporaryDirectory(prefix='.segments_', dir=output_dir) as temp_dir:
+            wav_path = os.path.join(temp_dir, 'decoded.wav')
+            pcm_format, total_frames, energy, md5, options = _decode_to_wav(input_path, wav_path, options,
+                                                                            progress_callback)
+            unit = segment_unit(target_format, pcm_format.sample_rate)
+            if energy is not None:
+                # 合并为每个对齐单位的能量
+                ratio = unit // _ENERGY_UNIT
+                energy = energy[:len(energy) // ratio * ratio].reshape(-1, ratio).mean(axis=1)
+            units = -(-total_frames // unit)
+            segment_units = max(1, round(float(options.get('segment_seconds', DEFAULT_SEGMENT_SECONDS))
+                                         * pcm_format.sample_rate / unit))
+            search_units = min(round(SILENCE_SEARCH_SECONDS * pcm_format.sample_rate / unit), segment_units // 4)
+            use_energy = energy if options.get('split', 'silence') == 'silence' else None
+            bounds = [0] + [p * unit for p in find_split_points(units, segment_units, search_units, use_energy)]
+            bounds.append(total_frames)
+
+            overlap = MP3_OVERLAP_FRAMES * unit if target_format == 'mp3' else 0
+            codec_args = _FORMAT_ARGS[target_format] + audio_codec_args(options)
+            jobs, segments = [], []
+            for i, (start, end) in enumerate(zip(bounds, bounds[1:])):
+                last = i == len(bounds) - 2
+                pre = min(start, overlap)
+                post = 0 if last else overlap
+                path = os.path.join(temp_dir, f'{i:05d}.{target_format}')
+                jobs.append((start - pre, min(end + post, total_frames), path))
+                segments.append((path, pre // unit, None if last else (end - start) // unit))
+            logger.info(f"分为 {len(jobs)} 段并行编码: {input_path}")
+
+            workers = int(options.get('segment_workers') or os.cpu_count() or 1)
+            done_seconds = 0.0
+            start_time = time.monotonic()
+            total_seconds = total_frames / pcm_format.sample_rate
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    (executor.submit(_encode_segment, wav_path, pcm_format, start, end, path, target_format,
+                                     codec_args), end - start)
+                    for start, end, path in jobs
+                ]
+                for future, frames in futures:
+                    future.result()
+                    done_seconds += frames / pcm_format.sample_rate
+                    elapsed = time.monotonic() - start_time
+                    speed = done_seconds / elapsed if elapsed > 0 else None
+                    eta = (total_seconds - done_seconds) / speed if speed else None
+                    report_progress(progress_callback, 'audio', min(done_seconds, total_seconds), total_seconds,
+                                    's', speed=speed, eta=eta)
+
+            # 增益由编码进程施加，此时 PCM 的 MD5 与输出不符
+            _join_segments(output_path, target_format, segments, pcm_format, total_frames,
+                           bytes(16) if options.get('gain_db') else md5, _source_tags(input_path))
+    except Exception:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+
+    return total_frames / pcm_format.sample_rate
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+流式音频转码模块
+ffmpeg 把输入解码为 PCM 写到管道，按固定大小的块读入后再写给编码用的 ffmpeg，
+内存占用只与块大小有关，与音频时长无关。每处理一块报告一次进度。
+改变采样率时默认在两个进程之间按块做多相重采样（utils.resample），也可以交给 ffmpeg。
+响度归一化时解码输出边测量边暂存到临时文件，测得响度后再从临时文件编码，不需要再解码一遍。
+"""
+
+import os
+import struct
+import subprocess
+import tempfile
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+from utils.ffmpeg_utils import FFmpegError, FFmpegProcess, run_ffmpeg
+from utils.logger import get_logger
+from utils.loudness import LoudnessMeter, normalized_options, wants_normalization
+from utils.media_probe import MediaInfo, StreamInfo, probe_media
+from utils.native_audio import HAS_NUMPY, float_to_pcm, pcm_to_float
+from utils.progress import ProgressCallback, ffmpeg_progress_reporter, report_progress
+from utils.resample import DEFAULT_RESAMPLER, StreamingResampler
+
+logger = get_logger(__name__)
+
+# 每块的采样帧数（48kHz 下约1.4秒）
+DEFAULT_CHUNK_FRAMES = 65536
+
+# 目标格式 -> ffmpeg 封装格式
+AUDIO_MUXERS = {
+    'mp3': 'mp3',
+    'wav': 'wav',
+    'flac': 'flac',
+    'aac': 'adts',
+    'ogg': 'ogg',
+    'opus': 'opus',
+    'm4a': 'ipod',
+    'wma': 'asf',
+}
+
+# 位深（字节数） -> ffmpeg 的原始 PCM 格式名
+PCM_FORMATS = {1: 'u8', 2: 's16le', 3: 's24le', 4: 's32le'}
+
+# 目标格式 -> 可以直接复制（不重新编码）的音频编码
+COPYABLE_AUDIO_CODECS = {
+    'mp3': ('mp3',),
+    'wav': ('pcm_s16le', 'pcm_s24le', 'pcm_s32le', 'pcm_u8', 'pcm_f32le'),
+    'flac': ('flac',),
+    'aac': ('aac',),
+    'ogg': ('vorbis', 'opus', 'flac'),
+    'opus': ('opus',),
+    'm4a': ('aac', 'alac'),
+    'wma': ('wmav1', 'wmav2'),
+}
+
+
+class PcmFormat(NamedTuple):
+    """PCM 数据格式（有符号小端整数）"""
+    sample_rate: int
+    channels: int
+    sample_width: int = 2
+
+    @property
+    def frame_size(self) -> int:
+        """每个采样帧的字节数"""
+        return self.channels * self.sample_width
+
+    @property
+    def byte_rate(self) -> int:
+        """每秒的字节数"""
+        return self.sample_rate * self.frame_size
+
+    @property
+    def ffmpeg_format(self) -> str:
+        """ffmpeg 的原始 PCM 格式名"""
+        return PCM_FORMATS[self.sample_width]
+
+
+def read_wav_header(stream) -> PcmFormat:
+    """
+    读取 WAV 头直到 data 块（ffmpeg 写到管道的 WAV 头中长度字段无效，不使用）
+
+    Args:
+        stream: 二进制输入流
+
+    Returns:
+        PCM 格式
+    """
+    riff = stream.read(12)
+    if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+        raise FFmpegError("解码输出不是WAV数据")
+
+    pcm_format = None
+    while True:
+        header = stream.read(8)
+        if len(header) < 8:
+            raise FFmpegError("WAV头不完整")
+        chunk_id, size = struct.unpack('<4sI', header)
+        if chunk_id == b'data':
+            break
+        data = stream.read(size + (size & 1))
+        if chunk_id == b'fmt ':
+            _, channels, sample_rate, _, _, bits = struct.unpack('<HHIIHH', data[:16])
+            pcm_format = PcmFormat(sample_rate, channels, bits // 8)
+
+    if pcm_format is None:
+        raise FFmpegError("WAV头缺少fmt块")
+    return pcm_format
+
+
+def pcm_sample_width(stream: Optional[StreamInfo]) -> int:
+    """
+    根据源音频流选择解码输出的 PCM 位深（不截断高位深和浮点的无损源，有损编码按16位）
+
+    Args:
+        stream: 源音频流信息（为空时按16位）
+
+    Returns:
+        位深（字节数，1~4）
+    """
+    if stream is None:
+        return 2
+    if stream.bits_per_sample:
+        return min(4, max(1, -(-stream.bits_per_sample // 8)))
+    if stream.sample_fmt in ('s32', 's32p') or stream.codec_name.startswith('pcm_f'):
+        return 4
+    return 2
+
+
+class PcmDecoder:
+    """
+    用 ffmpeg 把音频（或视频中的音轨）解码为 PCM 流
+
+    示例:
+        with PcmDecoder('input.mp3') as decoder:
+            for chunk in decoder.chunks():
+                ...
+            decoder.finish()
+    """
+
+    def __init__(self, input_path: str, sample_rate: Optional[int] = None, channels: Optional[int] = None,
+                 resampler: str = 'ffmpeg', sample_width: Optional[int] = None):
+        """
+        Args:
+            input_path: 输入文件路径
+            sample_rate: 输出采样率（为空时保持原采样率）
+            channels: 输出声道数（为空时保持原声道数）
+            resampler: 重采样实现，ffmpeg（swresample）或 polyphase（utils.resample，需要numpy）
+            sample_width: 输出位深（字节数，为空时按探测到的源位深选择，见 pcm_sample_width）
+        """
+        if not sample_width:
+            try:
+                sample_width = pcm_sample_width(probe_media(input_path).audio)
+            except (FFmpegError, OSError, subprocess.TimeoutExpired):
+                # 探测失败时解码进程会报告具体原因
+                sample_width = 2
+        polyphase = bool(sample_rate) and resampler == 'polyphase' and HAS_NUMPY
+        args = ['-i', input_path, '-vn', '-map_metadata', '-1', '-c:a', 'pcm_' + PCM_FORMATS[int(sample_width)]]
+        if sample_rate and not polyphase:
+            args += ['-ar', str(sample_rate)]
+        if channels:
+            args += ['-ac', str(channels)]
+        self._ffmpeg = FFmpegProcess(args + ['-f', 'wav', 'pipe:1'], stdout=subprocess.PIPE)
+        try:
+            self.source_format = read_wav_header(self._ffmpeg.process.stdout)
+        except FFmpegError:
+            self._ffmpeg.kill()
+            self._ffmpeg.wait_success()
+            raise
+
+        self._resampler = None
+        self.format = self.source_format
+        if polyphase and sample_rate != self.source_format.sample_rate:
+            self._resampler = StreamingResampler(self.source_format.sample_rate, sample_rate,
+                                                 self.source_format.channels)
+            self.format = self.source_format._replace(sample_rate=int(sample_rate))
+
+    @property
+    def duration(self) -> Optional[float]:
+        """输入时长（秒），未知时为None"""
+        return self._ffmpeg.wait_duration(0)
+
+    def chunks(self, chunk_frames: int = DEFAULT_CHUNK_FRAMES) -> Iterator[bytes]:
+        """
+        按固定大小读取 PCM 数据（重采样时每块的大小随采样率变化）
+
+        Args:
+            chunk_frames: 每块的采样帧数
+
+        Returns:
+            PCM 数据块迭代器（最后一块可能较短）
+        """
+        size = max(1, chunk_frames) * self.source_format.frame_size
+        stream = self._ffmpeg.process.stdout
+        width, channels = self.source_format.sample_width, self.source_format.channels
+        while True:
+            chunk = stream.read(size)
+            if not chunk:
+                break
+            if self._resampler is None:
+                yield chunk
+            else:
+                yield float_to_pcm(self._resampler.process(pcm_to_float(chunk, width, channels)), width)
+        if self._resampler is not None:
+            resampler, self._resampler = self._resampler, None
+            yield float_to_pcm(resampler.flush(), width)
+
+    def finish(self):
+        """读完剩余数据并等待解码结束，失败时抛出 FFmpegError（提前放弃时直接退出 with 块即可）"""
+        for _ in self.chunks():
+            pass
+        self._ffmpeg.wait_success()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._ffmpeg.__exit__(exc_type, exc_val, exc_tb)
+
+
+class PcmEncoder:
+    """
+    用 ffmpeg 把 PCM 流编码为目标格式
+
+    示例:
+        with PcmEncoder('output.mp3', 'mp3', pcm_format) as encoder:
+            encoder.write(chunk)
+            encoder.finish()
+    """
+
+    def __init__(self, output_path: str, target_format: str, pcm_format: PcmFormat,
+                 codec_args: Optional[List[str]] = None, metadata_source: Optional[str] = None):
+        """
+        Args:
+            output_path: 输出文件路径
+            target_format: 目标格式（AUDIO_MUXERS 中的扩展名）
+            pcm_format: 输入 PCM 格式（WAV 输出保持同样的位深）
+            codec_args: 额外的编码参数（例如 ['-b:a', '192k']）
+            metadata_source: 复制标签的来源文件（为空时不写标签）
+        """
+        if target_format not in AUDIO_MUXERS:
+            raise FFmpegError(f"不支持的音频输出格式: {target_format}")
+        codec_args = list(codec_args or [])
+        if target_format == 'wav' and '-c:a' not in codec_args:
+            # wav 封装默认编码为 pcm_s16le
+            codec_args += ['-c:a', 'pcm_' + pcm_format.ffmpeg_format]
+        args = [
+            '-f', pcm_format.ffmpeg_format, '-ar', str(pcm_format.sample_rate), '-ac', str(pcm_format.channels),
+            '-i', 'pipe:0'
+        ]
+        if metadata_source:
+            args += ['-i', metadata_source, '-map', '0:a', '-map_metadata', '1']
+        args += codec_args + ['-f', AUDIO_MUXERS[target_format], output_path]
+        self._ffmpeg = FFmpegProcess(args, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL)
+
+    def write(self, chunk: bytes):
+        """
+        写入一块 PCM 数据
+
+        Args:
+            chunk: PCM 数据
+        """
+        try:
+            self._ffmpeg.process.stdin.write(chunk)
+        except BrokenPipeError:
+            # 编码进程已退出，从返回码和输出中取得原因
+            self._ffmpeg.process.wait()
+            self._ffmpeg.wait_success()
+            raise FFmpegError("ffmpeg 编码进程意外退出")
+
+    def finish(self):
+        """结束输入并等待编码完成，失败时抛出 FFmpegError"""
+        self._ffmpeg.process.stdin.close()
+        self._ffmpeg.wait_success()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._ffmpeg.__exit__(exc_type, exc_val, exc_tb)
+
+
+def can_copy_audio(info: MediaInfo, target_format: str, options: Optional[Dict] = None) -> bool:
+    """
+    判断能否直接把音频流复制到目标格式（只改变封装或标签）
+
+    Args:
+        info: 输入的媒体信息
+        target_format: 目标格式
+        options: 转换选项（指定了码率、增益、位深、响度归一化或不同的采样率、声道数时需要重新编码）
+
+    Returns:
+        是否可以复制
+    """
+    options = options or {}
+    stream = info.audio
+    if stream is None or stream.codec_name not in COPYABLE_AUDIO_CODECS.get(target_format, ()):
+        return False
+    if any(options.get(key) for key in ('bitrate', 'gain_db', 'sample_width', 'normalize')):
+        return False
+    for key, value in (('sample_rate', stream.sample_rate), ('channels', stream.channels)):
+        if options.get(key) and int(options[key]) != value:
+            return False
+    return True
+
+
+def remux_audio(input_path: str, output_path: str, target_format: str,
+                progress_callback: Optional[ProgressCallback] = None):
+    """
+    复制第一个音频流到新的封装（不解码，保留标签）
+
+    Args:
+        input_path: 输入文件路径
+        output_path: 输出文件路径
+        target_format: 目标格式
+        progress_callback: 进度回调（报告 'remux'，单位为秒）
+
+    Raises:
+        FFmpegError: ffmpeg 执行失败
+    """
+    try:
+        run_ffmpeg([
+            '-i', input_path, '-map', '0:a:0', '-c:a', 'copy', '-map_metadata', '0',
+            '-f', AUDIO_MUXERS[target_format], output_path
+        ], ffmpeg_progress_reporter(progress_callback, 'remux'))
+    except Exception:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+
+
+def audio_codec_args(options: Optional[Dict] = None) -> List[str]:
+    """
+    根据转换选项生成编码参数
+
+    Args:
+        options: 转换选项
+            bitrate: 码率（例如 '192k'）
+            gain_db: 增益（dB）
+
+    Returns:
+        ffmpeg 参数列表
+    """
+    options = options or {}
+    args = []
+    if options.get('bitrate'):
+        args += ['-b:a', str(options['bitrate'])]
+    if options.get('gain_db'):
+        args += ['-af', f"volume={float(options['gain_db'])}dB"]
+    return args
+
+
+def stream_audio(input_path: str, output_path: str, target_format: str,
+                 options: Optional[Dict] = None,
+                 chunk_frames: int = DEFAULT_CHUNK_FRAMES,
+                 progress_callback: Optional[ProgressCallback] = None) -> float:
+    """
+    流式转码音频（内存占用与时长无关）
+
+    Args:
+        input_path: 输入文件路径
+        output_path: 输出文件路径
+        target_format: 目标格式
+        options: 转换选项
+            bitrate / gain_db: 见 audio_codec_args
+            sample_rate / channels: 输出采样率 / 声道数
+            sample_width: 输出位深（字节数，默认保持源位深）
+            resampler: 重采样实现，polyphase（默认，需要numpy）或 ffmpeg
+            normalize / target_lufs / peak_db: 响度归一化（见 utils.loudness.normalized_options）
+        chunk_frames: 每块的采样帧数
+        progress_callback: 进度回调，每块报告一次（单位为秒）
+
+    Returns:
+        处理的音频时长（秒）
+    """
+    options = options or {}
+    processed = 0
+    start_time = time.monotonic()
+    try:
+        with PcmDecoder(input_path, options.get('sample_rate'), options.get('channels'),
+                        options.get('resampler', DEFAULT_RESAMPLER), options.get('sample_width')) as decoder:
+            pcm_format = decoder.format
+            chunks = decoder.chunks(chunk_frames)
+            if wants_normalization(options):
+                # 解码时测量响度并把 PCM 暂存到临时文件，编码时从临时文件读出（只解码一遍）
+                chunks, options = _measure_and_spool(decoder, chunk_frames, options, progress_callback)
+
+            with PcmEncoder(output_path, target_format, pcm_format, audio_codec_args(options),
+                            metadata_source=input_path) as encoder:
+                for chunk in chunks:
+                    encoder.write(chunk)
+                    processed += len(chunk)
+                    seconds = processed / pcm_format.byte_rate
+                    elapsed = time.monotonic() - start_time
+                    speed = seconds / elapsed if elapsed > 0 else None
+                    total = decoder.duration
+                    eta = (total - seconds) / speed if speed and total else None
+                    report_progress(progress_callback, 'audio', seconds, total, 's', speed=speed, eta=eta)
+                decoder.finish()
+                encoder.finish()
+    except Exception:
+        # 不留下不完整的输出文件
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+
+    return processed / pcm_format.byte_rate
+
+
+def _measure_and_spool(decoder: PcmDecoder, chunk_frames: int, options: Dict,
+                       progress_callback: Optional[ProgressCallback]) -> Tuple[Iterator[bytes], Dict]:
+    """
+    读完解码输出，测量响度并暂存 PCM
+
+    Returns:
+        (暂存数据的块迭代器, 合并了归一化增益的转换选项)
+    """
+    pcm_format = decoder.format
+    meter = LoudnessMeter(pcm_format.sample_rate, pcm_format.channels)
+    spool = tempfile.TemporaryFile()
+    decoded = 0
+    for chunk in decoder.chunks(chunk_frames):
+        meter.process(pcm_to_float(chunk, pcm_format.sample_width, pcm_format.channels))
+        spool.write(chunk)
+        decoded += len(chunk)
+        report_progress(progress_callback, 'decode', decoded / pcm_format.byte_rate, decoder.duration, 's')
+
+    def spooled_chunks():
+        spool.seek(0)
+        with spool:
+            while True:
+                chunk = spool.read(chunk_frames * pcm_format.frame_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    return spooled_chunks(), normalized_options(options, meter)
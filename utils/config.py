@@ -10,37 +10,52 @@ import os
 import yaml
 from typing import Dict, Any
 from utils.logger import get_logger
+from utils.formats import formats_for
+from utils.image_codecs import available_formats
 
 logger = get_logger(__name__)
 
-# 默认配置
+# 默认配置（格式列表由格式注册表生成）
 DEFAULT_CONFIG = {
     "converters": {
         "document": {
             "module": "converters.document_converter",
             "class": "DocumentConverter",
-            "input_formats": ["pdf", "doc", "docx", "txt", "rtf", "odt"],
-            "output_formats": ["pdf", "docx", "txt", "rtf", "odt"]
+            "input_formats": formats_for("document", "input"),
+            "output_formats": formats_for("document", "output")
         },
         "image": {
             "module": "converters.image_converter",
             "class": "ImageConverter",
-            "input_formats": ["jpg", "jpeg", "png", "gif", "bmp", "tiff", "webp", "svg"],
-            "output_formats": ["jpg", "jpeg", "png", "gif", "bmp", "tiff", "webp"]
+            # WebP、AVIF 只在 Pillow 支持时加入
+            "input_formats": available_formats(formats_for("image", "input")),
+            "output_formats": available_formats(formats_for("image", "output")),
+            "options": {
+                "profile": "balanced"
+            }
         },
         "audio": {
             "module": "converters.audio_converter",
             "class": "AudioConverter",
-            "input_formats": ["mp3", "wav", "flac", "aac", "ogg", "wma", "m4a"],
-            "output_formats": ["mp3", "wav", "flac", "aac", "ogg"]
+            "input_formats": formats_for("audio", "input"),
+            "output_formats": formats_for("audio", "output")
         },
         "video": {
             "module": "converters.video_converter",
             "class": "VideoConverter",
-            "input_formats": ["mp4", "avi", "mkv", "mov", "wmv", "flv", "webm"],
-            "output_formats": ["mp4", "avi", "mkv", "mov"]
+            "input_formats": formats_for("video", "input"),
+            "output_formats": formats_for("video", "output"),
+            # 可以在配置文件中设置 preset、crf、tune、threads 等（见 utils/encoder_profiles.py）
+            "options": {
+                "profile": "balanced"
+            }
         }
     },
+    # path 为空时使用用户缓存目录（见 utils/detect_cache.py），配置文件中的相对路径相对于配置文件所在目录
+    "cache": {
+        "enabled": True,
+        "path": None
+    },
     "logging": {
         "level": "INFO",
         "file": "logs/converter.log",
@@ -70,6 +85,9 @@ def load_config(config_path: str = None) -> Dict[Any, Any]:
         
         # 合并默认配置和用户配置
         merged_config = merge_config(DEFAULT_CONFIG, config)
+        cache_path = (config.get('cache') or {}).get('path')
+        if cache_path and not os.path.isabs(os.path.expanduser(cache_path)):
+            merged_config['cache']['path'] = os.path.join(os.path.dirname(os.path.abspath(config_path)), cache_path)
         logger.info(f"成功加载配置文件: {config_path}")
         return merged_config
         
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+文件检测缓存模块
+以 (st_dev, st_ino, size, mtime_ns) 作为文件身份，持久化保存检测结果。
+缓存存放在用户缓存目录下的SQLite数据库中（WAL模式），命令行、图形界面和工作进程可以共享同一份缓存。
+"""
+
+import os
+import sys
+import atexit
+import sqlite3
+import threading
+from typing import Any, Dict, Optional, Tuple
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 指定缓存目录的环境变量（优先于系统的用户缓存目录）
+CACHE_DIR_ENV = 'ALWAYS_CONVERTER_CACHE_DIR'
+
+# 缓存数据库文件名
+CACHE_FILE_NAME = 'detect_cache.db'
+
+# 内存层最多保留的条目数
+MEMORY_CACHE_SIZE = 65536
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_cache (
+    namespace TEXT NOT NULL,
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    value TEXT,
+    PRIMARY KEY (namespace, dev, ino)
+) WITHOUT ROWID
+"""
+
+
+def file_identity(st: os.stat_result) -> Tuple[int, int, int, int]:
+    """
+    根据stat结果生成文件身份
+
+    Args:
+        st: os.stat 的返回值
+
+    Returns:
+        (st_dev, st_ino, size, mtime_ns) 元组
+    """
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def user_cache_dir() -> str:
+    """
+    获取缓存目录（依次为环境变量 ALWAYS_CONVERTER_CACHE_DIR、系统的用户缓存目录下的 AlwaysConverter）
+
+    Returns:
+        缓存目录路径（不保证已存在）
+    """
+    path = os.environ.get(CACHE_DIR_ENV)
+    if path:
+        return path
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), 'AppData', 'Local')
+    elif sys.platform == 'darwin':
+        base = os.path.join(os.path.expanduser('~'), 'Library', 'Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'AlwaysConverter')
+
+
+def resolve_cache_path(db_path: Optional[str] = None) -> str:
+    """
+    解析缓存数据库路径（与当前工作目录无关）
+
+    Args:
+        db_path: 配置的路径，为空时使用缓存目录下的默认文件，相对路径相对于缓存目录
+
+    Returns:
+        绝对路径
+    """
+    if not db_path:
+        db_path = CACHE_FILE_NAME
+    return os.path.abspath(os.path.join(user_cache_dir(), os.path.expanduser(db_path)))
+
+
+class DetectionCache:
+    """基于文件身份的持久化检测缓存"""
+
+    def __init__(self, db_path: Optional[str] = None, batch_size: int = 512):
+        """
+        初始化检测缓存
+
+        Args:
+            db_path: SQLite数据库路径（见 resolve_cache_path）
+            batch_size: 累积多少条写入后批量提交
+        """
+        self.db_path = resolve_cache_path(db_path)
+        self.batch_size = batch_size
+        self.enabled = True
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._memory: Dict[Tuple, Optional[str]] = {}
+        self._pending = []
+        atexit.register(self.flush)
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """获取当前线程（和进程）专用的数据库连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        try:
+            db_dir = os.path.dirname(self.db_path)
+            if db_dir and not os.path.exists(db_dir):
+                os.makedirs(db_dir, exist_ok=True)
+
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"检测缓存不可用，已禁用: {str(e)}")
+            self.enabled = False
+            return None
+
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def get(self, st: os.stat_result, namespace: str = 'type') -> Tuple[bool, Optional[str]]:
+        """
+        查询缓存
+
+        Args:
+            st: 文件的stat结果
+            namespace: 缓存命名空间
+
+        Returns:
+            (是否命中, 缓存值)
+        """
+        if not self.enabled:
+            return False, None
+
+        identity = file_identity(st)
+        memory_key = (namespace,) + identity
+        with self._lock:
+            if memory_key in self._memory:
+                return True, self._memory[memory_key]
+
+        conn = self._connection()
+        if conn is None:
+            return False, None
+
+        try:
+            row = conn.execute(
+                "SELECT size, mtime_ns, value FROM file_cache WHERE namespace = ? AND dev = ? AND ino = ?",
+                (namespace, identity[0], identity[1])
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"读取检测缓存失败: {str(e)}")
+            return False, None
+
+        # 大小或修改时间变化即视为失效
+        if row is None or (row[0], row[1]) != identity[2:]:
+            return False, None
+
+        self._remember(memory_key, row[2])
+        return True, row[2]
+
+    def put(self, st: os.stat_result, value: Optional[str], namespace: str = 'type'):
+        """
+        写入缓存（批量提交）
+
+        Args:
+            st: 文件的stat结果
+            value: 缓存值
+            namespace: 缓存命名空间
+        """
+        if not self.enabled:
+            return
+
+        identity = file_identity(st)
+        self._remember((namespace,) + identity, value)
+
+        with self._lock:
+            self._pending.append((namespace,) + identity + (value,))
+            should_flush = len(self._pending) >= self.batch_size
+
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        """将待写入的条目提交到数据库"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+
+        if not pending or not self.enabled:
+            return
+
+        conn = self._connection()
+        if conn is None:
+            return
+
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO file_cache (namespace, dev, ino, size, mtime_ns, value) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                pending
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"写入检测缓存失败: {str(e)}")
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._memory.clear()
+            self._pending = []
+
+        conn = self._connection()
+        if conn is None:
+            return
+
+        try:
+            conn.execute("DELETE FROM file_cache")
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"清空检测缓存失败: {str(e)}")
+
+    def _remember(self, memory_key: Tuple, value: Optional[str]):
+        """写入内存层，超出容量时整体丢弃"""
+        with self._lock:
+            if len(self._memory) >= MEMORY_CACHE_SIZE:
+                self._memory.clear()
+            self._memory[memory_key] = value
+
+
+_cache: Optional[DetectionCache] = None
+_cache_enabled = True
+_cache_lock = threading.Lock()
+
+
+def configure_detection_cache(cache_config: Dict[str, Any]) -> Optional[DetectionCache]:
+    """
+    根据配置创建全局检测缓存
+
+    Args:
+        cache_config: 缓存配置（enabled, path，path 见 resolve_cache_path）
+
+    Returns:
+        检测缓存实例，禁用时返回None
+    """
+    global _cache, _cache_enabled
+
+    with _cache_lock:
+        _cache_enabled = cache_config.get('enabled', True)
+        if not _cache_enabled:
+            if _cache is not None:
+                _cache.flush()
+            _cache = None
+            return None
+
+        db_path = resolve_cache_path(cache_config.get('path'))
+        if _cache is None or _cache.db_path != db_path:
+            if _cache is not None:
+                _cache.flush()
+            _cache = DetectionCache(db_path)
+        return _cache
+
+
+def get_detection_cache() -> Optional[DetectionCache]:
+    """
+    获取全局检测缓存
+
+    Returns:
+        检测缓存实例，禁用时返回None
+    """
+    global _cache
+
+    with _cache_lock:
+        if _cache is None and _cache_enabled:
+            _cache = DetectionCache()
+        return _cache
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+编码配置模块
+按格式定义 fast / balanced / smallest 三档编码参数，用于在编码耗时和输出大小之间取舍。
+转换选项中的单项参数（例如 quality、crf）会覆盖配置档中的同名参数。
+视频按编码器定义预设（preset）和质量（CRF），smallest 也可以写作 archive。
+"""
+
+import os
+from typing import Any, Dict, List, Optional
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 配置档名称（按编码耗时从低到高）
+PROFILES = ('fast', 'balanced', 'smallest')
+
+# 默认配置档
+DEFAULT_PROFILE = 'balanced'
+
+# 配置档别名
+PROFILE_ALIASES = {'archive': 'smallest'}
+
+# 图片编码参数（键为 Pillow 格式名）
+IMAGE_PROFILES = {
+    'JPEG': {
+        'fast': {'quality': 75, 'optimize': False, 'progressive': False, 'subsampling': 2},
+        'balanced': {'quality': 75, 'optimize': True, 'progressive': False, 'subsampling': 2},
+        'smallest': {'quality': 70, 'optimize': True, 'progressive': True, 'subsampling': 2},
+    },
+    'PNG': {
+        'fast': {'compress_level': 1},
+        'balanced': {'compress_level': 6},
+        'smallest': {'compress_level': 9},
+    },
+    'WEBP': {
+        'fast': {'quality': 80, 'method': 0, 'lossless': False},
+        'balanced': {'quality': 80, 'method': 4, 'lossless': False},
+        'smallest': {'quality': 75, 'method': 6, 'lossless': False},
+    },
+    'TIFF': {
+        'fast': {'compression': 'raw'},
+        'balanced': {'compression': 'tiff_lzw'},
+        'smallest': {'compression': 'tiff_adobe_deflate'},
+    },
+    'GIF': {
+        'fast': {'optimize': False},
+        'balanced': {'optimize': True},
+        'smallest': {'optimize': True},
+    },
+    'AVIF': {
+        'fast': {'quality': 70, 'speed': 9},
+        'balanced': {'quality': 70, 'speed': 6},
+        'smallest': {'quality': 60, 'speed': 4},
+    },
+}
+
+# 各格式可以通过转换选项单独覆盖的参数
+IMAGE_OVERRIDES = {
+    'JPEG': ('quality', 'optimize', 'progressive', 'subsampling'),
+    'PNG': ('compress_level', 'optimize'),
+    'WEBP': ('quality', 'method', 'lossless'),
+    'TIFF': ('compression',),
+    'GIF': ('optimize',),
+    'AVIF': ('quality',),
+}
+
+# 视频编码参数（键为 ffmpeg 编码器名）：preset 越慢压缩率越高，crf 越小质量越高、文件越大
+VIDEO_PROFILES = {
+    'libx264': {
+        'fast': {'preset': 'veryfast', 'crf': 23},
+        'balanced': {'preset': 'medium', 'crf': 23},
+        'smallest': {'preset': 'slow', 'crf': 24},
+    },
+    'libx265': {
+        'fast': {'preset': 'veryfast', 'crf': 28},
+        'balanced': {'preset': 'medium', 'crf': 28},
+        'smallest': {'preset': 'slow', 'crf': 28},
+    },
+    'libvpx-vp9': {
+        'fast': {'preset': 'faster', 'crf': 34},
+        'balanced': {'preset': 'medium', 'crf': 32},
+        'smallest': {'preset': 'slower', 'crf': 32},
+    },
+}
+
+# x264 / x265 的预设名称（按速度从快到慢）
+VIDEO_PRESETS = ('ultrafast', 'superfast', 'veryfast', 'faster', 'fast', 'medium', 'slow', 'slower', 'veryslow')
+
+# x264 的 tune 选项（界面上可选的值）
+VIDEO_TUNES = ('film', 'animation', 'grain', 'stillimage', 'fastdecode', 'zerolatency')
+
+# 各编码器接受的 tune 选项：x265 没有 film 和 stillimage
+VIDEO_ENCODER_TUNES = {
+    'libx264': VIDEO_TUNES + ('psnr', 'ssim'),
+    'libx265': ('animation', 'grain', 'fastdecode', 'zerolatency', 'psnr', 'ssim'),
+}
+
+# VP9 没有预设名称，按速度映射为 -cpu-used（0 最慢，5 为 good 模式下最快）
+_VP9_CPU_USED = {
+    'ultrafast': 5, 'superfast': 5, 'veryfast': 5, 'faster': 4, 'fast': 3,
+    'medium': 2, 'slow': 1, 'slower': 1, 'veryslow': 0,
+}
+
+# 编码速度范围（speed 选项，越大越快、文件越大）
+MIN_SPEED, MAX_SPEED = 0, 10
+
+# WebP 的 method 范围（越大越慢、文件越小）
+MAX_WEBP_METHOD = 6
+
+# tiff_compression 选项到 Pillow 压缩名称的映射
+TIFF_COMPRESSION = {
+    'none': 'raw',
+    'deflate': 'tiff_adobe_deflate',
+    'lzw': 'tiff_lzw',
+}
+
+
+def resolve_profile(options: Optional[Dict[str, Any]]) -> str:
+    """
+    从转换选项中取出配置档名称
+
+    Args:
+        options: 转换选项（profile）
+
+    Returns:
+        配置档名称，未知名称时返回默认配置档
+    """
+    profile = (options or {}).get('profile') or DEFAULT_PROFILE
+    profile = PROFILE_ALIASES.get(profile, profile)
+    if profile not in PROFILES:
+        logger.warning(f"未知的编码配置: {profile}，使用 {DEFAULT_PROFILE}")
+        return DEFAULT_PROFILE
+    return profile
+
+
+def image_save_params(save_format: str, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    获取图片的编码参数
+
+    Args:
+        save_format: Pillow 格式名
+        options: 转换选项（profile 以及 quality 等单项参数）
+            speed: 编码速度 0~10（AVIF 的 speed，WebP 映射为 method 6~0）
+            threads: AVIF 编码线程数
+
+    Returns:
+        传给 Image.save 的参数字典
+    """
+    options = options or {}
+    params = dict(IMAGE_PROFILES.get(save_format, {}).get(resolve_profile(options), {}))
+
+    for key in IMAGE_OVERRIDES.get(save_format, ()):
+        if options.get(key) is not None:
+            params[key] = options[key]
+
+    if save_format == 'TIFF' and options.get('tiff_compression'):
+        compression = options['tiff_compression']
+        params['compression'] = TIFF_COMPRESSION.get(compression, compression)
+
+    if options.get('speed') is not None:
+        speed = max(MIN_SPEED, min(MAX_SPEED, int(options['speed'])))
+        if save_format == 'AVIF':
+            params['speed'] = speed
+        elif save_format == 'WEBP' and options.get('method') is None:
+            params['method'] = round((MAX_SPEED - speed) * MAX_WEBP_METHOD / MAX_SPEED)
+
+    if save_format == 'AVIF' and options.get('threads'):
+        # 编码器内部线程数，默认使用全部CPU；批量并行转换时应相应减少
+        params['max_threads'] = max(1, min(int(options['threads']), os.cpu_count() or 1))
+    return params
+
+
+def threads_per_job(jobs: int) -> int:
+    """
+    计算并行转换时每个任务的编码线程数（避免 N 个并行任务各自使用全部CPU）
+
+    Args:
+        jobs: 并行任务数
+
+    Returns:
+        线程数，至少为1
+    """
+    return max(1, (os.cpu_count() or 1) // max(1, jobs))
+
+
+def video_encoder_args(encoder: str, options: Optional[Dict[str, Any]] = None) -> List[str]:
+    """
+    获取视频编码器的速度、质量和线程参数
+
+    Args:
+        encoder: ffmpeg 编码器名
+        options: 转换选项（profile 以及单项参数）
+            preset: 编码预设（x264 / x265 的预设名，VP9 映射为 -cpu-used）
+            crf: 固定质量参数（指定 video_bitrate 时不使用）
+            tune: x264 / x265 的 tune 选项
+            video_bitrate: 视频码率（例如 '2M'）
+            threads: 编码线程数
+
+    Returns:
+        ffmpeg 参数，编码器没有对应配置时只包含码率和线程参数
+    """
+    options = options or {}
+    params = dict(VIDEO_PROFILES.get(encoder, {}).get(resolve_profile(options), {}))
+    for key in ('preset', 'crf'):
+        if params and options.get(key) is not None:
+            params[key] = options[key]
+
+    args = []
+    if encoder in ('libx264', 'libx265'):
+        if params.get('preset') not in VIDEO_PRESETS:
+            logger.warning(f"未知的编码预设: {params.get('preset')}，使用 medium")
+            params['preset'] = 'medium'
+        args += ['-preset', params['preset']]
+        tune = options.get('tune')
+        if tune and tune not in VIDEO_ENCODER_TUNES[encoder]:
+            logger.warning(f"{encoder} 不支持 tune {tune}，已忽略")
+        elif tune:
+            args += ['-tune', str(tune)]
+    elif encoder == 'libvpx-vp9':
+        # 只有 -b:v 0 时 -crf 才是固定质量模式；-row-mt 让单个编码器使用多个线程
+        args += ['-deadline', 'good', '-cpu-used', str(_VP9_CPU_USED.get(params.get('preset'), 2)), '-row-mt', '1']
+
+    if options.get('video_bitrate'):
+        args += ['-b:v', str(options['video_bitrate'])]
+    elif 'crf' in params:
+        args += ['-crf', str(params['crf'])]
+        if encoder == 'libvpx-vp9':
+            args += ['-b:v', '0']
+
+    if options.get('threads'):
+        threads = max(1, min(int(options['threads']), os.cpu_count() or 1))
+        args += ['-threads', str(threads)]
+        if encoder == 'libx265':
+            # x265 的线程池不受 -threads 控制
+            args += ['-x265-params', f'pools={threads}']
+    return args
+
+
+def profile_quality(profile: str, save_format: str = 'JPEG') -> Optional[int]:
+    """
+    获取配置档的质量参数（用于界面上的质量滑块）
+
+    Args:
+        profile: 配置档名称
+        save_format: Pillow 格式名
+
+    Returns:
+        质量参数，该格式没有质量参数时返回None
+    """
+    return IMAGE_PROFILES.get(save_format, {}).get(profile, {}).get('quality')
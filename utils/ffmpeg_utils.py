@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+FFmpeg 工具模块
+查找 ffmpeg / ffprobe 可执行文件，启动 ffmpeg 子进程并收集错误输出，解析 -progress 输出的实时进度
+"""
+
+import os
+import re
+import shutil
+import subprocess
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 可以通过环境变量指定 ffmpeg / ffprobe 路径
+FFMPEG_ENV = 'FFMPEG_BINARY'
+FFPROBE_ENV = 'FFPROBE_BINARY'
+
+# 错误信息中保留的 ffmpeg 输出行数
+STDERR_TAIL_LINES = 20
+
+_DURATION_PATTERN = re.compile(r'Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)')
+
+
+class FFmpegError(RuntimeError):
+    """ffmpeg 执行失败"""
+
+
+class FFmpegProgress(NamedTuple):
+    """ffmpeg -progress 输出的一次进度（结束时的 fps、speed 为全程平均值）"""
+    out_time: Optional[float]
+    frame: Optional[int]
+    fps: Optional[float]
+    speed: Optional[float]
+    duration: Optional[float]
+    finished: bool
+
+
+@lru_cache(maxsize=None)
+def find_ffmpeg() -> Optional[str]:
+    """
+    查找 ffmpeg 可执行文件（依次为环境变量 FFMPEG_BINARY、PATH、imageio-ffmpeg 自带的二进制）
+
+    Returns:
+        ffmpeg 路径，找不到时返回None
+    """
+    path = os.environ.get(FFMPEG_ENV)
+    if path and os.path.isfile(path):
+        return path
+
+    path = shutil.which('ffmpeg')
+    if path:
+        return path
+
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        pass
+
+    logger.warning("未找到ffmpeg，音视频转换功能将受限")
+    return None
+
+
+@lru_cache(maxsize=None)
+def find_ffprobe() -> Optional[str]:
+    """
+    查找 ffprobe 可执行文件（依次为环境变量 FFPROBE_BINARY、PATH、ffmpeg 所在目录）
+
+    Returns:
+        ffprobe 路径，找不到时返回None（imageio-ffmpeg 不带 ffprobe）
+    """
+    path = os.environ.get(FFPROBE_ENV)
+    if path and os.path.isfile(path):
+        return path
+
+    path = shutil.which('ffprobe')
+    if path:
+        return path
+
+    ffmpeg = find_ffmpeg()
+    if ffmpeg:
+        directory, name = os.path.split(ffmpeg)
+        candidate = os.path.join(directory, name.replace('ffmpeg', 'ffprobe', 1))
+        if candidate != ffmpeg and os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def parse_duration(line: str) -> Optional[float]:
+    """
+    从 ffmpeg 输出的 "Duration: 00:01:02.50" 行中解析时长
+
+    Args:
+        line: ffmpeg 输出行
+
+    Returns:
+        时长（秒），不是时长行或时长未知时返回None
+    """
+    match = _DURATION_PATTERN.search(line)
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def _parse_number(value: Optional[str], kind=float):
+    """解析 -progress 输出中的数值（N/A 或无法解析时返回None）"""
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_progress(fields: Dict[str, str], duration: Optional[float] = None) -> FFmpegProgress:
+    """
+    解析 ffmpeg -progress 输出的一组 key=value（以 progress=continue/end 结尾）
+
+    Args:
+        fields: 一组进度字段
+        duration: 输入时长（秒）
+
+    Returns:
+        进度（out_time 为已输出的时长，秒；speed 为相对实时的倍数）
+    """
+    out_time_us = _parse_number(fields.get('out_time_us'), int)
+    speed = _parse_number(fields.get('speed', '').rstrip('x'))
+    return FFmpegProgress(
+        out_time=max(0.0, out_time_us / 1e6) if out_time_us is not None else None,
+        frame=_parse_number(fields.get('frame'), int),
+        fps=_parse_number(fields.get('fps')) or None,
+        speed=speed or None,
+        duration=duration,
+        finished=fields.get('progress') == 'end'
+    )
+
+
+class FFmpegProcess:
+    """
+    ffmpeg 子进程（后台线程持续读取 stderr，避免管道写满阻塞，并保留最后几行用于报错）
+
+    示例:
+        with FFmpegProcess(['-i', 'in.wav', 'out.mp3']) as proc:
+            proc.wait_success()
+    """
+
+    def __init__(self, args: List[str], stdin=None, stdout=None):
+        """
+        启动 ffmpeg
+
+        Args:
+            args: ffmpeg 参数（不含可执行文件和通用参数）
+            stdin: 标准输入（subprocess.PIPE 或None）
+            stdout: 标准输出（subprocess.PIPE 或None）
+        """
+        ffmpeg = find_ffmpeg()
+        if ffmpeg is None:
+            raise FFmpegError("未找到ffmpeg")
+
+        self.args = args
+        self.duration = None
+        self._duration_known = threading.Event()
+        self._stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+        self.process = subprocess.Popen(
+            [ffmpeg, '-hide_banner', '-nostdin', '-y'] + args,
+            stdin=stdin, stdout=stdout, stderr=subprocess.PIPE
+        )
+        self._stderr_thread = threading.Thread(target=self._read_stderr, daemon=True)
+        self._stderr_thread.start()
+
+    def _read_stderr(self):
+        """读取 stderr，记录输入时长和最后几行"""
+        for raw in iter(self.process.stderr.readline, b''):
+            line = raw.decode('utf-8', errors='replace').rstrip()
+            if self.duration is None:
+                self.duration = parse_duration(line)
+                if self.duration is not None:
+                    self._duration_known.set()
+            self._stderr_tail.append(line)
+        self._duration_known.set()
+
+    def wait_duration(self, timeout: float = 0) -> Optional[float]:
+        """
+        获取输入时长（ffmpeg 在开始输出前打印时长）
+
+        Args:
+            timeout: 最多等待的秒数
+
+        Returns:
+            时长（秒），未知时返回None
+        """
+        self._duration_known.wait(timeout)
+        return self.duration
+
+    @property
+    def stderr_tail(self) -> str:
+        """ffmpeg 最后几行输出"""
+        return '\n'.join(self._stderr_tail)
+
+    def wait_success(self):
+        """等待进程结束，失败时抛出 FFmpegError"""
+        returncode = self.process.wait()
+        self._stderr_thread.join()
+        if returncode != 0:
+            raise FFmpegError(f"ffmpeg 返回 {returncode}: {self.stderr_tail}")
+
+    def kill(self):
+        """终止进程"""
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # 异常退出时终止进程，正常退出时进程应已结束
+        if exc_type is not None:
+            self.kill()
+        for stream in (self.process.stdin, self.process.stdout):
+            if stream:
+                try:
+                    stream.close()
+                except OSError:
+                    pass
+        self.process.wait()
+        self._stderr_thread.join()
+
+
+def run_ffmpeg(args: List[str],
+               on_progress: Optional[Callable[[FFmpegProgress], Any]] = None) -> Optional[FFmpegProgress]:
+    """
+    运行 ffmpeg 并等待结束
+
+    Args:
+        args: ffmpeg 参数（不含可执行文件和通用参数）
+        on_progress: 进度回调，指定时 ffmpeg 通过 -progress pipe:1 每0.5秒输出一次进度
+
+    Returns:
+        最后一次进度（未指定 on_progress 时为None）
+
+    Raises:
+        FFmpegError: 未找到 ffmpeg 或执行失败
+    """
+    if on_progress is None:
+        with FFmpegProcess(args, stdout=subprocess.DEVNULL) as proc:
+            proc.wait_success()
+        return None
+
+    progress = None
+    with FFmpegProcess(['-progress', 'pipe:1', '-nostats'] + args, stdout=subprocess.PIPE) as proc:
+        fields = {}
+        for raw in iter(proc.process.stdout.readline, b''):
+            key, sep, value = raw.decode('utf-8', errors='replace').strip().partition('=')
+            if not sep:
+                continue
+            fields[key] = value
+            if key == 'progress':
+                progress = parse_progress(fields, proc.duration)
+                on_progress(progress)
+                fields = {}
+        proc.wait_success()
+    return progress
@@ -9,6 +9,8 @@
 import os
 from typing import Optional
 from utils.logger import get_logger
+from utils.detect_cache import get_detection_cache
+from utils.formats import SIGNATURE_READ_SIZE, detect_by_signature, expand_format_set, ext_from_mime
 
 logger = get_logger(__name__)
 
@@ -21,64 +23,74 @@ except ImportError:
     logger.warning("未安装python-magic库，将使用基础文件类型检测")
 
 
-def get_file_type(file_path: str) -> Optional[str]:
+def get_file_type(file_path: str, st: Optional[os.stat_result] = None) -> Optional[str]:
     """
     获取文件类型（扩展名）
     
     Args:
         file_path: 文件路径
+        st: 已有的stat结果（可选，避免重复stat）
         
     Returns:
         文件扩展名（小写，不包含点号）或None
     """
-    if not os.path.exists(file_path):
-        logger.error(f"文件不存在: {file_path}")
-        return None
+    if st is None:
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            logger.error(f"文件不存在: {file_path}")
+            return None
     
     # 首先尝试从文件扩展名获取
     _, ext = os.path.splitext(file_path)
     if ext:
         return ext[1:].lower()
     
+    # 需要读取文件内容时，先查询检测缓存
+    cache = get_detection_cache()
+    if cache is not None:
+        hit, file_type = cache.get(st)
+        if hit:
+            return file_type
+    
+    file_type = _detect_file_type_by_content(file_path)
+    if cache is not None and file_type is not None:
+        cache.put(st, file_type)
+    return file_type
+
+
+def _detect_file_type_by_content(file_path: str) -> Optional[str]:
+    """
+    根据文件内容检测文件类型
+    
+    Args:
+        file_path: 文件路径
+        
+    Returns:
+        文件扩展名或None
+    """
     # 如果无法从扩展名获取，则使用magic库检测
     if HAS_MAGIC:
         try:
             mime = magic.from_file(file_path, mime=True)
             # 根据MIME类型映射到文件扩展名
-            mime_to_ext = {
-                'application/pdf': 'pdf',
-                'application/msword': 'doc',
-                'application/vnd.openxmlformats-officedocument.wordprocessingml.document': 'docx',
-                'text/plain': 'txt',
-                'application/rtf': 'rtf',
-                'application/vnd.oasis.opendocument.text': 'odt',
-                'image/jpeg': 'jpg',
-                'image/png': 'png',
-                'image/gif': 'gif',
-                'image/bmp': 'bmp',
-                'image/tiff': 'tiff',
-                'image/webp': 'webp',
-                'audio/mpeg': 'mp3',
-                'audio/wav': 'wav',
-                'audio/flac': 'flac',
-                'audio/aac': 'aac',
-                'video/mp4': 'mp4',
-                'video/x-msvideo': 'avi',
-                'video/x-matroska': 'mkv',
-                'application/zip': 'zip',
-                'application/x-rar': 'rar',
-                'application/x-7z-compressed': '7z',
-                'application/x-tar': 'tar',
-                'application/gzip': 'gz'
-            }
-            return mime_to_ext.get(mime, 'unknown')
+            return ext_from_mime(mime) or 'unknown'
         except Exception as e:
             logger.error(f"使用magic库获取文件类型失败: {e}")
             return None
-    else:
-        # 如果没有magic库，只能返回None
-        logger.warning(f"无法从扩展名获取文件类型，且magic库不可用: {file_path}")
+    
+    # 没有magic库时，根据文件头签名识别
+    try:
+        with open(file_path, 'rb') as f:
+            header = f.read(SIGNATURE_READ_SIZE)
+    except OSError as e:
+        logger.error(f"读取文件头失败: {e}")
         return None
+    
+    file_type = detect_by_signature(header)
+    if not file_type:
+        logger.warning(f"无法从扩展名或文件签名获取文件类型: {file_path}")
+    return file_type
 
 
 def get_file_size(file_path: str) -> Optional[int]:
@@ -98,13 +110,13 @@ def get_file_size(file_path: str) -> Optional[int]:
         return None
 
 
-def is_file_supported(file_path: str, supported_formats: list) -> bool:
+def is_file_supported(file_path: str, supported_formats) -> bool:
     """
     检查文件是否被支持
     
     Args:
         file_path: 文件路径
-        supported_formats: 支持的格式列表
+        supported_formats: 支持的格式列表或 expand_format_set 生成的集合
         
     Returns:
         文件是否被支持
@@ -113,7 +125,10 @@ def is_file_supported(file_path: str, supported_formats: list) -> bool:
     if not file_type:
         return False
     
-    return file_type.lower() in [fmt.lower() for fmt in supported_formats]
+    if not isinstance(supported_formats, frozenset):
+        supported_formats = expand_format_set(supported_formats)
+    
+    return file_type.lower() in supported_formats
 
 
 def get_file_name_without_extension(file_path: str) -> str:
@@ -7,131 +7,28 @@
 """
 
 import os
+from utils.formats import CATEGORY_BY_EXT, MIME_BY_EXT, expand_format_set, ext_of, get_category, get_mime
 
-# 文件类型映射
-FILE_TYPE_MAP = {
-    # 文档格式
-    'pdf': 'document',
-    'doc': 'document',
-    'docx': 'document',
-    'txt': 'document',
-    'rtf': 'document',
-    'odt': 'document',
-    'xls': 'document',
-    'xlsx': 'document',
-    'ppt': 'document',
-    'pptx': 'document',
-    
-    # 图片格式
-    'jpg': 'image',
-    'jpeg': 'image',
-    'png': 'image',
-    'gif': 'image',
-    'bmp': 'image',
-    'tiff': 'image',
-    'webp': 'image',
-    'svg': 'image',
-    'ico': 'image',
-    
-    # 音频格式
-    'mp3': 'audio',
-    'wav': 'audio',
-    'flac': 'audio',
-    'aac': 'audio',
-    'ogg': 'audio',
-    'wma': 'audio',
-    'm4a': 'audio',
-    'opus': 'audio',
-    
-    # 视频格式
-    'mp4': 'video',
-    'avi': 'video',
-    'mkv': 'video',
-    'mov': 'video',
-    'wmv': 'video',
-    'flv': 'video',
-    'webm': 'video',
-    'm4v': 'video',
-    
-    # 压缩格式
-    'zip': 'archive',
-    'rar': 'archive',
-    '7z': 'archive',
-    'tar': 'archive',
-    'gz': 'archive',
-    'bz2': 'archive',
-}
+# 文件类型映射（由格式注册表生成的只读索引）
+FILE_TYPE_MAP = CATEGORY_BY_EXT
 
-# MIME类型映射
-MIME_TYPE_MAP = {
-    # 文档格式
-    'pdf': 'application/pdf',
-    'doc': 'application/msword',
-    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-    'txt': 'text/plain',
-    'rtf': 'application/rtf',
-    'odt': 'application/vnd.oasis.opendocument.text',
-    'xls': 'application/vnd.ms-excel',
-    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-    'ppt': 'application/vnd.ms-powerpoint',
-    'pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
-    
-    # 图片格式
-    'jpg': 'image/jpeg',
-    'jpeg': 'image/jpeg',
-    'png': 'image/png',
-    'gif': 'image/gif',
-    'bmp': 'image/bmp',
-    'tiff': 'image/tiff',
-    'webp': 'image/webp',
-    'svg': 'image/svg+xml',
-    'ico': 'image/x-icon',
-    
-    # 音频格式
-    'mp3': 'audio/mpeg',
-    'wav': 'audio/wav',
-    'flac': 'audio/flac',
-    'aac': 'audio/aac',
-    'ogg': 'audio/ogg',
-    'wma': 'audio/x-ms-wma',
-    'm4a': 'audio/mp4',
-    'opus': 'audio/opus',
-    
-    # 视频格式
-    'mp4': 'video/mp4',
-    'avi': 'video/x-msvideo',
-    'mkv': 'video/x-matroska',
-    'mov': 'video/quicktime',
-    'wmv': 'video/x-ms-wmv',
-    'flv': 'video/x-flv',
-    'webm': 'video/webm',
-    'm4v': 'video/x-m4v',
-    
-    # 压缩格式
-    'zip': 'application/zip',
-    'rar': 'application/vnd.rar',
-    '7z': 'application/x-7z-compressed',
-    'tar': 'application/x-tar',
-    'gz': 'application/gzip',
-    'bz2': 'application/x-bzip2',
-}
+# MIME类型映射（由格式注册表生成的只读索引）
+MIME_TYPE_MAP = MIME_BY_EXT
 
 
-def get_file_type(file_path: str) -> str:
+def get_file_type(file_path: str, st: os.stat_result = None) -> str:
     """
     获取文件类型
     
     Args:
         file_path: 文件路径
+        st: 已有的stat结果（仅为与完整版保持接口一致，未使用）
         
     Returns:
         文件类型字符串
     """
-    _, ext = os.path.splitext(file_path)
-    ext = ext.lower().lstrip('.')
-    
     # 根据扩展名判断文件类型
-    return FILE_TYPE_MAP.get(ext, 'unknown')
+    return get_category(ext_of(file_path))
 
 
 def get_file_size(file_path: str) -> int:
@@ -150,21 +47,21 @@ def get_file_size(file_path: str) -> int:
         return 0
 
 
-def is_file_supported(file_path: str, supported_formats: list) -> bool:
+def is_file_supported(file_path: str, supported_formats) -> bool:
     """
     检查文件是否支持
     
     Args:
         file_path: 文件路径
-        supported_formats: 支持的格式列表
+        supported_formats: 支持的格式列表或 expand_format_set 生成的集合
         
     Returns:
         是否支持
     """
-    _, ext = os.path.splitext(file_path)
-    ext = ext.lower().lstrip('.')
+    if not isinstance(supported_formats, frozenset):
+        supported_formats = expand_format_set(supported_formats)
     
-    return ext in supported_formats or '*' in supported_formats
+    return ext_of(file_path) in supported_formats or '*' in supported_formats
 
 
 def get_file_name_without_extension(file_path: str) -> str:
@@ -190,7 +87,4 @@ def get_mime_type(file_path: str) -> str:
     Returns:
         MIME类型字符串
     """
-    _, ext = os.path.splitext(file_path)
-    ext = ext.lower().lstrip('.')
-    
-    return MIME_TYPE_MAP.get(ext, 'application/octet-stream')
\ No newline at end of file
+    return get_mime(ext_of(file_path))
\ No newline at end of file
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+格式注册表模块
+集中维护所有文件格式的扩展名、别名、MIME类型、分类、文件签名和转换能力，
+并预先构建只读索引，所有查询都是常数时间。
+"""
+
+import os
+from types import MappingProxyType
+from typing import FrozenSet, List, NamedTuple, Optional, Tuple
+
+
+class FormatSpec(NamedTuple):
+    """单个文件格式的描述"""
+    ext: str
+    category: str
+    mimes: Tuple[str, ...]
+    aliases: Tuple[str, ...] = ()
+    # 文件签名：每个签名是 ((偏移, 字节串), ...)，所有片段都匹配才算命中
+    signatures: Tuple[Tuple[Tuple[int, bytes], ...], ...] = ()
+    # Pillow 保存时使用的格式名
+    pillow: Optional[str] = None
+    # 是否可作为转换输入 / 输出
+    readable: bool = False
+    writable: bool = False
+
+    @property
+    def mime(self) -> str:
+        """主MIME类型"""
+        return self.mimes[0]
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        """扩展名及全部别名"""
+        return (self.ext,) + self.aliases
+
+
+def _sig(*parts: Tuple[int, bytes]) -> Tuple[Tuple[int, bytes], ...]:
+    """构造一个签名"""
+    return tuple(parts)
+
+
+# 格式定义（顺序即默认配置中格式列表的顺序）
+FORMATS: Tuple[FormatSpec, ...] = (
+    # 文档格式
+    FormatSpec('pdf', 'document', ('application/pdf',),
+               signatures=(_sig((0, b'%PDF-')),), readable=True, writable=True),
+    FormatSpec('doc', 'document', ('application/msword',),
+               signatures=(_sig((0, b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1')),), readable=True),
+    FormatSpec('docx', 'document',
+               ('application/vnd.openxmlformats-officedocument.wordprocessingml.document',),
+               readable=True, writable=True),
+    FormatSpec('txt', 'document', ('text/plain',), readable=True, writable=True),
+    FormatSpec('rtf', 'document', ('application/rtf', 'text/rtf'),
+               signatures=(_sig((0, b'{\\rtf')),), readable=True, writable=True),
+    FormatSpec('odt', 'document', ('application/vnd.oasis.opendocument.text',),
+               readable=True, writable=True),
+    FormatSpec('xls', 'document', ('application/vnd.ms-excel',)),
+    FormatSpec('xlsx', 'document',
+               ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',)),
+    FormatSpec('ppt', 'document', ('application/vnd.ms-powerpoint',)),
+    FormatSpec('pptx', 'document',
+               ('application/vnd.openxmlformats-officedocument.presentationml.presentation',)),
+
+    # 图片格式
+    FormatSpec('jpg', 'image', ('image/jpeg',), aliases=('jpeg',),
+               signatures=(_sig((0, b'\xff\xd8\xff')),), pillow='JPEG', readable=True, writable=True),
+    FormatSpec('png', 'image', ('image/png',),
+               signatures=(_sig((0, b'\x89PNG\r\n\x1a\n')),), pillow='PNG', readable=True, writable=True),
+    FormatSpec('gif', 'image', ('image/gif',),
+               signatures=(_sig((0, b'GIF87a')), _sig((0, b'GIF89a'))),
+               pillow='GIF', readable=True, writable=True),
+    FormatSpec('bmp', 'image', ('image/bmp', 'image/x-ms-bmp'),
+               signatures=(_sig((0, b'BM')),), pillow='BMP', readable=True, writable=True),
+    FormatSpec('tiff', 'image', ('image/tiff',), aliases=('tif',),
+               signatures=(_sig((0, b'II*\x00')), _sig((0, b'MM\x00*')),
+                           _sig((0, b'II+\x00')), _sig((0, b'MM\x00+'))),
+               pillow='TIFF', readable=True, writable=True),
+    FormatSpec('webp', 'image', ('image/webp',),
+               signatures=(_sig((0, b'RIFF'), (8, b'WEBP')),), pillow='WEBP', readable=True, writable=True),
+    FormatSpec('avif', 'image', ('image/avif',),
+               signatures=(_sig((4, b'ftypavif')), _sig((4, b'ftypavis'))),
+               pillow='AVIF', readable=True, writable=True),
+    FormatSpec('svg', 'image', ('image/svg+xml',), readable=True),
+    FormatSpec('ico', 'image', ('image/x-icon', 'image/vnd.microsoft.icon'),
+               signatures=(_sig((0, b'\x00\x00\x01\x00')),), pillow='ICO'),
+
+    # 音频格式
+    FormatSpec('mp3', 'audio', ('audio/mpeg', 'audio/mp3'),
+               signatures=(_sig((0, b'ID3')), _sig((0, b'\xff\xfb')),
+                           _sig((0, b'\xff\xf3')), _sig((0, b'\xff\xf2'))),
+               readable=True, writable=True),
+    FormatSpec('wav', 'audio', ('audio/wav', 'audio/x-wav', 'audio/wave'),
+               signatures=(_sig((0, b'RIFF'), (8, b'WAVE')),), readable=True, writable=True),
+    FormatSpec('flac', 'audio', ('audio/flac', 'audio/x-flac'),
+               signatures=(_sig((0, b'fLaC')),), readable=True, writable=True),
+    FormatSpec('aac', 'audio', ('audio/aac', 'audio/x-aac'),
+               signatures=(_sig((0, b'\xff\xf1')), _sig((0, b'\xff\xf9'))),
+               readable=True, writable=True),
+    FormatSpec('ogg', 'audio', ('audio/ogg', 'application/ogg'),
+               signatures=(_sig((0, b'OggS')),), readable=True, writable=True),
+    FormatSpec('wma', 'audio', ('audio/x-ms-wma',), readable=True),
+    FormatSpec('m4a', 'audio', ('audio/mp4', 'audio/x-m4a'),
+               signatures=(_sig((4, b'ftypM4A')),), readable=True, writable=True),
+    FormatSpec('opus', 'audio', ('audio/opus',)),
+
+    # 视频格式
+    FormatSpec('mp4', 'video', ('video/mp4',),
+               signatures=(_sig((4, b'ftyp')),), readable=True, writable=True),
+    FormatSpec('avi', 'video', ('video/x-msvideo', 'video/avi'),
+               signatures=(_sig((0, b'RIFF'), (8, b'AVI ')),), readable=True, writable=True),
+    FormatSpec('mkv', 'video', ('video/x-matroska',),
+               signatures=(_sig((0, b'\x1a\x45\xdf\xa3')),), readable=True, writable=True),
+    FormatSpec('mov', 'video', ('video/quicktime',),
+               signatures=(_sig((4, b'ftypqt')),), readable=True, writable=True),
+    FormatSpec('wmv', 'video', ('video/x-ms-wmv', 'video/x-ms-asf'),
+               signatures=(_sig((0, b'\x30\x26\xb2\x75\x8e\x66\xcf\x11')),), readable=True),
+    FormatSpec('flv', 'video', ('video/x-flv',),
+               signatures=(_sig((0, b'FLV\x01')),), readable=True),
+    FormatSpec('webm', 'video', ('video/webm',), readable=True),
+    FormatSpec('m4v', 'video', ('video/x-m4v',)),
+
+    # 压缩格式
+    FormatSpec('zip', 'archive', ('application/zip',),
+               signatures=(_sig((0, b'PK\x03\x04')),), readable=True, writable=True),
+    FormatSpec('rar', 'archive', ('application/vnd.rar', 'application/x-rar'),
+               signatures=(_sig((0, b'Rar!\x1a\x07')),)),
+    FormatSpec('7z', 'archive', ('application/x-7z-compressed',),
+               signatures=(_sig((0, b"7z\xbc\xaf'\x1c")),)),
+    FormatSpec('tar', 'archive', ('application/x-tar',),
+               signatures=(_sig((257, b'ustar')),), readable=True, writable=True),
+    FormatSpec('gz', 'archive', ('application/gzip', 'application/x-gzip'),
+               signatures=(_sig((0, b'\x1f\x8b')),), writable=True),
+    FormatSpec('bz2', 'archive', ('application/x-bzip2',),
+               signatures=(_sig((0, b'BZh')),)),
+)
+
+# 签名检测需要读取的文件头长度
+SIGNATURE_READ_SIZE = 512
+
+
+def _build_indexes():
+    """构建只读索引"""
+    by_name = {}
+    by_mime = {}
+    by_category = {}
+    for spec in FORMATS:
+        for name in spec.names:
+            by_name[name] = spec
+        for mime in spec.mimes:
+            by_mime.setdefault(mime, spec)
+        by_category.setdefault(spec.category, []).append(spec)
+
+    # 签名越长越具体，优先匹配（例如 m4a/mov 优先于 mp4）
+    signatures = sorted(
+        ((sig, spec.ext) for spec in FORMATS for sig in spec.signatures),
+        key=lambda item: -sum(len(part) for _, part in item[0])
+    )
+
+    return (
+        MappingProxyType(by_name),
+        MappingProxyType(by_mime),
+        MappingProxyType({k: tuple(v) for k, v in by_category.items()}),
+        tuple(signatures),
+    )
+
+
+_BY_NAME, _BY_MIME, _BY_CATEGORY, _SIGNATURES = _build_indexes()
+
+# 所有已知扩展名（含别名）
+EXTENSIONS: FrozenSet[str] = frozenset(_BY_NAME)
+
+# 扩展名 -> 分类
+CATEGORY_BY_EXT = MappingProxyType({name: spec.category for name, spec in _BY_NAME.items()})
+
+# 扩展名 -> 主MIME类型
+MIME_BY_EXT = MappingProxyType({name: spec.mime for name, spec in _BY_NAME.items()})
+
+# 扩展名 -> Pillow格式名
+PILLOW_FORMATS = MappingProxyType({name: spec.pillow for name, spec in _BY_NAME.items() if spec.pillow})
+
+
+def normalize_ext(name: str) -> str:
+    """
+    规范化扩展名（小写，去掉前导点号）
+
+    Args:
+        name: 扩展名或格式名
+
+    Returns:
+        规范化后的扩展名
+    """
+    return name.lower().lstrip('.')
+
+
+def ext_of(file_path: str) -> str:
+    """
+    获取文件路径的规范化扩展名
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        扩展名（可能为空字符串）
+    """
+    return normalize_ext(os.path.splitext(file_path)[1])
+
+
+def get_format(name: str) -> Optional[FormatSpec]:
+    """
+    按扩展名或别名查找格式
+
+    Args:
+        name: 扩展名或别名
+
+    Returns:
+        格式描述或None
+    """
+    return _BY_NAME.get(normalize_ext(name))
+
+
+def canonical_ext(name: str) -> str:
+    """
+    将别名转换为标准扩展名（例如 jpeg -> jpg）
+
+    Args:
+        name: 扩展名或别名
+
+    Returns:
+        标准扩展名，未知格式原样返回（规范化后）
+    """
+    name = normalize_ext(name)
+    spec = _BY_NAME.get(name)
+    return spec.ext if spec else name
+
+
+def get_category(name: str) -> str:
+    """
+    获取格式所属分类
+
+    Args:
+        name: 扩展名或别名
+
+    Returns:
+        分类名称，未知格式返回 'unknown'
+    """
+    return CATEGORY_BY_EXT.get(normalize_ext(name), 'unknown')
+
+
+def get_mime(name: str) -> str:
+    """
+    获取格式的主MIME类型
+
+    Args:
+        name: 扩展名或别名
+
+    Returns:
+        MIME类型，未知格式返回 'application/octet-stream'
+    """
+    return MIME_BY_EXT.get(normalize_ext(name), 'application/octet-stream')
+
+
+def ext_from_mime(mime: str) -> Optional[str]:
+    """
+    根据MIME类型获取扩展名
+
+    Args:
+        mime: MIME类型
+
+    Returns:
+        扩展名或None
+    """
+    spec = _BY_MIME.get(mime)
+    return spec.ext if spec else None
+
+
+def pillow_format(name: str) -> str:
+    """
+    获取Pillow保存时使用的格式名
+
+    Args:
+        name: 扩展名或别名
+
+    Returns:
+        Pillow格式名，未登记的格式返回大写扩展名
+    """
+    name = normalize_ext(name)
+    return PILLOW_FORMATS.get(name, name.upper())
+
+
+def detect_by_signature(header: bytes) -> Optional[str]:
+    """
+    根据文件头签名识别格式
+
+    Args:
+        header: 文件开头的字节（建议至少 SIGNATURE_READ_SIZE 字节）
+
+    Returns:
+        扩展名或None
+    """
+    for signature, ext in _SIGNATURES:
+        if all(header[offset:offset + len(part)] == part for offset, part in signature):
+            return ext
+    return None
+
+
+def formats_for(category: str, capability: str) -> List[str]:
+    """
+    获取某分类下具备指定能力的格式列表（含别名）
+
+    Args:
+        category: 分类名称
+        capability: 'input' 或 'output'
+
+    Returns:
+        扩展名列表
+    """
+    attr = 'readable' if capability == 'input' else 'writable'
+    return [name for spec in _BY_CATEGORY.get(category, ()) if getattr(spec, attr) for name in spec.names]
+
+
+def expand_format_set(names) -> FrozenSet[str]:
+    """
+    将格式列表转换为包含全部别名的小写集合，用于常数时间查询
+
+    Args:
+        names: 格式名称序列（可以包含 '*'）
+
+    Returns:
+        格式集合
+    """
+    result = set()
+    for name in names:
+        name = normalize_ext(name)
+        spec = _BY_NAME.get(name)
+        if spec:
+            result.update(spec.names)
+        else:
+            result.add(name)
+    return frozenset(result)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+图片编解码能力检测模块
+WebP、AVIF 依赖 Pillow 编译时启用的库（AVIF 也可以由 pillow-avif-plugin 提供），
+启动时检测一次，缺少时从可用格式中去掉，转换时给出明确的错误。
+"""
+
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+from utils.formats import pillow_format
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    from PIL import Image, features
+    HAS_PILLOW = True
+except ImportError:
+    HAS_PILLOW = False
+
+# 需要检测的可选编解码器（Pillow 格式名）
+OPTIONAL_CODECS = ('WEBP', 'AVIF')
+
+
+def _pillow_feature(name: str) -> bool:
+    """Pillow 是否启用了某个模块（旧版本不认识的名称视为未启用）"""
+    try:
+        return bool(features.check_module(name))
+    except (ValueError, KeyError):
+        return False
+
+
+@lru_cache(maxsize=None)
+def probe_image_codecs() -> Dict[str, Optional[str]]:
+    """
+    检测可选图片编解码器
+
+    Returns:
+        {Pillow格式名: 提供者名称}，不可用时提供者为None
+    """
+    if not HAS_PILLOW:
+        return {codec: None for codec in OPTIONAL_CODECS}
+
+    codecs = {'WEBP': 'pillow' if _pillow_feature('webp') else None, 'AVIF': None}
+    if _pillow_feature('avif'):
+        codecs['AVIF'] = 'pillow'
+    else:
+        try:
+            # 只为副作用导入：导入时向 Pillow 注册 AVIF 编解码插件，模块本身不会被使用
+            import pillow_avif  # noqa: F401
+            if 'AVIF' in Image.SAVE:
+                codecs['AVIF'] = 'pillow_avif'
+        except ImportError:
+            pass
+
+    missing = [codec for codec, provider in codecs.items() if provider is None]
+    if missing:
+        logger.info(f"以下图片格式不可用: {', '.join(missing)}（Pillow未启用对应的库）")
+    return codecs
+
+
+def is_codec_available(save_format: str) -> bool:
+    """
+    检查 Pillow 格式是否可以编码
+
+    Args:
+        save_format: Pillow 格式名
+
+    Returns:
+        是否可用（非可选编解码器只要求安装了Pillow）
+    """
+    if save_format not in OPTIONAL_CODECS:
+        return HAS_PILLOW
+    return probe_image_codecs()[save_format] is not None
+
+
+def available_formats(names: Iterable[str]) -> List[str]:
+    """
+    从格式列表中去掉编解码器不可用的格式
+
+    Args:
+        names: 扩展名列表
+
+    Returns:
+        过滤后的扩展名列表
+    """
+    return [name for name in names if is_codec_available(pillow_format(name))]
+
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+图片处理工具模块
+提供与具体转换流程无关的Pillow辅助函数
+"""
+
+from typing import Optional, Sequence, Tuple, Union
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    from PIL import Image, ImageColor
+    HAS_PILLOW = True
+except ImportError:
+    HAS_PILLOW = False
+
+# 去除透明度时默认使用的背景色
+DEFAULT_BACKGROUND = (255, 255, 255)
+
+# resize 时先用整数倍 reduce 缩小，直到剩余缩放比例不超过该值，再做高质量重采样
+DEFAULT_REDUCING_GAP = 3.0
+
+
+def fit_size(size: Tuple[int, int], max_width: Optional[int] = None,
+             max_height: Optional[int] = None) -> Tuple[int, int]:
+    """
+    计算等比缩放后不超过最大宽高的尺寸（不放大）
+
+    Args:
+        size: 原始尺寸 (宽, 高)
+        max_width: 最大宽度
+        max_height: 最大高度
+
+    Returns:
+        目标尺寸 (宽, 高)
+    """
+    width, height = size
+    scale = 1.0
+    if max_width:
+        scale = min(scale, max_width / width)
+    if max_height:
+        scale = min(scale, max_height / height)
+    if scale >= 1.0:
+        return size
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def target_size_from_options(size: Tuple[int, int], options: dict) -> Tuple[int, int]:
+    """
+    根据转换选项计算目标尺寸
+
+    Args:
+        size: 原始尺寸 (宽, 高)
+        options: 转换选项（max_width, max_height, max_dimension）
+
+    Returns:
+        目标尺寸 (宽, 高)
+    """
+    max_dimension = options.get('max_dimension')
+    max_width = options.get('max_width') or max_dimension
+    max_height = options.get('max_height') or max_dimension
+    return fit_size(size, max_width, max_height)
+
+
+def draft_for_size(img, size: Tuple[int, int]):
+    """
+    在解码前请求降采样解码（JPEG 使用 DCT 缩放，解码量按 1/2、1/4、1/8 减少）
+
+    必须在图片加载（load）之前调用，其他格式调用无副作用。
+
+    Args:
+        img: 尚未加载的 Pillow 图片
+        size: 最终需要的尺寸（草稿尺寸不会小于该尺寸）
+    """
+    if img.format == 'JPEG' and size != img.size:
+        img.draft(img.mode, size)
+
+
+def resize_to(img, size: Tuple[int, int], reducing_gap: Optional[float] = DEFAULT_REDUCING_GAP):
+    """
+    缩放图片，先用 Image.reduce 做整数倍盒式缩小，再做 LANCZOS 重采样
+
+    Args:
+        img: Pillow 图片
+        size: 目标尺寸
+        reducing_gap: 传给 Image.resize 的 reducing_gap（None 表示直接重采样）
+
+    Returns:
+        缩放后的图片（尺寸相同时返回原图片）
+    """
+    if img.size == size:
+        return img
+    return img.resize(size, Image.LANCZOS, reducing_gap=reducing_gap)
+
+
+def open_scaled(img, size: Tuple[int, int], reducing_gap: Optional[float] = DEFAULT_REDUCING_GAP):
+    """
+    以尽量低的解码代价得到指定尺寸的图片
+
+    Args:
+        img: 刚打开、尚未加载的 Pillow 图片
+        size: 目标尺寸
+        reducing_gap: reduce 阶段的 reducing_gap
+
+    Returns:
+        指定尺寸的图片
+    """
+    draft_for_size(img, size)
+    return resize_to(img, size, reducing_gap)
+
+
+def shallow_copy(img):
+    """
+    创建共享像素数据的图片对象（不复制位图）
+
+    Image.save 会在图片对象上记录编码参数，多个线程同时保存同一张图片时，
+    各线程应使用各自的浅拷贝。
+
+    Args:
+        img: 已加载的 Pillow 图片
+
+    Returns:
+        新的图片对象
+    """
+    img.load()
+    return img._new(img.im)
+
+
+def parse_color(color: Union[str, Sequence[int], None]) -> Tuple[int, int, int]:
+    """
+    解析背景色
+
+    Args:
+        color: 颜色名称/十六进制字符串（例如 '#ffffff'）或 RGB 序列
+
+    Returns:
+        (R, G, B) 元组
+    """
+    if color is None:
+        return DEFAULT_BACKGROUND
+    if isinstance(color, str):
+        return ImageColor.getrgb(color)[:3]
+    return tuple(int(c) for c in color[:3])
+
+
+def flatten_alpha(img, background: Union[str, Sequence[int], None] = DEFAULT_BACKGROUND):
+    """
+    将带透明度的图片合成到纯色背景上，得到 RGB 图片
+
+    - RGBA / LA：背景图上按 alpha 通道一次 paste 完成合成，不拆分全部通道，LA 不扩展为 RGBA
+    - P：只对最多256个调色板颜色做合成，再查表展开为 RGB，不经过 RGBA 中间图
+    - 其他模式：直接转换为 RGB
+
+    Args:
+        img: Pillow 图片
+        background: 背景色
+
+    Returns:
+        RGB 图片
+    """
+    background = parse_color(background)
+
+    if img.mode == 'P':
+        return _flatten_palette(img, background)
+
+    if img.mode in ('PA', 'RGBa', 'La'):
+        img = img.convert('RGBA')
+
+    if img.mode in ('RGBA', 'LA'):
+        flattened = Image.new('RGB', img.size, background)
+        flattened.paste(img, mask=img.getchannel('A'))
+        return flattened
+
+    return img if img.mode == 'RGB' else img.convert('RGB')
+
+
+def _flatten_palette(img, background: Tuple[int, int, int]):
+    """合成调色板图片的透明色，返回 RGB 图片"""
+    transparency = img.info.get('transparency')
+    palette = img.getpalette('RGBA') or []
+    if transparency is None and all(palette[i] == 255 for i in range(3, len(palette), 4)):
+        return img.convert('RGB')
+
+    # 合并调色板自带的 alpha 与 tRNS 信息
+    alphas = palette[3::4]
+    if isinstance(transparency, int):
+        if transparency < len(alphas):
+            alphas[transparency] = 0
+    elif isinstance(transparency, (bytes, bytearray)):
+        for index, alpha in enumerate(transparency[:len(alphas)]):
+            alphas[index] = min(alphas[index], alpha)
+
+    flat_palette = []
+    for index, alpha in enumerate(alphas):
+        for channel in range(3):
+            color = palette[index * 4 + channel]
+            flat_palette.append((color * alpha + background[channel] * (255 - alpha) + 127) // 255)
+
+    # 只复制索引数据（每像素1字节），再按新调色板查表展开
+    flattened = img.copy()
+    flattened.info.pop('transparency', None)
+    flattened.putpalette(flat_palette)
+    return flattened.convert('RGB')
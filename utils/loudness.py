@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+响度测量模块
+按 ITU-R BS.1770 / EBU R128 测量综合响度（LUFS）：K 计权滤波、400ms 块（重叠75%）、
+绝对门限 -70 LUFS 和相对门限 -10 LU。数据按块输入，内存占用与时长无关。
+K 计权滤波在有 SciPy 时使用 lfilter，否则用 NumPy 按子块做状态空间矩阵运算（逐采样的递推
+只在子块之间进行）。
+"""
+
+import math
+from typing import Any, Dict, List, Optional, Tuple
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+try:
+    from scipy.signal import lfilter
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+# EBU R128 的目标响度；ReplayGain 2.0 的参考响度为 -18 LUFS
+DEFAULT_TARGET_LUFS = -23.0
+# 归一化后允许的最大采样峰值（dBFS）
+DEFAULT_PEAK_DB = -1.0
+
+# 门限
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+
+# 块长 400ms，步长 100ms
+_STEP_SECONDS = 0.1
+_STEPS_PER_BLOCK = 4
+
+# 5.1 声道（FL FR FC LFE BL BR）的权重，其他布局各声道权重为1
+_WEIGHTS_51 = (1.0, 1.0, 1.0, 0.0, 1.41, 1.41)
+
+# NumPy 滤波的子块长度
+_SUB_BLOCK = 256
+
+
+def k_weighting(sample_rate: int) -> List[Tuple[List[float], List[float]]]:
+    """
+    计算 K 计权滤波器的系数
+
+    Args:
+        sample_rate: 采样率
+
+    Returns:
+        [(b, a), (b, a)]，依次为高架滤波和高通滤波两个二阶节（分开计算比合并为四阶滤波器数值上更稳定）
+    """
+    # 第一级：高架滤波（模拟头部的声学效应）
+    k = math.tan(math.pi * 1681.974450955533 / sample_rate)
+    q = 0.7071752369554196
+    vh = 10 ** (3.999843853973347 / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    b1 = [(vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0]
+    a1 = [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+
+    # 第二级：RLB 高通滤波
+    k = math.tan(math.pi * 38.13547087602444 / sample_rate)
+    q = 0.5003270373238773
+    a0 = 1 + k / q + k * k
+    b2 = [1.0, -2.0, 1.0]
+    a2 = [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+    return [(b1, a1), (b2, a2)]
+
+
+class BlockFilter:
+    """
+    分块 IIR 滤波器（各声道独立，块之间保留状态）
+
+    NumPy 实现把输入分为长度 M 的子块，用状态空间形式
+        y = O·s + T·x,  s' = A^M·s + G·x
+    一次矩阵乘法算出所有子块的输出，只有状态 s 需要在子块之间依次递推。
+    """
+
+    def __init__(self, b, a, channels: int):
+        """
+        Args:
+            b, a: 滤波器系数（a[0] 为1）
+            channels: 声道数
+        """
+        self.b = np.asarray(b, dtype=np.float64)
+        self.a = np.asarray(a, dtype=np.float64)
+        order = len(self.a) - 1
+        self.channels = channels
+        if HAS_SCIPY:
+            self._zi = np.zeros((order, channels))
+            return
+
+        # 直接 II 型转置结构的状态空间矩阵
+        A = np.zeros((order, order))
+        A[:, 0] = -self.a[1:]
+        A[:-1, 1:] = np.eye(order - 1)
+        B = self.b[1:] - self.a[1:] * self.b[0]
+        C = np.zeros(order)
+        C[0] = 1.0
+
+        powers = [np.eye(order)]
+        for _ in range(_SUB_BLOCK):
+            powers.append(A @ powers[-1])
+        # O[m] = C·A^m，h[0] = D，h[q] = C·A^(q-1)·B
+        self._observe = np.array([C @ powers[m] for m in range(_SUB_BLOCK)])
+        impulse = np.concatenate([[self.b[0]], [C @ powers[q - 1] @ B for q in range(1, _SUB_BLOCK)]])
+        index = np.arange(_SUB_BLOCK)
+        lags = index[:, None] - index[None, :]
+        self._toeplitz = np.where(lags >= 0, impulse[np.clip(lags, 0, None)], 0.0)
+        # G[:, j] = A^(M-1-j)·B
+        self._advance = powers[_SUB_BLOCK]
+        self._gain = np.stack([powers[_SUB_BLOCK - 1 - j] @ B for j in range(_SUB_BLOCK)], axis=1)
+        self._state = np.zeros((channels, order))
+        self._pending = np.zeros((0, channels))
+
+    def process(self, block):
+        """
+        滤波一块数据
+
+        Args:
+            block: 形状为 (帧数, 声道数) 的数组
+
+        Returns:
+            滤波结果（NumPy 实现每次输出整数个子块，余下的帧留到下一块）
+        """
+        if HAS_SCIPY:
+            output, self._zi = lfilter(self.b, self.a, block, axis=0, zi=self._zi)
+            return output
+
+        if len(self._pending):
+            block = np.concatenate([self._pending, block])
+        usable = len(block) // _SUB_BLOCK * _SUB_BLOCK
+        self._pending = block[usable:]
+        if usable == 0:
+            return np.zeros((0, self.channels))
+
+        # 排列为 (声道数, 子块数, M)，每个子块是一行
+        count = usable // _SUB_BLOCK
+        x = np.ascontiguousarray(block[:usable].T).reshape(self.channels, count, _SUB_BLOCK)
+        contributions = x @ self._gain.T
+        states = np.empty((self.channels, count, len(self._advance)))
+        state = self._state
+        advance = self._advance.T
+        for i in range(count):
+            states[:, i] = state
+            state = state @ advance + contributions[:, i]
+        self._state = state
+        y = states @ self._observe.T + x @ self._toeplitz.T
+        return y.reshape(self.channels, usable).T
+
+
+class LoudnessMeter:
+    """
+    综合响度测量
+
+    示例:
+        meter = LoudnessMeter(48000, 2)
+        for block in blocks:
+            meter.process(block)
+        print(meter.integrated, meter.peak_db)
+    """
+
+    def __init__(self, sample_rate: int, channels: int):
+        """
+        Args:
+            sample_rate: 采样率
+            channels: 声道数
+        """
+        if not HAS_NUMPY:
+            raise ImportError("响度测量需要numpy库")
+        self._filters = [BlockFilter(b, a, channels) for b, a in k_weighting(sample_rate)]
+        self._step = int(round(sample_rate * _STEP_SECONDS))
+        self._weights = np.array(_WEIGHTS_51 if channels == 6 else (1.0,) * channels)
+        self._pending = np.zeros((0, channels))
+        # 每 100ms 的各声道加权均方值
+        self._steps = []
+        self._peak = 0.0
+
+    def process(self, block):
+        """
+        输入一块数据
+
+        Args:
+            block: 形状为 (帧数, 声道数) 的浮点数组（满幅为1）
+        """
+        if len(block):
+            self._peak = max(self._peak, float(np.abs(block).max()))
+        filtered = block
+        for block_filter in self._filters:
+            filtered = block_filter.process(filtered)
+        if len(self._pending):
+            filtered = np.concatenate([self._pending, filtered])
+        usable = len(filtered) // self._step * self._step
+        self._pending = filtered[usable:]
+        if usable:
+            squares = np.square(filtered[:usable]).reshape(-1, self._step, filtered.shape[1]).mean(axis=1)
+            self._steps.append(squares @ self._weights)
+
+    @property
+    def integrated(self) -> Optional[float]:
+        """综合响度（LUFS），有效数据不足一个块或全部低于门限时为None"""
+        if not self._steps:
+            return None
+        steps = np.concatenate(self._steps)
+        if len(steps) < _STEPS_PER_BLOCK:
+            return None
+        # 400ms 块 = 连续4个 100ms 的平均
+        blocks = np.convolve(steps, np.full(_STEPS_PER_BLOCK, 1.0 / _STEPS_PER_BLOCK), mode='valid')
+        with np.errstate(divide='ignore'):
+            loudness = -0.691 + 10 * np.log10(blocks)
+        gated = blocks[loudness > ABSOLUTE_GATE]
+        if not len(gated):
+            return None
+        relative = -0.691 + 10 * math.log10(gated.mean()) + RELATIVE_GATE
+        gated = blocks[(loudness > ABSOLUTE_GATE) & (loudness > relative)]
+        return -0.691 + 10 * math.log10(gated.mean())
+
+    @property
+    def peak_db(self) -> float:
+        """采样峰值（dBFS）"""
+        return 20 * math.log10(self._peak) if self._peak > 0 else -math.inf
+
+
+def normalization_gain(meter: LoudnessMeter, target_lufs: float = DEFAULT_TARGET_LUFS,
+                       peak_db: Optional[float] = DEFAULT_PEAK_DB) -> float:
+    """
+    计算把响度调整到目标值所需的增益
+
+    Args:
+        meter: 已输入全部数据的响度测量
+        target_lufs: 目标响度（LUFS）
+        peak_db: 增益后允许的最大采样峰值（dBFS），为None时不限制
+
+    Returns:
+        增益（dB），无法测量响度（静音或过短）时为0
+    """
+    loudness = meter.integrated
+    if loudness is None:
+        return 0.0
+    gain = target_lufs - loudness
+    if peak_db is not None and math.isfinite(meter.peak_db):
+        gain = min(gain, peak_db - meter.peak_db)
+    return gain
+
+
+def wants_normalization(options: Optional[Dict[str, Any]]) -> bool:
+    """
+    判断转换选项是否要求响度归一化
+
+    Args:
+        options: 转换选项
+
+    Returns:
+        是否需要（没有numpy时记录警告并返回False）
+    """
+    if not options or not options.get('normalize'):
+        return False
+    if not HAS_NUMPY:
+        logger.warning("响度归一化需要numpy库，已跳过")
+        return False
+    return True
+
+
+def normalized_options(options: Dict[str, Any], meter: LoudnessMeter) -> Dict[str, Any]:
+    """
+    根据测量结果把归一化增益合并到转换选项的 gain_db 中
+
+    Args:
+        options: 转换选项
+            target_lufs: 目标响度（默认 -23 LUFS）
+            peak_db: 最大采样峰值（默认 -1 dBFS）
+            gain_db: 额外增益（dB），在归一化增益之上叠加
+        meter: 已输入全部数据的响度测量
+
+    Returns:
+        新的转换选项
+    """
+    gain = normalization_gain(meter, float(options.get('target_lufs', DEFAULT_TARGET_LUFS)),
+                              options.get('peak_db', DEFAULT_PEAK_DB))
+    loudness = meter.integrated
+    if loudness is None:
+        logger.info("音频过短或为静音，不做响度归一化")
+    else:
+        logger.info(f"响度 {loudness:.1f} LUFS，峰值 {meter.peak_db:.1f} dBFS，归一化增益 {gain:+.2f} dB")
+    return dict(options, gain_db=float(options.get('gain_db', 0)) + gain)
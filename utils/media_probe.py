@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+媒体探测模块
+获取音视频文件的封装格式、时长和各个流的编码参数，用于判断能否直接复制流（不重新编码）。
+优先使用 ffprobe 的 JSON 输出，没有 ffprobe 时解析 ffmpeg -i 打印的流信息。
+探测结果按文件身份 (st_dev, st_ino, size, mtime_ns) 保存在检测缓存中，文件不变时不再启动 ffprobe；
+批量探测时多个文件并行探测。
+"""
+
+import json
+import os
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from utils.detect_cache import get_detection_cache
+from utils.ffmpeg_utils import FFmpegError, find_ffmpeg, find_ffprobe, parse_duration
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 探测超时（秒）
+PROBE_TIMEOUT = 30
+
+# 检测缓存中探测结果的命名空间，以及缓存格式版本（StreamInfo、MediaInfo 字段变化时递增）
+PROBE_CACHE_NAMESPACE = 'probe'
+PROBE_CACHE_VERSION = 2
+
+# 批量探测的默认线程数（探测以等待 ffprobe 子进程为主）
+DEFAULT_PROBE_WORKERS = 8
+
+# 声道布局名称 -> 声道数
+CHANNEL_LAYOUTS = {
+    'mono': 1, 'stereo': 2, '2.1': 3, '3.0': 3, 'quad': 4, '4.0': 4,
+    '5.0': 5, '5.0(side)': 5, '5.1': 6, '5.1(side)': 6, '6.1': 7, '7.1': 8,
+}
+
+_STREAM_PATTERN = re.compile(
+    r'Stream #\d+:(\d+)(?:\[\w+\])?(?:\([^)]*\))?: (Audio|Video|Subtitle|Data|Attachment): (\w+)(.*)'
+)
+_INPUT_PATTERN = re.compile(r'Input #\d+, (.+), from ')
+_BITRATE_PATTERN = re.compile(r'(\d+) kb/s')
+_SAMPLE_RATE_PATTERN = re.compile(r'(\d+) Hz, ([^,]+)')
+_SAMPLE_FMT_PATTERN = re.compile(r' Hz, [^,]+, (\w+)(?: \((\d+) bit\))?')
+_SIZE_PATTERN = re.compile(r', (\d{2,5})x(\d{2,5})')
+_FPS_PATTERN = re.compile(r'([\d.]+) fps')
+_PIX_FMT_PATTERN = re.compile(r', (\w+)(?:\([^)]*\))?, \d{2,5}x\d{2,5}')
+
+
+class StreamInfo(NamedTuple):
+    """单个流的信息"""
+    index: int
+    codec_type: str
+    codec_name: str
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    bit_rate: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    frame_rate: Optional[float] = None
+    pix_fmt: Optional[str] = None
+    attached_pic: bool = False
+    sample_fmt: Optional[str] = None
+    bits_per_sample: Optional[int] = None
+
+
+class MediaInfo(NamedTuple):
+    """媒体文件信息"""
+    format_name: str
+    duration: Optional[float]
+    bit_rate: Optional[int]
+    streams: Tuple[StreamInfo, ...]
+
+    def streams_of(self, codec_type: str) -> List[StreamInfo]:
+        """
+        获取指定类型的流（视频流不包含封面图片）
+
+        Args:
+            codec_type: 'audio'、'video'、'subtitle' 等
+
+        Returns:
+            流列表
+        """
+        return [s for s in self.streams if s.codec_type == codec_type and not s.attached_pic]
+
+    @property
+    def audio(self) -> Optional[StreamInfo]:
+        """第一个音频流"""
+        streams = self.streams_of('audio')
+        return streams[0] if streams else None
+
+    @property
+    def video(self) -> Optional[StreamInfo]:
+        """第一个视频流（不含封面图片）"""
+        streams = self.streams_of('video')
+        return streams[0] if streams else None
+
+
+def _to_int(value) -> Optional[int]:
+    """转换为整数，无效值返回None"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value) -> Optional[float]:
+    """转换为浮点数，无效值返回None"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_rate(value: Optional[str]) -> Optional[float]:
+    """解析 ffprobe 的帧率（例如 '30000/1001'）"""
+    if not value or value == '0/0':
+        return None
+    numerator, _, denominator = value.partition('/')
+    try:
+        return float(numerator) / float(denominator or 1)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def _from_ffprobe(data: Dict[str, Any]) -> MediaInfo:
+    """从 ffprobe 的 JSON 输出构造媒体信息"""
+    streams = []
+    for stream in data.get('streams', []):
+        streams.append(StreamInfo(
+            index=stream.get('index', len(streams)),
+            codec_type=stream.get('codec_type', ''),
+            codec_name=stream.get('codec_name', ''),
+            sample_rate=_to_int(stream.get('sample_rate')),
+            channels=_to_int(stream.get('channels')),
+            bit_rate=_to_int(stream.get('bit_rate')),
+            width=_to_int(stream.get('width')),
+            height=_to_int(stream.get('height')),
+            frame_rate=_parse_rate(stream.get('avg_frame_rate')) or _parse_rate(stream.get('r_frame_rate')),
+            pix_fmt=stream.get('pix_fmt'),
+            attached_pic=bool(stream.get('disposition', {}).get('attached_pic')),
+            sample_fmt=stream.get('sample_fmt'),
+            # 无损编码的有效位深（有损编码为0）
+            bits_per_sample=_to_int(stream.get('bits_per_raw_sample')) or _to_int(stream.get('bits_per_sample')) or None,
+        ))
+    fmt = data.get('format', {})
+    return MediaInfo(
+        format_name=fmt.get('format_name', ''),
+        duration=_to_float(fmt.get('duration')),
+        bit_rate=_to_int(fmt.get('bit_rate')),
+        streams=tuple(streams),
+    )
+
+
+def parse_ffmpeg_info(text: str) -> MediaInfo:
+    """
+    解析 ffmpeg -i 打印的输入信息
+
+    Args:
+        text: ffmpeg 的 stderr 输出
+
+    Returns:
+        媒体信息
+    """
+    format_name, duration, bit_rate = '', None, None
+    streams = []
+    for line in text.splitlines():
+        match = _INPUT_PATTERN.search(line)
+        if match and not format_name:
+            format_name = match.group(1).replace(' ', '')
+            continue
+
+        if 'Duration:' in line and duration is None:
+            duration = parse_duration(line)
+            bitrate_match = _BITRATE_PATTERN.search(line)
+            bit_rate = int(bitrate_match.group(1)) * 1000 if bitrate_match else None
+            continue
+
+        match = _STREAM_PATTERN.search(line)
+        if not match:
+            continue
+        index, codec_type, codec_name, rest = match.groups()
+        stream = {'index': int(index), 'codec_type': codec_type.lower(), 'codec_name': codec_name}
+        bitrate_match = _BITRATE_PATTERN.search(rest)
+        if bitrate_match:
+            stream['bit_rate'] = int(bitrate_match.group(1)) * 1000
+        if codec_type == 'Audio':
+            rate_match = _SAMPLE_RATE_PATTERN.search(rest)
+            if rate_match:
+                stream['sample_rate'] = int(rate_match.group(1))
+                layout = rate_match.group(2).strip()
+                channels_match = re.match(r'(\d+) channels', layout)
+                stream['channels'] = int(channels_match.group(1)) if channels_match else CHANNEL_LAYOUTS.get(layout)
+            fmt_match = _SAMPLE_FMT_PATTERN.search(rest)
+            if fmt_match:
+                stream['sample_fmt'] = fmt_match.group(1)
+                stream['bits_per_sample'] = _to_int(fmt_match.group(2))
+        elif codec_type == 'Video':
+            size_match = _SIZE_PATTERN.search(rest)
+            if size_match:
+                stream['width'], stream['height'] = int(size_match.group(1)), int(size_match.group(2))
+            fps_match = _FPS_PATTERN.search(rest)
+            if fps_match:
+                stream['frame_rate'] = float(fps_match.group(1))
+            pix_fmt_match = _PIX_FMT_PATTERN.search(rest)
+            if pix_fmt_match:
+                stream['pix_fmt'] = pix_fmt_match.group(1)
+            stream['attached_pic'] = '(attached pic)' in rest
+        streams.append(StreamInfo(**stream))
+
+    return MediaInfo(format_name, duration, bit_rate, tuple(streams))
+
+
+def _dump_info(info: MediaInfo) -> str:
+    """把媒体信息序列化为缓存值（JSON）"""
+    return json.dumps({
+        'version': PROBE_CACHE_VERSION,
+        'format_name': info.format_name,
+        'duration': info.duration,
+        'bit_rate': info.bit_rate,
+        'streams': [stream._asdict() for stream in info.streams],
+    }, separators=(',', ':'))
+
+
+def _load_info(value: Optional[str]) -> Optional[MediaInfo]:
+    """从缓存值恢复媒体信息，格式版本不符或无法解析时返回None"""
+    try:
+        data = json.loads(value)
+        if data.get('version') != PROBE_CACHE_VERSION:
+            return None
+        streams = tuple(StreamInfo(**stream) for stream in data['streams'])
+        return MediaInfo(data['format_name'], data['duration'], data['bit_rate'], streams)
+    except (TypeError, ValueError, KeyError, AttributeError):
+        return None
+
+
+def probe_media(path: str, st: Optional[os.stat_result] = None, use_cache: bool = True) -> MediaInfo:
+    """
+    探测媒体文件（结果按文件身份缓存）
+
+    Args:
+        path: 文件路径
+        st: 已有的stat结果（可选，避免重复stat）
+        use_cache: 是否使用检测缓存
+
+    Returns:
+        媒体信息
+
+    Raises:
+        FFmpegError: 没有可用的 ffprobe / ffmpeg，或文件无法识别
+        OSError: 文件不存在或无法访问
+    """
+    cache = get_detection_cache() if use_cache else None
+    if cache is None:
+        return _run_probe(path)
+
+    if st is None:
+        st = os.stat(path)
+    hit, value = cache.get(st, PROBE_CACHE_NAMESPACE)
+    info = _load_info(value) if hit else None
+    if info is not None:
+        return info
+
+    info = _run_probe(path)
+    cache.put(st, _dump_info(info), PROBE_CACHE_NAMESPACE)
+    return info
+
+
+def probe_many(paths: Sequence[str], stats: Optional[Sequence[os.stat_result]] = None,
+               max_workers: int = DEFAULT_PROBE_WORKERS) -> List[Optional[MediaInfo]]:
+    """
+    并行探测多个媒体文件（已缓存的直接返回）
+
+    Args:
+        paths: 文件路径列表
+        stats: 与 paths 对应的stat结果（可选）
+        max_workers: 探测线程数
+
+    Returns:
+        与 paths 对应的媒体信息列表，无法探测的文件为None
+    """
+    def probe(index: int) -> Optional[MediaInfo]:
+        try:
+            return probe_media(paths[index], stats[index] if stats is not None else None)
+        except (FFmpegError, OSError, subprocess.TimeoutExpired) as e:
+            logger.debug(f"媒体探测失败: {paths[index]}: {str(e)}")
+            return None
+
+    if len(paths) <= 1:
+        return [probe(i) for i in range(len(paths))]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(paths)), thread_name_prefix='probe') as executor:
+        return list(executor.map(probe, range(len(paths))))
+
+
+def parse_ffmetadata(text: str) -> Dict[str, str]:
+    """
+    解析 ffmpeg 的 ffmetadata 输出中的全局标签（章节等分节内容忽略）
+
+    Args:
+        text: ffmetadata 文本
+
+    Returns:
+        标签字典（键为小写）
+    """
+    tags = {}
+    # 换行、'='、';'、'#' 和反斜杠都以反斜杠转义，按未转义的换行分行
+    for line in (m.group() for m in re.finditer(r'(?:[^\\\n]|\\.)+', text, re.DOTALL)):
+        if line.startswith('['):
+            break
+        if line[0] in ';#':
+            continue
+        match = re.match(r'((?:[^\\=]|\\.)*)=(.*)', line, re.DOTALL)
+        if match:
+            key, value = (re.sub(r'\\(.)', r'\1', part, flags=re.DOTALL) for part in match.groups())
+            tags[key.lower()] = value
+    return tags
+
+
+def probe_tags(path: str) -> Dict[str, str]:
+    """
+    读取媒体文件的全局标签（不含 ffmpeg 写出时自动添加的 encoder）
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        标签字典（键为小写），没有标签时为空字典
+
+    Raises:
+        FFmpegError: 未找到 ffmpeg 或无法读取
+    """
+    ffmpeg = find_ffmpeg()
+    if ffmpeg is None:
+        raise FFmpegError("未找到ffmpeg")
+    result = subprocess.run([ffmpeg, '-hide_banner', '-nostdin', '-i', path, '-f', 'ffmetadata', '-'],
+                            capture_output=True, timeout=PROBE_TIMEOUT)
+    if result.returncode != 0:
+        raise FFmpegError(f"无法读取标签 {path}: {result.stderr.decode('utf-8', errors='replace').strip()}")
+    tags = parse_ffmetadata(result.stdout.decode('utf-8', errors='replace'))
+    tags.pop('encoder', None)
+    return tags
+
+
+def _run_probe(path: str) -> MediaInfo:
+    """启动 ffprobe（或 ffmpeg -i）探测媒体文件"""
+    ffprobe = find_ffprobe()
+    if ffprobe:
+        result = subprocess.run(
+            [ffprobe, '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path],
+            capture_output=True, timeout=PROBE_TIMEOUT
+        )
+        if result.returncode != 0:
+            raise FFmpegError(f"无法探测媒体文件 {path}: {result.stderr.decode('utf-8', errors='replace').strip()}")
+        return _from_ffprobe(json.loads(result.stdout or b'{}'))
+
+    ffmpeg = find_ffmpeg()
+    if ffmpeg is None:
+        raise FFmpegError("未找到ffprobe或ffmpeg")
+    # 不指定输出时 ffmpeg 打印输入信息后以错误码退出，这是预期行为
+    result = subprocess.run([ffmpeg, '-hide_banner', '-nostdin', '-i', path],
+                            capture_output=True, timeout=PROBE_TIMEOUT)
+    info = parse_ffmpeg_info(result.stderr.decode('utf-8', errors='replace'))
+    if not info.format_name:
+        raise FFmpegError(f"无法探测媒体文件 {path}")
+    return info
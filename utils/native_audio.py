@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+原生 WAV/FLAC 处理模块
+不启动 ffmpeg，在进程内读写 WAV（标准库 wave）和 FLAC（soundfile / libsndfile），
+位深、声道混缩、增益、重采样和响度测量按块用 NumPy 向量化计算。大量短音效批量转换时，
+省去每个文件启动 ffmpeg 进程的开销。
+"""
+
+import os
+import tempfile
+import time
+import wave
+from typing import Any, Dict, Optional
+from utils.logger import get_logger
+from utils.loudness import LoudnessMeter, normalized_options, wants_normalization
+from utils.progress import ProgressCallback, report_progress
+from utils.resample import DEFAULT_RESAMPLER, StreamingResampler
+
+logger = get_logger(__name__)
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+try:
+    import soundfile
+    HAS_SOUNDFILE = True
+except (ImportError, OSError):
+    # OSError: 已安装 soundfile 但缺少 libsndfile
+    HAS_SOUNDFILE = False
+
+# 每块的采样帧数
+BLOCK_FRAMES = 65536
+
+# 支持的位深（字节数）
+SAMPLE_WIDTHS = (1, 2, 3, 4)
+
+# soundfile 的 subtype <-> 字节数
+_SUBTYPES = {1: 'PCM_U8', 2: 'PCM_16', 3: 'PCM_24', 4: 'PCM_32'}
+_SUBTYPE_WIDTHS = {'PCM_U8': 1, 'PCM_S8': 1, 'PCM_16': 2, 'PCM_24': 3, 'PCM_32': 4, 'FLOAT': 4, 'DOUBLE': 4}
+
+# FLAC 最大支持 24 位
+_FLAC_MAX_WIDTH = 3
+
+# 多声道混缩为立体声的系数（ITU-R BS.775：中置和环绕声道以 -3 dB 分到两侧，丢弃 LFE），
+# 按 WAV / FLAC 的默认声道顺序，每个声道为 (左, 右)
+_C = 0.7071
+_DOWNMIX = {
+    3: ((1, 0), (0, 1), (_C, _C)),                                           # FL FR FC
+    4: ((1, 0), (0, 1), (_C, 0), (0, _C)),                                   # FL FR BL BR
+    5: ((1, 0), (0, 1), (_C, _C), (_C, 0), (0, _C)),                         # FL FR FC BL BR
+    6: ((1, 0), (0, 1), (_C, _C), (0, 0), (_C, 0), (0, _C)),                 # 5.1: FL FR FC LFE BL BR
+    7: ((1, 0), (0, 1), (_C, _C), (0, 0), (_C, _C), (_C, 0), (0, _C)),       # 6.1: FL FR FC LFE BC SL SR
+    8: ((1, 0), (0, 1), (_C, _C), (0, 0), (_C, 0), (0, _C), (_C, 0), (0, _C)),  # 7.1: ... BL BR SL SR
+}
+
+
+class NativeAudioError(Exception):
+    """输入无法在进程内处理（例如浮点 WAV 且没有 soundfile），需要改用 ffmpeg"""
+
+
+def native_formats():
+    """
+    获取可以在进程内读写的格式
+
+    Returns:
+        扩展名集合
+    """
+    if not HAS_NUMPY:
+        return frozenset()
+    return frozenset(('wav', 'flac')) if HAS_SOUNDFILE else frozenset(('wav',))
+
+
+def can_convert_natively(source_format: str, target_format: str, options: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    判断转换能否在进程内完成
+
+    Args:
+        source_format: 源格式
+        target_format: 目标格式
+        options: 转换选项（指定码率或要求用 ffmpeg 重采样时不能在进程内完成）
+
+    Returns:
+        是否可以
+    """
+    options = options or {}
+    formats = native_formats()
+    if source_format not in formats or target_format not in formats:
+        return False
+    if options.get('bitrate'):
+        return False
+    if options.get('sample_rate') and options.get('resampler', DEFAULT_RESAMPLER) != 'polyphase':
+        return False
+    channels = options.get('channels')
+    return not channels or int(channels) in (1, 2)
+
+
+class _WaveReader:
+    """用标准库 wave 读取整数 PCM 的 WAV"""
+
+    def __init__(self, path: str):
+        try:
+            self._file = wave.open(path, 'rb')
+        except (wave.Error, EOFError) as e:
+            # 浮点、WAVE_FORMAT_EXTENSIBLE 等 wave 不支持的格式
+            raise NativeAudioError(str(e))
+        self.channels = self._file.getnchannels()
+        self.sample_rate = self._file.getframerate()
+        self.sample_width = self._file.getsampwidth()
+        self.frames = self._file.getnframes()
+        if self.sample_width not in SAMPLE_WIDTHS:
+            self._file.close()
+            raise NativeAudioError(f"不支持的位深: {self.sample_width * 8}")
+
+    def read(self, frames: int):
+        return pcm_to_float(self._file.readframes(frames), self.sample_width, self.channels)
+
+    def close(self):
+        self._file.close()
+
+
+class _SoundFileReader:
+    """用 soundfile 读取 WAV / FLAC"""
+
+    def __init__(self, path: str):
+        try:
+            self._file = soundfile.SoundFile(path)
+        except RuntimeError as e:
+            raise NativeAudioError(str(e))
+        self.channels = self._file.channels
+        self.sample_rate = self._file.samplerate
+        self.sample_width = _SUBTYPE_WIDTHS.get(self._file.subtype, 2)
+        self.frames = self._file.frames
+
+    def read(self, frames: int):
+        return self._file.read(frames, dtype='float64', always_2d=True)
+
+    def close(self):
+        self._file.close()
+
+
+class _WaveWriter:
+    """用标准库 wave 写出整数 PCM 的 WAV"""
+
+    def __init__(self, path: str, sample_rate: int, channels: int, sample_width: int):
+        self._file = wave.open(path, 'wb')
+        self._file.setnchannels(channels)
+        self._file.setsampwidth(sample_width)
+        self._file.setframerate(sample_rate)
+        self.sample_width = sample_width
+
+    def write(self, block):
+        self._file.writeframes(float_to_pcm(block, self.sample_width))
+
+    def close(self):
+        self._file.close()
+
+
+class _SoundFileWriter:
+    """用 soundfile 写出 WAV / FLAC"""
+
+    def __init__(self, path: str, target_format: str, sample_rate: int, channels: int, sample_width: int):
+        subtype = _SUBTYPES[sample_width]
+        if target_format == 'flac' and subtype == 'PCM_U8':
+            subtype = 'PCM_S8'
+        self._file = soundfile.SoundFile(path, 'w', sample_rate, channels, subtype=subtype,
+                                         format=target_format.upper())
+
+    def write(self, block):
+        self._file.write(block)
+
+    def close(self):
+        self._file.close()
+
+
+def _open_reader(path: str, source_format: str):
+    """打开输入，WAV 优先使用标准库"""
+    if source_format == 'wav':
+        try:
+            return _WaveReader(path)
+        except NativeAudioError:
+            if not HAS_SOUNDFILE:
+                raise
+    if not HAS_SOUNDFILE:
+        raise NativeAudioError(f"读取 {source_format} 需要soundfile库")
+    return _SoundFileReader(path)
+
+
+def pcm_to_float(data: bytes, sample_width: int, channels: int):
+    """
+    把整数 PCM 转换为 [-1, 1) 范围的浮点数组
+
+    Args:
+        data: 小端整数 PCM（8 位为无符号）
+        sample_width: 每个采样的字节数
+        channels: 声道数
+
+    Returns:
+        形状为 (帧数, 声道数) 的 float64 数组
+    """
+    if sample_width == 1:
+        samples = np.frombuffer(data, dtype=np.uint8).astype(np.float64) - 128.0
+    elif sample_width == 3:
+        # 24 位：拼到 32 位整数的高 24 位，保留符号
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        padded = np.zeros((raw.shape[0], 4), dtype=np.uint8)
+        padded[:, 1:] = raw
+        samples = (padded.view('<i4').ravel() >> 8).astype(np.float64)
+    else:
+        samples = np.frombuffer(data, dtype='<i2' if sample_width == 2 else '<i4').astype(np.float64)
+    return samples.reshape(-1, channels) / float(1 << (sample_width * 8 - 1))
+
+
+def float_to_pcm(block, sample_width: int) -> bytes:
+    """
+    把浮点数组转换为整数 PCM（四舍五入并限幅）
+
+    Args:
+        block: 形状为 (帧数, 声道数) 的浮点数组
+        sample_width: 每个采样的字节数
+
+    Returns:
+        小端整数 PCM（8 位为无符号）
+    """
+    scale = float(1 << (sample_width * 8 - 1))
+    samples = np.clip(np.rint(block * scale), -scale, scale - 1)
+    if sample_width == 1:
+        return (samples + 128).astype(np.uint8).tobytes()
+    if sample_width == 2:
+        return samples.astype('<i2').tobytes()
+    ints = samples.astype('<i4')
+    if sample_width == 4:
+        return ints.tobytes()
+    return ints.reshape(-1, 1).view(np.uint8)[:, :3].tobytes()
+
+
+def downmix_matrix(source_channels: int):
+    """
+    获取多声道混缩为立体声的矩阵（与 ffmpeg 相同，按每侧系数之和归一化，避免削波）
+
+    Args:
+        source_channels: 输入声道数（3~8）
+
+    Returns:
+        形状为 (source_channels, 2) 的数组
+
+    Raises:
+        NativeAudioError: 声道数没有对应的默认布局，需要改用 ffmpeg
+    """
+    if source_channels not in _DOWNMIX:
+        raise NativeAudioError(f"不支持混缩 {source_channels} 声道")
+    matrix = np.array(_DOWNMIX[source_channels], dtype=np.float64)
+    return matrix / matrix.sum(axis=0)
+
+
+def remix_channels(block, channels: int):
+    """
+    改变声道数（立体声混缩为单声道取平均，多声道先按 downmix_matrix 混缩为立体声，单声道扩展为多声道复制）
+
+    Args:
+        block: 形状为 (帧数, 声道数) 的数组
+        channels: 目标声道数
+
+    Returns:
+        形状为 (帧数, channels) 的数组
+    """
+    source_channels = block.shape[1]
+    if channels == source_channels:
+        return block
+    if source_channels == 1:
+        return np.repeat(block, channels, axis=1)
+    if source_channels > 2 and channels in (1, 2):
+        block = block @ downmix_matrix(source_channels)
+        if channels == 2:
+            return block
+    if channels == 1:
+        return block.mean(axis=1, keepdims=True)
+    raise NativeAudioError(f"不支持 {source_channels} 声道转换为 {channels} 声道")
+
+
+def _read_spool(spool, channels: int):
+    """从头读出暂存的 float64 数据块，读完后关闭临时文件"""
+    spool.seek(0)
+    with spool:
+        while True:
+            data = spool.read(BLOCK_FRAMES * channels * 8)
+            if not data:
+                return
+            yield np.frombuffer(data, dtype=np.float64).reshape(-1, channels)
+
+
+def convert_native(input_path: str, output_path: str, source_format: str, target_format: str,
+                   options: Optional[Dict[str, Any]] = None,
+                   progress_callback: Optional[ProgressCallback] = None) -> float:
+    """
+    在进程内转换 WAV / FLAC
+
+    Args:
+        input_path: 输入文件路径
+        output_path: 输出文件路径
+        source_format: 源格式（wav、flac）
+        target_format: 目标格式（wav、flac）
+        options: 转换选项
+            sample_width: 输出位深（字节数 1~4，默认与输入相同）
+            channels: 输出声道数（1 或 2，默认与输入相同）
+            sample_rate: 输出采样率（默认与输入相同，多相滤波重采样）
+            gain_db: 增益（dB）
+            normalize / target_lufs / peak_db: 响度归一化（见 utils.loudness.normalized_options）
+            chunk_frames: 每块的采样帧数（默认 BLOCK_FRAMES）
+        progress_callback: 进度回调，每块报告一次（单位为秒）
+
+    Returns:
+        处理的音频时长（秒，按输入计）
+
+    Raises:
+        NativeAudioError: 输入无法在进程内处理，需要改用 ffmpeg
+    """
+    options = options or {}
+    reader = _open_reader(input_path, source_format)
+    writer = None
+    try:
+        channels = int(options.get('channels') or reader.channels)
+        sample_width = int(options.get('sample_width') or reader.sample_width)
+        if sample_width not in SAMPLE_WIDTHS:
+            raise NativeAudioError(f"不支持的输出位深: {sample_width * 8}")
+        if target_format == 'flac' and sample_width > _FLAC_MAX_WIDTH:
+            logger.info("FLAC 最高支持24位，输出改为24位")
+            sample_width = _FLAC_MAX_WIDTH
+        if reader.channels > 2 and channels != reader.channels:
+            # 没有默认布局的声道数在写出前就交给 ffmpeg
+            downmix_matrix(reader.channels)
+        block_frames = int(options.get('chunk_frames') or BLOCK_FRAMES)
+        sample_rate = int(options.get('sample_rate') or reader.sample_rate)
+        resampler = None
+        if sample_rate != reader.sample_rate:
+            resampler = StreamingResampler(reader.sample_rate, sample_rate, channels)
+
+        if target_format == 'wav':
+            writer = _WaveWriter(output_path, sample_rate, channels, sample_width)
+        else:
+            writer = _SoundFileWriter(output_path, target_format, sample_rate, channels, sample_width)
+
+        processed = 0
+        total = reader.frames / reader.sample_rate if reader.sample_rate else None
+        start_time = time.monotonic()
+
+        def processed_blocks():
+            """读取输入并改变声道数和采样率，每块报告一次进度"""
+            nonlocal processed
+            while True:
+                block = reader.read(block_frames)
+                if len(block) == 0:
+                    break
+                processed += len(block)
+                block = remix_channels(block, channels)
+                yield block if resampler is None else resampler.process(block)
+
+                seconds = processed / reader.sample_rate
+                elapsed = time.monotonic() - start_time
+                speed = seconds / elapsed if elapsed > 0 else None
+                eta = (total - seconds) / speed if speed and total else None
+                report_progress(progress_callback, 'audio', seconds, total, 's', speed=speed, eta=eta)
+            if resampler is not None:
+                yield resampler.flush()
+
+        blocks = processed_blocks()
+        if wants_normalization(options):
+            # 测量响度的同时把处理后的数据暂存到临时文件，再从临时文件读出并施加增益（只读取一遍输入）
+            spool = tempfile.TemporaryFile()
+            meter = LoudnessMeter(sample_rate, channels)
+            for block in blocks:
+                meter.process(block)
+                spool.write(block.tobytes())
+            options = normalized_options(options, meter)
+            blocks = _read_spool(spool, channels)
+
+        gain = 10 ** (float(options.get('gain_db', 0)) / 20)
+        for block in blocks:
+            writer.write(block * gain if gain != 1 else block)
+    except Exception:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+    finally:
+        reader.close()
+
+    writer.close()
+    return processed / reader.sample_rate
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+PNG 无损优化模块
+对已写出的 PNG 尝试多种“滤波方式 × zlib 级别/策略”组合，去掉非必要的块，保留最小的结果。
+各组合在线程池中并行尝试（NumPy 滤波和 zlib 压缩都会释放GIL），总耗时受每张图片的时间预算限制。
+"""
+
+import io
+import os
+import time
+import zlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, NamedTuple, Optional
+from utils.logger import get_logger
+from utils.png_utils import (
+    FILTER_ADAPTIVE, FILTER_AVERAGE, FILTER_NONE, FILTER_PAETH, FILTER_SUB, FILTER_UP,
+    PNG_CHANNELS, PNG_MODES, PNG_SIGNATURE, filter_band, png_chunk, read_png_chunks
+)
+
+logger = get_logger(__name__)
+
+try:
+    from PIL import Image
+    HAS_PILLOW = True
+except ImportError:
+    HAS_PILLOW = False
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+# 每张图片的默认时间预算（秒）
+DEFAULT_TIME_BUDGET = 5.0
+
+# 去除非必要块时保留的辅助块（影响颜色或像素解释）
+ESSENTIAL_CHUNKS = frozenset([b'PLTE', b'tRNS', b'gAMA', b'cHRM', b'sRGB', b'iCCP', b'sBIT', b'pHYs'])
+
+# 每次滤波和压缩的行数（也是取消检查的粒度）
+_BAND_ROWS = 256
+
+# 单个 IDAT 块的大小
+_IDAT_CHUNK_SIZE = 1024 * 1024
+
+# 尝试的组合（按经验收益排序，时间预算不足时先完成的通常就是较好的组合）
+_ZLIB_DEFAULT = (9, zlib.Z_DEFAULT_STRATEGY)
+_ZLIB_FILTERED = (9, zlib.Z_FILTERED)
+_ZLIB_RLE = (9, zlib.Z_RLE)
+TRIALS = (
+    (FILTER_ADAPTIVE, _ZLIB_DEFAULT),
+    (FILTER_NONE, _ZLIB_DEFAULT),
+    (FILTER_PAETH, _ZLIB_FILTERED),
+    (FILTER_ADAPTIVE, _ZLIB_FILTERED),
+    (FILTER_UP, _ZLIB_DEFAULT),
+    (FILTER_SUB, _ZLIB_DEFAULT),
+    (FILTER_PAETH, _ZLIB_DEFAULT),
+    (FILTER_NONE, _ZLIB_RLE),
+    (FILTER_AVERAGE, _ZLIB_FILTERED),
+    (FILTER_UP, _ZLIB_RLE),
+)
+
+# 没有 NumPy 时使用 Pillow 编码器尝试的参数
+PILLOW_TRIALS = (
+    {'compress_level': 9},
+    {'optimize': True},
+    {'compress_level': 9, 'compress_type': zlib.Z_FILTERED},
+    {'compress_level': 9, 'compress_type': zlib.Z_RLE},
+)
+
+
+class OptimizeResult(NamedTuple):
+    """PNG 优化结果"""
+    original_size: int
+    optimized_size: int
+    trial: str
+
+    @property
+    def saved(self) -> int:
+        """节省的字节数"""
+        return self.original_size - self.optimized_size
+
+
+class _PngStructure(NamedTuple):
+    """解析后的 PNG 结构"""
+    ihdr: bytes
+    before_idat: List[tuple]
+    after_idat: List[tuple]
+
+
+def _parse(data: bytes, strip: bool) -> Optional[_PngStructure]:
+    """解析 PNG 块，返回需要保留的块；动画 PNG 返回None"""
+    f = io.BytesIO(data)
+    if f.read(8) != PNG_SIGNATURE:
+        return None
+
+    ihdr = None
+    before, after = [], []
+    seen_idat = False
+    for chunk_type, chunk_data in read_png_chunks(f):
+        if chunk_type == b'IHDR':
+            ihdr = chunk_data
+        elif chunk_type == b'acTL':
+            # 动画 PNG 的帧数据不在 IDAT 中，不做处理
+            return None
+        elif chunk_type == b'IDAT':
+            seen_idat = True
+        elif chunk_type == b'IEND':
+            break
+        elif not strip or chunk_type in ESSENTIAL_CHUNKS:
+            (after if seen_idat else before).append((chunk_type, chunk_data))
+    if ihdr is None or not seen_idat:
+        return None
+    return _PngStructure(ihdr, before, after)
+
+
+def _assemble(structure: _PngStructure, idat: bytes) -> bytes:
+    """组装 PNG 文件（输出为非隔行扫描）"""
+    parts = [PNG_SIGNATURE, png_chunk(b'IHDR', structure.ihdr[:12] + b'\x00')]
+    parts.extend(png_chunk(t, d) for t, d in structure.before_idat)
+    for offset in range(0, max(1, len(idat)), _IDAT_CHUNK_SIZE):
+        parts.append(png_chunk(b'IDAT', idat[offset:offset + _IDAT_CHUNK_SIZE]))
+    parts.extend(png_chunk(t, d) for t, d in structure.after_idat)
+    parts.append(png_chunk(b'IEND', b''))
+    return b''.join(parts)
+
+
+def _compress_trial(rows, bpp: int, filter_type, level: int, strategy: int,
+                    stop: threading.Event) -> Optional[bytes]:
+    """按条带滤波并压缩，收到停止信号时放弃"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 15, 9, strategy)
+    parts = []
+    previous = np.zeros(rows.shape[1], dtype=np.uint8)
+    for start in range(0, rows.shape[0], _BAND_ROWS):
+        if stop.is_set():
+            return None
+        band = rows[start:start + _BAND_ROWS]
+        parts.append(compressor.compress(filter_band(band, previous, bpp, filter_type)))
+        previous = band[-1]
+    parts.append(compressor.flush())
+    return b''.join(parts)
+
+
+def _pillow_trial(img, params: dict, stop: threading.Event) -> Optional[bytes]:
+    """使用 Pillow 编码器尝试一组参数"""
+    if stop.is_set():
+        return None
+    buffer = io.BytesIO()
+    extra = {key: img.info[key] for key in ('transparency', 'icc_profile') if key in img.info}
+    img.save(buffer, format='PNG', **params, **extra)
+    return buffer.getvalue()
+
+
+def _trial_name(filter_type, level: int, strategy: int) -> str:
+    """组合的可读名称"""
+    strategies = {zlib.Z_DEFAULT_STRATEGY: 'default', zlib.Z_FILTERED: 'filtered', zlib.Z_RLE: 'rle'}
+    return f"filter={filter_type} zlib={level}/{strategies.get(strategy, strategy)}"
+
+
+def optimize_png(path: str, output_path: Optional[str] = None,
+                 time_budget: float = DEFAULT_TIME_BUDGET,
+                 max_workers: Optional[int] = None,
+                 strip: bool = True) -> Optional[OptimizeResult]:
+    """
+    无损优化 PNG 文件
+
+    Args:
+        path: PNG 文件路径
+        output_path: 输出路径（为空时原地替换，只有结果更小时才写入）
+        time_budget: 时间预算（秒），超时后使用已完成组合中最小的结果
+        max_workers: 并行线程数（默认为CPU核数）
+        strip: 是否去除文本、时间、EXIF等非必要块
+
+    Returns:
+        优化结果，无法优化（动画PNG、不支持的位深等）时返回None
+    """
+    if not HAS_PILLOW:
+        logger.warning("PNG优化需要Pillow库")
+        return None
+
+    start_time = time.monotonic()
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    structure = _parse(data, strip)
+    if structure is None:
+        logger.info(f"跳过PNG优化（非PNG或动画PNG）: {path}")
+        return None
+
+    bit_depth, color_type = structure.ihdr[8], structure.ihdr[9]
+    if (bit_depth, color_type) not in PNG_MODES:
+        logger.info(f"跳过PNG优化（不支持位深 {bit_depth}、颜色类型 {color_type}）: {path}")
+        return None
+
+    with Image.open(io.BytesIO(data)) as img:
+        img.load()
+        stop = threading.Event()
+        if HAS_NUMPY:
+            _, rawmode = PNG_MODES[(bit_depth, color_type)]
+            width, height = img.size
+            row_bytes = (width * PNG_CHANNELS[color_type] * bit_depth + 7) // 8
+            rows = np.frombuffer(img.tobytes('raw', rawmode), dtype=np.uint8).reshape(height, row_bytes)
+            bpp = max(1, PNG_CHANNELS[color_type] * bit_depth // 8)
+            jobs = {
+                _trial_name(filter_type, level, strategy): (
+                    _compress_trial, rows, bpp, filter_type, level, strategy, stop
+                )
+                for filter_type, (level, strategy) in TRIALS
+            }
+        else:
+            jobs = {f"pillow {params}": (_pillow_trial, img, params, stop) for params in PILLOW_TRIALS}
+
+        remaining = time_budget - (time.monotonic() - start_time)
+        if remaining <= 0:
+            jobs = {}
+        executor = ThreadPoolExecutor(max_workers=max_workers or os.cpu_count(), thread_name_prefix='png-opt')
+        futures = {executor.submit(*job): name for name, job in jobs.items()}
+        done, pending = wait(futures, timeout=max(0.0, remaining))
+        stop.set()
+        # 进行中的组合会在下一个条带处退出
+        executor.shutdown(wait=HAS_NUMPY, cancel_futures=True)
+
+    best_name, best = 'original', data
+    for future in done:
+        if future.exception() is not None:
+            logger.warning(f"PNG优化组合失败 {futures[future]}: {str(future.exception())}")
+            continue
+        result = future.result()
+        if result is None:
+            continue
+        candidate = result if not HAS_NUMPY else _assemble(structure, result)
+        if len(candidate) < len(best):
+            best_name, best = futures[future], candidate
+
+    if pending:
+        logger.info(f"PNG优化超出时间预算，{len(pending)} 个组合未完成: {path}")
+
+    target = output_path or path
+    if best is not data or output_path:
+        temp_path = f"{target}.tmp{os.getpid()}"
+        with open(temp_path, 'wb') as f:
+            f.write(best)
+        os.replace(temp_path, target)
+
+    result = OptimizeResult(len(data), len(best), best_name)
+    logger.info(f"PNG优化完成: {path} {result.original_size} -> {result.optimized_size} 字节 ({best_name})")
+    return result
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+PNG 底层工具模块
+PNG 块的读写，以及扫描行滤波（NumPy 向量化，按条带处理）
+"""
+
+import struct
+import zlib
+from typing import Iterator, Tuple
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# 可以无损往返（解码后再按原始格式打包）的 PNG 格式：(位深, 颜色类型) -> (模式, 原始模式)
+PNG_MODES = {
+    (1, 0): ('1', '1'),
+    (8, 0): ('L', 'L'),
+    (16, 0): ('I;16', 'I;16B'),
+    (8, 2): ('RGB', 'RGB'),
+    (1, 3): ('P', 'P;1'),
+    (2, 3): ('P', 'P;2'),
+    (4, 3): ('P', 'P;4'),
+    (8, 3): ('P', 'P'),
+    (8, 4): ('LA', 'LA'),
+    (8, 6): ('RGBA', 'RGBA'),
+}
+
+# 颜色类型 -> 通道数
+PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+# 滤波类型
+FILTER_NONE, FILTER_SUB, FILTER_UP, FILTER_AVERAGE, FILTER_PAETH = range(5)
+
+# 逐行选择滤波类型（按滤波后字节的有符号绝对值之和最小，libpng 的启发式）
+FILTER_ADAPTIVE = 'adaptive'
+
+
+def png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    """
+    构造 PNG 块
+
+    Args:
+        chunk_type: 块类型（4字节）
+        data: 块数据
+
+    Returns:
+        带长度和CRC的完整块
+    """
+    return (struct.pack('>I', len(data)) + chunk_type + data +
+            struct.pack('>I', zlib.crc32(chunk_type + data) & 0xffffffff))
+
+
+def read_png_chunks(f) -> Iterator[Tuple[bytes, bytes]]:
+    """
+    逐个读取 PNG 块（文件位置需在签名之后）
+
+    Args:
+        f: 二进制文件对象
+
+    Returns:
+        (块类型, 块数据) 迭代器，读到 IEND 为止
+    """
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        length, chunk_type = struct.unpack('>I4s', header)
+        data = f.read(length)
+        f.read(4)
+        yield chunk_type, data
+        if chunk_type == b'IEND':
+            return
+
+
+def filter_band(rows, previous, bpp: int, filter_type=FILTER_PAETH) -> bytes:
+    """
+    对一个条带的原始扫描行做滤波
+
+    Args:
+        rows: 原始扫描行，形状为 (行数, 每行字节数) 的 uint8 数组
+        previous: 条带前一行的原始数据（第一个条带为全0）
+        bpp: 每像素字节数（位深小于8时为1）
+        filter_type: 滤波类型（0~4）或 FILTER_ADAPTIVE
+
+    Returns:
+        每行带滤波类型字节的数据
+    """
+    x = rows.astype(np.int16)
+    b = np.empty_like(x)
+    b[0] = previous
+    b[1:] = x[:-1]
+    a = np.zeros_like(x)
+    a[:, bpp:] = x[:, :-bpp]
+
+    def predict(kind):
+        if kind == FILTER_NONE:
+            return None
+        if kind == FILTER_SUB:
+            return a
+        if kind == FILTER_UP:
+            return b
+        if kind == FILTER_AVERAGE:
+            return (a + b) >> 1
+        c = np.zeros_like(x)
+        c[:, bpp:] = b[:, :-bpp]
+        p = a + b - c
+        pa = np.abs(p - a)
+        pb = np.abs(p - b)
+        pc = np.abs(p - c)
+        return np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+
+    def apply(kind):
+        predictor = predict(kind)
+        return x if predictor is None else (x - predictor) & 0xff
+
+    out = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+    if filter_type != FILTER_ADAPTIVE:
+        out[:, 0] = filter_type
+        out[:, 1:] = apply(filter_type)
+        return out.tobytes()
+
+    candidates = [apply(kind) for kind in range(5)]
+    # 把字节视为有符号数，绝对值之和越小通常越容易压缩
+    scores = np.stack([np.abs(((c + 128) & 0xff) - 128).sum(axis=1) for c in candidates])
+    best = scores.argmin(axis=0)
+    out[:, 0] = best
+    for kind in range(5):
+        selected = best == kind
+        if selected.any():
+            out[selected, 1:] = candidates[kind][selected]
+    return out.tobytes()
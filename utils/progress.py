@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+进度报告模块
+转换器通过转换选项中的 progress_callback 报告进度，回调参数为 ProgressEvent
+"""
+
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional, TextIO
+from utils.ffmpeg_utils import FFmpegProgress
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ProgressEvent(NamedTuple):
+    """进度事件"""
+    stage: str
+    current: float
+    total: Optional[float] = None
+    unit: str = ''
+    speed: Optional[float] = None
+    eta: Optional[float] = None
+    fps: Optional[float] = None
+
+    @property
+    def fraction(self) -> Optional[float]:
+        """完成比例（0~1），总量未知时为None"""
+        if not self.total:
+            return None
+        return min(1.0, self.current / self.total)
+
+
+ProgressCallback = Callable[[ProgressEvent], Any]
+
+
+def get_progress_callback(options: Optional[Dict[str, Any]]) -> Optional[ProgressCallback]:
+    """
+    从转换选项中取出进度回调
+
+    Args:
+        options: 转换选项
+
+    Returns:
+        进度回调，未设置时返回None
+    """
+    if not options:
+        return None
+    callback = options.get('progress_callback')
+    return callback if callable(callback) else None
+
+
+def report_progress(callback: Optional[ProgressCallback], stage: str, current: float,
+                    total: Optional[float] = None, unit: str = '', **extra):
+    """
+    报告进度（回调出错只记录警告，不影响转换）
+
+    Args:
+        callback: 进度回调
+        stage: 阶段名称
+        current: 当前进度
+        total: 总量
+        unit: 单位
+        **extra: speed, eta, fps
+    """
+    if callback is None:
+        return
+    try:
+        callback(ProgressEvent(stage, current, total, unit, **extra))
+    except Exception as e:
+        logger.warning(f"进度回调出错: {str(e)}")
+
+
+def ffmpeg_progress_reporter(callback: Optional[ProgressCallback], stage: str,
+                             duration: Optional[float] = None) -> Callable[[FFmpegProgress], None]:
+    """
+    把 ffmpeg 的进度转换为进度事件（传给 run_ffmpeg 的 on_progress）
+
+    Args:
+        callback: 进度回调
+        stage: 阶段名称
+        duration: 输出时长（秒），未指定时使用 ffmpeg 打印的输入时长
+
+    Returns:
+        ffmpeg 进度回调（单位为秒，speed 为相对实时的倍数）
+    """
+    def on_progress(progress: FFmpegProgress):
+        total = duration or progress.duration
+        current = progress.out_time or 0.0
+        if total:
+            current = total if progress.finished else min(current, total)
+        eta = (total - current) / progress.speed if total and progress.speed else None
+        report_progress(callback, stage, current, total, 's', speed=progress.speed, eta=eta, fps=progress.fps)
+
+    return on_progress
+
+
+def _clock(seconds: float) -> str:
+    """把秒数格式化为 h:mm:ss 或 m:ss"""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+def format_progress(event: ProgressEvent) -> str:
+    """
+    把进度事件格式化为一行文字，例如 "video 45.0% 0:12/0:27 87 fps 2.30x 剩余 0:07"
+
+    Args:
+        event: 进度事件
+
+    Returns:
+        进度文字
+    """
+    parts = [event.stage]
+    if event.fraction is not None:
+        parts.append(f"{event.fraction * 100:.1f}%")
+    if event.unit == 's':
+        parts.append(_clock(event.current) + (f"/{_clock(event.total)}" if event.total else ''))
+    else:
+        parts.append(f"{event.current:g}" + (f"/{event.total:g}" if event.total else '') + f" {event.unit}".rstrip())
+    if event.fps:
+        parts.append(f"{event.fps:.0f} fps")
+    if event.speed:
+        parts.append(f"{event.speed:.2f}x" if event.unit == 's' else f"{event.speed:.1f} {event.unit}/s")
+    if event.eta is not None:
+        parts.append(f"剩余 {_clock(event.eta)}")
+    return ' '.join(parts)
+
+
+class ConsoleProgress:
+    """
+    在终端的同一行刷新进度（可直接用作 progress_callback），每个阶段完成时换行
+
+    示例:
+        progress = ConsoleProgress()
+        converter.convert(input_path, output_path, 'mp4', options={'progress_callback': progress})
+        progress.close()
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None, interval: float = 0.2):
+        """
+        Args:
+            stream: 输出流（默认 stderr）
+            interval: 最短刷新间隔（秒），完成时总是刷新
+        """
+        self.stream = stream or sys.stderr
+        self.interval = interval
+        self._last = 0.0
+        self._width = 0
+        self._finished_stage = None
+        self._lock = threading.Lock()
+
+    def __call__(self, event: ProgressEvent):
+        now = time.monotonic()
+        finished = event.fraction is not None and event.fraction >= 1.0
+        with self._lock:
+            if finished and event.stage == self._finished_stage:
+                return
+            if now - self._last < self.interval and not finished:
+                return
+            self._last = now
+            self._finished_stage = event.stage if finished else None
+            text = format_progress(event)
+            # 用空格覆盖上一次较长的文字
+            self.stream.write('\r' + text.ljust(self._width) + ('\n' if finished else ''))
+            self.stream.flush()
+            self._width = 0 if finished else len(text)
+
+    def close(self):
+        """结束进度行"""
+        with self._lock:
+            if self._width:
+                self.stream.write('\n')
+                self.stream.flush()
+                self._width = 0
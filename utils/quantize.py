@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+调色板量化模块
+把真彩色图片转换为调色板图片（GIF、PNG8），支持多种量化算法和抖动方式，
+并支持复用已有调色板（动画的各帧使用同一调色板，避免逐帧计算和颜色闪烁）。
+"""
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    from PIL import Image, ImageChops, ImageStat, features
+    HAS_PILLOW = True
+    HAS_LIBIMAGEQUANT = features.check_feature('libimagequant')
+except ImportError:
+    HAS_PILLOW = False
+    HAS_LIBIMAGEQUANT = False
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+# 量化算法
+QUANTIZE_METHODS = ('auto', 'mediancut', 'fastoctree', 'libimagequant')
+
+# 抖动方式
+DITHER_METHODS = ('none', 'floyd-steinberg', 'ordered')
+
+# alpha 低于该值的像素在单一透明色模式下视为透明
+ALPHA_THRESHOLD = 128
+
+# 8x8 Bayer 矩阵（有序抖动）
+_BAYER_8X8 = (
+    (0, 32, 8, 40, 2, 34, 10, 42),
+    (48, 16, 56, 24, 50, 18, 58, 26),
+    (12, 44, 4, 36, 14, 46, 6, 38),
+    (60, 28, 52, 20, 62, 30, 54, 22),
+    (3, 35, 11, 43, 1, 33, 9, 41),
+    (51, 19, 59, 27, 49, 17, 57, 25),
+    (15, 47, 7, 39, 13, 45, 5, 37),
+    (63, 31, 55, 23, 61, 29, 53, 21),
+)
+
+
+def _method_constant(method: str, has_alpha: bool):
+    """将算法名称转换为 Pillow 常量"""
+    if method == 'auto':
+        method = 'libimagequant' if HAS_LIBIMAGEQUANT else 'fastoctree'
+    if method == 'libimagequant' and not HAS_LIBIMAGEQUANT:
+        logger.warning("Pillow未启用libimagequant，改用fastoctree")
+        method = 'fastoctree'
+    if method == 'mediancut' and has_alpha:
+        # 中位切分不支持 RGBA，带透明度的图片改用八叉树
+        method = 'fastoctree'
+
+    return {
+        'mediancut': Image.Quantize.MEDIANCUT,
+        'fastoctree': Image.Quantize.FASTOCTREE,
+        'libimagequant': Image.Quantize.LIBIMAGEQUANT,
+    }[method]
+
+
+def _dither_constant(dither: str):
+    """将抖动方式转换为 Pillow 常量（有序抖动在量化前单独处理）"""
+    if dither == 'floyd-steinberg':
+        return Image.Dither.FLOYDSTEINBERG
+    return Image.Dither.NONE
+
+
+def ordered_dither(img, colors: int):
+    """
+    对 RGB 图片叠加 Bayer 阈值矩阵（随后按调色板取最近色即得到有序抖动效果）
+
+    Args:
+        img: RGB 图片
+        colors: 调色板颜色数（决定抖动幅度）
+
+    Returns:
+        叠加阈值后的 RGB 图片
+    """
+    if not HAS_NUMPY:
+        logger.warning("有序抖动需要NumPy，改用Floyd-Steinberg抖动")
+        return None
+
+    width, height = img.size
+    # 每个通道大约有 colors^(1/3) 个色阶，抖动幅度取一个色阶
+    spread = 255.0 / max(1.0, colors ** (1.0 / 3.0))
+    bayer = (np.array(_BAYER_8X8, dtype=np.float32) + 0.5) / 64.0 - 0.5
+    threshold = np.tile(bayer, (height // 8 + 1, width // 8 + 1))[:height, :width, None]
+    pixels = np.asarray(img, dtype=np.float32) + threshold * spread
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+
+def make_palette_image(paletted) -> 'Image.Image':
+    """
+    从量化结果提取调色板图片（可传给 quantize_image 的 palette 参数复用）
+
+    Args:
+        paletted: 量化得到的调色板图片
+
+    Returns:
+        只包含实际颜色（不含预留透明色）的调色板图片
+    """
+    palette = paletted.getpalette('RGB')
+    transparency = paletted.info.get('transparency')
+    if isinstance(transparency, int) and transparency * 3 == len(palette) - 3:
+        palette = palette[:-3]
+    return _palette_image(palette)
+
+
+def palette_error(img, palette, sample_size: int = 64) -> float:
+    """
+    估计用已有调色板表示图片的误差（在缩小的样本上计算，代价很低）
+
+    Args:
+        img: Pillow 图片
+        palette: 调色板图片
+        sample_size: 样本的短边长度
+
+    Returns:
+        不透明像素每通道的平均绝对误差（0~255）
+    """
+    factor = max(1, min(img.size) // sample_size)
+    sample = img.convert('RGBA').reduce(factor)
+    rgb = sample.convert('RGB')
+    mapped = rgb.quantize(palette=palette, dither=Image.Dither.NONE).convert('RGB')
+    mask = sample.getchannel('A').point(lambda a: 255 if a >= ALPHA_THRESHOLD else 0, 'L')
+    if mask.getbbox() is None:
+        return 0.0
+    return max(ImageStat.Stat(ImageChops.difference(mapped, rgb), mask).mean)
+
+
+def quantize_image(img, colors: int = 256, method: str = 'auto', dither: str = 'none',
+                   palette=None, alpha: str = 'binary'):
+    """
+    把图片量化为调色板图片
+
+    Args:
+        img: Pillow 图片
+        colors: 最大颜色数（2~256）
+        method: 量化算法（auto、mediancut、fastoctree、libimagequant）
+        dither: 抖动方式（none、floyd-steinberg、ordered）
+        palette: 复用的调色板图片（由 make_palette_image 得到），为空时从图片计算
+        alpha: 透明度处理方式
+            binary: 单一透明色（GIF），预留最后一个调色板索引作为透明色
+            full: 调色板带 alpha（PNG8，保存为 tRNS 块）
+
+    Returns:
+        P 模式图片，带透明度时 info['transparency'] 为透明色索引（binary）
+    """
+    if method not in QUANTIZE_METHODS:
+        raise ValueError(f"未知的量化算法: {method}")
+    if dither not in DITHER_METHODS:
+        raise ValueError(f"未知的抖动方式: {dither}")
+    colors = max(2, min(256, int(colors)))
+
+    if img.mode == 'P' and palette is None and len(img.getpalette() or []) <= colors * 3:
+        return img
+
+    has_alpha = img.mode in ('RGBA', 'LA', 'PA', 'RGBa') or img.info.get('transparency') is not None
+    if has_alpha:
+        img = img.convert('RGBA')
+        mask = img.getchannel('A')
+        if mask.getextrema()[0] >= 255:
+            has_alpha = False
+    if not has_alpha and img.mode != 'RGB':
+        img = img.convert('RGB')
+
+    # PNG8 的完整透明度：调色板直接包含 alpha（不复用调色板时）
+    if has_alpha and alpha == 'full' and palette is None:
+        quantized = img.quantize(colors, method=_method_constant(method, True),
+                                 dither=_dither_constant(dither))
+        return quantized
+
+    rgb = img.convert('RGB') if has_alpha else img
+    color_count = colors - 1 if has_alpha else colors
+
+    if palette is not None and has_alpha and len(palette.getpalette('RGB')) > 255 * 3:
+        # 复用的调色板已满，需要腾出一个索引作为透明色
+        palette = _palette_image(palette.getpalette('RGB')[:255 * 3])
+
+    if palette is None:
+        palette = rgb.quantize(color_count, method=_method_constant(method, False))
+        if dither == 'none':
+            quantized = palette
+            palette = None
+    if palette is not None:
+        source = ordered_dither(rgb, color_count) if dither == 'ordered' else None
+        if source is None:
+            source = rgb
+            dither_mode = _dither_constant('floyd-steinberg' if dither == 'ordered' else dither)
+        else:
+            dither_mode = Image.Dither.NONE
+        quantized = source.quantize(palette=palette, dither=dither_mode)
+
+    if has_alpha:
+        # 在已用颜色之后追加一个透明色
+        entries = quantized.getpalette('RGB')
+        transparent_index = len(entries) // 3
+        quantized.putpalette(entries + [0, 0, 0])
+        quantized.paste(transparent_index, mask=mask.point(lambda a: 255 if a < ALPHA_THRESHOLD else 0, '1'))
+        quantized.info['transparency'] = transparent_index
+    return quantized
+
+
+def _palette_image(entries):
+    """用 RGB 调色板数据创建调色板图片"""
+    palette_img = Image.new('P', (1, 1))
+    palette_img.putpalette(entries)
+    return palette_img
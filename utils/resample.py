@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+多相重采样模块
+按块对 PCM 浮点数据做有理数倍率的多相 FIR 重采样，结果与 scipy.signal.resample_poly
+（默认 Kaiser 窗，beta=5）一致，但可以分块输入，内存占用只与块大小和滤波器长度有关。
+只依赖 NumPy，安装了 SciPy 时也不需要它。
+"""
+
+from math import gcd
+from typing import Tuple
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+# 可选的重采样实现：polyphase 为本模块（NumPy），ffmpeg 为 ffmpeg 自带的 swresample
+RESAMPLERS = ('polyphase', 'ffmpeg')
+DEFAULT_RESAMPLER = 'polyphase'
+
+# 与 resample_poly 相同的滤波器参数
+KAISER_BETA = 5.0
+HALF_LEN_FACTOR = 10
+
+# 每个相位每次计算的输出帧数（限制中间数组大小）
+OUTPUT_BLOCK = 4096
+
+
+def design_filter(up: int, down: int, beta: float = KAISER_BETA) -> Tuple['np.ndarray', int]:
+    """
+    设计抗混叠低通滤波器（与 scipy.signal.firwin + resample_poly 的设计相同）
+
+    Args:
+        up: 上采样倍数
+        down: 下采样倍数
+        beta: Kaiser 窗参数
+
+    Returns:
+        (滤波器系数（已乘以 up）, 滤波器中心位置)
+    """
+    max_rate = max(up, down)
+    cutoff = 1.0 / max_rate
+    half_len = HALF_LEN_FACTOR * max_rate
+    n = np.arange(2 * half_len + 1) - half_len
+    h = cutoff * np.sinc(cutoff * n) * np.kaiser(2 * half_len + 1, beta)
+    return h * (up / h.sum()), half_len
+
+
+class StreamingResampler:
+    """
+    分块多相重采样器
+
+    示例:
+        resampler = StreamingResampler(44100, 16000, 2)
+        for block in blocks:
+            write(resampler.process(block))
+        write(resampler.flush())
+    """
+
+    def __init__(self, source_rate: int, target_rate: int, channels: int):
+        """
+        Args:
+            source_rate: 输入采样率
+            target_rate: 输出采样率
+            channels: 声道数
+        """
+        if not HAS_NUMPY:
+            raise ImportError("重采样需要numpy库")
+        if source_rate <= 0 or target_rate <= 0:
+            raise ValueError(f"无效的采样率: {source_rate} -> {target_rate}")
+
+        divisor = gcd(source_rate, target_rate)
+        self.up = target_rate // divisor
+        self.down = source_rate // divisor
+        self.channels = channels
+
+        h, self._offset = design_filter(self.up, self.down)
+        self.taps = -(-len(h) // self.up)
+        padded = np.zeros(self.taps * self.up)
+        padded[:len(h)] = h
+        # 第 p 个相位的系数按时间倒序排列，与滑动窗口直接做点积
+        self._phases = padded.reshape(self.taps, self.up).T[:, ::-1].copy()
+
+        # 缓冲区第一帧对应的输入帧序号（开头补 taps-1 个零）
+        self._buffer = np.zeros((self.taps - 1, channels))
+        self._base = -(self.taps - 1)
+        self._received = 0
+        self._produced = 0
+
+    def _produce(self, count: int):
+        """计算接下来 count 个输出帧（所需输入都已在缓冲区中）"""
+        if count <= 0:
+            return np.zeros((0, self.channels))
+        windows = np.lib.stride_tricks.sliding_window_view(self._buffer, self.taps, axis=0)
+        output = np.empty((count, self.channels))
+        # 输出帧 k 与 k+up 使用同一相位，对应的输入位置相差 down，按相位分组后每组是一次矩阵乘法
+        for r in range(min(self.up, count)):
+            last, phase = divmod((self._produced + r) * self.down + self._offset, self.up)
+            start = last - self._base - (self.taps - 1)
+            rows = -(-(count - r) // self.up)
+            for first in range(0, rows, OUTPUT_BLOCK):
+                n = min(OUTPUT_BLOCK, rows - first)
+                selected = windows[start + first * self.down::self.down][:n]
+                output[r + first * self.up::self.up][:n] = selected @ self._phases[phase]
+        self._produced += count
+
+        # 丢弃之后不再需要的输入
+        next_last = (self._produced * self.down + self._offset) // self.up
+        drop = max(0, min(next_last - (self.taps - 1) - self._base, len(self._buffer)))
+        self._buffer = self._buffer[drop:]
+        self._base += drop
+        return output
+
+    def process(self, block):
+        """
+        输入一块数据
+
+        Args:
+            block: 形状为 (帧数, 声道数) 的浮点数组
+
+        Returns:
+            已经可以确定的输出帧（形状为 (帧数, 声道数)，可能为空）
+        """
+        if self.up == self.down:
+            return block
+        self._received += len(block)
+        self._buffer = np.concatenate([self._buffer, block])
+        # 输出帧 k 需要的最后一个输入帧序号小于已接收帧数
+        available = (self._received * self.up - self._offset + self.down - 1) // self.down
+        return self._produce(max(0, available) - self._produced)
+
+    def flush(self):
+        """
+        结束输入，输出剩余的帧（输入末尾之后视为零）
+
+        Returns:
+            形状为 (帧数, 声道数) 的数组，总输出帧数为 ceil(输入帧数 * up / down)
+        """
+        if self.up == self.down:
+            return np.zeros((0, self.channels))
+        total = -(-self._received * self.up // self.down)
+        self._buffer = np.concatenate([self._buffer, np.zeros((self.taps + 1, self.channels))])
+        return self._produce(total - self._produced)
+
+
+def resample(data, source_rate: int, target_rate: int):
+    """
+    一次性重采样整段数据
+
+    Args:
+        data: 形状为 (帧数, 声道数) 的浮点数组
+        source_rate: 输入采样率
+        target_rate: 输出采样率
+
+    Returns:
+        重采样后的数组
+    """
+    resampler = StreamingResampler(source_rate, target_rate, data.shape[1])
+    return np.concatenate([resampler.process(data), resampler.flush()])
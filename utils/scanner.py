@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+目录扫描模块
+基于 os.scandir 的并行流式目录扫描器：多个子目录由线程池并发读取，
+边遍历边按扩展名和 include/exclude 通配符过滤，并惰性返回带stat结果的条目。
+"""
+
+import os
+import fnmatch
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from utils.logger import get_logger
+from utils.formats import expand_format_set, ext_of
+
+logger = get_logger(__name__)
+
+# 默认扫描线程数（目录读取以IO等待为主，网络文件系统上更多线程更有效）
+DEFAULT_SCAN_WORKERS = 16
+
+
+class ScanEntry(NamedTuple):
+    """扫描得到的文件条目"""
+    path: str
+    rel_path: str
+    stat: os.stat_result
+
+    @property
+    def size(self) -> int:
+        """文件大小（字节）"""
+        return self.stat.st_size
+
+    @property
+    def mtime_ns(self) -> int:
+        """修改时间（纳秒）"""
+        return self.stat.st_mtime_ns
+
+
+def _match_any(rel_path: str, name: str, patterns: Tuple[str, ...]) -> bool:
+    """相对路径或文件名匹配任一通配符"""
+    return any(fnmatch.fnmatch(rel_path, p) or fnmatch.fnmatch(name, p) for p in patterns)
+
+
+def _entry_stat(entry: os.DirEntry, follow_symlinks: bool) -> os.stat_result:
+    """
+    获取目录项的stat结果（Windows 上 DirEntry.stat() 的 st_ino、st_dev 恒为0，此时改用 os.stat）
+
+    Args:
+        entry: 目录项
+        follow_symlinks: 是否跟随符号链接
+
+    Returns:
+        带有效文件身份的stat结果
+    """
+    st = entry.stat(follow_symlinks=follow_symlinks)
+    if st.st_ino == 0:
+        st = os.stat(entry.path, follow_symlinks=follow_symlinks)
+    return st
+
+
+class _DirectoryScanner:
+    """单次扫描的状态"""
+
+    def __init__(self, root: str, extensions, include, exclude, follow_symlinks: bool):
+        self.root = root
+        self.extensions = extensions
+        self.include = include
+        self.exclude = exclude
+        self.follow_symlinks = follow_symlinks
+
+    def scan_one(self, dir_path: str, rel_dir: str) -> Tuple[List[ScanEntry], List[Tuple[str, str, Tuple[int, int]]]]:
+        """
+        读取单个目录
+
+        Args:
+            dir_path: 目录路径
+            rel_dir: 相对于根目录的路径
+
+        Returns:
+            (文件条目列表, 子目录列表[(路径, 相对路径, (st_dev, st_ino))])
+        """
+        files = []
+        subdirs = []
+        try:
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=self.follow_symlinks):
+                            if self.exclude and _match_any(rel_path, entry.name, self.exclude):
+                                continue
+                            st = _entry_stat(entry, self.follow_symlinks)
+                            subdirs.append((entry.path, rel_path, (st.st_dev, st.st_ino)))
+                            continue
+
+                        if not entry.is_file(follow_symlinks=self.follow_symlinks):
+                            continue
+
+                        # 先用扩展名和通配符过滤，被过滤的文件不产生stat调用
+                        if self.extensions is not None and ext_of(entry.name) not in self.extensions:
+                            continue
+                        if self.include and not _match_any(rel_path, entry.name, self.include):
+                            continue
+                        if self.exclude and _match_any(rel_path, entry.name, self.exclude):
+                            continue
+
+                        st = _entry_stat(entry, self.follow_symlinks)
+                        files.append(ScanEntry(entry.path, rel_path, st))
+                    except OSError as e:
+                        logger.warning(f"读取目录项失败: {entry.path}: {str(e)}")
+        except OSError as e:
+            logger.warning(f"读取目录失败: {dir_path}: {str(e)}")
+        return files, subdirs
+
+
+def scan_directory(root: str,
+                   extensions: Optional[Iterable[str]] = None,
+                   include: Optional[Iterable[str]] = None,
+                   exclude: Optional[Iterable[str]] = None,
+                   follow_symlinks: bool = False,
+                   max_workers: int = DEFAULT_SCAN_WORKERS) -> Iterator[ScanEntry]:
+    """
+    并行扫描目录树，惰性返回文件条目
+
+    Args:
+        root: 根目录
+        extensions: 允许的扩展名（None表示不过滤）
+        include: 包含的通配符列表（匹配相对路径或文件名）
+        exclude: 排除的通配符列表（同时用于剪枝子目录）
+        follow_symlinks: 是否跟随符号链接（已访问的目录按 (st_dev, st_ino) 去重，避免循环）
+        max_workers: 扫描线程数
+
+    Returns:
+        文件条目迭代器（顺序不保证）
+    """
+    if extensions is not None and not isinstance(extensions, frozenset):
+        extensions = expand_format_set(extensions)
+
+    scanner = _DirectoryScanner(
+        root, extensions, tuple(include or ()), tuple(exclude or ()), follow_symlinks
+    )
+
+    root_st = os.stat(root)
+    visited = {(root_st.st_dev, root_st.st_ino)}
+    queued = deque([(root, '')])
+    max_in_flight = max_workers * 4
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scan')
+    in_flight = set()
+    try:
+        while queued or in_flight:
+            while queued and len(in_flight) < max_in_flight:
+                dir_path, rel_dir = queued.popleft()
+                in_flight.add(executor.submit(scanner.scan_one, dir_path, rel_dir))
+
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs = future.result()
+                for dir_path, rel_path, identity in subdirs:
+                    if identity in visited:
+                        logger.warning(f"检测到重复目录或符号链接循环，已跳过: {dir_path}")
+                        continue
+                    visited.add(identity)
+                    queued.append((dir_path, rel_path))
+                yield from files
+    finally:
+        # 调用方提前停止迭代时，取消尚未开始的任务
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+共享内存帧传递模块
+解码和编码在不同进程中进行时，把解码后的位图放入 multiprocessing.shared_memory，
+另一端用同一块内存直接构造 Pillow 图片，避免 pickle 复制整张位图。
+
+共享内存块由创建方（SharedFramePool）按引用计数管理：每个使用方任务结束时释放一次，
+计数归零即回收。工作进程崩溃时任务同样会结束，内存照常回收；创建方进程异常退出时，
+由 multiprocessing 的资源跟踪进程回收。
+"""
+
+import atexit
+import threading
+from multiprocessing import shared_memory
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    from PIL import Image
+    HAS_PILLOW = True
+except ImportError:
+    HAS_PILLOW = False
+
+# 可以直接映射的模式 -> Pillow 内部每像素字节数（RGB、LA 等在内部按4字节存储）
+SHAREABLE_MODES = {
+    '1': 1, 'L': 1, 'P': 1,
+    'I;16': 2,
+    'I': 4, 'F': 4,
+    'LA': 4, 'PA': 4,
+    'RGB': 4, 'RGBA': 4, 'RGBX': 4, 'CMYK': 4, 'YCbCr': 4,
+}
+
+# 随帧一起传递的图片信息
+SHARED_INFO_KEYS = ('transparency', 'background', 'duration', 'dpi', 'icc_profile')
+
+# 仍有图片引用、暂时无法关闭的内存块（之后再次尝试关闭）
+_deferred_close = []
+_deferred_lock = threading.Lock()
+
+
+class FrameHandle(NamedTuple):
+    """共享帧的描述（可以 pickle，传给其他进程）"""
+    name: str
+    mode: str
+    size: Tuple[int, int]
+    palette: Optional[bytes] = None
+    palette_mode: str = 'RGB'
+    info: Dict[str, Any] = {}
+
+
+def _map_image(buffer, mode: str, size: Tuple[int, int]):
+    """在缓冲区上直接构造图片（不复制像素数据）"""
+    # Image.frombuffer 只接受部分模式，这里直接使用它底层的 map_buffer，
+    # 按 Pillow 的内部布局映射，所有 SHAREABLE_MODES 都不需要复制
+    stride = size[0] * SHAREABLE_MODES[mode]
+    core = Image.core.map_buffer(buffer, size, 'raw', 0, (mode, stride, 1))
+    img = Image.new(mode, (0, 0))._new(core)
+    img.readonly = 1
+    return img
+
+
+def _close(shm):
+    """关闭内存块映射；仍有图片引用时推迟到之后再关闭"""
+    with _deferred_lock:
+        pending = _deferred_close[:]
+        _deferred_close.clear()
+        for segment in pending + [shm]:
+            try:
+                segment.close()
+            except BufferError:
+                _deferred_close.append(segment)
+
+
+class SharedFramePool:
+    """
+    共享帧池（在创建帧的进程中使用）
+
+    示例:
+        with SharedFramePool() as pool:
+            handle = pool.put(img, refs=2)
+            for path in outputs:
+                future = executor.submit(encode, handle, path)
+                pool.release_when_done(handle, future)
+    """
+
+    def __init__(self):
+        self._segments = {}
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def put(self, img, refs: int = 1) -> FrameHandle:
+        """
+        把图片放入共享内存
+
+        Args:
+            img: Pillow 图片
+            refs: 初始引用计数（使用方数量）
+
+        Returns:
+            帧描述
+        """
+        img.load()
+        mode = img.mode
+        if mode not in SHAREABLE_MODES:
+            mode = 'RGBA' if 'A' in img.getbands() else 'RGB'
+            img = img.convert(mode)
+
+        width, height = img.size
+        shm = shared_memory.SharedMemory(create=True, size=max(1, width * height * SHAREABLE_MODES[mode]))
+        try:
+            view = _map_image(shm.buf, mode, img.size)
+            # 直接复制到共享内存中（唯一的一次复制）
+            view.im.paste(img.im, (0, 0, width, height))
+            del view
+        except Exception:
+            shm.close()
+            shm.unlink()
+            raise
+
+        palette, palette_mode = None, 'RGB'
+        if mode in ('P', 'PA') and img.palette is not None:
+            palette_mode = img.palette.mode
+            palette = bytes(img.getpalette(palette_mode))
+        info = {key: img.info[key] for key in SHARED_INFO_KEYS if key in img.info}
+
+        with self._lock:
+            self._segments[shm.name] = [shm, refs]
+        return FrameHandle(shm.name, mode, img.size, palette, palette_mode, info)
+
+    def acquire(self, handle: FrameHandle, count: int = 1):
+        """
+        增加引用计数
+
+        Args:
+            handle: 帧描述
+            count: 增加的数量
+        """
+        with self._lock:
+            self._segments[handle.name][1] += count
+
+    def release(self, handle: FrameHandle):
+        """
+        释放一次引用，计数归零时回收共享内存
+
+        Args:
+            handle: 帧描述
+        """
+        with self._lock:
+            segment = self._segments.get(handle.name)
+            if segment is None:
+                return
+            segment[1] -= 1
+            if segment[1] > 0:
+                return
+            del self._segments[handle.name]
+        self._free(segment[0])
+
+    def release_when_done(self, handle: FrameHandle, future):
+        """
+        在任务结束（包括失败和工作进程崩溃）时释放一次引用
+
+        Args:
+            handle: 帧描述
+            future: concurrent.futures.Future
+        """
+        future.add_done_callback(lambda _: self.release(handle))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._segments)
+
+    def close(self):
+        """回收所有剩余的共享内存"""
+        with self._lock:
+            segments = [shm for shm, _ in self._segments.values()]
+            self._segments.clear()
+        for shm in segments:
+            self._free(shm)
+        atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @staticmethod
+    def _free(shm):
+        """关闭并删除共享内存块"""
+        # 本进程中仍有图片引用该内存时只推迟关闭映射，不影响删除
+        _close(shm)
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SharedFrame:
+    """
+    在使用方进程中打开共享帧（上下文管理器，返回的图片只在 with 块内有效）
+
+    示例:
+        with SharedFrame(handle) as img:
+            img.save(output_path)
+    """
+
+    def __init__(self, handle: FrameHandle):
+        self.handle = handle
+        self._shm = None
+        self._image = None
+
+    def __enter__(self):
+        # 工作进程与创建方共用资源跟踪进程，这里打开已有的内存块不会改变其回收方式
+        self._shm = shared_memory.SharedMemory(name=self.handle.name)
+        img = _map_image(self._shm.buf, self.handle.mode, self.handle.size)
+        if self.handle.palette is not None:
+            img.putpalette(self.handle.palette, self.handle.palette_mode)
+        img.info.update(self.handle.info)
+        self._image = img
+        return img
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._image = None
+        _close(self._shm)
+        self._shm = None
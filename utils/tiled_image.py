@@ -0,0 +1,715 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+分块图片处理模块
+按水平条带读取和写入超大 PNG/TIFF 图片，内存占用只与条带大小有关，与整图大小无关。
+
+- PNG 读取：逐块解压 IDAT，每个条带连同上一行的原始数据组装成一个小 PNG 交给 Pillow 反滤波解码
+- TIFF 读取：通过 tifffile 逐条带/逐块解码（可选依赖）
+- PNG 写入：逐行滤波（有 NumPy 时使用 Paeth）并流式压缩为多个 IDAT 块
+- TIFF 写入：分块（tile）的 BigTIFF，tile 在线程池中并行 deflate 压缩
+"""
+
+import io
+import os
+import math
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional, Tuple
+from utils.logger import get_logger
+from utils.png_utils import FILTER_PAETH, PNG_CHANNELS, PNG_MODES, PNG_SIGNATURE, filter_band, png_chunk
+
+logger = get_logger(__name__)
+
+try:
+    from PIL import Image, PngImagePlugin, TiffImagePlugin
+    HAS_PILLOW = True
+except ImportError:
+    HAS_PILLOW = False
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+try:
+    import tifffile
+    HAS_TIFFFILE = True
+except ImportError:
+    HAS_TIFFFILE = False
+
+# 默认内存上限（MB），用于计算条带高度
+DEFAULT_MEMORY_LIMIT_MB = 256
+
+# 条带处理过程中同时存在的条带副本数（读取时的解压缓冲和解码结果、写出时的原始数据等）的估计值
+_BAND_COPIES = 6
+
+# PNG 写出时条带分成小块滤波：Paeth 滤波的 int16 临时数组（x、a、b、c、p、pa、pb、pc 等）
+# 合计约为原始数据的 22 倍，滤波占内存上限的 1/4，其余用于条带；每块最多 256KB 原始数据
+_FILTER_COST = 22
+_FILTER_SHARE = 0.25
+_FILTER_CHUNK_BYTES = 256 * 1024
+
+# 单个 IDAT 块的目标大小，也是读取 IDAT 和解压的单次数据量
+_IDAT_CHUNK_SIZE = 256 * 1024
+
+# 写出时支持的模式：模式 -> (位深, 颜色类型/通道数, 原始模式)
+_PNG_WRITE_MODES = {
+    'L': (8, 0, 'L'),
+    'I;16': (16, 0, 'I;16B'),
+    'RGB': (8, 2, 'RGB'),
+    'P': (8, 3, 'P'),
+    'LA': (8, 4, 'LA'),
+    'RGBA': (8, 6, 'RGBA'),
+}
+
+# TIFF 写出支持的模式：模式 -> (每通道位数, 通道数, 光度解释, 额外通道, 原始模式)
+_TIFF_WRITE_MODES = {
+    'L': (8, 1, 1, None, 'L'),
+    'I;16': (16, 1, 1, None, 'I;16'),
+    'RGB': (8, 3, 2, None, 'RGB'),
+    'LA': (8, 2, 1, 2, 'LA'),
+    'RGBA': (8, 4, 2, 2, 'RGBA'),
+}
+
+
+class TiledProcessingError(Exception):
+    """图片无法分块处理"""
+    pass
+
+
+class ImageHeader(NamedTuple):
+    """不解码像素即可获得的图片信息"""
+    format: str
+    width: int
+    height: int
+    mode: str
+
+
+def band_height_for(row_bytes: int, memory_limit_mb: float = DEFAULT_MEMORY_LIMIT_MB,
+                    multiple: int = 1) -> int:
+    """
+    根据内存上限计算条带高度
+
+    Args:
+        row_bytes: 每行解码后的字节数
+        memory_limit_mb: 内存上限（MB）
+        multiple: 条带高度需要是该值的整数倍（例如 TIFF tile 高度）
+
+    Returns:
+        条带高度（行）
+    """
+    rows = int(memory_limit_mb * 1024 * 1024 * (1 - _FILTER_SHARE) / (max(1, row_bytes) * _BAND_COPIES))
+    return max(multiple, rows // multiple * multiple)
+
+
+def filter_rows_for(row_bytes: int, memory_limit_mb: float = DEFAULT_MEMORY_LIMIT_MB) -> int:
+    """
+    根据内存上限计算 PNG 写出时每次滤波的行数
+
+    Args:
+        row_bytes: 每行原始数据的字节数
+        memory_limit_mb: 内存上限（MB）
+
+    Returns:
+        行数
+    """
+    chunk_bytes = min(_FILTER_CHUNK_BYTES, memory_limit_mb * 1024 * 1024 * _FILTER_SHARE / _FILTER_COST)
+    return max(1, int(chunk_bytes // max(1, row_bytes)))
+
+
+def read_header(path: str) -> Optional[ImageHeader]:
+    """
+    读取 PNG/TIFF 的尺寸和模式（不触发 Pillow 的解压炸弹检查，也不解码像素）
+
+    Args:
+        path: 图片路径
+
+    Returns:
+        图片信息，非 PNG/TIFF 或无法识别时返回None
+    """
+    with open(path, 'rb') as f:
+        head = f.read(8)
+        f.seek(0)
+        try:
+            if head == PNG_SIGNATURE:
+                img = PngImagePlugin.PngImageFile(f)
+                return ImageHeader('PNG', img.size[0], img.size[1], img.mode)
+            if head[:4] in (b'II*\x00', b'MM\x00*', b'II+\x00', b'MM\x00+'):
+                img = TiffImagePlugin.TiffImageFile(f)
+                return ImageHeader('TIFF', img.size[0], img.size[1], img.mode)
+        except Exception as e:
+            logger.warning(f"读取图片头信息失败: {str(e)}")
+    return None
+
+
+def iter_png_bands(path: str, memory_limit_mb: float = DEFAULT_MEMORY_LIMIT_MB,
+                   band_height: Optional[int] = None):
+    """
+    按条带读取 PNG
+
+    Args:
+        path: PNG 路径
+        memory_limit_mb: 内存上限（MB）
+        band_height: 指定条带高度（为空时按内存上限计算）
+
+    Returns:
+        (图片信息, 迭代器[(起始行, 条带图片)], 调色板, 透明度)
+    """
+    f = open(path, 'rb')
+    if f.read(8) != PNG_SIGNATURE:
+        f.close()
+        raise TiledProcessingError("不是有效的PNG文件")
+
+    # IDAT 之前的块整块读取，IDAT 按固定大小分段读取（单个 IDAT 块可能包含整张图片的数据）
+    ihdr = plte = trns = None
+    idat_length = None
+    while True:
+        chunk_header = f.read(8)
+        if len(chunk_header) < 8:
+            break
+        length, chunk_type = struct.unpack('>I4s', chunk_header)
+        if chunk_type == b'IDAT':
+            idat_length = length
+            break
+        data = f.read(length)
+        f.read(4)
+        if chunk_type == b'IHDR':
+            ihdr = data
+        elif chunk_type == b'PLTE':
+            plte = data
+        elif chunk_type == b'tRNS':
+            trns = data
+        elif chunk_type == b'IEND':
+            break
+
+    if ihdr is None or idat_length is None:
+        f.close()
+        raise TiledProcessingError("PNG文件缺少IHDR或IDAT")
+
+    width, height, bit_depth, color_type, _, _, interlace = struct.unpack('>IIBBBBB', ihdr)
+    if interlace:
+        f.close()
+        raise TiledProcessingError("不支持隔行扫描(Adam7)PNG的分块处理")
+    if (bit_depth, color_type) not in PNG_MODES:
+        f.close()
+        raise TiledProcessingError(f"不支持的PNG格式: 位深 {bit_depth}, 颜色类型 {color_type}")
+
+    mode, rawmode = PNG_MODES[(bit_depth, color_type)]
+    channels = PNG_CHANNELS[color_type]
+    row_bytes = (width * channels * bit_depth + 7) // 8
+    if band_height is None:
+        band_height = band_height_for(row_bytes, memory_limit_mb)
+
+    palette = None
+    if plte is not None:
+        palette = list(plte)
+    transparency = None
+    if trns is not None:
+        transparency = trns[0] if color_type == 3 and len(trns) == 1 else trns
+        if color_type == 0:
+            transparency = struct.unpack('>H', trns[:2])[0]
+        elif color_type == 2:
+            transparency = struct.unpack('>HHH', trns[:6])
+
+    def idat_stream():
+        length = idat_length
+        while True:
+            while length > 0:
+                data = f.read(min(length, _IDAT_CHUNK_SIZE))
+                if not data:
+                    return
+                length -= len(data)
+                yield data
+            f.read(4)
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                return
+            length, chunk_type = struct.unpack('>I4s', chunk_header)
+            if chunk_type != b'IDAT':
+                return
+
+    def bands():
+        try:
+            decompressor = zlib.decompressobj()
+            pending = bytearray()
+            previous_row = None
+            y = 0
+            stream = idat_stream()
+            while y < height:
+                rows = min(band_height, height - y)
+                needed = rows * (row_bytes + 1)
+                while len(pending) < needed:
+                    data = decompressor.unconsumed_tail or next(stream, b'')
+                    if not data:
+                        raise TiledProcessingError("PNG数据不完整")
+                    pending += decompressor.decompress(data, _IDAT_CHUNK_SIZE)
+
+                with memoryview(pending) as view:
+                    band = _decode_png_rows(ihdr, plte, view[:needed], rows, previous_row, rawmode, bit_depth)
+                del pending[:needed]
+                previous_row = band.crop((0, rows - 1, width, rows)).tobytes('raw', rawmode)
+                yield y, band
+                y += rows
+        finally:
+            f.close()
+
+    header = ImageHeader('PNG', width, height, mode)
+    return header, bands(), palette, transparency
+
+
+def _decode_png_rows(ihdr: bytes, plte: Optional[bytes], filtered: bytes, rows: int,
+                     previous_row: Optional[bytes], rawmode: str, bit_depth: int):
+    """
+    解码一个条带的已滤波扫描行
+
+    把上一行的原始数据（滤波类型0）放在条带前面，组装成一个小 PNG，
+    交由 Pillow 的 C 解码器反滤波，再裁掉辅助行。
+    """
+    width = struct.unpack('>I', ihdr[:4])[0]
+    extra = 1 if previous_row is not None else 0
+
+    # 使用存储模式（不压缩）的 zlib 流，组装代价接近内存拷贝；各部分直接写入，不拼接成整块
+    compressor = zlib.compressobj(0)
+    parts = [compressor.compress(b'\x00' + previous_row)] if extra else []
+    parts += [compressor.compress(filtered), compressor.flush()]
+    crc = zlib.crc32(b'IDAT')
+    for part in parts:
+        crc = zlib.crc32(part, crc)
+
+    png = io.BytesIO()
+    png.write(PNG_SIGNATURE)
+    png.write(png_chunk(b'IHDR', struct.pack('>II', width, rows + extra) + ihdr[8:]))
+    if plte is not None:
+        png.write(png_chunk(b'PLTE', plte))
+    png.write(struct.pack('>I4s', sum(len(part) for part in parts), b'IDAT'))
+    while parts:
+        png.write(parts.pop(0))
+    png.write(struct.pack('>I', crc & 0xffffffff))
+    png.write(png_chunk(b'IEND', b''))
+    png.seek(0)
+
+    with Image.open(png) as img:
+        img.load()
+        band = img.crop((0, extra, width, rows + extra)) if extra else img.copy()
+    return band
+
+
+def iter_tiff_bands(path: str, memory_limit_mb: float = DEFAULT_MEMORY_LIMIT_MB,
+                    band_height: Optional[int] = None):
+    """
+    按条带读取 TIFF（需要 tifffile）
+
+    Args:
+        path: TIFF 路径
+        memory_limit_mb: 内存上限（MB）
+        band_height: 指定条带高度（为空时按内存上限计算）
+
+    Returns:
+        (图片信息, 迭代器[(起始行, 条带图片)], 调色板, 透明度)
+    """
+    if not HAS_TIFFFILE or not HAS_NUMPY:
+        raise TiledProcessingError("TIFF分块读取需要 tifffile 和 numpy 库")
+
+    tif = tifffile.TiffFile(path)
+    page = tif.pages[0]
+    if page.planarconfig != 1 and page.samplesperpixel > 1:
+        tif.close()
+        raise TiledProcessingError("不支持分平面存储(planar)的TIFF")
+    if page.dtype not in (np.uint8, np.uint16):
+        tif.close()
+        raise TiledProcessingError(f"不支持的TIFF像素类型: {page.dtype}")
+
+    width, height = page.imagewidth, page.imagelength
+    samples = page.samplesperpixel
+    photometric = int(page.photometric)
+    colormap = None
+
+    if photometric == 3:
+        # TIFF 的调色板按规范为16位
+        colormap = page.colormap.T
+        if colormap.dtype != np.uint8:
+            colormap = (colormap >> 8).astype(np.uint8)
+        mode = 'RGB'
+    elif photometric in (0, 1) and samples == 1:
+        mode = 'I;16' if page.dtype == np.uint16 else 'L'
+    elif photometric in (0, 1) and samples == 2 and page.dtype == np.uint8:
+        mode = 'LA'
+    elif photometric == 2 and samples in (3, 4) and page.dtype == np.uint8:
+        mode = 'RGB' if samples == 3 else 'RGBA'
+    else:
+        tif.close()
+        raise TiledProcessingError(f"不支持的TIFF颜色格式: photometric={photometric}, samples={samples}")
+
+    segment_height = page.tilelength if page.is_tiled else min(page.rowsperstrip or height, height)
+    row_bytes = width * samples * page.dtype.itemsize
+    if band_height is None:
+        band_height = band_height_for(row_bytes, memory_limit_mb, segment_height)
+    else:
+        band_height = max(segment_height, band_height // segment_height * segment_height)
+
+    def to_image(array):
+        if colormap is not None:
+            array = colormap[array[..., 0] if array.ndim == 3 else array]
+        elif samples == 1:
+            array = array.reshape(array.shape[:2])
+            if photometric == 0:
+                array = np.iinfo(array.dtype).max - array
+        return Image.fromarray(np.ascontiguousarray(array))
+
+    def bands():
+        try:
+            band = None
+            band_y = 0
+            for data, indices, _ in page.segments(maxworkers=1, sort=True):
+                y, x = indices[2], indices[3]
+                segment = data.reshape(data.shape[-3:])
+                if band is None:
+                    band_y = y
+                    rows = min(band_height, height - band_y)
+                    band = np.zeros((rows, width, samples), dtype=page.dtype)
+
+                # tile 在右侧和底部可能带有填充，需要裁掉
+                seg_rows = min(segment.shape[0], band.shape[0] - (y - band_y))
+                seg_cols = min(segment.shape[1], width - x)
+                band[y - band_y:y - band_y + seg_rows, x:x + seg_cols] = segment[:seg_rows, :seg_cols]
+
+                if y + seg_rows >= band_y + band.shape[0] and x + seg_cols >= width:
+                    yield band_y, to_image(band)
+                    band = None
+            if band is not None:
+                yield band_y, to_image(band)
+        finally:
+            tif.close()
+
+    header = ImageHeader('TIFF', width, height, mode)
+    return header, bands(), None, None
+
+
+def iter_bands(path: str, memory_limit_mb: float = DEFAULT_MEMORY_LIMIT_MB,
+               band_height: Optional[int] = None):
+    """
+    按条带读取 PNG 或 TIFF
+
+    Args:
+        path: 图片路径
+        memory_limit_mb: 内存上限（MB）
+        band_height: 指定条带高度
+
+    Returns:
+        (图片信息, 迭代器[(起始行, 条带图片)], 调色板, 透明度)
+    """
+    header = read_header(path)
+    if header is None:
+        raise TiledProcessingError("只支持PNG和TIFF的分块读取")
+    if header.format == 'PNG':
+        return iter_png_bands(path, memory_limit_mb, band_height)
+    return iter_tiff_bands(path, memory_limit_mb, band_height)
+
+
+class StreamingPngWriter:
+    """按条带写出 PNG"""
+
+    def __init__(self, path: str, size: Tuple[int, int], mode: str,
+                 palette=None, transparency=None, compress_level: int = 6,
+                 memory_limit_mb: float = DEFAULT_MEMORY_LIMIT_MB):
+        """
+        初始化 PNG 写入器
+
+        Args:
+            path: 输出路径
+            size: 图片尺寸
+            mode: 图片模式（L, I;16, RGB, P, LA, RGBA）
+            palette: P 模式的调色板（RGB 字节序列）
+            transparency: 透明度信息（P 模式为每个索引的 alpha 字节或单个索引）
+            compress_level: zlib 压缩级别
+            memory_limit_mb: 内存上限（MB），决定每次滤波的行数
+        """
+        if mode not in _PNG_WRITE_MODES:
+            raise TiledProcessingError(f"PNG分块写出不支持模式: {mode}")
+
+        self.width, self.height = size
+        self.mode = mode
+        bit_depth, color_type, self.rawmode = _PNG_WRITE_MODES[mode]
+        channels = PNG_CHANNELS[color_type]
+        self.bpp = max(1, channels * bit_depth // 8)
+        self.row_bytes = self.width * self.bpp
+        self.filter_rows = filter_rows_for(self.row_bytes, memory_limit_mb)
+        self.rows_written = 0
+        self.previous_row = bytes(self.row_bytes)
+        self.compressor = zlib.compressobj(compress_level)
+        self.buffer = bytearray()
+
+        self.file = open(path, 'wb')
+        self.file.write(PNG_SIGNATURE)
+        self.file.write(png_chunk(b'IHDR', struct.pack('>IIBBBBB', self.width, self.height,
+                                                        bit_depth, color_type, 0, 0, 0)))
+        if mode == 'P':
+            self.file.write(png_chunk(b'PLTE', bytes(palette or range(256))[:768]))
+            if isinstance(transparency, int):
+                self.file.write(png_chunk(b'tRNS', bytes([255] * transparency + [0])))
+            elif transparency:
+                self.file.write(png_chunk(b'tRNS', bytes(transparency)))
+
+    def write_band(self, band):
+        """
+        写入一个条带
+
+        Args:
+            band: 与目标模式一致、宽度相同的 Pillow 图片
+        """
+        if band.mode != self.mode:
+            band = band.convert(self.mode)
+        raw = band.tobytes('raw', self.rawmode)
+        rows = band.size[1]
+
+        if HAS_NUMPY and self.mode != 'P':
+            array = np.frombuffer(raw, dtype=np.uint8).reshape(rows, self.row_bytes)
+            previous = np.frombuffer(self.previous_row, dtype=np.uint8)
+            for start in range(0, rows, self.filter_rows):
+                chunk = array[start:start + self.filter_rows]
+                self._write_compressed(self.compressor.compress(filter_band(chunk, previous, self.bpp, FILTER_PAETH)))
+                previous = chunk[-1]
+        else:
+            # 没有 NumPy（或调色板图片）时不做滤波
+            for i in range(rows):
+                row = raw[i * self.row_bytes:(i + 1) * self.row_bytes]
+                self._write_compressed(self.compressor.compress(b'\x00' + row))
+
+        self.previous_row = raw[-self.row_bytes:]
+        self.rows_written += rows
+
+    def _write_compressed(self, data: bytes):
+        """累积压缩数据，满一块时写出 IDAT"""
+        self.buffer += data
+        if len(self.buffer) >= _IDAT_CHUNK_SIZE:
+            self.file.write(png_chunk(b'IDAT', bytes(self.buffer)))
+            self.buffer.clear()
+
+    def close(self):
+        """结束写入"""
+        if self.file.closed:
+            return
+        try:
+            if self.rows_written != self.height:
+                raise TiledProcessingError(f"PNG行数不一致: {self.rows_written}/{self.height}")
+            self.buffer += self.compressor.flush()
+            self.file.write(png_chunk(b'IDAT', bytes(self.buffer)))
+            self.file.write(png_chunk(b'IEND', b''))
+        finally:
+            self.file.close()
+
+
+class StreamingBigTiffWriter:
+    """按条带写出分块（tile）的 BigTIFF"""
+
+    def __init__(self, path: str, size: Tuple[int, int], mode: str, tile_size: int = 256,
+                 compression: str = 'deflate', max_workers: Optional[int] = None):
+        """
+        初始化 TIFF 写入器
+
+        Args:
+            path: 输出路径
+            size: 图片尺寸
+            mode: 图片模式（L, I;16, RGB, LA, RGBA）
+            tile_size: tile 边长（16的倍数）
+            compression: 'deflate' 或 'none'
+            max_workers: 并行压缩线程数
+        """
+        if mode not in _TIFF_WRITE_MODES:
+            raise TiledProcessingError(f"TIFF分块写出不支持模式: {mode}")
+        if tile_size % 16:
+            raise TiledProcessingError("tile 边长必须是16的倍数")
+
+        self.width, self.height = size
+        self.mode = mode
+        self.bits, self.samples, self.photometric, self.extra_samples, self.rawmode = _TIFF_WRITE_MODES[mode]
+        self.bpp = self.samples * self.bits // 8
+        self.tile_size = tile_size
+        self.compression = compression
+        self.tiles_across = math.ceil(self.width / tile_size)
+        self.offsets = []
+        self.byte_counts = []
+        self.pending = b''
+        self.pending_rows = 0
+        self.rows_written = 0
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or os.cpu_count())
+
+        self.file = open(path, 'wb')
+        # BigTIFF 头：字节序、版本号43、偏移大小8、保留字、第一个IFD偏移（最后回填）
+        self.file.write(b'II' + struct.pack('<HHHQ', 43, 8, 0, 0))
+
+    @property
+    def band_multiple(self) -> int:
+        """条带高度应为 tile 高度的整数倍"""
+        return self.tile_size
+
+    def write_band(self, band):
+        """
+        写入一个条带（高度不是 tile 高度的整数倍时，余下的行会等下一个条带）
+
+        Args:
+            band: 与目标模式一致、宽度相同的 Pillow 图片
+        """
+        if band.mode != self.mode:
+            band = band.convert(self.mode)
+        data = self.pending + band.tobytes('raw', self.rawmode)
+        rows = self.pending_rows + band.size[1]
+        self.rows_written += band.size[1]
+
+        full_rows = rows // self.tile_size * self.tile_size
+        if self.rows_written == self.height:
+            full_rows = rows
+        split = full_rows * self.width * self.bpp
+        self._write_tile_rows(data[:split], full_rows)
+        self.pending = data[split:]
+        self.pending_rows = rows - full_rows
+
+    def _write_tile_rows(self, data: bytes, rows: int):
+        """把若干完整 tile 行切分为 tile 并并行压缩写出"""
+        row_bytes = self.width * self.bpp
+        tile_row_bytes = self.tile_size * self.bpp
+        tiles = []
+        for top in range(0, rows, self.tile_size):
+            tile_rows = min(self.tile_size, rows - top)
+            for col in range(self.tiles_across):
+                start = col * tile_row_bytes
+                width_bytes = min(tile_row_bytes, row_bytes - start)
+                tile = bytearray(self.tile_size * tile_row_bytes)
+                for r in range(tile_rows):
+                    offset = (top + r) * row_bytes + start
+                    tile[r * tile_row_bytes:r * tile_row_bytes + width_bytes] = data[offset:offset + width_bytes]
+                tiles.append(bytes(tile))
+
+        if self.compression == 'deflate':
+            tiles = self.executor.map(lambda t: zlib.compress(t, 6), tiles)
+        for tile in tiles:
+            self.offsets.append(self.file.tell())
+            self.byte_counts.append(len(tile))
+            self.file.write(tile)
+
+    def close(self):
+        """写出 IFD 并结束写入"""
+        if self.file.closed:
+            return
+        try:
+            if self.rows_written != self.height:
+                raise TiledProcessingError(f"TIFF行数不一致: {self.rows_written}/{self.height}")
+            self._write_ifd()
+        finally:
+            self.executor.shutdown()
+            self.file.close()
+
+    def _write_ifd(self):
+        """写出 IFD（BigTIFF 格式）"""
+        SHORT, LONG8 = 3, 16
+        compression = 8 if self.compression == 'deflate' else 1
+
+        def out_of_line(fmt: str, values) -> int:
+            if self.file.tell() % 2:
+                self.file.write(b'\x00')
+            offset = self.file.tell()
+            self.file.write(struct.pack('<' + fmt * len(values), *values))
+            return offset
+
+        entries = [
+            (256, LONG8, 1, self.width),
+            (257, LONG8, 1, self.height),
+            (258, SHORT, self.samples, [self.bits] * self.samples),
+            (259, SHORT, 1, compression),
+            (262, SHORT, 1, self.photometric),
+            (277, SHORT, 1, self.samples),
+            (284, SHORT, 1, 1),
+            (322, SHORT, 1, self.tile_size),
+            (323, SHORT, 1, self.tile_size),
+            (324, LONG8, len(self.offsets), self.offsets),
+            (325, LONG8, len(self.byte_counts), self.byte_counts),
+        ]
+        if self.extra_samples is not None:
+            entries.append((338, SHORT, 1, self.extra_samples))
+
+        # 超过8字节的数组写在IFD之前
+        resolved = []
+        for tag, tag_type, count, value in entries:
+            fmt = 'H' if tag_type == SHORT else 'Q'
+            values = value if isinstance(value, list) else [value]
+            if struct.calcsize('<' + fmt * count) > 8:
+                resolved.append((tag, tag_type, count, struct.pack('<Q', out_of_line(fmt, values))))
+            else:
+                resolved.append((tag, tag_type, count, struct.pack('<' + fmt * count, *values).ljust(8, b'\x00')))
+
+        if self.file.tell() % 2:
+            self.file.write(b'\x00')
+        ifd_offset = self.file.tell()
+        self.file.write(struct.pack('<Q', len(resolved)))
+        for tag, tag_type, count, value in resolved:
+            self.file.write(struct.pack('<HHQ', tag, tag_type, count) + value)
+        self.file.write(struct.pack('<Q', 0))
+
+        self.file.seek(8)
+        self.file.write(struct.pack('<Q', ifd_offset))
+
+
+def convert_tiled(input_path: str, output_path: str, save_format: str,
+                  memory_limit_mb: float = DEFAULT_MEMORY_LIMIT_MB,
+                  tile_size: int = 256, compress_level: int = 6,
+                  tiff_compression: str = 'deflate') -> ImageHeader:
+    """
+    以固定内存上限转换超大 PNG/TIFF
+
+    Args:
+        input_path: 输入路径（PNG 或 TIFF）
+        output_path: 输出路径
+        save_format: 'PNG' 或 'TIFF'（输出分块 BigTIFF）
+        memory_limit_mb: 内存上限（MB）
+        tile_size: TIFF tile 边长
+        compress_level: PNG zlib 压缩级别
+        tiff_compression: TIFF 压缩方式（'deflate' 或 'none'）
+
+    Returns:
+        输入图片信息
+    """
+    header = read_header(input_path)
+    if header is None:
+        raise TiledProcessingError("只支持PNG和TIFF的分块读取")
+
+    band_height = None
+    if save_format == 'TIFF':
+        row_bytes = header.width * 8
+        band_height = band_height_for(row_bytes, memory_limit_mb, tile_size)
+
+    header, bands, palette, transparency = iter_bands(input_path, memory_limit_mb, band_height)
+    mode = header.mode
+    if mode == '1':
+        mode = 'L'
+
+    if save_format == 'PNG':
+        writer = StreamingPngWriter(output_path, (header.width, header.height), mode,
+                                    palette=palette, transparency=transparency,
+                                    compress_level=compress_level, memory_limit_mb=memory_limit_mb)
+    elif save_format == 'TIFF':
+        if mode == 'P':
+            mode = 'RGBA' if transparency is not None else 'RGB'
+        writer = StreamingBigTiffWriter(output_path, (header.width, header.height), mode,
+                                        tile_size=tile_size, compression=tiff_compression)
+    else:
+        raise TiledProcessingError(f"分块模式不支持输出格式: {save_format}")
+
+    try:
+        for _, band in bands:
+            if band.mode == 'P' and mode != 'P':
+                if transparency is not None:
+                    band.info['transparency'] = transparency
+                band = band.convert(mode)
+            writer.write_band(band)
+        writer.close()
+    except BaseException:
+        # 中途失败或被中断时删除截断的输出文件
+        writer.file.close()
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+    return header
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+分段并行视频转码模块
+用 ffmpeg 的 segment 封装在关键帧处切分视频流（直接复制，不解码），各段由多个 ffmpeg 进程同时编码，
+再用 concat 分离器拼接。音频不切分，作为一个流与视频段同时编码，段边界处没有音频间隙。
+中间文件放在输出文件旁的工作目录中，并记录清单：转码中断后用相同的输入和参数再次转换时，
+跳过已完成的段，全部完成后删除工作目录。
+"""
+
+import csv
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from utils.encoder_profiles import threads_per_job
+from utils.ffmpeg_utils import FFmpegError, FFmpegProgress, run_ffmpeg
+from utils.logger import get_logger
+from utils.media_probe import MediaInfo
+from utils.progress import ProgressCallback, report_progress
+from utils.video_transcode import VIDEO_MUXERS, audio_stream_args, output_args, video_stream_args
+
+logger = get_logger(__name__)
+
+# 默认段长（秒），实际段长取决于关键帧间隔
+DEFAULT_SEGMENT_SECONDS = 60
+
+# 清单文件名和版本（版本变化时不复用旧的工作目录）
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+# 切分后的原始段使用 Matroska 封装（可以容纳任意编码）
+_PIECE_FORMAT = 'matroska'
+
+
+def work_dir_for(output_path: str) -> str:
+    """
+    获取输出文件对应的工作目录（与输出文件在同一目录，便于断点续传时找到）
+
+    Args:
+        output_path: 输出文件路径
+
+    Returns:
+        工作目录路径
+    """
+    directory, name = os.path.split(os.path.abspath(output_path))
+    return os.path.join(directory, f'.{name}.segments')
+
+
+class SegmentManifest:
+    """
+    分段转码清单：记录输入文件、编码参数、切分结果和已完成的段
+
+    输入文件（路径、大小、修改时间）或编码参数变化时清单失效，需要重新切分和编码。
+    """
+
+    def __init__(self, path: str, identity: Dict[str, Any]):
+        """
+        Args:
+            path: 清单文件路径
+            identity: 输入文件和编码参数
+        """
+        self.path = path
+        self.identity = identity
+        # [(文件名, 开始时间, 结束时间)]，时间只用于报告进度
+        self.pieces: List[Tuple[str, float, float]] = []
+        self.done = set()
+        self.audio_done = False
+
+    @classmethod
+    def load(cls, path: str, identity: Dict[str, Any]) -> Optional['SegmentManifest']:
+        """
+        读取清单
+
+        Args:
+            path: 清单文件路径
+            identity: 本次转换的输入文件和编码参数
+
+        Returns:
+            清单，不存在、无法读取或与本次转换不符时返回None
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != MANIFEST_VERSION or data.get('identity') != identity:
+            return None
+        manifest = cls(path, identity)
+        manifest.pieces = [tuple(piece) for piece in data.get('pieces', [])]
+        manifest.done = set(data.get('done', []))
+        manifest.audio_done = bool(data.get('audio_done'))
+        return manifest
+
+    def save(self):
+        """写入清单（先写临时文件再替换，中断时不会留下不完整的清单）"""
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': MANIFEST_VERSION,
+                'identity': self.identity,
+                'pieces': self.pieces,
+                'done': sorted(self.done),
+                'audio_done': self.audio_done,
+            }, f, ensure_ascii=False, indent=1)
+        os.replace(temp_path, self.path)
+
+
+def _split_at_keyframes(input_path: str, work_dir: str, segment_seconds: float) -> List[Tuple[str, float, float]]:
+    """
+    在关键帧处切分第一个视频流
+
+    Returns:
+        [(文件名, 开始时间, 结束时间)]
+    """
+    list_path = os.path.join(work_dir, 'pieces.csv')
+    run_ffmpeg([
+        '-i', input_path, '-map', '0:v:0', '-c', 'copy',
+        '-f', 'segment', '-segment_time', str(segment_seconds), '-segment_format', _PIECE_FORMAT,
+        '-reset_timestamps', '1', '-segment_list', list_path, '-segment_list_type', 'csv',
+        os.path.join(work_dir, 'piece_%05d.mkv')
+    ])
+    pieces = []
+    with open(list_path, 'r', newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            if len(row) >= 3:
+                pieces.append((row[0], float(row[1]), float(row[2])))
+    if not pieces:
+        raise FFmpegError(f"无法切分视频: {input_path}")
+    return pieces
+
+
+def _encoded_name(index: int, target_format: str) -> str:
+    """编码后的段文件名"""
+    return f'encoded_{index:05d}.{target_format}'
+
+
+def _run_to(args: List[str], output_path: str, on_progress: Optional[Callable[[FFmpegProgress], Any]] = None):
+    """运行 ffmpeg 输出到临时文件，成功后再改名（中断时不会留下看似完成的文件）"""
+    temp_path = output_path + '.part'
+    # 输出路径放在参数最后
+    run_ffmpeg(args + [temp_path], on_progress)
+    os.replace(temp_path, output_path)
+
+
+def segment_video(input_path: str, output_path: str, target_format: str, info: MediaInfo,
+                  options: Optional[Dict[str, Any]] = None,
+                  progress_callback: Optional[ProgressCallback] = None) -> float:
+    """
+    分段并行转码视频
+
+    Args:
+        input_path: 输入文件路径
+        output_path: 输出文件路径
+        target_format: 目标格式
+        info: 输入的媒体信息
+        options: 转换选项
+            segment_seconds: 每段时长（秒，默认60，在此时长之后的第一个关键帧处切分）
+            segment_workers: 同时编码的段数（默认为CPU核心数）
+            resume: 复用工作目录中已完成的段（默认 True）
+            threads: 每段的编码线程数（默认按段数平分CPU）
+            其他编码参数同 build_video_args
+        progress_callback: 进度回调（报告 'video'，单位为秒：已完成的段加上正在编码的段已输出的时长，
+            fps 为正在编码的各段之和）
+
+    Returns:
+        视频时长（秒）
+    """
+    options = dict(options or {})
+    if info.video is None:
+        raise FFmpegError(f"没有视频流: {input_path}")
+    workers = int(options.get('segment_workers') or os.cpu_count() or 1)
+    if not options.get('threads'):
+        options['threads'] = threads_per_job(workers)
+    segment_seconds = float(options.get('segment_seconds', DEFAULT_SEGMENT_SECONDS))
+    video_args = video_stream_args(target_format, options)
+    audio_args = audio_stream_args(target_format, options) if info.audio is not None else None
+
+    work_dir = work_dir_for(output_path)
+    stat = os.stat(input_path)
+    identity = {
+        'input': os.path.abspath(input_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+        'target_format': target_format, 'segment_seconds': segment_seconds,
+        # 线程数可以与上次不同（例如换了一台机器继续），不参与比较
+        'video_args': video_stream_args(target_format, dict(options, threads=None)),
+        'audio_args': audio_args,
+    }
+    manifest_path = os.path.join(work_dir, MANIFEST_NAME)
+    manifest = SegmentManifest.load(manifest_path, identity) if options.get('resume', True) else None
+    if manifest is None:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        os.makedirs(work_dir)
+        manifest = SegmentManifest(manifest_path, identity)
+        manifest.pieces = _split_at_keyframes(input_path, work_dir, segment_seconds)
+        manifest.save()
+    else:
+        logger.info(f"继续未完成的分段转码: 已完成 {len(manifest.done)}/{len(manifest.pieces)} 段")
+
+    muxer = VIDEO_MUXERS[target_format]
+    audio_path = os.path.join(work_dir, f'audio.{target_format}')
+    total_seconds = sum(end - start for _, start, end in manifest.pieces)
+    done_seconds = sum(end - start for i, (_, start, end) in enumerate(manifest.pieces) if i in manifest.done)
+    logger.info(f"分为 {len(manifest.pieces)} 段并行编码: {input_path}")
+
+    start_time = time.monotonic()
+    resumed_seconds = done_seconds
+    lock = threading.Lock()
+    # 正在编码的段: 段序号 -> (已输出的时长, 编码 fps)
+    running: Dict[int, Tuple[float, float]] = {}
+
+    def report():
+        with lock:
+            current = min(done_seconds + sum(seconds for seconds, _ in running.values()), total_seconds)
+            fps = sum(fps for _, fps in running.values()) or None
+        elapsed = time.monotonic() - start_time
+        speed = (current - resumed_seconds) / elapsed if elapsed > 0 else None
+        eta = (total_seconds - current) / speed if speed else None
+        report_progress(progress_callback, 'video', current, total_seconds, 's', speed=speed, eta=eta, fps=fps)
+
+    def piece_progress(index: int) -> Optional[Callable[[FFmpegProgress], None]]:
+        if progress_callback is None:
+            return None
+
+        def on_progress(progress: FFmpegProgress):
+            if not progress.finished:
+                with lock:
+                    running[index] = (progress.out_time or 0.0, progress.fps or 0.0)
+                report()
+
+        return on_progress
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        if audio_args is not None and not manifest.audio_done:
+            future = executor.submit(_run_to, ['-i', input_path, '-map', '0:a:0', '-vn'] + audio_args
+                                     + ['-f', muxer], audio_path)
+            futures[future] = None
+        for i, (name, start, end) in enumerate(manifest.pieces):
+            if i in manifest.done:
+                continue
+            args = ['-i', os.path.join(work_dir, name), '-map', '0:v:0'] + video_args + ['-f', muxer]
+            futures[executor.submit(_run_to, args, os.path.join(work_dir, _encoded_name(i, target_format)),
+                                    piece_progress(i))] = i
+
+        error = None
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                if error is None:
+                    error = e
+                    # 不再启动排队中的段；正在编码的段完成后仍然记录到清单，下次可以跳过
+                    for pending in futures:
+                        pending.cancel()
+                continue
+            index = futures[future]
+            if index is None:
+                manifest.audio_done = True
+            else:
+                manifest.done.add(index)
+                _, start, end = manifest.pieces[index]
+                with lock:
+                    running.pop(index, None)
+                    done_seconds += end - start
+                os.remove(os.path.join(work_dir, manifest.pieces[index][0]))
+            manifest.save()
+            report()
+
+    if error is not None:
+        logger.warning(f"分段转码中断，已完成 {len(manifest.done)}/{len(manifest.pieces)} 段，"
+                       f"用相同的参数再次转换时继续: {work_dir}")
+        raise error
+
+    # 各段的时间戳都从0开始，concat 分离器按每段的实际时长依次接上
+    list_path = os.path.join(work_dir, 'concat.txt')
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for i in range(len(manifest.pieces)):
+            f.write(f"file '{_encoded_name(i, target_format)}'\n")
+    args = ['-f', 'concat', '-safe', '0', '-i', list_path]
+    maps = ['-map', '0:v:0']
+    if audio_args is not None:
+        args += ['-i', audio_path]
+        maps += ['-map', '1:a:0']
+    # 最后一个输入只用于复制标签
+    args += ['-i', input_path] + maps + ['-c', 'copy', '-map_metadata', '2' if audio_args is not None else '1']
+    try:
+        run_ffmpeg(args + output_args(target_format, output_path))
+    except Exception:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return total_seconds
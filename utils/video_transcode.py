@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+视频转码模块
+直接调用 ffmpeg 完成解码、编码和封装，帧数据不经过 Python。
+按目标封装格式选择编码器（例如 avi 使用 MPEG-4 Part 2 + MP3，webm 使用 VP9 + Opus），
+首选编码器不可用时（ffmpeg 编译时未启用）依次尝试后备编码器。
+只改变封装时（例如 mp4 -> mkv、mov -> mp4），如果各个流的编码都可以放入目标格式，直接复制流，不重新编码。
+进度由 ffmpeg 的 -progress 输出解析（已输出时长、帧数、编码 fps 和速度）。
+"""
+
+import os
+import subprocess
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+from utils.encoder_profiles import video_encoder_args
+from utils.ffmpeg_utils import FFmpegError, FFmpegProgress, find_ffmpeg, run_ffmpeg
+from utils.logger import get_logger
+from utils.media_probe import MediaInfo, StreamInfo
+from utils.progress import ProgressCallback, ffmpeg_progress_reporter
+
+logger = get_logger(__name__)
+
+# 目标格式 -> ffmpeg 封装格式
+VIDEO_MUXERS = {
+    'mp4': 'mp4',
+    'm4v': 'mp4',
+    'mov': 'mov',
+    'mkv': 'matroska',
+    'avi': 'avi',
+    'wmv': 'asf',
+    'flv': 'flv',
+    'webm': 'webm',
+}
+
+
+class VideoCodecs(NamedTuple):
+    """目标格式可用的编码器（按优先顺序）"""
+    video: Tuple[str, ...]
+    audio: Tuple[str, ...]
+
+
+# 目标格式 -> 编码器
+VIDEO_CODECS = {
+    'mp4': VideoCodecs(('libx264', 'mpeg4'), ('aac',)),
+    'm4v': VideoCodecs(('libx264', 'mpeg4'), ('aac',)),
+    'mov': VideoCodecs(('libx264', 'mpeg4'), ('aac',)),
+    'mkv': VideoCodecs(('libx264', 'mpeg4'), ('aac', 'libopus', 'libvorbis')),
+    'avi': VideoCodecs(('mpeg4', 'libxvid'), ('libmp3lame', 'ac3')),
+    'wmv': VideoCodecs(('wmv2', 'msmpeg4'), ('wmav2',)),
+    'flv': VideoCodecs(('libx264', 'flv'), ('aac', 'libmp3lame')),
+    'webm': VideoCodecs(('libvpx-vp9', 'libvpx'), ('libopus', 'libvorbis')),
+}
+
+
+class CopyableCodecs(NamedTuple):
+    """目标格式可以直接容纳（复制流）的编码"""
+    video: Tuple[str, ...]
+    audio: Tuple[str, ...]
+    subtitle: Tuple[str, ...] = ()
+
+
+_MP4_VIDEO = ('h264', 'hevc', 'av1', 'vp9', 'mpeg4', 'mpeg2video')
+_MP4_AUDIO = ('aac', 'mp3', 'ac3', 'eac3', 'alac', 'opus', 'flac')
+
+# 目标格式 -> 可以直接复制的编码（avi 不容纳 mp4 中的 H.264，需要转换码流格式，这里不复制）
+COPYABLE_CODECS = {
+    'mp4': CopyableCodecs(_MP4_VIDEO, _MP4_AUDIO, ('mov_text',)),
+    'm4v': CopyableCodecs(_MP4_VIDEO, _MP4_AUDIO, ('mov_text',)),
+    'mov': CopyableCodecs(_MP4_VIDEO + ('prores', 'mjpeg'),
+                          ('aac', 'mp3', 'ac3', 'eac3', 'alac', 'pcm_s16le', 'pcm_s24le'), ('mov_text',)),
+    'mkv': CopyableCodecs(
+        _MP4_VIDEO + ('vp8', 'mpeg1video', 'msmpeg4v3', 'theora', 'prores', 'mjpeg', 'ffv1'),
+        _MP4_AUDIO + ('vorbis', 'dts', 'truehd', 'mp2', 'pcm_s16le', 'pcm_s24le', 'wmav2'),
+        ('subrip', 'ass', 'ssa', 'webvtt', 'hdmv_pgs_subtitle', 'dvd_subtitle'),
+    ),
+    'avi': CopyableCodecs(('mpeg4', 'msmpeg4v3', 'msmpeg4v2', 'mjpeg'), ('mp3', 'ac3', 'mp2', 'pcm_s16le')),
+    'wmv': CopyableCodecs(('wmv1', 'wmv2', 'wmv3', 'vc1'), ('wmav1', 'wmav2', 'wmapro')),
+    'flv': CopyableCodecs(('h264', 'flv1'), ('aac', 'mp3')),
+    'webm': CopyableCodecs(('vp8', 'vp9', 'av1'), ('opus', 'vorbis'), ('webvtt',)),
+}
+
+# 指定了这些选项时需要重新编码
+REENCODE_OPTIONS = ('video_codec', 'audio_codec', 'video_bitrate', 'audio_bitrate', 'preset', 'crf', 'tune')
+
+# 编码器的附加参数：H.264 / H.265 / VP9 输出 4:2:0 采样（播放器兼容性最好），MPEG-4 Part 2 等使用固定质量
+# （预设、CRF 和线程数见 utils.encoder_profiles）
+_ENCODER_ARGS = {
+    'libx264': ['-pix_fmt', 'yuv420p'],
+    'libx265': ['-pix_fmt', 'yuv420p'],
+    'libvpx-vp9': ['-pix_fmt', 'yuv420p'],
+    'libvpx': ['-pix_fmt', 'yuv420p', '-b:v', '1M'],
+    'mpeg4': ['-q:v', '4'],
+    'libxvid': ['-q:v', '4'],
+    'msmpeg4': ['-q:v', '4'],
+    'wmv2': ['-q:v', '4'],
+}
+
+# 封装格式的附加参数：mp4 / mov 把索引移到文件开头，便于边下载边播放
+_MUXER_ARGS = {
+    'mp4': ['-movflags', '+faststart'],
+    'mov': ['-movflags', '+faststart'],
+}
+
+
+@lru_cache(maxsize=None)
+def available_encoders() -> FrozenSet[str]:
+    """
+    获取 ffmpeg 支持的编码器名称
+
+    Returns:
+        编码器名称集合，没有 ffmpeg 时为空
+    """
+    ffmpeg = find_ffmpeg()
+    if ffmpeg is None:
+        return frozenset()
+    try:
+        result = subprocess.run([ffmpeg, '-hide_banner', '-encoders'], capture_output=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"无法获取ffmpeg编码器列表: {str(e)}")
+        return frozenset()
+    names = set()
+    in_table = False
+    # 每行为 " V....D libx264   说明"，表头以 " ------" 行结束
+    for line in result.stdout.decode('utf-8', errors='replace').splitlines():
+        if not in_table:
+            in_table = line.strip().startswith('---')
+            continue
+        parts = line.split()
+        if len(parts) >= 2:
+            names.add(parts[1])
+    return frozenset(names)
+
+
+def _pick(candidates: Tuple[str, ...], override: Optional[str]) -> str:
+    """选择第一个可用的编码器，用户指定时直接使用"""
+    if override:
+        return override
+    encoders = available_encoders()
+    for name in candidates:
+        if name in encoders:
+            return name
+    raise FFmpegError(f"ffmpeg不支持以下任一编码器: {', '.join(candidates)}")
+
+
+def select_codecs(target_format: str, options: Optional[Dict[str, Any]] = None) -> Tuple[str, str]:
+    """
+    按目标格式选择视频和音频编码器
+
+    Args:
+        target_format: 目标格式
+        options: 转换选项（video_codec / audio_codec 指定编码器）
+
+    Returns:
+        (视频编码器, 音频编码器)
+
+    Raises:
+        FFmpegError: 不支持的目标格式，或没有可用的编码器
+    """
+    options = options or {}
+    codecs = VIDEO_CODECS.get(target_format)
+    if codecs is None:
+        raise FFmpegError(f"不支持的视频格式: {target_format}")
+    return _pick(codecs.video, options.get('video_codec')), _pick(codecs.audio, options.get('audio_codec'))
+
+
+def video_stream_args(target_format: str, options: Optional[Dict[str, Any]] = None) -> List[str]:
+    """
+    生成视频流的编码参数
+
+    Args:
+        target_format: 目标格式
+        options: 转换选项
+            video_codec: 编码器（默认按目标格式选择）
+            profile / preset / crf / tune / threads: 编码配置和单项参数（见 video_encoder_args）
+            video_bitrate: 视频码率（例如 '2M'，指定后不使用固定质量参数）
+
+    Returns:
+        ffmpeg 参数（-c:v 及编码器参数）
+    """
+    options = options or {}
+    video_codec, _ = select_codecs(target_format, options)
+    encoder_args = list(_ENCODER_ARGS.get(video_codec, []))
+    if options.get('video_bitrate'):
+        # 码率与固定质量参数不能同时使用
+        for flag in ('-q:v', '-b:v'):
+            if flag in encoder_args:
+                index = encoder_args.index(flag)
+                del encoder_args[index:index + 2]
+    return ['-c:v', video_codec] + encoder_args + video_encoder_args(video_codec, options)
+
+
+def audio_stream_args(target_format: str, options: Optional[Dict[str, Any]] = None) -> List[str]:
+    """
+    生成音频流的编码参数
+
+    Args:
+        target_format: 目标格式
+        options: 转换选项（audio_codec 编码器，audio_bitrate 码率，例如 '128k'）
+
+    Returns:
+        ffmpeg 参数（-c:a 及码率）
+    """
+    options = options or {}
+    _, audio_codec = select_codecs(target_format, options)
+    args = ['-c:a', audio_codec]
+    if options.get('audio_bitrate'):
+        args += ['-b:a', str(options['audio_bitrate'])]
+    return args
+
+
+def output_args(target_format: str, output_path: str) -> List[str]:
+    """
+    生成输出文件的封装参数
+
+    Args:
+        target_format: 目标格式
+        output_path: 输出文件路径
+
+    Returns:
+        ffmpeg 参数（封装格式选项、-f 和输出路径）
+    """
+    muxer = VIDEO_MUXERS[target_format]
+    return _MUXER_ARGS.get(muxer, []) + ['-f', muxer, output_path]
+
+
+def build_video_args(input_path: str, output_path: str, target_format: str,
+                     options: Optional[Dict[str, Any]] = None) -> List[str]:
+    """
+    生成视频转码的 ffmpeg 参数
+
+    Args:
+        input_path: 输入文件路径
+        output_path: 输出文件路径
+        target_format: 目标格式
+        options: 转换选项（见 video_stream_args、audio_stream_args）
+
+    Returns:
+        ffmpeg 参数（不含可执行文件和通用参数）
+    """
+    return (['-i', input_path] + video_stream_args(target_format, options)
+            + audio_stream_args(target_format, options) + output_args(target_format, output_path))
+
+
+def transcode_video(input_path: str, output_path: str, target_format: str,
+                    options: Optional[Dict[str, Any]] = None, duration: Optional[float] = None,
+                    progress_callback: Optional[ProgressCallback] = None) -> Optional[FFmpegProgress]:
+    """
+    用 ffmpeg 转码视频
+
+    Args:
+        input_path: 输入文件路径
+        output_path: 输出文件路径
+        target_format: 目标格式
+        options: 转换选项（见 build_video_args）
+        duration: 探测到的时长（秒），未指定时使用 ffmpeg 打印的输入时长
+        progress_callback: 进度回调（约每0.5秒报告一次 'video'，单位为秒，带编码 fps）
+
+    Returns:
+        结束时的进度（总帧数、平均编码 fps 和速度）
+
+    Raises:
+        FFmpegError: 未找到 ffmpeg、没有可用的编码器或转码失败
+    """
+    args = build_video_args(input_path, output_path, target_format, options)
+    logger.debug(f"ffmpeg 视频转码参数: {' '.join(args)}")
+    try:
+        return run_ffmpeg(args, ffmpeg_progress_reporter(progress_callback, 'video', duration))
+    except Exception:
+        # 转码失败或被中断时不留下不完整的输出文件
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+
+
+def can_copy_video(info: MediaInfo, target_format: str, options: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    判断能否直接把各个流复制到目标格式（只改变封装）
+
+    Args:
+        info: 输入的媒体信息
+        target_format: 目标格式
+        options: 转换选项（指定了编码器或码率时需要重新编码）
+
+    Returns:
+        是否可以复制（不能放入目标格式的字幕流会被丢弃，不影响判断）
+    """
+    options = options or {}
+    codecs = COPYABLE_CODECS.get(target_format)
+    if codecs is None or info.video is None:
+        return False
+    if any(options.get(key) for key in REENCODE_OPTIONS):
+        return False
+    return all(s.codec_name in codecs.video for s in info.streams_of('video')) and \
+        all(s.codec_name in codecs.audio for s in info.streams_of('audio'))
+
+
+def _copy_streams(info: MediaInfo, target_format: str) -> List[StreamInfo]:
+    """需要复制的流：全部视频流（不含封面图片）、音频流和目标格式可以容纳的字幕流"""
+    subtitles = COPYABLE_CODECS[target_format].subtitle
+    streams = info.streams_of('video') + info.streams_of('audio')
+    dropped = [s for s in info.streams_of('subtitle') if s.codec_name not in subtitles]
+    if dropped:
+        logger.info(f"{target_format} 不支持字幕编码 {', '.join(s.codec_name for s in dropped)}，已丢弃")
+    return streams + [s for s in info.streams_of('subtitle') if s.codec_name in subtitles]
+
+
+def remux_video(input_path: str, output_path: str, target_format: str, info: MediaInfo,
+                progress_callback: Optional[ProgressCallback] = None):
+    """
+    复制各个流到新的封装（不解码，保留标签和章节）
+
+    Args:
+        input_path: 输入文件路径
+        output_path: 输出文件路径
+        target_format: 目标格式
+        info: 输入的媒体信息
+        progress_callback: 进度回调（报告 'remux'，单位为秒）
+
+    Raises:
+        FFmpegError: ffmpeg 执行失败
+    """
+    args = ['-i', input_path]
+    for stream in _copy_streams(info, target_format):
+        args += ['-map', f'0:{stream.index}']
+    args += ['-c', 'copy', '-map_metadata', '0'] + output_args(target_format, output_path)
+    try:
+        run_ffmpeg(args, ffmpeg_progress_reporter(progress_callback, 'remux', info.duration))
+    except Exception:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise